@@ -1,6 +1,7 @@
 import streamlit as st
 import time
-from utils.db_manager import supabase, create_profile_if_not_exists
+from utils.db_manager import get_supabase, create_profile_if_not_exists
+from utils.tracing import bind_streamlit_session
 
 # 1. 페이지 설정
 st.set_page_config(
@@ -16,6 +17,23 @@ if "user" not in st.session_state:
 if "profile" not in st.session_state:
     st.session_state.profile = None
 
+# 지연 시간 추적용 세션 ID (이 세션의 모든 span에 기록)
+bind_streamlit_session(st.session_state, (st.session_state.profile or {}).get("id"))
+
+@st.cache_resource
+def resume_background_jobs():
+    """서버 프로세스 시작 후 1회: 재시작 등으로 중단된 코칭 결과 저장 / 참고자료 수집 / 재채점 작업 재개"""
+    from utils.save_queue import resume_pending_saves
+    from utils.reference_ingest import resume_pending_ingestions
+    from utils.rescoring import resume_rescore_jobs
+
+    resume_pending_saves()
+    resume_pending_ingestions()
+    resume_rescore_jobs()
+    return True
+
+resume_background_jobs()
+
 # ==========================================
 # 🔐 인증 로직
 # ==========================================
@@ -23,7 +41,7 @@ if "profile" not in st.session_state:
 def login_with_email(email, password):
     try:
         # 로그인 시도
-        res = supabase.auth.sign_in_with_password({"email": email, "password": password})
+        res = get_supabase().auth.sign_in_with_password({"email": email, "password": password})
         st.session_state.user = res.user
         
         # 프로필 조회 및 세션 저장
@@ -47,7 +65,7 @@ def sign_up_with_email(email, password, role_selection):
                 "is_admin_request": is_admin
             }
         }
-        res = supabase.auth.sign_up({"email": email, "password": password, "options": options})
+        res = get_supabase().auth.sign_up({"email": email, "password": password, "options": options})
         
         if res.user:
             st.success("✅ 가입 신청이 완료되었습니다!")
@@ -63,7 +81,7 @@ def sign_up_with_email(email, password, role_selection):
             st.error(f"가입 실패 (상세): {e}")
 
 def logout():
-    supabase.auth.sign_out()
+    get_supabase().auth.sign_out()
     st.session_state.user = None
     st.session_state.profile = None
     st.rerun()
@@ -0,0 +1,102 @@
+"""
+coaching_logs 로컬 분석 스냅샷 벤치마크
+
+합성 데이터(기본 1,000,000행)로 스냅샷 리빌드 시간, 증분 동기화 시간,
+메모리 사용량(원본 DataFrame vs 압축 dtype)과 대시보드 집계 쿼리 시간을 측정합니다.
+
+    python -m benchmarks.bench_analytics_snapshot --rows 1000000
+"""
+import os
+import sys
+import time
+import json
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from utils.analytics_snapshot import rebuild_snapshot, sync_snapshot, load_snapshot
+
+TYPES = ["refund", "tech", "inquiry", "general", "promotion", "retention"]
+
+def generate_pages(rows, page_size, start_id=1, start_at=None, users=200, seed=42):
+    """(created_at, id) 순서로 정렬된 합성 coaching_logs 페이지를 생성합니다."""
+    rnd = random.Random(seed + start_id)
+    user_ids = [f"00000000-0000-0000-0000-{i:012d}" for i in range(users)]
+    ts = start_at or datetime(2025, 1, 1, tzinfo=timezone.utc)
+    page = []
+    for i in range(rows):
+        ts += timedelta(seconds=rnd.randint(1, 30))
+        page.append({
+            "id": start_id + i,
+            "created_at": ts.isoformat(),
+            "user_id": rnd.choice(user_ids),
+            "consultation_type": rnd.choice(TYPES),
+            "ai_score": rnd.randint(40, 100),
+            "metrics": {
+                "empathy": rnd.randint(40, 100),
+                "clarity": rnd.randint(40, 100),
+                "compliance": rnd.randint(40, 100)
+            }
+        })
+        if len(page) >= page_size:
+            yield page
+            page = []
+    if page:
+        yield page
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--incremental", type=int, default=5_000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--out", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    result = {"rows": args.rows}
+    with tempfile.TemporaryDirectory() as path:
+        # 1. 전체 리빌드
+        started = time.perf_counter()
+        stats = rebuild_snapshot(path, pages=generate_pages(args.rows, args.page_size))
+        result["rebuild_s"] = round(time.perf_counter() - started, 2)
+        result["snapshot_bytes"] = sum(
+            os.path.getsize(os.path.join(path, f)) for f in os.listdir(path) if f.endswith(".parquet")
+        )
+
+        # 2. 증분 동기화
+        started = time.perf_counter()
+        wm_at = datetime.fromisoformat(load_snapshot(path, columns=["created_at"])["created_at"].max().isoformat())
+        sync_snapshot(path, pages=generate_pages(args.incremental, args.page_size,
+                                                 start_id=args.rows + 1, start_at=wm_at))
+        result["incremental_rows"] = args.incremental
+        result["incremental_sync_s"] = round(time.perf_counter() - started, 3)
+
+        # 3. 로드 + 메모리
+        started = time.perf_counter()
+        frame = load_snapshot(path)
+        result["load_s"] = round(time.perf_counter() - started, 3)
+        result["compact_mem_mb"] = round(frame.memory_usage(deep=True).sum() / 1e6, 1)
+
+        # 4. 대시보드 집계 (KPI / 랭킹 / 추이)
+        started = time.perf_counter()
+        frame["ai_score"].mean()
+        frame.groupby("user_id", observed=True)["ai_score"].agg(["mean", "count"])
+        frame.groupby(frame["created_at"].dt.date)["ai_score"].mean()
+        result["aggregate_s"] = round(time.perf_counter() - started, 3)
+
+    # 비교 기준: 압축 전 list of dict -> DataFrame (샘플 10만 행 기준 외삽)
+    sample = min(args.rows, 100_000)
+    raw = pd.DataFrame([r for page in generate_pages(sample, sample) for r in page])
+    result["raw_mem_mb_est"] = round(raw.memory_usage(deep=True).sum() / 1e6 * args.rows / sample, 1)
+    result["sync_stats"] = stats
+
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
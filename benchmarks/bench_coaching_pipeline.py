@@ -0,0 +1,172 @@
+"""
+코칭 파이프라인 End-to-End 지연 시간 벤치마크 (로컬 Fake 사용, 실제 자격 증명 불필요)
+
+코칭 화면과 같은 순서로 각 단계를 실행하고 단계별 p50/p95/p99를 측정합니다.
+  analyze(1차 분석) -> context(고객/가이드/참고자료 조회) -> feedback(2차 분석)
+  -> upload_audio(오디오 입력만) -> save(결과 저장 + 프로필 통계 갱신)
+
+시나리오: 입력(text/audio) x 참고자료 수 x 상담원 누적 로그(이력) 수
+
+    python -m benchmarks.bench_coaching_pipeline --iterations 20 --out bench.json
+    python -m benchmarks.bench_coaching_pipeline --model-latency-ms 800 --db-latency-ms 30
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import itertools
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeSupabase, FakeModelClient, install_fakes, seed_database
+
+STAGES = ("analyze", "context", "feedback", "upload_audio", "save", "total")
+
+SAMPLE_SCRIPT = (
+    "상담원: 안녕하세요, 고객센터입니다. 무엇을 도와드릴까요?\n"
+    "고객: 홍길동인데요, 010-1234-5678이고 지난주에 산 제품 환불하고 싶어요.\n"
+    "상담원: 구매일로부터 7일이 지나서 환불은 어렵습니다.\n"
+) * 10
+
+def percentile(values, q):
+    """nearest-rank 방식 백분위수"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(round(q / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def summarize(samples):
+    return {
+        "n": len(samples),
+        "p50_ms": round(percentile(samples, 50), 2),
+        "p95_ms": round(percentile(samples, 95), 2),
+        "p99_ms": round(percentile(samples, 99), 2),
+        "mean_ms": round(sum(samples) / len(samples), 2),
+    }
+
+def run_once(modules, user_id, input_kind, audio_bytes, references):
+    """코칭 1건을 처리하며 단계별 소요 시간(ms)을 반환합니다."""
+    ai_agent, db_manager = modules
+    timings = {}
+
+    def timed(name, fn):
+        started = time.perf_counter()
+        result = fn()
+        timings[name] = (time.perf_counter() - started) * 1000
+        return result
+
+    script = SAMPLE_SCRIPT if input_kind == "text" else None
+    audio = audio_bytes if input_kind == "audio" else None
+    ref_meta = [{"id": r["id"], "title": r["title"], "summary": r.get("summary")} for r in references]
+    categories = db_manager.fetch_consultation_types(include_desc=True)
+
+    started = time.perf_counter()
+    analysis = timed("analyze", lambda: ai_agent.analyze_topic_and_traits(
+        script=script, audio_data=audio, ref_metadata=ref_meta, categories=categories
+    ))
+    topic = analysis["top_3_topics"][0]
+    info = analysis.get("customer_info") or {}
+
+    def load_context():
+        customer = db_manager.get_or_create_customer(info.get("name"), info.get("phone"))
+        guidelines = db_manager.fetch_active_guidelines(topic)
+        picked = set(analysis.get("recommended_ref_ids") or [])
+        refs = [r for r in references if r["id"] in picked]
+        return customer, guidelines, refs
+
+    customer, guidelines, refs = timed("context", load_context)
+    result = timed("feedback", lambda: ai_agent.generate_coaching_feedback(
+        script=script, audio_data=audio, history=customer.get("consultation_history") or [],
+        guidelines=guidelines, references=refs
+    ))
+    audio_url = None
+    if audio:
+        audio_url = timed("upload_audio", lambda: db_manager.upload_audio_file(audio, "mp3"))
+    result["summary"] = analysis.get("summary")
+    result["customer_traits"] = analysis.get("customer_traits")
+    timed("save", lambda: db_manager.save_coaching_result(
+        user_id, customer["id"], result, result.get("transcript") or script, audio_url=audio_url
+    ))
+    timings["total"] = (time.perf_counter() - started) * 1000
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20, help="시나리오당 반복 횟수")
+    parser.add_argument("--inputs", default="text,audio")
+    parser.add_argument("--references", default="0,5,20", help="등록된 참고자료 수")
+    parser.add_argument("--history", default="0,1000,10000", help="상담원 누적 코칭 로그 수")
+    parser.add_argument("--customer-history", type=int, default=20, help="고객 상담 이력 건수")
+    parser.add_argument("--audio-kb", type=int, default=2048, help="오디오 입력 크기(KB)")
+    parser.add_argument("--db-latency-ms", type=float, default=5.0)
+    parser.add_argument("--db-ms-per-mb", type=float, default=20.0)
+    parser.add_argument("--model-latency-ms", type=float, default=200.0)
+    parser.add_argument("--model-ms-per-kb-in", type=float, default=0.05)
+    parser.add_argument("--model-ms-per-kb-out", type=float, default=2.0)
+    parser.add_argument("--payload-chars", type=int, default=2000, help="피드백/전사문 출력 길이")
+    parser.add_argument("--out", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    db = FakeSupabase(latency_ms=args.db_latency_ms, ms_per_mb=args.db_ms_per_mb)
+    model = FakeModelClient(
+        latency_ms=args.model_latency_ms, ms_per_kb_in=args.model_ms_per_kb_in,
+        ms_per_kb_out=args.model_ms_per_kb_out, payload_chars=args.payload_chars
+    )
+    install_fakes(db, model)
+    from utils import ai_agent, db_manager
+
+    audio_template = os.urandom(args.audio_kb * 1024)
+    inputs = [s.strip() for s in args.inputs.split(",") if s.strip()]
+    ref_counts = [int(x) for x in args.references.split(",")]
+    history_sizes = [int(x) for x in args.history.split(",")]
+
+    scenarios = []
+    for input_kind, n_refs, n_history in itertools.product(inputs, ref_counts, history_sizes):
+        db.tables.clear()
+        db.storage_objects.clear()
+        (user_id,), _ = seed_database(
+            db, users=1, logs_per_user=n_history, references=n_refs,
+            customer_history=args.customer_history
+        )
+        references = db_manager.fetch_references(None, ready_only=True)
+
+        samples = {stage: [] for stage in STAGES}
+        db_calls, model_calls = db.calls, model.calls
+        for i in range(args.iterations):
+            # 업로드 중복 제거(콘텐츠 해시)에 걸리지 않도록 반복마다 오디오를 다르게 함
+            audio = i.to_bytes(4, "big") + audio_template[4:]
+            for stage, ms in run_once((ai_agent, db_manager), user_id, input_kind, audio, references).items():
+                samples[stage].append(ms)
+
+        scenario = {
+            "input": input_kind, "references": n_refs, "history": n_history,
+            "db_calls_per_run": round((db.calls - db_calls) / args.iterations, 1),
+            "model_calls_per_run": round((model.calls - model_calls) / args.iterations, 1),
+            "stages": {stage: summarize(v) for stage, v in samples.items() if v},
+        }
+        scenarios.append(scenario)
+        total = scenario["stages"]["total"]
+        print(f"[{input_kind:5s} refs={n_refs:<3d} history={n_history:<6d}] "
+              f"total p50={total['p50_ms']}ms p95={total['p95_ms']}ms p99={total['p99_ms']}ms "
+              f"(db calls {scenario['db_calls_per_run']})")
+
+    report = {
+        "benchmark": "coaching_pipeline",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "scenarios": scenarios,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"결과 저장: {args.out}")
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
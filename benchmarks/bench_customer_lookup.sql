@@ -0,0 +1,78 @@
+-- 고객 조회 벤치마크 (100만 고객)
+-- migration_customer_upsert.sql 적용 후 psql로 실행합니다. (\echo 사용)
+-- 전체가 하나의 트랜잭션이며 마지막에 rollback 하므로 실제 데이터는 바뀌지 않습니다.
+--
+--   psql "$DATABASE_URL" -f benchmarks/bench_customer_lookup.sql
+--
+-- 비교 항목
+--   1) 기존 방식: 원본 phone 컬럼 조회 (인덱스 없음) -> 없으면 insert  (왕복 2회)
+--   2) phone_normalized unique 인덱스 조회
+--   3) upsert_customer() RPC: 기존 고객 / 신규 고객 (왕복 1회)
+
+begin;
+
+-- 1. 고객 100만 명 + 고객당 이력 5건 (표기 형식을 섞어서 저장)
+insert into customers (name, phone, phone_normalized, consultation_history, last_consultation_date)
+select
+    '고객' || g,
+    case g % 3
+        when 0 then '010-' || lpad((g / 10000)::text, 4, '0') || '-' || lpad((g % 10000)::text, 4, '0')
+        when 1 then '010' || lpad(g::text, 8, '0')
+        else '+82 10 ' || lpad((g / 10000)::text, 4, '0') || ' ' || lpad((g % 10000)::text, 4, '0')
+    end,
+    '010' || lpad(g::text, 8, '0'),
+    (select jsonb_agg(jsonb_build_object(
+        'date', '2025-01-0' || h, 'type', 'refund', 'summary', '이전 상담 ' || h, 'extracted_traits', '급함'))
+     from generate_series(1, 5) h),
+    now()
+from generate_series(1, 1000000) g;
+
+analyze customers;
+
+-- 2. 실행 계획
+\echo '--- 1) 기존 방식: 원본 phone 조회 ---'
+explain (analyze, buffers, costs off)
+select * from customers where phone = '010-0050-0001';
+
+\echo '--- 2) phone_normalized 인덱스 조회 ---'
+explain (analyze, buffers, costs off)
+select * from customers where phone_normalized = normalize_phone('010-0050-0001');
+
+-- 3. 반복 호출 평균 지연 (ms/call)
+do $$
+declare
+    n integer := 2000;
+    started timestamptz;
+    i integer;
+    r jsonb;
+begin
+    started := clock_timestamp();
+    for i in 1..200 loop
+        perform * from customers where phone = '010-' || lpad((i * 37 / 10000)::text, 4, '0') || '-' || lpad((i * 37 % 10000)::text, 4, '0');
+    end loop;
+    raise notice '기존 phone 조회          : % ms/call (200회)',
+        round((extract(epoch from clock_timestamp() - started) * 1000 / 200)::numeric, 3);
+
+    started := clock_timestamp();
+    for i in 1..n loop
+        perform * from customers where phone_normalized = normalize_phone('010' || lpad((i * 397)::text, 8, '0'));
+    end loop;
+    raise notice 'phone_normalized 조회    : % ms/call', round((extract(epoch from clock_timestamp() - started) * 1000 / n)::numeric, 3);
+
+    started := clock_timestamp();
+    for i in 1..n loop
+        r := upsert_customer('고객', '010-' || lpad((i * 397 / 10000)::text, 4, '0') || '-' || lpad((i * 397 % 10000)::text, 4, '0'));
+    end loop;
+    raise notice 'upsert_customer (기존)   : % ms/call', round((extract(epoch from clock_timestamp() - started) * 1000 / n)::numeric, 3);
+
+    started := clock_timestamp();
+    for i in 1..n loop
+        r := upsert_customer('신규', '010-9' || lpad(i::text, 7, '0'));
+    end loop;
+    raise notice 'upsert_customer (신규)   : % ms/call', round((extract(epoch from clock_timestamp() - started) * 1000 / n)::numeric, 3);
+end $$;
+
+-- 인덱스 크기
+select pg_size_pretty(pg_relation_size('customers_phone_normalized_key')) as phone_normalized_index_size;
+
+rollback;
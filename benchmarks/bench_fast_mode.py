@@ -0,0 +1,117 @@
+"""
+빠른 모드(1회 호출) vs 기본 흐름(1차 + 2차 분석) 지연 시간 벤치마크 (텍스트 입력, 로컬 Fake 사용)
+
+기본 흐름은 bench_coaching_pipeline.run_once와 같은 순서로 실행하고,
+빠른 모드는 코칭 화면과 같이 로컬 고객 추출 -> 고객 조회 -> run_fast_coaching -> 저장 순서로 실행합니다.
+(상담원이 1차 결과를 확인하는 시간은 포함하지 않음: 실제 차이는 이 결과보다 큼)
+
+    python -m benchmarks.bench_fast_mode --iterations 20 --model-latency-ms 1500 --out fast_mode.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeSupabase, FakeModelClient, install_fakes, seed_database
+from benchmarks.bench_coaching_pipeline import SAMPLE_SCRIPT, run_once, summarize
+
+def run_fast_once(user_id, bundle):
+    from utils import db_manager
+    from utils.customer_extractor import extract_customer_info
+    from utils.fast_coaching import run_fast_coaching
+
+    timings = {}
+    started = time.perf_counter()
+    info = extract_customer_info(SAMPLE_SCRIPT)
+    customer = db_manager.get_or_create_customer(info["name"], info["phone"])
+    timings["context"] = (time.perf_counter() - started) * 1000
+
+    t0 = time.perf_counter()
+    result = run_fast_coaching(SAMPLE_SCRIPT, bundle, history=customer.get("consultation_history") or [])
+    timings["model"] = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    db_manager.save_coaching_result(user_id, customer["id"], result, SAMPLE_SCRIPT)
+    timings["save"] = (time.perf_counter() - t0) * 1000
+    timings["total"] = (time.perf_counter() - started) * 1000
+    return timings, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--references", type=int, default=10, help="등록된 참고자료 수")
+    parser.add_argument("--customer-history", type=int, default=5)
+    parser.add_argument("--db-latency-ms", type=float, default=5.0)
+    parser.add_argument("--model-latency-ms", type=float, default=1500.0, help="호출당 기본 지연 (왕복 + 사고)")
+    parser.add_argument("--model-ms-per-kb-in", type=float, default=0.05)
+    parser.add_argument("--model-ms-per-kb-out", type=float, default=2.0)
+    parser.add_argument("--payload-chars", type=int, default=2000, help="피드백/전사문 출력 길이")
+    parser.add_argument("--out", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    # 참고자료 인덱스/텔레메트리는 임시 디렉토리에 기록 (실제 .pass_data 오염 방지)
+    os.environ["PASS_DATA_DIR"] = tempfile.mkdtemp(prefix="bench-fast-mode-")
+
+    db = FakeSupabase(latency_ms=args.db_latency_ms)
+    model = FakeModelClient(
+        latency_ms=args.model_latency_ms, ms_per_kb_in=args.model_ms_per_kb_in,
+        ms_per_kb_out=args.model_ms_per_kb_out, payload_chars=args.payload_chars
+    )
+    install_fakes(db, model)
+    from utils import ai_agent, db_manager
+    from utils.prompt_bundles import build_bundle
+    from utils.reference_index import index_reference, chunk_text
+
+    (user_id,), _ = seed_database(db, users=1, references=args.references, customer_history=args.customer_history)
+    references = db_manager.fetch_references(None, ready_only=True)
+    for r in references:
+        index_reference(r["id"], chunk_text(r["content"]))
+    bundle = build_bundle(db_manager.fetch_consultation_types(include_desc=True),
+                          db_manager.fetch_all_guidelines(), references)
+
+    report = {
+        "benchmark": "fast_mode",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+    }
+
+    samples, calls = {}, model.calls
+    for _ in range(args.iterations):
+        for stage, ms in run_once((ai_agent, db_manager), user_id, "text", None, references).items():
+            samples.setdefault(stage, []).append(ms)
+    report["two_call"] = {
+        "model_calls_per_run": round((model.calls - calls) / args.iterations, 1),
+        "stages": {stage: summarize(v) for stage, v in samples.items()},
+    }
+
+    samples, calls = {}, model.calls
+    for _ in range(args.iterations):
+        timings, result = run_fast_once(user_id, bundle)
+        for stage, ms in timings.items():
+            samples.setdefault(stage, []).append(ms)
+    report["fast"] = {
+        "model_calls_per_run": round((model.calls - calls) / args.iterations, 1),
+        "rule_topics": result.get("rule_topics"),
+        "stages": {stage: summarize(v) for stage, v in samples.items()},
+    }
+
+    two, fast = report["two_call"]["stages"]["total"], report["fast"]["stages"]["total"]
+    report["speedup_p50"] = round(two["p50_ms"] / fast["p50_ms"], 2)
+    print(f"two-call p50={two['p50_ms']}ms p95={two['p95_ms']}ms | "
+          f"fast p50={fast['p50_ms']}ms p95={fast['p95_ms']}ms | x{report['speedup_p50']}")
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"결과 저장: {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+2차 분석 출력 형식 비교 벤치마크: markdown(기존 자유 형식) vs compact(구조화 findings + 로컬 렌더링)
+
+같은 입력으로 generate_coaching_feedback을 두 형식으로 호출하고, 모델 호출 텔레메트리
+(model_call_telemetry, 관리자 KPI 탭 '함수별 평균'과 같은 데이터)에서 함수별 출력 토큰과 지연 시간을 비교합니다.
+Fake 모델의 출력 길이는 --payload-chars(자유 형식 피드백/전사문)로 정하므로, 실제 절감률은
+배포 후 텔레메트리의 generate_coaching_feedback / generate_coaching_feedback.compact 행으로 확인합니다.
+
+    python -m benchmarks.bench_feedback_format --iterations 20 --model-ms-per-kb-out 40 --out feedback_format.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeSupabase, FakeModelClient, install_fakes, seed_database
+from benchmarks.bench_coaching_pipeline import SAMPLE_SCRIPT, summarize
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--inputs", default="text,audio")
+    parser.add_argument("--references", type=int, default=3)
+    parser.add_argument("--audio-kb", type=int, default=512)
+    parser.add_argument("--model-latency-ms", type=float, default=300.0)
+    parser.add_argument("--model-ms-per-kb-out", type=float, default=40.0, help="출력 KB당 지연 (출력 토큰 생성 속도)")
+    parser.add_argument("--payload-chars", type=int, default=2000, help="자유 형식 피드백/전사문 출력 길이")
+    parser.add_argument("--out", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    db = FakeSupabase()
+    model = FakeModelClient(latency_ms=args.model_latency_ms, ms_per_kb_out=args.model_ms_per_kb_out,
+                            payload_chars=args.payload_chars)
+    install_fakes(db, model)
+    from utils import ai_agent, db_manager, model_telemetry
+    from utils.feedback_templates import render_feedback
+
+    seed_database(db, references=args.references)
+    references = db_manager.fetch_references(None, ready_only=True)
+    audio = os.urandom(args.audio_kb * 1024)
+
+    report = {
+        "benchmark": "feedback_format",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "scenarios": [],
+    }
+    for input_kind in [s.strip() for s in args.inputs.split(",") if s.strip()]:
+        scenario = {"input": input_kind}
+        for fmt in ("markdown", "compact"):
+            model_telemetry.flush()
+            db.tables["model_call_telemetry"] = []
+            samples, feedback_chars = [], []
+            for _ in range(args.iterations):
+                started = time.perf_counter()
+                result = ai_agent.generate_coaching_feedback(
+                    script=SAMPLE_SCRIPT if input_kind == "text" else None,
+                    audio_data=audio if input_kind == "audio" else None,
+                    rule_text="- 규정을 먼저 안내하세요.\n", references=references,
+                    category="refund", feedback_format=fmt
+                )
+                samples.append((time.perf_counter() - started) * 1000)
+                feedback_chars.append(len(result.get("feedback") or ""))
+            model_telemetry.flush()
+            rows = db.tables.get("model_call_telemetry", [])
+            scenario[fmt] = {
+                "function": rows[0]["function"] if rows else None,
+                "output_tokens_mean": round(sum(r["output_tokens"] for r in rows) / max(len(rows), 1), 1),
+                "rendered_feedback_chars_mean": round(sum(feedback_chars) / len(feedback_chars), 1),
+                "has_transcript": bool(result.get("transcript")),
+                "latency": summarize(samples),
+            }
+            if fmt == "compact":
+                started = time.perf_counter()
+                for _ in range(1000):
+                    render_feedback(result.get("findings"), references)
+                scenario[fmt]["render_us"] = round((time.perf_counter() - started) * 1000, 2)
+        md, compact = scenario["markdown"], scenario["compact"]
+        scenario["output_token_ratio"] = round(compact["output_tokens_mean"] / max(md["output_tokens_mean"], 1), 3)
+        report["scenarios"].append(scenario)
+        print(f"[{input_kind:5s}] output tokens markdown={md['output_tokens_mean']} compact={compact['output_tokens_mean']} "
+              f"(x{scenario['output_token_ratio']}) | p50 {md['latency']['p50_ms']}ms -> {compact['latency']['p50_ms']}ms")
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"결과 저장: {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+실시간 코칭(Live Mode) 재생 벤치마크 (로컬 Fake 사용, 실제 자격 증명 불필요)
+
+합성 WAV 녹음을 조각 단위로 실제 통화처럼 흘려보내고(replay), 조각 도착 -> 알림 표시까지의 종단 지연,
+전사/분석 호출 지연, 기한 초과로 버린 알림 수, 종료 리포트 생성 시간을 측정합니다.
+--speed로 재생을 빠르게 할 때는 분석 주기/기한도 같은 배율로 줄여 실제 통화 비율을 유지합니다.
+
+    python -m benchmarks.bench_live_coaching --call-seconds 300 --speed 10 --model-latency-ms 800
+"""
+import os
+import sys
+import json
+import time
+import wave
+import argparse
+import platform
+import tempfile
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeSupabase, FakeModelClient, install_fakes, seed_database
+
+def make_wav(path, seconds, rate=8000):
+    """무음 8kHz 16bit 모노 WAV (조각 분할/전송 경로 측정용)"""
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\x00\x00" * int(rate * seconds))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--call-seconds", type=int, default=300, help="통화 길이")
+    parser.add_argument("--speed", type=float, default=10.0, help="재생 배속")
+    parser.add_argument("--chunk-seconds", type=float, default=5.0)
+    parser.add_argument("--references", type=int, default=5)
+    parser.add_argument("--db-latency-ms", type=float, default=5.0)
+    parser.add_argument("--model-latency-ms", type=float, default=800.0, help="실제 시간 기준 호출 지연 (배속 적용 전)")
+    parser.add_argument("--out", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    os.environ["PASS_DATA_DIR"] = tempfile.mkdtemp(prefix="bench-live-")
+    db = FakeSupabase(latency_ms=args.db_latency_ms)
+    model = FakeModelClient(latency_ms=args.model_latency_ms / args.speed)
+    install_fakes(db, model)
+    from utils import live_coaching
+    from utils import db_manager
+    from utils.prompt_bundles import build_bundle
+
+    seed_database(db, references=args.references)
+    bundle = build_bundle(db_manager.fetch_consultation_types(include_desc=True),
+                          db_manager.fetch_all_guidelines(), db_manager.fetch_references(None, ready_only=True))
+    wav_path = os.path.join(os.environ["PASS_DATA_DIR"], "call.wav")
+    make_wav(wav_path, args.call_seconds)
+
+    session = live_coaching.LiveCoachingSession(
+        bundle=bundle, category="refund",
+        analyze_every=live_coaching.ANALYZE_EVERY_SECONDS / args.speed,
+        deadline_seconds=live_coaching.NUDGE_DEADLINE_SECONDS / args.speed
+    )
+    started = time.perf_counter()
+    live_coaching.replay(session, path=wav_path, speed=args.speed, chunk_seconds=args.chunk_seconds)
+    replay_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    result = session.finish()
+    finish_ms = (time.perf_counter() - started) * 1000
+
+    summary = session.summary()
+    # 배속을 되돌린 실제 시간 기준 지연
+    scaled = {k: round(v * args.speed, 1) for k, v in summary.items() if k.endswith("_ms_p50") or k.endswith("_ms_p95")
+              if v is not None}
+    report = {
+        "benchmark": "live_coaching",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "deadline_ms": live_coaching.NUDGE_DEADLINE_SECONDS * 1000,
+        "replay_s": round(replay_s, 2),
+        "session": summary,
+        "realtime_ms": scaled,
+        "model_calls": model.calls,
+        "finish_ms": round(finish_ms, 1),
+        "report_ok": bool(result and result.get("feedback")),
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"결과 저장: {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+중복/유사 상담 감지(MinHash + LSH) 인덱스 벤치마크
+
+합성 상담 로그(기본 1,000,000건)로 인덱스 구성 시간, 메모리(배열 크기 / RSS / 파일 크기),
+조회 지연 시간(p50/p95/p99), 유사 스크립트 재현율과 무관한 스크립트 오탐률을 측정합니다.
+
+배경 로그의 서명은 기본적으로 난수로 만듭니다. (서로 다른 문서의 MinHash 값은 균등 분포와 같음)
+--sign-all을 주면 모든 로그를 실제 스크립트로 생성해 서명합니다. (100만 건 기준 수 분 소요)
+
+    python -m benchmarks.bench_near_duplicate --logs 1000000 --queries 1000 --out near_dup.json
+"""
+import os
+import sys
+import time
+import json
+import random
+import argparse
+import platform
+import tempfile
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from utils.near_duplicate import MinHashIndex, signature, NUM_PERM, DUPLICATE_THRESHOLD
+from benchmarks.bench_coaching_pipeline import percentile
+from benchmarks.load_test_pages import rss_mb
+
+WORDS = [
+    "고객님", "환불", "규정", "안내", "확인", "도와드리겠습니다", "정책", "기간", "처리", "배송", "교환",
+    "요금제", "위약금", "약정", "수리", "접수", "택배", "영수증", "카드", "취소", "포인트", "쿠폰", "상담원",
+    "불편", "죄송합니다", "문의", "주문번호", "결제", "변경", "해지", "설치", "방문", "일정", "재발송", "보상",
+]
+
+def make_script(rnd, chars):
+    lines, size = [], 0
+    while size < chars:
+        speaker = "상담원" if len(lines) % 2 == 0 else "고객"
+        line = f"{speaker}: " + " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(6, 14))) + "."
+        lines.append(line)
+        size += len(line)
+    return "\n".join(lines)
+
+def light_edit(rnd, script, ratio):
+    """단어 일부를 바꾸거나 지워 '조금 고친' 스크립트를 만듭니다."""
+    words = script.split(" ")
+    for _ in range(max(1, int(len(words) * ratio))):
+        i = rnd.randrange(len(words))
+        if rnd.random() < 0.5:
+            words[i] = rnd.choice(WORDS)
+        else:
+            words[i] = ""
+    return " ".join(w for w in words if w)
+
+def summarize(samples):
+    return {
+        "n": len(samples),
+        "p50_ms": round(percentile(samples, 50), 4),
+        "p95_ms": round(percentile(samples, 95), 4),
+        "p99_ms": round(percentile(samples, 99), 4),
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logs", type=int, default=1_000_000, help="색인할 상담 로그 수")
+    parser.add_argument("--queries", type=int, default=1000, help="유사/무관 조회 각각의 횟수")
+    parser.add_argument("--script-chars", type=int, default=1500, help="합성 스크립트 길이")
+    parser.add_argument("--edit-ratio", type=float, default=0.03, help="유사 스크립트의 단어 변경 비율")
+    parser.add_argument("--sign-all", action="store_true", help="배경 로그도 실제 스크립트로 서명")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    report = {
+        "benchmark": "near_duplicate",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+    }
+
+    # 1. 기존 로그 서명 (조회 대상 원본은 항상 실제 스크립트)
+    planted = [make_script(rnd, args.script_chars) for _ in range(args.queries)]
+    sign_ms = []
+    planted_sigs = []
+    for script in planted:
+        started = time.perf_counter()
+        planted_sigs.append(signature(script))
+        sign_ms.append((time.perf_counter() - started) * 1000)
+    report["signature"] = summarize(sign_ms)
+
+    background = args.logs - len(planted)
+    if args.sign_all:
+        bg_sigs = np.stack([signature(make_script(rnd, args.script_chars)) for _ in range(background)])
+    else:
+        bg_sigs = np.random.default_rng(args.seed).integers(0, 2**32, size=(background, NUM_PERM), dtype=np.uint64).astype(np.uint32)
+    sigs = np.concatenate([bg_sigs, np.stack(planted_sigs)])
+    ids = np.arange(1, args.logs + 1, dtype=np.int64)
+    planted_ids = ids[background:]
+    del bg_sigs
+
+    # 2. 인덱스 구성 / 메모리
+    base_rss = rss_mb()
+    started = time.perf_counter()
+    index = MinHashIndex(ids, sigs)
+    build_s = time.perf_counter() - started
+    rss_delta = rss_mb() - base_rss
+    del sigs
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.npz")
+        started = time.perf_counter()
+        index.save(path)
+        save_s = time.perf_counter() - started
+        file_mb = os.path.getsize(path) / 1e6
+        started = time.perf_counter()
+        MinHashIndex.load(path)
+        load_s = time.perf_counter() - started
+    report["index"] = {
+        "logs": len(index),
+        "build_s": round(build_s, 2),
+        "save_s": round(save_s, 2),
+        "load_s": round(load_s, 2),
+        "array_mb": round(index.nbytes / 1e6, 1),
+        "bytes_per_log": round(index.nbytes / len(index), 1),
+        "rss_delta_mb": round(rss_delta, 1),
+        "file_mb": round(file_mb, 1),
+    }
+
+    # 3. 조회: 조금 고친 스크립트(재현율) / 무관한 스크립트(오탐률)
+    def run_queries(scripts, expected_ids):
+        times, hits = [], 0
+        for script, expected in zip(scripts, expected_ids):
+            sig = signature(script)
+            started = time.perf_counter()
+            matches = index.query(sig, threshold=DUPLICATE_THRESHOLD)
+            times.append((time.perf_counter() - started) * 1000)
+            found = {log_id for log_id, _ in matches}
+            hits += (expected in found) if expected is not None else bool(found)
+        return times, hits
+
+    near_times, recalled = run_queries([light_edit(rnd, s, args.edit_ratio) for s in planted], planted_ids)
+    fresh_times, false_hits = run_queries(
+        [make_script(rnd, args.script_chars) for _ in range(args.queries)], [None] * args.queries
+    )
+    report["query_near_duplicate"] = dict(summarize(near_times), recall=round(recalled / args.queries, 4))
+    report["query_unrelated"] = dict(summarize(fresh_times), false_positive_rate=round(false_hits / args.queries, 4))
+
+    # 4. 저장 시 추가 + 병합 비용
+    started = time.perf_counter()
+    for i, sig in enumerate(planted_sigs[:2000]):
+        index.add(args.logs + 1 + i, sig)
+    add_ms = (time.perf_counter() - started) * 1000 / min(2000, len(planted_sigs))
+    started = time.perf_counter()
+    index.compact()
+    report["update"] = {"add_ms": round(add_ms, 4), "compact_s": round(time.perf_counter() - started, 2)}
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"결과 저장: {args.out}")
+
+if __name__ == "__main__":
+    main()
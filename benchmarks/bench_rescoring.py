@@ -0,0 +1,103 @@
+"""
+가이드라인 변경 후 재채점 작업 벤치마크 (로컬 Fake 사용, 실제 자격 증명 불필요)
+
+같은 로그 집합을 두 방식으로 재채점하고 소요 시간과 모델 요청 수를 비교합니다.
+  batch: client.batches 인라인 배치 제출 (배치 1건당 BATCH_SIZE 요청, 결과 폴링)
+  pool : 배치 미지원 클라이언트 -> POOL_WORKERS개 스레드 즉시 호출
+이어서 일부 요청이 실패하는 배치로 실행한 뒤 같은 작업을 재개해, 재개 시 실패분만 다시 제출되는지 확인합니다.
+
+    python -m benchmarks.bench_rescoring --logs 2000 --model-latency-ms 400 --out rescoring.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeSupabase, FakeModelClient, install_fakes, seed_database
+from benchmarks.bench_coaching_pipeline import SAMPLE_SCRIPT
+
+def make_db(args):
+    db = FakeSupabase(latency_ms=args.db_latency_ms)
+    seed_database(db, users=args.users, logs_per_user=args.logs // args.users, seed=args.seed)
+    for log in db.tables["coaching_logs"]:
+        log["original_script"] = SAMPLE_SCRIPT
+    return db
+
+def run_mode(args, rescoring, batch, fail_every=0):
+    db = make_db(args)
+    model = FakeModelClient(latency_ms=args.model_latency_ms, batch=batch,
+                            batch_turnaround_ms=args.batch_turnaround_ms, batch_fail_every=fail_every)
+    install_fakes(db, model)
+    job = rescoring.plan_rescore("common", reason="bench")
+    started = time.perf_counter()
+    job = rescoring.run_rescore(job["job_id"], use_batch=batch, poll_seconds=args.poll_seconds)
+    elapsed = time.perf_counter() - started
+    result = {
+        "elapsed_s": round(elapsed, 2),
+        "model_calls": model.calls,
+        "batch_jobs": model.batches.created if model.batches else 0,
+        "batch_requests": sum(len(j["src"]) for j in model.batches.jobs.values()) if model.batches else 0,
+        "rows_written": len(db.tables.get("coaching_log_rescores", [])),
+        "progress": rescoring.job_progress(job),
+    }
+    return result, job, db, model
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logs", type=int, default=2000, help="재채점 대상 로그 수")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--model-latency-ms", type=float, default=400, help="즉시 호출 1회 지연")
+    parser.add_argument("--batch-turnaround-ms", type=float, default=2000, help="배치 작업 완료까지 지연")
+    parser.add_argument("--poll-seconds", type=float, default=0.5)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0)
+    parser.add_argument("--fail-every", type=int, default=7, help="재개 시나리오: n번째 요청마다 실패")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    # 작업 파일은 임시 디렉토리에 기록 (실제 .pass_data 오염 방지)
+    os.environ["PASS_DATA_DIR"] = tempfile.mkdtemp(prefix="bench-rescoring-")
+    from utils import rescoring
+
+    report = {
+        "benchmark": "rescoring",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "batch_size": rescoring.BATCH_SIZE,
+        "pool_workers": rescoring.POOL_WORKERS,
+    }
+
+    report["batch"], _, _, _ = run_mode(args, rescoring, batch=True)
+    report["pool"], _, _, _ = run_mode(args, rescoring, batch=False)
+
+    # 재개: 실패가 섞인 첫 실행 -> 같은 작업 재개 (완료된 로그는 다시 제출하지 않아야 함)
+    first, job, db, model = run_mode(args, rescoring, batch=True, fail_every=args.fail_every)
+    model.batches.fail_every = 0
+    submitted_before = first["batch_requests"]
+    job["status"] = "running"
+    rescoring._save_job(job)
+    started = time.perf_counter()
+    resumed = rescoring.run_rescore(job["job_id"], poll_seconds=args.poll_seconds)
+    report["resume"] = {
+        "first_run": first,
+        "resume_elapsed_s": round(time.perf_counter() - started, 2),
+        "resubmitted_requests": sum(len(j["src"]) for j in model.batches.jobs.values()) - submitted_before,
+        "rows_written": len(db.tables.get("coaching_log_rescores", [])),
+        "progress": rescoring.job_progress(resumed),
+    }
+
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"결과 저장: {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+페이지 콜드 스타트(import 시간 / 메모리) 벤치마크
+
+매 측정마다 새 파이썬 프로세스를 띄워 다음을 측정합니다.
+  - 모듈별 import 시간과 import 직후 RSS, 함께 로드된 무거운 모듈(pandas, altair, pypdf, docx, SDK)
+  - 로그인 화면(app.py) 첫 렌더링 시간과 RSS (streamlit AppTest, 네트워크 호출 없음)
+
+    python -m benchmarks.bench_startup --repeat 5 --out startup.json
+"""
+import os
+import sys
+import json
+import argparse
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["pandas", "altair", "pyarrow", "pypdf", "docx", "google.genai", "supabase", "requests"]
+
+TARGETS = {
+    "utils.db_manager": "import utils.db_manager",
+    "utils.ai_agent": "import utils.ai_agent",
+    "utils.save_queue": "import utils.save_queue",
+    "utils.text_extractor": "import utils.text_extractor",
+    "utils.dashboard_data": "import utils.dashboard_data",
+}
+
+# 자식 프로세스에서 실행: 측정 결과를 JSON 한 줄로 출력
+CHILD_TEMPLATE = r'''
+import sys, time, json
+sys.path.insert(0, {root!r})
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+import streamlit as st
+st.secrets = {{"supabase": {{"url": "https://fake.supabase.local", "key": "x"}}, "google": {{"api_key": "x"}}}}
+base_rss = rss_mb()
+started = time.perf_counter()
+{stmt}
+elapsed = (time.perf_counter() - started) * 1000
+print(json.dumps({{
+    "ms": elapsed,
+    "rss_mb": rss_mb(),
+    "delta_rss_mb": rss_mb() - base_rss,
+    "heavy_loaded": [m for m in {heavy!r} if m in sys.modules],
+}}))
+'''
+
+LOGIN_RENDER_STMT = '''
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=60)
+at.secrets["supabase"] = {"url": "https://fake.supabase.local", "key": "x"}
+at.secrets["google"] = {"api_key": "x"}
+at.run()
+assert not at.exception, at.exception
+'''
+
+def measure(stmt):
+    code = CHILD_TEMPLATE.format(root=ROOT, stmt=stmt, heavy=HEAVY_MODULES)
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=300
+    )
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr else "failed")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def run_target(name, stmt, repeat):
+    runs = []
+    for _ in range(repeat):
+        try:
+            runs.append(measure(stmt))
+        except Exception as e:
+            return {"name": name, "error": str(e)}
+    return {
+        "name": name,
+        "median_ms": round(statistics.median(r["ms"] for r in runs), 1),
+        "min_ms": round(min(r["ms"] for r in runs), 1),
+        "rss_mb": round(statistics.median(r["rss_mb"] for r in runs), 1),
+        "delta_rss_mb": round(statistics.median(r["delta_rss_mb"] for r in runs), 1),
+        "heavy_loaded": runs[-1]["heavy_loaded"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5, help="대상별 측정 횟수 (매번 새 프로세스)")
+    parser.add_argument("--skip-login-render", action="store_true", help="AppTest 로그인 화면 측정 생략")
+    parser.add_argument("--out", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    results = []
+    targets = dict(TARGETS)
+    if not args.skip_login_render:
+        targets["login_page_render (app.py)"] = LOGIN_RENDER_STMT
+    for name, stmt in targets.items():
+        result = run_target(name, stmt, args.repeat)
+        results.append(result)
+        if "error" in result:
+            print(f"{name:32s} 실패: {result['error']}")
+        else:
+            print(f"{name:32s} {result['median_ms']:8.1f}ms  rss {result['rss_mb']:6.1f}MB "
+                  f"(+{result['delta_rss_mb']:.1f})  heavy={','.join(result['heavy_loaded']) or '-'}")
+
+    report = {
+        "benchmark": "startup",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"결과 저장: {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+문서 텍스트 추출 처리량 벤치마크
+
+생성한 N페이지(기본 500) PDF로 기존 방식(text += page.extract_text())과
+iter_document 순차/병렬 추출을 비교합니다.
+
+    python -m benchmarks.bench_text_extractor --pages 500
+"""
+import os
+import sys
+import io
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pypdf
+from utils import text_extractor
+from utils.text_extractor import iter_document
+
+def make_pdf(pages, lines_per_page=45):
+    """외부 의존성 없이 텍스트가 들어간 N페이지 PDF 바이트를 생성합니다."""
+    objects = []  # 1-based object bodies
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(None)
+    pages_obj = add(None)
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    kids = []
+    for p in range(pages):
+        lines = [
+            f"({'Page %d line %d: refund policy clause %d applies within seven days of purchase.' % (p + 1, l + 1, l)}) Tj T*"
+            for l in range(lines_per_page)
+        ]
+        stream = ("BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(lines) + " ET").encode()
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (pages_obj, font, content)
+        ))
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_obj
+    objects[pages_obj - 1] = (
+        b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % k for k in kids) + b"] /Count %d >>" % len(kids)
+    )
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % i + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for off in offsets:
+        out.write(b"%010d 00000 n \n" % off)
+    out.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref))
+    return out.getvalue()
+
+def legacy_extract(file_bytes):
+    """변경 전 extract_text_from_file의 PDF 처리 방식"""
+    text = ""
+    pdf_reader = pypdf.PdfReader(io.BytesIO(file_bytes))
+    for page in pdf_reader.pages:
+        text += page.extract_text() + "\n"
+    return text.strip()
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    pdf = make_pdf(args.pages)
+    result = {"pages": args.pages, "pdf_bytes": len(pdf)}
+
+    t, legacy_text = timed(lambda: legacy_extract(pdf), args.repeat)
+    result["legacy_s"] = round(t, 3)
+
+    def run(parallel):
+        return "\n".join(item["text"] for item in iter_document(pdf, "pdf", parallel=parallel)).strip()
+
+    t, serial_text = timed(lambda: run(False), args.repeat)
+    result["iter_serial_s"] = round(t, 3)
+
+    run(True)  # 프로세스 풀 워밍업 (spawn 비용은 최초 1회)
+    t, parallel_text = timed(lambda: run(True), args.repeat)
+    result["iter_parallel_s"] = round(t, 3)
+    result["parallel_workers"] = text_extractor._pool._max_workers if text_extractor._pool else 0
+
+    # 첫 페이지 도착 시간 (스트리밍)
+    started = time.perf_counter()
+    next(iter(iter_document(pdf, "pdf", parallel=True)))
+    result["parallel_first_page_s"] = round(time.perf_counter() - started, 3)
+
+    result["pages_per_s"] = {
+        k: round(args.pages / result[k], 1) for k in ("legacy_s", "iter_serial_s", "iter_parallel_s")
+    }
+    result["output_identical"] = legacy_text == serial_text == parallel_text
+
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
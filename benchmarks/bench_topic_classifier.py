@@ -0,0 +1,78 @@
+"""
+로컬 상담 유형 분류기 벤치마크 (합성 상담 로그, 자격 증명 불필요)
+
+유형별 어휘를 공통 어휘와 섞은 합성 스크립트로 학습/검증해 정확도, 확신 비율(1차 프롬프트 축소 비율),
+확신 구간 정확도, 분류 지연 시간, 학습 시간, 모델 크기를 측정합니다.
+--label-noise로 상담원이 유형을 잘못 고른 기록의 비율을 흉내냅니다.
+
+    python -m benchmarks.bench_topic_classifier --logs 5000 --out topic.json
+"""
+import os
+import sys
+import json
+import random
+import argparse
+import platform
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.topic_classifier import train
+
+COMMON = [
+    "고객님", "안녕하세요", "확인", "도와드리겠습니다", "잠시만요", "네", "감사합니다", "문의", "상담원",
+    "불편", "죄송합니다", "주문번호", "말씀", "처리", "안내", "기다려", "주세요", "혹시", "맞으실까요",
+]
+TOPIC_WORDS = {
+    "refund": ["환불", "반품", "단순변심", "7일", "카드취소", "결제", "환불규정", "수거", "영수증"],
+    "tech": ["오류", "재부팅", "접속", "앱", "업데이트", "설치", "로그인", "비밀번호", "화면"],
+    "inquiry": ["배송", "재고", "입고", "언제", "가격", "옵션", "사이즈", "색상", "출고"],
+    "retention": ["해지", "위약금", "약정", "요금제", "할인", "혜택", "유지", "포인트", "재약정"],
+    "general": ["주소", "변경", "회원정보", "이벤트", "쿠폰", "문자", "알림", "등록", "확인서"],
+}
+
+def make_script(rnd, topic, lines, topic_ratio):
+    out = []
+    for i in range(lines):
+        speaker = "상담원" if i % 2 == 0 else "고객"
+        words = [rnd.choice(TOPIC_WORDS[topic]) if rnd.random() < topic_ratio else rnd.choice(COMMON)
+                 for _ in range(rnd.randint(5, 12))]
+        out.append(f"{speaker}: {' '.join(words)}.")
+    return "\n".join(out)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logs", type=int, default=5000, help="학습+검증 로그 수")
+    parser.add_argument("--lines", type=int, default=12, help="스크립트당 발화 수")
+    parser.add_argument("--topic-ratio", type=float, default=0.12, help="유형 어휘 비율 (낮을수록 어려움)")
+    parser.add_argument("--label-noise", type=float, default=0.03, help="잘못 기록된 유형 비율")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    topics = list(TOPIC_WORDS)
+    weights = [0.35, 0.25, 0.2, 0.12, 0.08]
+
+    def examples():
+        for log_id in range(1, args.logs + 1):
+            topic = rnd.choices(topics, weights)[0]
+            label = rnd.choice(topics) if rnd.random() < args.label_noise else topic
+            yield log_id, make_script(rnd, topic, args.lines, args.topic_ratio), label
+
+    model = train(examples())
+    report = {
+        "benchmark": "topic_classifier",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "report": model.report if model else None,
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"결과 저장: {args.out}")
+
+if __name__ == "__main__":
+    main()
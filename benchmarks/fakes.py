@@ -0,0 +1,663 @@
+"""
+벤치마크/부하 테스트용 로컬 대체 구현 (Supabase 클라이언트, Gemini 클라이언트)
+
+- FakeSupabase: db_manager가 사용하는 table/select/eq/or_/order/limit/insert/update/upsert,
+  rpc(upsert_customer, find_customer, refresh_profile_stats), storage, auth 인터페이스를 메모리 테이블로 흉내냅니다. 호출마다 지연(latency)을 줄 수 있습니다.
+- FakeModelClient: client.models.generate_content를 흉내내며, 프롬프트 종류에 맞는 JSON을
+  설정된 지연 시간과 출력 크기로 반환합니다. usage_metadata도 함께 채웁니다.
+  client.batches(create/get)는 인라인 배치 작업을 흉내내며, batch_turnaround_ms 후 결과를 반환합니다.
+- install_fakes(): st.secrets와 db_manager / ai_agent의 클라이언트(get_supabase / get_client)를 교체합니다.
+"""
+import os
+import re
+import json
+import time
+import uuid
+import random
+import threading
+from datetime import datetime, timezone
+
+# ==========================================
+# 🗄️ Fake Supabase
+# ==========================================
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+def _parse_value(raw):
+    raw = raw.strip()
+    if raw.startswith('"') and raw.endswith('"'):
+        return raw[1:-1]
+    if raw == "null":
+        return None
+    if re.fullmatch(r"-?\d+", raw):
+        return int(raw)
+    return raw
+
+def _split_top_level(expr):
+    parts, depth, current = [], 0, ""
+    in_quote = False
+    for ch in expr:
+        if ch == '"':
+            in_quote = not in_quote
+        if not in_quote:
+            if ch == "(":
+                depth += 1
+            elif ch == ")":
+                depth -= 1
+            elif ch == "," and depth == 0:
+                parts.append(current)
+                current = ""
+                continue
+        current += ch
+    if current:
+        parts.append(current)
+    return parts
+
+def _compare(a, b):
+    # created_at 문자열과 숫자 id를 같은 방식으로 비교
+    if isinstance(a, (int, float)) and isinstance(b, str) and re.fullmatch(r"-?\d+", b):
+        b = int(b)
+    return (a > b) - (a < b)
+
+def _condition(expr):
+    """PostgREST or_ 식의 조건 하나를 row -> bool 함수로 변환합니다."""
+    expr = expr.strip()
+    if expr.startswith("and(") and expr.endswith(")"):
+        subs = [_condition(e) for e in _split_top_level(expr[4:-1])]
+        return lambda row: all(f(row) for f in subs)
+    if expr.startswith("or(") and expr.endswith(")"):
+        subs = [_condition(e) for e in _split_top_level(expr[3:-1])]
+        return lambda row: any(f(row) for f in subs)
+    col, op, raw = expr.split(".", 2)
+    value = _parse_value(raw)
+    ops = {
+        "eq": lambda v: v == value or (v is not None and str(v) == str(value)),
+        "neq": lambda v: v != value,
+        "gt": lambda v: v is not None and _compare(v, value) > 0,
+        "gte": lambda v: v is not None and _compare(v, value) >= 0,
+        "lt": lambda v: v is not None and _compare(v, value) < 0,
+        "lte": lambda v: v is not None and _compare(v, value) <= 0,
+        "is": lambda v: v is value,
+    }
+    return lambda row: ops[op](row.get(col))
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.columns = None
+        self.filters = []
+        self.orders = []
+        self.limit_n = None
+        self.action = "select"
+        self.payload = None
+        self.upsert_opts = {}
+
+    # --- 조회 조건 ---
+    def select(self, columns="*", count=None):
+        self.columns = [c.strip() for c in columns.split(",")] if columns.strip() != "*" else None
+        return self
+
+    def eq(self, col, value):
+        self.filters.append(lambda row: row.get(col) == value or str(row.get(col)) == str(value))
+        return self
+
+    def in_(self, col, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(col) in values)
+        return self
+
+    def gt(self, col, value):
+        self.filters.append(lambda row: row.get(col) is not None and _compare(row.get(col), value) > 0)
+        return self
+
+    def gte(self, col, value):
+        self.filters.append(lambda row: row.get(col) is not None and _compare(row.get(col), value) >= 0)
+        return self
+
+    def or_(self, expr):
+        subs = [_condition(e) for e in _split_top_level(expr)]
+        self.filters.append(lambda row: any(f(row) for f in subs))
+        return self
+
+    def order(self, col, desc=False):
+        self.orders.append((col, desc))
+        return self
+
+    def limit(self, n):
+        self.limit_n = n
+        return self
+
+    def range(self, start, end):
+        self.offset = start
+        self.limit_n = end - start + 1
+        return self
+
+    # --- 쓰기 ---
+    def insert(self, data):
+        self.action, self.payload = "insert", data
+        return self
+
+    def update(self, data):
+        self.action, self.payload = "update", data
+        return self
+
+    def upsert(self, data, on_conflict=None, ignore_duplicates=False):
+        self.action, self.payload = "upsert", data
+        self.upsert_opts = {"on_conflict": on_conflict or "id", "ignore_duplicates": ignore_duplicates}
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def execute(self):
+        self.db._latency()
+        with self.db.lock:
+            rows = self.db.tables.setdefault(self.table, [])
+            if self.action == "insert":
+                return FakeResult([self.db._insert(self.table, r) for r in _as_list(self.payload)])
+            if self.action == "upsert":
+                return FakeResult(self._upsert(rows))
+            matched = [r for r in rows if all(f(r) for f in self.filters)]
+            if self.action == "update":
+                for r in matched:
+                    r.update(self.payload)
+                self.db._after_write(self.table, "update", matched)
+                return FakeResult([dict(r) for r in matched])
+            if self.action == "delete":
+                self.db.tables[self.table] = [r for r in rows if r not in matched]
+                self.db._after_write(self.table, "delete", matched)
+                return FakeResult(matched)
+
+            for col, desc in reversed(self.orders):
+                matched.sort(key=lambda r: (r.get(col) is None, r.get(col)), reverse=desc)
+            start = getattr(self, "offset", 0)
+            if self.limit_n is not None:
+                matched = matched[start:start + self.limit_n]
+            if self.columns:
+                matched = [{c: r.get(c) for c in self.columns} for r in matched]
+            else:
+                matched = [dict(r) for r in matched]
+            return FakeResult(matched)
+
+    def _upsert(self, rows):
+        keys = [k.strip() for k in self.upsert_opts["on_conflict"].split(",")]
+        out = []
+        for item in _as_list(self.payload):
+            existing = next((r for r in rows if all(r.get(k) == item.get(k) for k in keys)), None)
+            if existing is not None:
+                if not self.upsert_opts["ignore_duplicates"]:
+                    existing.update(item)
+                    out.append(dict(existing))
+            else:
+                out.append(self.db._insert(self.table, item))
+        return out
+
+def _as_list(data):
+    return data if isinstance(data, list) else [data]
+
+class FakeBucket:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+
+    def upload(self, path, file, file_options=None):
+        # storage3와 같이 bytes/버퍼 또는 로컬 파일 경로를 받음
+        size = os.path.getsize(file) if isinstance(file, (str, os.PathLike)) else len(file)
+        self.db._latency(size)
+        objects = self.db.storage_objects.setdefault(self.name, {})
+        if path in objects:
+            raise Exception("Duplicate: The resource already exists")
+        objects[path] = size
+        return {"Key": f"{self.name}/{path}"}
+
+    def get_public_url(self, path):
+        return f"https://fake.supabase.local/storage/v1/object/public/{self.name}/{path}"
+
+    def list(self, path="", options=None):
+        self.db._latency()
+        search = (options or {}).get("search", "")
+        return [{"name": n} for n in self.db.storage_objects.get(self.name, {}) if n.startswith(search)]
+
+class FakeStorage:
+    def __init__(self, db):
+        self.db = db
+
+    def from_(self, bucket):
+        return FakeBucket(self.db, bucket)
+
+class FakeUser:
+    def __init__(self, email):
+        self.id = str(uuid.uuid5(uuid.NAMESPACE_DNS, email))
+        self.email = email
+        self.user_metadata = {}
+
+class FakeAuthResponse:
+    def __init__(self, user):
+        self.user = user
+        self.session = None
+
+class FakeAuth:
+    def __init__(self, db):
+        self.db = db
+
+    def sign_in_with_password(self, credentials):
+        self.db._latency()
+        return FakeAuthResponse(FakeUser(credentials["email"]))
+
+    def sign_up(self, credentials):
+        self.db._latency()
+        return FakeAuthResponse(FakeUser(credentials["email"]))
+
+    def sign_out(self):
+        pass
+
+    def get_session(self):
+        return None
+
+class FakeRpc:
+    def __init__(self, db, name, params):
+        self.db = db
+        self.name = name
+        self.params = params
+
+    def execute(self):
+        self.db._latency()
+        handler = self.db.rpc_handlers.get(self.name)
+        if handler is None:
+            raise Exception(f"Could not find the function public.{self.name}")
+        with self.db.lock:
+            return FakeResult(handler(self.db, **self.params))
+
+def _customer_index(db):
+    """phone_normalized unique 인덱스 흉내 (행 수가 바뀌면 다시 구성)"""
+    from utils.phone_number import normalize_phone  # SQL normalize_phone()과 같은 규칙
+
+    rows = db.tables.setdefault("customers", [])
+    source, size, index = db.indexes.get("customers.phone_normalized", (None, -1, None))
+    if source is not rows or size != len(rows):
+        index = {normalize_phone(r.get("phone_normalized") or r.get("phone")): r for r in rows}
+    db.indexes["customers.phone_normalized"] = (rows, len(rows), index)
+    return rows, index
+
+def _with_recent_history(row, p_history_limit, is_new):
+    history = row.get("consultation_history") or []
+    return dict(row, consultation_history=history[-p_history_limit:] if p_history_limit else [], is_new=is_new)
+
+def _rpc_upsert_customer(db, p_name, p_phone, p_history_limit=3):
+    """upsert_customer RPC (database/migration_customer_upsert.sql)와 같은 결과를 반환합니다."""
+    from utils.phone_number import normalize_phone
+
+    key = normalize_phone(p_phone)
+    rows, index = _customer_index(db)
+    row, is_new = index.get(key), False
+    if row is None:
+        db._insert("customers", {
+            "name": p_name, "phone": p_phone, "phone_normalized": key,
+            "consultation_history": [], "last_consultation_date": datetime.now(timezone.utc).isoformat()
+        })
+        row, is_new = rows[-1], True
+        index[key] = row
+        db.indexes["customers.phone_normalized"] = (rows, len(rows), index)
+    return _with_recent_history(row, p_history_limit, is_new)
+
+def _rpc_find_customer(db, p_phone, p_history_limit=3):
+    """find_customer RPC: 조회만 (없으면 None)"""
+    from utils.phone_number import normalize_phone
+
+    _, index = _customer_index(db)
+    row = index.get(normalize_phone(p_phone))
+    return _with_recent_history(row, p_history_limit, False) if row else None
+
+def _rpc_refresh_profile_stats(db, p_user_id):
+    """refresh_profile_stats RPC (database/migration_profile_stats.sql)"""
+    scores = [r.get("ai_score") or 0 for r in db.tables.get("coaching_logs", []) if r.get("user_id") == p_user_id]
+    profile = next((p for p in db.tables.get("profiles", []) if p["id"] == p_user_id), None)
+    if not scores or profile is None:
+        return None
+    profile.update(total_coaching_count=len(scores), avg_score=round(sum(scores) / len(scores), 1))
+    return {"total_coaching_count": profile["total_coaching_count"], "avg_score": profile["avg_score"]}
+
+class FakeSupabase:
+    """
+    메모리 기반 Supabase 클라이언트.
+    latency_ms: 요청 1회당 지연, ms_per_mb: 업로드 크기 비례 지연
+    """
+    def __init__(self, latency_ms=0.0, ms_per_mb=0.0, seed=0):
+        self.tables = {}
+        self.storage_objects = {}
+        self.rpc_handlers = {
+            "upsert_customer": _rpc_upsert_customer,
+            "find_customer": _rpc_find_customer,
+            "refresh_profile_stats": _rpc_refresh_profile_stats,
+        }
+        self.indexes = {}
+        self.latency_ms = latency_ms
+        self.ms_per_mb = ms_per_mb
+        self.calls = 0
+        self.lock = threading.RLock()
+        self._next_id = 1
+        self._rnd = random.Random(seed)
+        self.storage = FakeStorage(self)
+        self.auth = FakeAuth(self)
+
+    def _latency(self, size_bytes=0):
+        self.calls += 1
+        delay = self.latency_ms + self.ms_per_mb * size_bytes / 1e6
+        if delay:
+            time.sleep(delay / 1000)
+
+    def _insert(self, table, row):
+        row = dict(row)
+        row.setdefault("id", self._next_id)
+        row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+        self._next_id += 1
+        self.tables.setdefault(table, []).append(row)
+        return dict(row)
+
+    def _after_write(self, table, action, rows):
+        """coaching_logs 트리거 흉내 (database/migration_snapshot_changes.sql: updated_at, tombstone)"""
+        if table != "coaching_logs":
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        if action == "update":
+            for r in rows:
+                r["updated_at"] = now
+        elif action == "delete":
+            tombstones = self.tables.setdefault("coaching_log_tombstones", [])
+            tombstones.extend({"log_id": r["id"], "deleted_at": now} for r in rows)
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params=None):
+        return FakeRpc(self, name, params or {})
+
+# ==========================================
+# 🤖 Fake Gemini Client
+# ==========================================
+
+class FakeUsage:
+    def __init__(self, prompt, output, thoughts=0, cached=0):
+        self.prompt_token_count = prompt
+        self.candidates_token_count = output
+        self.thoughts_token_count = thoughts
+        self.cached_content_token_count = cached
+        self.total_token_count = prompt + output + thoughts
+
+class FakeResponse:
+    def __init__(self, text, usage):
+        self.text = text
+        self.usage_metadata = usage
+
+def _content_size(contents):
+    """프롬프트 텍스트 길이와 바이너리(Part) 크기를 계산합니다."""
+    text_len, binary = 0, 0
+    for c in contents if isinstance(contents, list) else [contents]:
+        if isinstance(c, str):
+            text_len += len(c)
+            continue
+        data = getattr(getattr(c, "inline_data", None), "data", None)
+        if data:
+            binary += len(data)
+        else:
+            text_len += len(str(c))
+    return text_len, binary
+
+class FakeModels:
+    def __init__(self, owner):
+        self.owner = owner
+
+    def generate_content(self, model, contents, config=None):
+        return self.owner._generate(contents)
+
+class FakeJobState:
+    def __init__(self, name):
+        self.name = name
+
+class FakeInlinedResponse:
+    def __init__(self, response=None, error=None):
+        self.response = response
+        self.error = error
+
+class FakeBatchDest:
+    def __init__(self, inlined_responses):
+        self.inlined_responses = inlined_responses
+
+class FakeBatchJob:
+    def __init__(self, name, state, dest=None):
+        self.name = name
+        self.state = FakeJobState(state)
+        self.dest = dest
+
+class FakeBatches:
+    """
+    client.batches 인라인 배치 작업 흉내
+    제출 후 turnaround_ms가 지나면 SUCCEEDED가 되며, 결과는 제출 순서대로 inlined_responses에 담깁니다.
+    fail_every: n번째 요청마다 error 응답 (부분 실패 재현용, 0이면 없음)
+    """
+    def __init__(self, owner, turnaround_ms=0.0, fail_every=0):
+        self.owner = owner
+        self.turnaround_ms = turnaround_ms
+        self.fail_every = fail_every
+        self.jobs = {}
+        self.created = 0
+        self.polls = 0
+
+    def create(self, model, src, config=None):
+        with self.owner._lock:
+            self.created += 1
+            name = f"batches/fake-{self.created}"
+            self.jobs[name] = {"src": list(src), "submitted": time.monotonic(), "responses": None}
+        return FakeBatchJob(name, "JOB_STATE_PENDING")
+
+    def get(self, name):
+        self.polls += 1
+        job = self.jobs[name]
+        if (time.monotonic() - job["submitted"]) * 1000 < self.turnaround_ms:
+            return FakeBatchJob(name, "JOB_STATE_RUNNING")
+        if job["responses"] is None:
+            job["responses"] = []
+            for i, request in enumerate(job["src"], start=1):
+                if self.fail_every and i % self.fail_every == 0:
+                    job["responses"].append(FakeInlinedResponse(error="INTERNAL"))
+                    continue
+                texts = [p["text"] for c in request["contents"] for p in c["parts"] if "text" in p]
+                job["responses"].append(FakeInlinedResponse(self.owner._complete("\n".join(texts))))
+        return FakeBatchJob(name, "JOB_STATE_SUCCEEDED", FakeBatchDest(job["responses"]))
+
+class FakeModelClient:
+    """
+    latency_ms: 호출당 기본 지연, ms_per_kb_in: 입력 KB당 지연, ms_per_kb_out: 출력 KB당 지연
+    payload_chars: 피드백/전사문 출력 길이
+    batch: False면 client.batches가 없는 클라이언트 (즉시 호출 폴백 확인용)
+    """
+    def __init__(self, latency_ms=0.0, ms_per_kb_in=0.0, ms_per_kb_out=0.0, payload_chars=2000,
+                 categories=("refund", "tech", "inquiry", "general"), seed=0,
+                 batch=True, batch_turnaround_ms=0.0, batch_fail_every=0):
+        self.latency_ms = latency_ms
+        self.ms_per_kb_in = ms_per_kb_in
+        self.ms_per_kb_out = ms_per_kb_out
+        self.payload_chars = payload_chars
+        self.categories = list(categories)
+        self.calls = 0
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+        self.models = FakeModels(self)
+        self.batches = FakeBatches(self, batch_turnaround_ms, batch_fail_every) if batch else None
+
+    def _filler(self, n):
+        words = ["고객님", "환불", "규정", "안내", "확인", "도와드리겠습니다", "정책", "기간", "처리"]
+        out = []
+        size = 0
+        while size < n:
+            w = self._rnd.choice(words)
+            out.append(w)
+            size += len(w) + 1
+        return " ".join(out)[:n]
+
+    def _feedback_fields(self, prompt, transcript):
+        """2차 분석 출력: 자유 형식(feedback Markdown) 또는 간결 형식(findings). 전사문은 요청된 경우만"""
+        if '"findings"' in prompt:
+            ref_ids = [int(x) for x in re.findall(r"ID:(\d+)", prompt)][:2] or [None]
+            fields = {"findings": {
+                "good": [self._filler(40) for _ in range(2)],
+                "improve": [
+                    {"issue": self._filler(40), "before": self._filler(50), "after": self._filler(60),
+                     "ref_id": ref_id, "clause": "제15조 (환불)" if ref_id else None}
+                    for ref_id in ref_ids
+                ],
+                "overall": self._filler(80),
+            }}
+        else:
+            fields = {"feedback": self._filler(self.payload_chars)}
+        if transcript:
+            fields["transcript"] = self._filler(self.payload_chars)
+        return fields
+
+    def _respond(self, prompt):
+        if '"nudges"' in prompt:
+            # 실시간 알림: 대부분 빈 리스트, 가끔 1건
+            nudges = [] if self._rnd.random() < 0.6 else [
+                {"kind": "compliance", "text": self._rnd.choice(["환불 기간(7일) 먼저 안내하세요", "고객 감정 먼저 공감하세요",
+                                                                "본인 확인 절차를 진행하세요"]), "ref_id": None}
+            ]
+            return json.dumps({"nudges": nudges}, ensure_ascii=False)
+        if "조각입니다" in prompt:
+            # 실시간 전사: 조각 1개 -> 발화 1~2줄
+            return "\n".join(f"{self._rnd.choice(['상담원', '고객'])}: {self._filler(40)}"
+                             for _ in range(self._rnd.randint(1, 2)))
+        if "top_3_topics" in prompt and ('"feedback"' in prompt or '"findings"' in prompt):
+            # 빠른 모드: 1차 분석 + 코칭 (전사문 없음)
+            score = self._rnd.randint(50, 100)
+            return json.dumps({
+                "top_3_topics": self._rnd.sample(self.categories, min(3, len(self.categories))),
+                "customer_traits": "급함, 논리적",
+                "customer_info": {"name": "홍길동", "phone": "010-1234-5678"},
+                "summary": "환불 기간 문의",
+                "recommended_ref_ids": [int(x) for x in re.findall(r"ID:(\d+)", prompt)][:3],
+                "score": score,
+                "metrics": {"empathy": score, "clarity": score, "compliance": score},
+                **self._feedback_fields(prompt, transcript=False)
+            }, ensure_ascii=False)
+        if "top_3_topics" in prompt:
+            ref_ids = [int(x) for x in re.findall(r"ID:(\d+)", prompt)][:3]
+            return json.dumps({
+                "top_3_topics": self._rnd.sample(self.categories, min(3, len(self.categories))),
+                "customer_traits": "급함, 논리적",
+                "customer_info": {"name": "홍길동", "phone": "010-1234-5678"},
+                "summary": "환불 기간 문의",
+                "recommended_ref_ids": ref_ids
+            }, ensure_ascii=False)
+        if '"transcript"' in prompt or '"findings"' in prompt:
+            score = self._rnd.randint(50, 100)
+            return json.dumps({
+                "score": score,
+                "metrics": {"empathy": score, "clarity": score, "compliance": score},
+                "type": self.categories[0],
+                **self._feedback_fields(prompt, transcript='"transcript"' in prompt)
+            }, ensure_ascii=False)
+        if '"score"' in prompt:
+            # 재채점: 점수/지표와 짧은 사유만
+            score = self._rnd.randint(40, 100)
+            return json.dumps({
+                "score": score,
+                "metrics": {"empathy": score, "clarity": score, "compliance": score},
+                "feedback": self._filler(120)
+            }, ensure_ascii=False)
+        if "사용 시점" in prompt:
+            return "사용 시점: 단순 변심 환불 방어 시"
+        return self._filler(200)
+
+    def _complete(self, prompt):
+        """지연 없이 응답만 생성합니다. (배치 결과용)"""
+        with self._lock:
+            text = self._respond(prompt)
+        return FakeResponse(text, FakeUsage(prompt=len(prompt) // 2, output=len(text) // 2, thoughts=len(text) // 4))
+
+    def _generate(self, contents):
+        with self._lock:
+            self.calls += 1
+        parts = contents if isinstance(contents, list) else [contents]
+        prompt = "\n".join(p for p in parts if isinstance(p, str))
+        text = self._respond(prompt)
+        text_len, binary = _content_size(contents)
+        in_kb = (text_len * 3 + binary) / 1024  # 한글 1자 ≈ 3바이트
+        delay = self.latency_ms + self.ms_per_kb_in * in_kb + self.ms_per_kb_out * len(text.encode()) / 1024
+        if delay:
+            time.sleep(delay / 1000)
+        usage = FakeUsage(prompt=text_len // 2 + binary // 32, output=len(text) // 2, thoughts=len(text) // 4)
+        return FakeResponse(text, usage)
+
+# ==========================================
+# 🔌 설치
+# ==========================================
+
+FAKE_SECRETS = {
+    "supabase": {"url": "https://fake.supabase.local", "key": "fake-anon-key"},
+    "google": {"api_key": "fake-gemini-key"}
+}
+
+def install_fakes(db=None, model=None):
+    """
+    st.secrets를 교체하고, db_manager / ai_agent의 지연 생성 클라이언트 자리에 로컬 대체 구현을 넣습니다.
+    (get_supabase() / get_client()가 실제 SDK 클라이언트를 만들지 않음) 반환: (db, model)
+    """
+    import streamlit as st
+
+    db = db or FakeSupabase()
+    model = model or FakeModelClient()
+    st.secrets = FAKE_SECRETS
+
+    from utils import db_manager, ai_agent
+    db_manager._supabase = db
+    ai_agent._client = model
+    return db, model
+
+def seed_database(db, users=1, logs_per_user=0, references=0, customer_history=0,
+                  categories=("refund", "tech", "inquiry", "general"), seed=0):
+    """벤치마크 시나리오용 기본 데이터를 채웁니다. 반환: (user_ids, customer)"""
+    rnd = random.Random(seed)
+    db.tables.setdefault("consultation_types", []).extend(
+        {"name": c, "description": f"{c} 관련 상담", "is_active": True} for c in categories
+    )
+    db.tables.setdefault("guidelines", []).extend(
+        {"id": i, "category": c, "raw_input": "-", "refined_content": f"{c} 가이드 {i}: 규정을 먼저 안내하세요.",
+         "is_active": True}
+        for i, c in enumerate(list(categories) * 2 + ["common"] * 3, start=1)
+    )
+    user_ids = [str(uuid.UUID(int=i + 1)) for i in range(users)]
+    for uid in user_ids:
+        db.tables.setdefault("profiles", []).append({
+            "id": uid, "email": f"{uid[-4:]}@pass.local", "is_admin": False, "is_consultant": True,
+            "total_coaching_count": logs_per_user, "avg_score": 75.0,
+            "created_at": "2025-01-01T00:00:00+00:00", "department": "CS"
+        })
+        for i in range(logs_per_user):
+            db._insert("coaching_logs", {
+                "user_id": uid, "customer_id": None,
+                "consultation_type": rnd.choice(categories),
+                "original_script": "고객: 환불 문의드립니다.", "audio_url": None,
+                "ai_score": rnd.randint(40, 100),
+                "metrics": {"empathy": 70, "clarity": 70, "compliance": 70},
+                "ai_feedback": "-",
+                "created_at": f"2025-01-01T00:00:{i % 60:02d}.{i:06d}+00:00"
+            })
+    for i in range(references):
+        content = ("제15조 (환불) 구매 후 7일 이내 단순 변심 환불 가능. " * 40)
+        db._insert("reference_materials", {
+            "category": rnd.choice(list(categories) + ["common"]), "title": f"규정 {i + 1}",
+            "content": content, "summary": "환불 규정 안내 시", "file_url": None, "is_active": True,
+            "ingest_status": "ready", "chunk_count": 1
+        })
+    customer = db._insert("customers", {
+        "name": "홍길동", "phone": "010-1234-5678", "phone_normalized": "01012345678", "last_consultation_date": None,
+        "consultation_history": [
+            {"date": "2025-01-01", "type": "refund", "summary": f"이전 상담 {i}", "extracted_traits": "급함"}
+            for i in range(customer_history)
+        ]
+    })
+    return user_ids, customer
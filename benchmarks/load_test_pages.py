@@ -0,0 +1,224 @@
+"""
+동시 상담원 부하 테스트 (Streamlit AppTest + 로컬 Fake)
+
+N명의 가상 상담원이 동시에 app.py 로그인 -> 코칭 페이지(텍스트 입력 -> 1차 분석 -> FINAL 코칭 -> 결과)
+흐름을 반복합니다. Supabase/Gemini는 benchmarks/fakes의 로컬 대체 구현(지연 시간 설정 가능)을 사용하고,
+한 프로세스 안에서 실행되므로 실제 배포(단일 Streamlit 서버)와 같은 방식으로 모듈/캐시/스레드 풀을 공유합니다.
+
+동시 사용자 수 단계별로 처리량(flows/s, reruns/s), rerun 지연 시간(p50/p95/p99), 프로세스 메모리(RSS)를 보고합니다.
+
+    python -m benchmarks.load_test_pages --users 1,5,10,25 --flows 3 --out load.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import (
+    FakeSupabase, FakeModelClient, FakeUser, FAKE_SECRETS, install_fakes, seed_database
+)
+from benchmarks.bench_coaching_pipeline import SAMPLE_SCRIPT, percentile
+
+APP_PATH = os.path.join(ROOT, "app.py")
+COACHING_PAGE_PATH = os.path.join(ROOT, "pages", "02_coaching_session.py")
+
+def rss_mb():
+    """현재 프로세스 RSS(MB). /proc이 없으면 최대 RSS로 대체"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+class MemorySampler(threading.Thread):
+    def __init__(self, interval=0.2):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.samples.append(rss_mb())
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return {
+            "start_mb": round(self.samples[0], 1) if self.samples else None,
+            "peak_mb": round(max(self.samples), 1) if self.samples else None,
+            "end_mb": round(rss_mb(), 1),
+        }
+
+def _new_app_test(path, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(path, default_timeout=timeout)
+    for section, values in FAKE_SECRETS.items():
+        at.secrets[section] = values
+    return at
+
+def _button(at, label_prefix):
+    return next(b for b in at.button if b.label.startswith(label_prefix))
+
+def simulate_user(index, flows, timeout, record):
+    """가상 상담원 1명: 로그인 후 코칭 흐름을 flows회 반복합니다."""
+    def timed_run(step, action):
+        started = time.perf_counter()
+        at = action()
+        record(step, (time.perf_counter() - started) * 1000, bool(at.exception))
+        return at
+
+    # 1. 로그인 (app.py)
+    login = _new_app_test(APP_PATH, timeout)
+    timed_run("login_render", login.run)
+    login.text_input(key="login_email").input(f"consultant{index}@pass.local")
+    login.text_input(key="login_pw").input("password")
+    timed_run("login_submit", _button(login, "로그인 시작").click().run)
+    profile = login.session_state["profile"]
+    user = login.session_state["user"]
+
+    # 2. 코칭 페이지
+    page = _new_app_test(COACHING_PAGE_PATH, timeout)
+    page.session_state["user"] = user
+    page.session_state["profile"] = profile
+    timed_run("page_load", page.run)
+
+    completed = 0
+    for _ in range(flows):
+        page.session_state["process_step"] = "input"
+        timed_run("input_render", page.run)
+        page.text_area(key="txt_in").input(SAMPLE_SCRIPT)
+        timed_run("analyze_submit", _button(page, "분석 시작").click().run)
+        if page.session_state["process_step"] != "extracted":
+            continue
+        timed_run("final_submit", _button(page, "FINAL 코칭 진행").click().run)
+        if page.session_state["process_step"] == "result":
+            completed += 1
+    return completed
+
+def run_level(users, flows, timeout):
+    samples = {}
+    errors = {"count": 0}
+    lock = threading.Lock()
+
+    def record(step, ms, failed):
+        with lock:
+            samples.setdefault(step, []).append(ms)
+            if failed:
+                errors["count"] += 1
+
+    sampler = MemorySampler()
+    sampler.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as pool:
+        futures = [pool.submit(simulate_user, i, flows, timeout, record) for i in range(users)]
+        completed, failures = 0, 0
+        for f in futures:
+            try:
+                completed += f.result()
+            except Exception as e:
+                failures += 1
+                print(f"  가상 사용자 실패: {type(e).__name__}: {e}")
+    wall = time.perf_counter() - started
+    memory = sampler.stop()
+
+    reruns = sum(len(v) for v in samples.values())
+    all_ms = [ms for v in samples.values() for ms in v]
+    return {
+        "users": users,
+        "wall_s": round(wall, 2),
+        "flows_completed": completed,
+        "flows_per_s": round(completed / wall, 3),
+        "reruns": reruns,
+        "reruns_per_s": round(reruns / wall, 2),
+        "script_exceptions": errors["count"],
+        "user_failures": failures,
+        "rerun_ms": {
+            "p50": round(percentile(all_ms, 50) or 0, 1),
+            "p95": round(percentile(all_ms, 95) or 0, 1),
+            "p99": round(percentile(all_ms, 99) or 0, 1),
+        },
+        "steps": {
+            step: {
+                "n": len(v),
+                "p50_ms": round(percentile(v, 50), 1),
+                "p95_ms": round(percentile(v, 95), 1),
+                "p99_ms": round(percentile(v, 99), 1),
+            }
+            for step, v in samples.items()
+        },
+        "memory": memory,
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", default="1,5,10,25", help="동시 사용자 수 단계")
+    parser.add_argument("--flows", type=int, default=3, help="사용자당 코칭 흐름 반복 횟수")
+    parser.add_argument("--references", type=int, default=10)
+    parser.add_argument("--history", type=int, default=1000, help="상담원당 누적 코칭 로그 수")
+    parser.add_argument("--db-latency-ms", type=float, default=20.0)
+    parser.add_argument("--model-latency-ms", type=float, default=500.0)
+    parser.add_argument("--payload-chars", type=int, default=2000)
+    parser.add_argument("--timeout", type=float, default=120.0, help="rerun 1회 제한 시간(초)")
+    parser.add_argument("--out", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    db = FakeSupabase(latency_ms=args.db_latency_ms)
+    model = FakeModelClient(latency_ms=args.model_latency_ms, payload_chars=args.payload_chars)
+    install_fakes(db, model)
+    seed_database(db, users=0, references=args.references)
+
+    baseline_mb = round(rss_mb(), 1)
+    levels = []
+    for users in [int(x) for x in args.users.split(",")]:
+        # 로그인 시 생성될 프로필마다 누적 로그를 미리 채워 프로필 재집계 비용을 반영
+        for i in range(users):
+            uid = FakeUser(f"consultant{i}@pass.local").id
+            if not any(p["id"] == uid for p in db.tables.get("profiles", [])):
+                db.tables.setdefault("profiles", []).append({
+                    "id": uid, "email": f"consultant{i}@pass.local", "is_admin": False,
+                    "is_consultant": True, "total_coaching_count": args.history, "avg_score": 75.0
+                })
+                for n in range(args.history):
+                    db._insert("coaching_logs", {
+                        "user_id": uid, "consultation_type": "refund", "ai_score": 70,
+                        "created_at": f"2025-01-01T00:00:00.{n:06d}+00:00"
+                    })
+        result = run_level(users, args.flows, args.timeout)
+        levels.append(result)
+        print(f"[users={users:<3d}] flows/s={result['flows_per_s']} reruns/s={result['reruns_per_s']} "
+              f"rerun p50={result['rerun_ms']['p50']}ms p95={result['rerun_ms']['p95']}ms "
+              f"rss peak={result['memory']['peak_mb']}MB")
+
+    report = {
+        "benchmark": "load_test_pages",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "baseline_rss_mb": baseline_mb,
+        "levels": levels,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"결과 저장: {args.out}")
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+-- Per-consultant rolling trends and warnings
+-- 상담 저장 시마다 utils/consultant_trends.py가 상담원별 상태(최근 N건, EWMA, 지표별 드리프트)를 갱신합니다.
+-- 관리자 대시보드는 coaching_logs 전체를 다시 집계하지 않고 이 테이블만 읽습니다.
+
+create table if not exists consultant_trends (
+    user_id uuid primary key,
+    state jsonb not null,              -- 증분 계산 상태 (count, score_sum, window, ewma, metric_*, last_log_id)
+    session_count integer default 0,
+    total_mean real,                   -- 전체 평균 점수
+    recent_mean real,                  -- 최근 N건 평균
+    growth real,                       -- 최근 N건 평균 - 전체 평균
+    ewma real,                         -- 점수 EWMA
+    drift jsonb default '{}'::jsonb,   -- {"empathy": -3.2, ...} 지표 EWMA - 지표 전체 평균
+    warnings jsonb default '[]'::jsonb,
+    updated_at timestamptz default now()
+);
+
+create index if not exists consultant_trends_warned_idx
+on consultant_trends (updated_at) where jsonb_array_length(warnings) > 0;
+
+alter table consultant_trends enable row level security;
+
+drop policy if exists "Allow authenticated read consultant trends" on consultant_trends;
+create policy "Allow authenticated read consultant trends"
+on consultant_trends for select
+to authenticated
+using (true);
+
+-- 상담원의 저장 작업(백그라운드)이 자기 행을 갱신, 관리자 재계산은 전체 행 갱신
+drop policy if exists "Allow authenticated write consultant trends" on consultant_trends;
+create policy "Allow authenticated write consultant trends"
+on consultant_trends for all
+to authenticated
+using (true)
+with check (true);
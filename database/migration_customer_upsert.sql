@@ -0,0 +1,161 @@
+-- Customer upsert: normalized phone key + single round-trip RPC
+-- "010-1234-5678"과 "01012345678"을 같은 고객으로 보도록 정규화한 전화번호(phone_normalized)에 unique 인덱스를 두고,
+-- 조회/생성을 upsert_customer() 한 번의 호출로 처리합니다. (동시 상담에서 중복 고객 생성 방지)
+-- 키는 SQL normalize_phone()만 계산합니다. (utils/phone_number.py는 화면 표시/로컬 비교용으로 같은 규칙을 따름)
+
+create or replace function normalize_phone(p text) returns text
+language plpgsql immutable as $$
+declare
+    raw text := btrim(coalesce(p, ''));
+    digits text := regexp_replace(raw, '\D', '', 'g');
+begin
+    if raw = '' then
+        return null;
+    end if;
+    if length(digits) < 7 then
+        return lower(regexp_replace(raw, '\s+', '', 'g'));
+    end if;
+    if digits like '0082%' then
+        digits := substr(digits, 5);
+    elsif digits like '82%' then
+        digits := substr(digits, 3);
+    end if;
+    if digits not like '0%' then
+        digits := '0' || digits;
+    end if;
+    return digits;
+end $$;
+
+alter table customers add column if not exists phone_normalized text;
+
+update customers set phone_normalized = normalize_phone(phone)
+where phone_normalized is null and phone is not null;
+
+-- 기존 중복 고객 병합: id가 가장 작은 행에 이력을 날짜순으로 합치고, 상담 로그를 그 행으로 옮긴 뒤 나머지 삭제
+with ranked as (
+    select id, phone_normalized,
+           first_value(id) over (partition by phone_normalized order by id) as keep_id,
+           row_number() over (partition by phone_normalized order by id) as rn
+    from customers
+    where phone_normalized is not null
+),
+merged as (
+    select r.keep_id,
+           jsonb_agg(h.entry order by h.entry->>'date', c.id, h.ord) as history,
+           max(c.last_consultation_date) as last_date
+    from ranked r
+    join customers c on c.id = r.id
+    cross join lateral jsonb_array_elements(coalesce(c.consultation_history, '[]'::jsonb))
+         with ordinality as h(entry, ord)
+    where r.keep_id in (select keep_id from ranked where rn > 1)
+    group by r.keep_id
+)
+update customers c
+   set consultation_history = m.history,
+       last_consultation_date = m.last_date
+  from merged m
+ where c.id = m.keep_id;
+
+with ranked as (
+    select id,
+           first_value(id) over (partition by phone_normalized order by id) as keep_id
+    from customers
+    where phone_normalized is not null
+)
+update coaching_logs l
+   set customer_id = r.keep_id
+  from ranked r
+ where l.customer_id = r.id and r.id <> r.keep_id;
+
+with ranked as (
+    select id,
+           first_value(id) over (partition by phone_normalized order by id) as keep_id
+    from customers
+    where phone_normalized is not null
+)
+delete from customers c
+ using ranked r
+ where c.id = r.id and r.id <> r.keep_id;
+
+create unique index if not exists customers_phone_normalized_key on customers (phone_normalized);
+
+-- 앱 외 경로(SQL 편집기, 다른 도구)로 들어온 행도 키가 채워지도록
+create or replace function set_customer_phone_normalized() returns trigger
+language plpgsql as $$
+begin
+    if tg_op = 'INSERT' then
+        new.phone_normalized := coalesce(new.phone_normalized, normalize_phone(new.phone));
+    elsif new.phone is distinct from old.phone and new.phone_normalized is not distinct from old.phone_normalized then
+        new.phone_normalized := normalize_phone(new.phone);
+    end if;
+    return new;
+end $$;
+
+drop trigger if exists customers_phone_normalized on customers;
+create trigger customers_phone_normalized
+before insert or update of phone on customers
+for each row execute function set_customer_phone_normalized();
+
+-- 조회 또는 생성 (원자적), 최근 이력 p_history_limit건만 포함해 반환
+-- 정규화 키는 이 함수(normalize_phone)만 계산합니다. (앱은 원본 번호만 전달)
+-- 기존 고객이면 insert는 아무것도 쓰지 않고(do nothing) 이어서 조회 -> 조회마다 행 버전/트리거가 생기지 않음
+-- 반환: customers 행(jsonb) + is_new
+drop function if exists upsert_customer(text, text, text, integer);
+
+create or replace function upsert_customer(
+    p_name text,
+    p_phone text,
+    p_history_limit integer default 3
+) returns jsonb
+language plpgsql as $$
+declare
+    c customers;
+    key text := normalize_phone(p_phone);
+    inserted boolean;
+    recent jsonb;
+begin
+    insert into customers (name, phone, phone_normalized, consultation_history, last_consultation_date)
+    values (p_name, p_phone, key, '[]'::jsonb, now())
+    on conflict (phone_normalized) do nothing
+    returning * into c;
+    inserted := found;
+
+    if not inserted then
+        -- 충돌한 행 (동시에 insert 중이던 트랜잭션은 커밋을 기다린 뒤 조회됨)
+        select * into c from customers where phone_normalized = key;
+    end if;
+
+    select coalesce(jsonb_agg(h.entry order by h.ord), '[]'::jsonb) into recent
+    from jsonb_array_elements(coalesce(c.consultation_history, '[]'::jsonb)) with ordinality as h(entry, ord)
+    where h.ord > jsonb_array_length(coalesce(c.consultation_history, '[]'::jsonb)) - p_history_limit;
+
+    return (to_jsonb(c) - 'consultation_history')
+        || jsonb_build_object('consultation_history', recent, 'is_new', inserted);
+end $$;
+
+grant execute on function upsert_customer(text, text, integer) to authenticated;
+
+-- 조회만 (생성하지 않음): 1차 분석 중 고객 선행 조회용. 없으면 null
+create or replace function find_customer(
+    p_phone text,
+    p_history_limit integer default 3
+) returns jsonb
+language plpgsql stable as $$
+declare
+    c customers;
+    recent jsonb;
+begin
+    select * into c from customers where phone_normalized = normalize_phone(p_phone);
+    if not found then
+        return null;
+    end if;
+
+    select coalesce(jsonb_agg(h.entry order by h.ord), '[]'::jsonb) into recent
+    from jsonb_array_elements(coalesce(c.consultation_history, '[]'::jsonb)) with ordinality as h(entry, ord)
+    where h.ord > jsonb_array_length(coalesce(c.consultation_history, '[]'::jsonb)) - p_history_limit;
+
+    return (to_jsonb(c) - 'consultation_history')
+        || jsonb_build_object('consultation_history', recent, 'is_new', false);
+end $$;
+
+grant execute on function find_customer(text, integer) to authenticated;
@@ -0,0 +1,36 @@
+-- Versioned re-scores after guideline changes
+-- 가이드라인이 바뀐 뒤 과거 상담을 새 기준으로 다시 채점한 결과를 원본(coaching_logs.ai_score)과 별도로 저장합니다.
+-- rules_version은 채점에 쓴 가이드라인 본문의 해시이며, (log_id, rules_version)당 1행만 저장되므로
+-- 재채점 작업(utils/rescoring.py)이 중단 후 재개되어도 같은 로그를 중복 저장하지 않습니다.
+
+create table if not exists coaching_log_rescores (
+    id bigserial primary key,
+    log_id bigint not null references coaching_logs (id) on delete cascade,
+    rules_version text not null,       -- sha256(가이드라인 본문) 앞 12자리
+    category text,
+    job_id text,                       -- 재채점 작업 ID (로컬 작업 파일과 연결)
+    score integer,
+    metrics jsonb,
+    feedback text,
+    original_score integer,            -- 재채점 당시 coaching_logs.ai_score (비교용)
+    model text,
+    created_at timestamptz default now(),
+    unique (log_id, rules_version)
+);
+
+create index if not exists coaching_log_rescores_version_idx
+on coaching_log_rescores (rules_version, log_id);
+
+alter table coaching_log_rescores enable row level security;
+
+drop policy if exists "Allow authenticated read log rescores" on coaching_log_rescores;
+create policy "Allow authenticated read log rescores"
+on coaching_log_rescores for select
+to authenticated
+using (true);
+
+drop policy if exists "Allow authenticated insert log rescores" on coaching_log_rescores;
+create policy "Allow authenticated insert log rescores"
+on coaching_log_rescores for insert
+to authenticated
+with check (true);
@@ -0,0 +1,57 @@
+-- Content-hashed audio storage: object registry + reference counts
+-- 'recordings' 버킷의 객체 이름은 파일 내용의 SHA-256 해시입니다.
+-- ref_count는 coaching_logs.audio_url을 참조하는 로그 수이며 트리거로 관리됩니다.
+
+create table if not exists media_objects (
+    object_path text primary key,          -- '<bucket>/<sha256>.<ext>'
+    bucket text not null,
+    content_hash text not null,
+    size_bytes bigint,
+    public_url text unique,
+    ref_count integer not null default 0,
+    created_at timestamptz default now(),
+    last_referenced_at timestamptz
+);
+
+create index if not exists media_objects_orphan_idx
+on media_objects (created_at) where ref_count = 0;
+
+alter table media_objects enable row level security;
+
+drop policy if exists "Allow authenticated read media" on media_objects;
+create policy "Allow authenticated read media"
+on media_objects for select
+to authenticated
+using (true);
+
+drop policy if exists "Allow authenticated insert media" on media_objects;
+create policy "Allow authenticated insert media"
+on media_objects for insert
+to authenticated
+with check (true);
+
+-- coaching_logs insert/delete 시 참조 카운트 갱신
+create or replace function sync_media_ref_count() returns trigger
+language plpgsql security definer as $$
+begin
+    if tg_op = 'INSERT' and new.audio_url is not null then
+        update media_objects
+           set ref_count = ref_count + 1, last_referenced_at = now()
+         where public_url = new.audio_url;
+    elsif tg_op = 'DELETE' and old.audio_url is not null then
+        update media_objects
+           set ref_count = greatest(ref_count - 1, 0)
+         where public_url = old.audio_url;
+    end if;
+    return null;
+end $$;
+
+drop trigger if exists coaching_logs_media_ref on coaching_logs;
+create trigger coaching_logs_media_ref
+after insert or delete on coaching_logs
+for each row execute function sync_media_ref_count();
+
+-- 고아 객체 정리 대상 조회 (선택 후 저장되지 않았거나 모든 로그가 삭제된 오디오)
+-- 업로드 직후 저장 대기 중인 객체를 지우지 않도록 유예 기간을 둡니다.
+-- select object_path from media_objects
+--  where ref_count = 0 and created_at < now() - interval '1 day';
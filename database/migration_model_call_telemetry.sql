@@ -0,0 +1,52 @@
+-- Model call token telemetry
+-- ai_agent의 모든 모델 호출마다 usage_metadata(프롬프트/캐시/사고(thinking)/출력 토큰)와 지연 시간을 기록합니다.
+-- 앱은 행을 모아서 백그라운드로 insert하므로 코칭 응답 시간에는 영향을 주지 않습니다.
+
+create table if not exists model_call_telemetry (
+    id bigint generated by default as identity primary key,
+    created_at timestamptz default now(),
+    function text not null,            -- analyze_topic_and_traits, generate_coaching_feedback, ...
+    category text,                     -- 상담 유형 (분류 전 호출은 null)
+    user_id uuid,
+    session_id text,                   -- utils/tracing 세션 ID (Streamlit 세션 단위)
+    model text,
+    prompt_tokens integer default 0,
+    cached_tokens integer default 0,
+    thoughts_tokens integer default 0,
+    output_tokens integer default 0,
+    total_tokens integer default 0,
+    latency_ms real,
+    status text default 'ok'           -- ok / error
+);
+
+create index if not exists model_call_telemetry_created_at_idx on model_call_telemetry (created_at, id);
+create index if not exists model_call_telemetry_category_idx on model_call_telemetry (category, created_at);
+
+alter table model_call_telemetry enable row level security;
+
+drop policy if exists "Allow authenticated insert model call telemetry" on model_call_telemetry;
+create policy "Allow authenticated insert model call telemetry"
+on model_call_telemetry for insert
+to authenticated
+with check (true);
+
+drop policy if exists "Allow authenticated read model call telemetry" on model_call_telemetry;
+create policy "Allow authenticated read model call telemetry"
+on model_call_telemetry for select
+to authenticated
+using (true);
+
+-- 일자/카테고리/함수별 토큰 합계 (SQL 편집기에서 직접 확인용)
+create or replace view model_call_daily_usage as
+select
+    date_trunc('day', created_at) as day,
+    coalesce(category, '(분류 전)') as category,
+    function,
+    count(*) as calls,
+    sum(prompt_tokens) as prompt_tokens,
+    sum(cached_tokens) as cached_tokens,
+    sum(thoughts_tokens) as thoughts_tokens,
+    sum(output_tokens) as output_tokens,
+    avg(latency_ms) as avg_latency_ms
+from model_call_telemetry
+group by 1, 2, 3;
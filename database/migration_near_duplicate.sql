@@ -0,0 +1,6 @@
+-- Near-duplicate detection: exact re-upload lookup by audio URL
+-- 오디오는 내용 해시 이름으로 저장되므로 같은 파일을 다시 올리면 audio_url이 같습니다.
+-- 코칭 화면은 1차 분석 전에 audio_url로 기존 로그를 조회합니다. (텍스트 유사도는 로컬 MinHash 인덱스: utils/near_duplicate.py)
+
+create index if not exists coaching_logs_audio_url_idx
+on coaching_logs (audio_url) where audio_url is not null;
@@ -0,0 +1,24 @@
+-- Profile stats aggregate: 상담 건수 / 평균 점수를 DB에서 집계
+-- 저장 후 프로필 통계 재계산(utils/db_manager.save_coaching_result)이 상담원의 로그 전체를 앱으로 페이지 조회하지 않고
+-- RPC 한 번으로 처리합니다. 전체 평균(fetch_global_avg_score)은 이렇게 갱신된 profiles 집계만 읽습니다.
+
+create index if not exists coaching_logs_user_score_idx
+on coaching_logs (user_id) include (ai_score);
+
+-- 반환: {"total_coaching_count", "avg_score"} (로그가 없으면 null, 프로필은 그대로)
+create or replace function refresh_profile_stats(p_user_id uuid)
+returns jsonb
+language sql as $$
+    update profiles p
+    set total_coaching_count = s.n,
+        avg_score = round(s.avg_score::numeric, 1)
+    from (
+        select count(*) as n, avg(coalesce(ai_score, 0)) as avg_score
+        from coaching_logs
+        where user_id = p_user_id
+    ) s
+    where p.id = p_user_id and s.n > 0
+    returning jsonb_build_object('total_coaching_count', p.total_coaching_count, 'avg_score', p.avg_score);
+$$;
+
+grant execute on function refresh_profile_stats(uuid) to authenticated;
@@ -0,0 +1,28 @@
+-- Precompiled prompt bundles
+-- 관리자가 가이드라인/상담 유형/참고자료를 저장할 때마다 프롬프트 블록(상담 유형 목록, 참고자료 목록,
+-- 카테고리별 가이드라인)을 미리 렌더링해 버전별로 저장합니다. (utils/prompt_bundles.py)
+-- 코칭 화면은 최신 버전 1건만 읽어 사용하며, 행이 없으면 기존처럼 테이블을 직접 조회합니다.
+
+create table if not exists prompt_bundles (
+    version integer primary key,       -- 1부터 증가 (동시 발행 시 PK 충돌로 하나만 저장)
+    bundle jsonb not null,             -- {"schema", "category_text", "reference_list_text", "categories", "references", "rules"}
+    content_hash text not null,        -- bundle의 sha256 (내용이 같으면 새 버전을 만들지 않음)
+    published_by uuid,
+    reason text,                       -- guideline:12 updated, type:refund added, reference:7 ready, ...
+    published_at timestamptz default now()
+);
+
+alter table prompt_bundles enable row level security;
+
+drop policy if exists "Allow authenticated read prompt bundles" on prompt_bundles;
+create policy "Allow authenticated read prompt bundles"
+on prompt_bundles for select
+to authenticated
+using (true);
+
+-- 참고자료 수집 완료 시 백그라운드 작업도 발행하므로 관리자 외 세션의 insert도 허용
+drop policy if exists "Allow authenticated insert prompt bundles" on prompt_bundles;
+create policy "Allow authenticated insert prompt bundles"
+on prompt_bundles for insert
+to authenticated
+with check (true);
@@ -0,0 +1,35 @@
+-- Deduplicated reference storage + extraction cache
+-- 참고자료 파일을 내용 해시(SHA-256)로 한 번만 저장하고,
+-- 최초 업로드 시 계산한 추출 텍스트/페이지 수/토큰 추정치/사용 상황 요약을 함께 보관합니다.
+
+create table if not exists reference_files (
+    content_hash text primary key,
+    file_url text not null,
+    file_ext text,
+    extracted_text text,
+    page_count integer,
+    token_estimate integer,
+    usage_summary text,
+    created_at timestamptz default now()
+);
+
+alter table reference_files enable row level security;
+
+drop policy if exists "Allow public read reference files" on reference_files;
+create policy "Allow public read reference files"
+on reference_files for select
+using (true);
+
+drop policy if exists "Allow authenticated insert reference files" on reference_files;
+create policy "Allow authenticated insert reference files"
+on reference_files for insert
+to authenticated
+with check (true);
+
+drop policy if exists "Allow authenticated update reference files" on reference_files;
+create policy "Allow authenticated update reference files"
+on reference_files for update
+to authenticated
+using (true);
+
+ALTER TABLE reference_materials ADD COLUMN IF NOT EXISTS content_hash TEXT REFERENCES reference_files(content_hash);
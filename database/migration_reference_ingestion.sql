@@ -0,0 +1,12 @@
+-- Reference ingestion pipeline status
+-- 자료 등록은 'pending' 행을 먼저 만들고, 백그라운드 수집 작업(텍스트 추출 -> 청크 -> 로컬 인덱스 -> 요약)이
+-- 끝나면 'ready'로 바뀝니다. 실패 시 'failed'와 ingest_error가 기록됩니다.
+-- 기존 행은 수집 파이프라인을 거치지 않았으므로 status는 null로 둡니다.
+
+ALTER TABLE reference_materials ADD COLUMN IF NOT EXISTS ingest_status TEXT
+    CHECK (ingest_status IN ('pending', 'processing', 'ready', 'failed'));
+ALTER TABLE reference_materials ADD COLUMN IF NOT EXISTS ingest_error TEXT;
+ALTER TABLE reference_materials ADD COLUMN IF NOT EXISTS chunk_count INTEGER;
+ALTER TABLE reference_materials ADD COLUMN IF NOT EXISTS page_count INTEGER;
+ALTER TABLE reference_materials ADD COLUMN IF NOT EXISTS token_estimate INTEGER;
+ALTER TABLE reference_materials ADD COLUMN IF NOT EXISTS ingested_at TIMESTAMPTZ;
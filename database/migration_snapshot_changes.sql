@@ -0,0 +1,54 @@
+-- Analytics snapshot change feed: coaching_logs 수정/삭제 추적
+-- 로컬 Parquet 스냅샷(utils/analytics_snapshot.py)은 (created_at, id) 워터마크로 신규 행만 받으므로,
+-- 이후의 수정(상담 유형 수정 등)과 삭제(deduplicate_logs.sql 등)를 따로 알 수 있어야 합니다.
+--   - updated_at: update 시에만 트리거로 기록 (insert 직후에는 null -> 신규 행은 created_at 워터마크로만 전달)
+--   - coaching_log_tombstones: 삭제된 로그 ID와 삭제 시각
+
+alter table coaching_logs add column if not exists updated_at timestamptz;
+
+create index if not exists coaching_logs_updated_at_idx
+on coaching_logs (updated_at, id) where updated_at is not null;
+
+create or replace function touch_coaching_log() returns trigger
+language plpgsql as $$
+begin
+    new.updated_at := now();
+    return new;
+end $$;
+
+drop trigger if exists coaching_logs_touch on coaching_logs;
+create trigger coaching_logs_touch
+before update on coaching_logs
+for each row execute function touch_coaching_log();
+
+create table if not exists coaching_log_tombstones (
+    log_id bigint primary key,
+    deleted_at timestamptz not null default now()
+);
+
+create index if not exists coaching_log_tombstones_deleted_at_idx
+on coaching_log_tombstones (deleted_at, log_id);
+
+alter table coaching_log_tombstones enable row level security;
+
+drop policy if exists "Allow authenticated read tombstones" on coaching_log_tombstones;
+create policy "Allow authenticated read tombstones"
+on coaching_log_tombstones for select
+to authenticated
+using (true);
+
+create or replace function record_coaching_log_tombstone() returns trigger
+language plpgsql security definer as $$
+begin
+    insert into coaching_log_tombstones (log_id) values (old.id)
+    on conflict (log_id) do update set deleted_at = excluded.deleted_at;
+    return null;
+end $$;
+
+drop trigger if exists coaching_logs_tombstone on coaching_logs;
+create trigger coaching_logs_tombstone
+after delete on coaching_logs
+for each row execute function record_coaching_log_tombstone();
+
+-- 오래된 tombstone 정리 (모든 스냅샷의 주기적 전체 재구성 주기보다 길게 보관)
+-- delete from coaching_log_tombstones where deleted_at < now() - interval '7 days';
@@ -0,0 +1,6 @@
+-- Write-behind auto-save: idempotency key for background save retries
+-- (재시도 시 같은 job이 두 번 insert되지 않도록 unique 제약)
+ALTER TABLE coaching_logs ADD COLUMN IF NOT EXISTS client_job_id uuid;
+
+CREATE UNIQUE INDEX IF NOT EXISTS coaching_logs_client_job_id_key
+ON coaching_logs (client_job_id);
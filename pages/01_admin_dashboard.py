@@ -1,23 +1,26 @@
 import streamlit as st
 import pandas as pd
 from utils.db_manager import (
-    fetch_all_kpi_data, 
     fetch_all_guidelines, 
     add_new_guideline, 
     update_guideline_content,
-    fetch_all_profiles,
-    fetch_consultation_types,
     add_consultation_type,
     deactivate_consultation_type,
-    fetch_kpi_trend,
     fetch_references,
-    add_reference,
     delete_reference,
-    update_user_department,
-    upload_reference_file
+    update_user_department
 )
 
-from utils.ai_agent import refine_guideline_with_ai, generate_reference_usage_context
+from utils.ai_agent import refine_guideline_with_ai
+from utils.dashboard_data import load_dashboard_data, TELEMETRY_DAYS
+from utils.reference_ingest import submit_reference_ingestion, retry_ingestion
+from utils.reference_index import remove_reference as remove_reference_from_index
+from utils.tracing import bind_streamlit_session, load_spans, summarize_spans, prometheus_text
+from utils.prompt_bundles import publish_prompt_bundle, load_current_bundle
+from utils.consultant_trends import rebuild_trends
+from utils.rescoring import start_rescore, resume_rescore, list_jobs as list_rescore_jobs, job_progress
+from utils.topic_classifier import train_from_logs as train_topic_classifier, model_report as topic_classifier_report
+from utils.customer_extractor import agreement_summary
 import altair as alt
 import time
 
@@ -28,15 +31,52 @@ if "profile" not in st.session_state or not st.session_state.profile.get("is_adm
     st.error("접근 권한이 없습니다.")
     st.stop()
 
+bind_streamlit_session(st.session_state, st.session_state.profile.get("id"))
+
 st.title("📊 Admin Dashboard")
 
+# 참고자료 수집 상태 표시
+INGEST_BADGES = {"pending": "⏳ ", "processing": "⚙️ ", "failed": "⚠️ ", "ready": ""}
+
+def publish_bundle(reason):
+    """관리자 저장 직후 프롬프트 번들 재발행 (코칭 화면은 다음 조회부터 새 버전 사용)"""
+    return publish_prompt_bundle(published_by=st.session_state.profile.get("id"), reason=reason)
+
+# 렌더링 1회당 데이터셋을 한 번씩만 로드하여 모든 탭이 공유
+ctx = load_dashboard_data()
+active_types = ctx["types"]
+
+with st.sidebar:
+    load_stats = ctx["stats"]
+    st.caption(f"⏱️ 데이터 로드: 쿼리 {load_stats['queries']}회 / {load_stats['total_ms']:.0f}ms")
+    with st.expander("로드 상세 (ms)"):
+        st.json(load_stats["timings"])
+
+    # 코칭 화면이 사용하는 프롬프트 번들 (상담 유형/가이드라인/참고자료 목록)
+    current_bundle = load_current_bundle()
+    st.caption(f"📦 프롬프트 번들: {'v' + str(current_bundle['version']) if current_bundle else '미발행 (실시간 조회 중)'}")
+    if st.button("번들 다시 발행", key="republish_bundle"):
+        version = publish_bundle("manual")
+        if version:
+            st.success(f"v{version} 발행 완료")
+        else:
+            st.error("발행 실패")
+
+    # 중복/유사 상담 감지 인덱스: 기능 도입 전 로그, 다른 서버에서 저장된 로그 반영
+    if st.button("유사 상담 인덱스 동기화", key="sync_near_dup"):
+        from utils.near_duplicate import sync_index
+        with st.spinner("coaching_logs 색인 중..."):
+            result = sync_index()
+        st.success(f"{result['added']:,}건 추가 (전체 {result['indexed']:,}건)")
+
 # 탭 구성 (순서 변경: 상담원 현황을 1순위로)
-tab_consultants, tab_kpi, tab_guide, tab_types, tab_refs = st.tabs([
+tab_consultants, tab_kpi, tab_guide, tab_types, tab_refs, tab_latency = st.tabs([
     "👥 상담원 현황", 
     "📈 성과 분석 (KPI)", 
     "📜 가이드라인 관리", 
     "📑 상담 유형 관리", 
-    "📚 자료실 관리"
+    "📚 자료실 관리",
+    "⏱️ 지연 시간 분석"
 ])
 
 # ----------------------------------------------------
@@ -45,16 +85,10 @@ tab_consultants, tab_kpi, tab_guide, tab_types, tab_refs = st.tabs([
 with tab_kpi:
     st.subheader("종합 성과 지표")
     
-    # 데이터 로드
-    raw_logs = fetch_all_kpi_data() # List of dicts
+    # 데이터 로드 (KST 변환 완료된 공용 DataFrame)
+    df = ctx["logs"]
     
-    if raw_logs:
-        df = pd.DataFrame(raw_logs)
-        df["created_at"] = pd.to_datetime(df["created_at"])
-        if df["created_at"].dt.tz is None:
-             df["created_at"] = df["created_at"].dt.tz_localize("UTC")
-        df["created_at"] = df["created_at"].dt.tz_convert("Asia/Seoul")
-        
+    if not df.empty:
         # 메트릭 계산
         total_sessions = len(df)
         avg_score = df["ai_score"].mean() if not df.empty else 0
@@ -67,20 +101,20 @@ with tab_kpi:
         st.markdown("### 📈 전체 평균 점수 변화 추이")
         
         # 필터링
-        types = ["All"] + fetch_consultation_types()
+        types = ["All"] + active_types
         selected_type = st.selectbox("상담 유형 필터", types)
         
-        chart_df = df.copy()
+        chart_df = df
         if selected_type != "All":
             chart_df = chart_df[chart_df["consultation_type"] == selected_type]
             
         if not chart_df.empty:
             # 시간순 정렬
             chart_df = chart_df.sort_values("created_at")
-            chart_df["일자"] = chart_df["created_at"].dt.strftime("%Y-%m-%d")
+            days = chart_df["created_at"].dt.strftime("%Y-%m-%d").rename("일자")
             
             # 일별 평균 계산
-            daily_avg = chart_df.groupby("일자")["ai_score"].mean().reset_index()
+            daily_avg = chart_df.groupby(days)["ai_score"].mean().reset_index()
             
             # Altair Chart
             chart = alt.Chart(daily_avg).mark_line(point=True).encode(
@@ -102,9 +136,8 @@ with tab_kpi:
         # We can use fetch_all_profiles combined with raw_logs or just aggregate raw_logs if names are not critical, 
         # but for tooltips we want names.
         
-        profiles_data = fetch_all_profiles()
-        if profiles_data:
-            scatter_df = pd.DataFrame(profiles_data)
+        scatter_df = ctx["profiles"]
+        if not scatter_df.empty:
             # Ensure columns exist
             if "total_coaching_count" in scatter_df.columns and "avg_score" in scatter_df.columns:
                  # Altair Scatter
@@ -125,35 +158,99 @@ with tab_kpi:
     else:
         st.info("아직 누적된 상담 데이터가 없습니다.")
 
+    # [NEW] 모델 토큰 사용량 (프롬프트 크기 최적화 효과 확인용)
+    st.divider()
+    st.markdown(f"### 🪙 모델 토큰 사용량 (최근 {TELEMETRY_DAYS}일)")
+    tel_df = ctx["telemetry"]
+
+    if not tel_df.empty:
+        n_sessions = tel_df["session_id"].nunique()
+        col_t1, col_t2, col_t3, col_t4 = st.columns(4)
+        col_t1.metric("모델 호출 수", f"{len(tel_df):,}회")
+        col_t2.metric("총 토큰", f"{tel_df['total_tokens'].sum():,}")
+        col_t3.metric("추정 비용", f"${tel_df['cost_usd'].sum():,.2f}")
+        col_t4.metric("세션당 평균 토큰", f"{tel_df['total_tokens'].sum() / max(n_sessions, 1):,.0f}")
+
+        # 카테고리별 토큰 구성 (신규 입력 / 캐시 / 사고 / 출력)
+        token_kind = tel_df.assign(new_prompt=tel_df["prompt_tokens"] - tel_df["cached_tokens"])
+        by_cat = token_kind.groupby("category")[["new_prompt", "cached_tokens", "thoughts_tokens", "output_tokens"]].sum()
+        by_cat = by_cat.rename(columns={
+            "new_prompt": "입력", "cached_tokens": "캐시 입력", "thoughts_tokens": "사고", "output_tokens": "출력"
+        }).reset_index().melt(id_vars="category", var_name="토큰 종류", value_name="토큰")
+        cat_chart = alt.Chart(by_cat).mark_bar().encode(
+            x=alt.X("category", title="상담 유형"),
+            y=alt.Y("토큰", stack=True),
+            color=alt.Color("토큰 종류", legend=alt.Legend(orient="bottom")),
+            tooltip=["category", "토큰 종류", "토큰"]
+        ).properties(height=350)
+        st.altair_chart(cat_chart, use_container_width=True)
+
+        col_fn, col_sess = st.columns(2)
+        with col_fn:
+            st.markdown("**함수별 평균**")
+            fn_summary = tel_df.groupby("function").agg(
+                호출수=("function", "size"),
+                평균_입력=("prompt_tokens", "mean"),
+                평균_사고=("thoughts_tokens", "mean"),
+                평균_출력=("output_tokens", "mean"),
+                평균_지연_ms=("latency_ms", "mean"),
+                비용_USD=("cost_usd", "sum")
+            ).round(1).sort_values("비용_USD", ascending=False)
+            st.dataframe(fn_summary, use_container_width=True)
+        with col_sess:
+            st.markdown("**세션별 사용량 (상위 20)**")
+            sess_summary = tel_df.dropna(subset=["session_id"]).groupby("session_id").agg(
+                호출수=("function", "size"),
+                토큰=("total_tokens", "sum"),
+                비용_USD=("cost_usd", "sum"),
+                마지막_호출=("created_at", "max")
+            ).sort_values("토큰", ascending=False).head(20)
+            sess_summary["마지막_호출"] = sess_summary["마지막_호출"].dt.strftime("%m-%d %H:%M")
+            st.dataframe(sess_summary.round(4), use_container_width=True)
+    else:
+        st.info("기록된 모델 호출 텔레메트리가 없습니다.")
+
 # ----------------------------------------------------
 # TAB 1: Consultant Status (Ranking & Growth)
 # ----------------------------------------------------
 with tab_consultants:
     st.subheader("🏆 상담원 성과 랭킹 & 코칭 현황")
     
-    profiles = fetch_all_profiles()
-    logs_data = fetch_all_kpi_data()
+    log_df = ctx["logs"]
+    trends_df = ctx["trends"]
     
-    if profiles and logs_data:
-        # Pre-process Logs
-        log_df = pd.DataFrame(logs_data)
-        
-        # Calculate Trend
-        log_df["created_at"] = pd.to_datetime(log_df["created_at"])
-        trend_map = {}
-        for uid, group in log_df.groupby("user_id"):
-            group = group.sort_values("created_at")
-            if len(group) >= 5:
-                recent = group.tail(5)["ai_score"].mean()
-                total = group["ai_score"].mean()
-                trend_map[uid] = recent - total
-            else:
-                trend_map[uid] = 0.0
+    if not ctx["profiles"].empty and not log_df.empty:
+        # Trend: 저장 시 증분 계산된 consultant_trends를 그대로 사용 (utils/consultant_trends)
+        if not trends_df.empty:
+            trend_map = trends_df.set_index("user_id")["growth"]
+        else:
+            # 추세 상태가 아직 없음 (기능 도입 후 재계산 전) -> 로그에서 직접 계산
+            st.caption("ℹ️ 상담원 추세 상태가 비어 있어 성장세를 상담 로그에서 직접 계산했습니다. "
+                       "아래 '🔄 추세 재계산'을 한 번 실행하면 경고와 함께 저장 시 자동 갱신됩니다.")
+            trend_map = {}
+            for uid, group in log_df.groupby("user_id", observed=True):
+                group = group.sort_values("created_at")
+                if len(group) >= 5:
+                    recent = group.tail(5)["ai_score"].mean()
+                    total = group["ai_score"].mean()
+                    trend_map[uid] = recent - total
+                else:
+                    trend_map[uid] = 0.0
                 
         # Merge with Profiles
-        p_df = pd.DataFrame(profiles)
+        p_df = ctx["profiles"].copy()
         p_df["growth_rate"] = p_df["id"].map(trend_map).fillna(0.0)
         
+        # 경고 상담원
+        email_map = p_df.set_index("id")["email"]
+        warned = trends_df[trends_df["warnings"].map(len) > 0]
+        if not warned.empty:
+            with st.expander(f"🚨 주의가 필요한 상담원 ({len(warned)}명)", expanded=True):
+                for _, row in warned.iterrows():
+                    name = str(email_map.get(row["user_id"], row["user_id"])).split("@")[0]
+                    details = ", ".join(f"{w['label']} {w['value']:.1f} (기준 {w['threshold']})" for w in row["warnings"])
+                    st.warning(f"**{name}** · 최근 평균 {row['recent_mean']:.1f}점 · {details}")
+        
         # Display Metrics (Top 3)
         top_performers = p_df.sort_values("avg_score", ascending=False).head(3)
         
@@ -217,6 +314,13 @@ with tab_consultants:
             ).properties(height=300)
             st.altair_chart(chart, use_container_width=True)
 
+            if st.button("🔄 추세 재계산", help="전체 상담 로그로 상담원별 추세/경고 상태를 다시 만듭니다."):
+                with st.spinner("상담 로그를 다시 집계하는 중..."):
+                    result = rebuild_trends()
+                st.success(f"✅ 상담원 {result['consultants']}명 / 로그 {result['logs']}건 재계산 완료")
+                time.sleep(1)
+                st.rerun()
+
     else:
         st.info("데이터가 부족합니다.")
 
@@ -226,9 +330,6 @@ with tab_consultants:
 with tab_guide:
     st.subheader("상담 가이드라인 관리")
     
-    # 카테고리 로딩 (동적)
-    active_types = fetch_consultation_types()
-    
     col_list, col_add = st.columns([1, 1])
     
     with col_list:
@@ -263,6 +364,8 @@ with tab_guide:
                         with col_btn1:
                             if st.button("수정 저장", key=f"save_{row['id']}"):
                                 update_guideline_content(row['id'], new_text)
+                                publish_bundle(f"guideline:{row['id']} updated")
+                                st.session_state["rescore_suggest"] = row['category']
                                 st.success("수정 완료!")
                                 time.sleep(1)
                                 st.rerun()
@@ -290,10 +393,46 @@ with tab_guide:
             
             if st.button("DB에 저장"):
                 add_new_guideline(category, raw_input, st.session_state["temp_refined"])
+                publish_bundle(f"guideline added ({category})")
                 st.success("저장되었습니다!")
                 del st.session_state["temp_refined"]
                 st.rerun()
 
+    # 가이드라인 변경 후 과거 상담 재채점 (원본 점수는 유지, 규칙 버전별로 별도 저장)
+    st.divider()
+    st.markdown("#### 🔁 과거 상담 재채점")
+    rescore_options = ["common"] + active_types
+    suggested = st.session_state.get("rescore_suggest")
+    if suggested:
+        st.info(f"'{suggested}' 가이드라인이 변경되었습니다. 기존 점수는 이전 기준으로 채점된 결과입니다.")
+    col_r1, col_r2 = st.columns([2, 1])
+    with col_r1:
+        rescore_cat = st.selectbox(
+            "재채점할 카테고리 (common = 전체)", rescore_options,
+            index=rescore_options.index(suggested) if suggested in rescore_options else 0,
+            key="rescore_category"
+        )
+    with col_r2:
+        st.write("")
+        if st.button("재채점 시작", key="start_rescore"):
+            job = start_rescore(rescore_cat, reason="admin", requested_by=st.session_state.profile.get("id"))
+            st.session_state.pop("rescore_suggest", None)
+            st.success(f"작업 {job['job_id']} 예약됨 (배치 제출, 완료까지 시간이 걸릴 수 있습니다)")
+
+    for job in list_rescore_jobs(limit=5):
+        progress = job_progress(job)
+        label = f"{job['category']} · {job['job_id']} · {progress['state']}"
+        if progress["mode"]:
+            label += f" ({progress['mode']})"
+        st.progress(min(progress["percent"], 100.0) / 100, text=label)
+        details = f"완료 {progress['done']:,} / 실패 {progress['failed']:,} / 건너뜀 {progress['skipped']:,} / 전체 {progress['total']:,}"
+        if progress["avg_delta"] is not None:
+            details += f" · 평균 점수 변화 {progress['avg_delta']:+.1f}"
+        st.caption(details + (f" · 오류: {job['error']}" if job.get("error") else ""))
+        if progress["state"] == "failed" and st.button("재개", key=f"resume_rescore_{job['job_id']}"):
+            resume_rescore(job["job_id"])
+            st.success(f"작업 {job['job_id']} 재개 예약됨 (저장되지 않은 로그만 다시 채점)")
+
 # ----------------------------------------------------
 # TAB 4: Category Management - NOW Using tab_types
 # ----------------------------------------------------
@@ -301,14 +440,12 @@ with tab_types:
     st.subheader("📑 상담 유형(Category) 관리")
     st.info("가이드라인 및 상담 분류에 사용되는 카테고리를 관리합니다. 삭제 시 'Unused' 처리되어 과거 데이터는 보존됩니다.")
 
-    active_types = fetch_consultation_types()
-    
     col_c1, col_c2 = st.columns([1, 1])
     
     with col_c1:
         st.markdown("#### 현재 활성 카테고리")
         # include_desc=True로 상세 정보 가져오기
-        detailed_types = fetch_consultation_types(include_desc=True)
+        detailed_types = ctx["types_detailed"]
         
         # Fallback for list of strings (if DB migration pending/failed)
         if detailed_types and isinstance(detailed_types[0], str):
@@ -318,6 +455,7 @@ with tab_types:
                     c_a.write(f"**{t}**")
                     if c_b.button("삭제", key=f"del_{t}"):
                          if deactivate_consultation_type(t):
+                             publish_bundle(f"type:{t} removed")
                              st.rerun()
         else:
             for t_obj in detailed_types:
@@ -331,6 +469,7 @@ with tab_types:
                     
                     if c_b.button("삭제", key=f"del_{t_name}"):
                         if deactivate_consultation_type(t_name):
+                            publish_bundle(f"type:{t_name} removed")
                             st.success(f"'{t_name}' 삭제 완료")
                             time.sleep(1)
                             st.rerun()
@@ -353,12 +492,35 @@ with tab_types:
             else:
                 success, msg = add_consultation_type(new_cat, new_desc)
                 if success:
+                    publish_bundle(f"type:{new_cat} added")
                     st.success(f"'{new_cat}' 추가 완료!")
                     time.sleep(1)
                     st.rerun()
                 else:
                     st.error(f"추가 실패: {msg}")
 
+    # 로컬 유형 분류기: 확신할 때 1차 분석의 유형 선택을 대신함 (상담원이 확정한 유형으로 학습)
+    st.divider()
+    st.markdown("#### 🏷️ 로컬 상담 유형 분류기")
+    report = topic_classifier_report()
+    if st.button("분류기 재학습", help="coaching_logs의 스크립트와 확정 유형으로 다시 학습합니다."):
+        with st.spinner("상담 기록으로 학습 중..."):
+            report = train_topic_classifier()
+        if report:
+            st.success("✅ 학습 완료")
+        else:
+            st.error("학습 실패 또는 학습 데이터 부족 (유형별 최소 예시 필요)")
+    if report:
+        col_c1, col_c2, col_c3, col_c4 = st.columns(4)
+        col_c1.metric("검증 정확도", f"{(report['accuracy'] or 0) * 100:.1f}%",
+                      help=f"Top-3 {(report['top3_accuracy'] or 0) * 100:.1f}% / 검증 {report['holdout']:,}건")
+        col_c2.metric("확신 비율 (프롬프트 축소)", f"{report['coverage'] * 100:.1f}%")
+        col_c3.metric("확신 구간 정확도", f"{(report['confident_precision'] or 0) * 100:.1f}%")
+        col_c4.metric("분류 지연 (p50/p95)", f"{report['predict_ms_p50']}ms", f"p95 {report['predict_ms_p95']}ms", delta_color="off")
+        st.caption(f"학습 {report['examples']:,}건 · {report['train_s']}초 · {report['trained_at'][:16]} · 유형별 예시 {report['classes']}")
+    else:
+        st.caption("학습된 분류기가 없습니다. (1차 분석은 모든 유형을 모델이 판단)")
+
 # ----------------------------------------------------
 # TAB 5: Reference Management - NOW Using tab_refs
 # ----------------------------------------------------
@@ -366,7 +528,6 @@ with tab_refs:
     st.subheader("📚 자료실 (참고문헌) 관리")
     st.info("코칭 시 팩트 체크를 위해 참고할 긴 규정이나 법률을 저장합니다.")
     
-    active_types = fetch_consultation_types()
     col_ref_list, col_ref_add = st.columns([1.2, 1])
     
     with col_ref_list:
@@ -378,7 +539,20 @@ with tab_refs:
         
         if refs:
             for r in refs:
-                with st.expander(f"[{r['category']}] {r['title']}"):
+                status = r.get("ingest_status") or "ready"
+                badge = INGEST_BADGES.get(status, "")
+                with st.expander(f"{badge}[{r['category']}] {r['title']}"):
+                    if status == "failed":
+                        st.error(f"수집 실패: {r.get('ingest_error')}")
+                        if st.button("다시 시도", key=f"retry_ref_{r['id']}"):
+                            if retry_ingestion(r['id']):
+                                st.rerun()
+                            else:
+                                st.warning("원본 파일이 남아 있지 않습니다. 자료를 다시 등록해주세요.")
+                    elif status != "ready":
+                        st.info("⏳ 텍스트 추출 및 분석 중입니다. 잠시 후 새로고침하세요.")
+                    if r.get("chunk_count"):
+                        st.caption(f"🔎 검색 청크 {r['chunk_count']}개 · 페이지 {r.get('page_count') or '-'} · 약 {r.get('token_estimate') or 0:,} 토큰")
                     st.caption(f"💡 Usage Context: {r['summary']}")
                     st.text_area("본문 내용", r['content'], height=150, disabled=True, key=f"v_{r['id']}")
                     
@@ -387,6 +561,8 @@ with tab_refs:
                     
                     if st.button("삭제(Soft Delete)", key=f"del_ref_{r['id']}"):
                         if delete_reference(r['id']):
+                            remove_reference_from_index(r['id'])
+                            publish_bundle(f"reference:{r['id']} removed")
                             st.success("삭제됨")
                             time.sleep(1)
                             st.rerun()
@@ -415,7 +591,7 @@ with tab_refs:
                                       height=150, 
                                       placeholder="직접 입력하거나, 파일에 대한 추가 설명을 적으세요.")
             
-            st.caption("ℹ️ '등록 하기'를 누르면 AI가 **'어떤 상황에서 이 자료를 써야 하는지'**를 분석해 저장합니다.")
+            st.caption("ℹ️ '등록 하기'를 누르면 백그라운드에서 AI가 **'어떤 상황에서 이 자료를 써야 하는지'**를 분석해 저장합니다.")
             
             submitted = st.form_submit_button("등록 하기")
             
@@ -423,37 +599,109 @@ with tab_refs:
                 if not uploaded_ref_file and not in_content:
                     st.error("파일을 업로드하거나 본문을 입력해야 합니다.")
                 else:
-                    file_url = None
-                    file_bytes = None
-                    mime_type = "application/pdf" # Default
-                    
-                    if uploaded_ref_file:
-                        with st.spinner("파일을 저장소에 업로드 중..."):
-                            ext = uploaded_ref_file.name.split('.')[-1].lower()
-                            mime_type = "application/pdf" if ext == "pdf" else "text/plain" # Simple fallback
-                            
-                            uploaded_ref_file.seek(0)
-                            file_bytes = uploaded_ref_file.getvalue()
-                            
-                            # Upload to Storage
-                            file_url = upload_reference_file(file_bytes, ext)
-                    
-                    with st.spinner("AI가 사용 상황(Context)을 분석 중입니다..."):
-                        # 파일이 있으면 파일 바이트 전달, 없으면 텍스트 전달
-                        final_summary = generate_reference_usage_context(
-                            content=in_content, 
-                            file_data=file_bytes,
-                            mime_type=mime_type
+                    # 행만 'pending'으로 만들고 즉시 반환 - 추출/인덱싱/요약은 백그라운드 수집 작업이 처리
+                    try:
+                        submit_reference_ingestion(
+                            in_cat, in_title,
+                            note=in_content,
+                            file_bytes=uploaded_ref_file.getvalue() if uploaded_ref_file else None,
+                            file_ext=uploaded_ref_file.name.split('.')[-1].lower() if uploaded_ref_file else None
                         )
-                    
-                    # Content 저장: 파일이 있으면 텍스트가 비어있어도 됨.
-                    # 하지만 DB에 뭔가는 넣어야 한다면...
-                    content_to_save = in_content if in_content else "(첨부 파일 참조)"
-                    
-                    suc, msg = add_reference(in_cat, in_title, content_to_save, final_summary, file_url)
+                        suc, msg = True, "접수 완료"
+                    except Exception as e:
+                        suc, msg = False, str(e)
                     if suc:
-                        st.success("등록 완료! (사용 가이드 포함)")
+                        st.success("등록 접수 완료! 분석이 끝나면 목록에 '준비 완료'로 표시됩니다.")
                         time.sleep(1)
                         st.rerun()
                     else:
-                        st.error(f"실패: {msg}")
\ No newline at end of file
+                        st.error(f"실패: {msg}")
+
+# ----------------------------------------------------
+# TAB 6: Latency Breakdown (Span Tracing)
+# ----------------------------------------------------
+with tab_latency:
+    st.subheader("⏱️ 단계별 지연 시간 분석")
+    st.caption("ai_agent / db_manager 함수 호출과 모델 호출, 참고자료 다운로드, 백그라운드 저장의 소요 시간입니다.")
+
+    lat_days = st.selectbox("조회 기간", [1, 3, 7], format_func=lambda d: f"최근 {d}일", key="lat_days")
+    spans = load_spans(days=lat_days)
+
+    if spans:
+        span_df = pd.DataFrame(summarize_spans(spans))
+        top_df = span_df.head(15)
+
+        # p50 / p95 비교 (p95 상위 15개)
+        chart_src = top_df.melt(id_vars="name", value_vars=["p50_ms", "p95_ms"], var_name="지표", value_name="ms")
+        lat_chart = alt.Chart(chart_src).mark_bar().encode(
+            y=alt.Y("name", title=None, sort=list(top_df["name"])),
+            x=alt.X("ms", title="소요 시간 (ms)"),
+            color=alt.Color("지표", legend=alt.Legend(orient="bottom")),
+            yOffset="지표",
+            tooltip=["name", "지표", "ms"]
+        ).properties(height=max(300, 28 * len(top_df)))
+        st.altair_chart(lat_chart, use_container_width=True)
+
+        st.dataframe(
+            span_df.rename(columns={
+                "name": "단계", "count": "호출 수", "errors": "오류", "self_mean_ms": "자체 평균(ms)",
+                "mean_ms": "평균(ms)", "total_ms": "합계(ms)"
+            }),
+            use_container_width=True, hide_index=True
+        )
+
+        # 세션 단위 상세 (워터폴)
+        st.divider()
+        st.markdown("#### 🔍 세션별 상세")
+        sessions = {}
+        for s_item in spans:
+            sid = s_item.get("session_id")
+            if sid and s_item["start"] > sessions.get(sid, ""):
+                sessions[sid] = s_item["start"]
+        recent_sessions = sorted(sessions, key=sessions.get, reverse=True)[:50]
+
+        if recent_sessions:
+            sel_session = st.selectbox(
+                "세션 선택 (최근 활동순)", recent_sessions,
+                format_func=lambda sid: f"{sid} · {pd.to_datetime(sessions[sid]).tz_convert('Asia/Seoul'):%m-%d %H:%M:%S}"
+            )
+            sess_df = pd.DataFrame([x for x in spans if x.get("session_id") == sel_session])
+            sess_df["start"] = pd.to_datetime(sess_df["start"])
+            sess_df = sess_df.sort_values("start").tail(200)
+            sess_df["end"] = sess_df["start"] + pd.to_timedelta(sess_df["duration_ms"], unit="ms")
+
+            waterfall = alt.Chart(sess_df).mark_bar().encode(
+                x=alt.X("start:T", title="시각"),
+                x2="end:T",
+                y=alt.Y("name", title=None, sort=None),
+                color=alt.Color("status", scale=alt.Scale(domain=["ok", "error"], range=["#4c78a8", "#e45756"])),
+                tooltip=["name", "duration_ms", "status", "thread"]
+            ).properties(height=max(250, 22 * sess_df["name"].nunique()))
+            st.altair_chart(waterfall, use_container_width=True)
+        else:
+            st.info("세션 정보가 있는 기록이 없습니다.")
+
+        st.download_button(
+            "📤 Prometheus 형식 내보내기",
+            prometheus_text(spans),
+            file_name="pass_spans.prom",
+            mime="text/plain"
+        )
+    else:
+        st.info("아직 기록된 지연 시간 데이터가 없습니다.")
+
+    # 로컬 고객 정보 추출 vs 1차 분석 모델 추출 일치율 (프롬프트에서 customer_info를 뺄 수 있는지 판단)
+    st.divider()
+    st.markdown("#### 🪪 고객 정보 로컬 추출 일치율")
+    agreement = agreement_summary()
+    if agreement["total"]:
+        col_a1, col_a2 = st.columns(2)
+        for col, field, label in ((col_a1, "phone", "전화번호"), (col_a2, "name", "이름")):
+            stat = agreement[field]
+            col.metric(f"{label} 일치율", f"{(stat['agree_rate'] or 0) * 100:.1f}%",
+                       f"로컬 재현율 {(stat['local_recall'] or 0) * 100:.1f}%", delta_color="off",
+                       help=f"일치 {stat.get('agree', 0)} · 불일치 {stat.get('disagree', 0)} · "
+                            f"로컬만 {stat.get('local_only', 0)} · 모델만 {stat.get('model_only', 0)}")
+        st.caption(f"텍스트 입력 1차 분석 {agreement['total']:,}건 기준")
+    else:
+        st.caption("아직 기록이 없습니다. (텍스트 입력으로 1차 분석 시 누적)")
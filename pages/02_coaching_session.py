@@ -3,18 +3,29 @@ import time
 import pandas as pd
 from utils.db_manager import (
     get_or_create_customer, 
-    fetch_active_guidelines, 
-    save_coaching_result,
     fetch_consultant_stats,
-    upload_audio_file,
+    fetch_consultant_log_page,
+    fetch_log_detail,
+    find_logs_by_audio,
     fetch_global_avg_score,
-    fetch_consultation_types,
-    fetch_consultation_types,
-    fetch_references,
-    supabase,
-    get_user_profile
+    get_supabase,
+    get_user_profile,
+    update_coaching_log_type
 )
 from utils.ai_agent import analyze_topic_and_traits, generate_coaching_feedback
+from utils.save_queue import enqueue_coaching_save, get_save_status, prefetch_audio_upload, retry_save
+from utils.tracing import bind_streamlit_session
+from utils.session_payloads import store_payload
+from utils.near_duplicate import find_duplicates
+from utils.prompt_bundles import (
+    load_current_bundle, bundle_categories, bundle_references, bundle_rule_text, render_reference_list
+)
+from utils.topic_classifier import classify_topic
+from utils.customer_extractor import (
+    extract_customer_info, merge_customer_info, prefetch_customer, take_prefetched_customer, record_agreement
+)
+from utils.fast_coaching import run_fast_coaching
+from utils.live_coaching import LiveCoachingSession, start_replay
 import altair as alt
 
 st.set_page_config(page_title="Smart Coaching", page_icon="🎧", layout="wide")
@@ -24,6 +35,78 @@ if "profile" not in st.session_state:
     st.stop()
 
 user_id = st.session_state.profile["id"]
+bind_streamlit_session(st.session_state, user_id)
+
+# 업로드 MIME 타입 -> Storage 파일 확장자
+AUDIO_EXT_BY_MIME = {"audio/mp3": "mp3", "audio/wav": "wav", "audio/mp4": "m4a"}
+
+def find_similar_logs(script, audio_payload):
+    """1차 분석 전 중복 확인 (상담원 본인 로그만): 오디오는 같은 파일(내용 해시), 텍스트는 MinHash 유사도"""
+    if audio_payload:
+        ext = AUDIO_EXT_BY_MIME.get(audio_payload.mime_type, "mp3")
+        return [{"log_id": r["id"], "similarity": 1.0} for r in find_logs_by_audio(audio_payload.path, user_id, ext)]
+    if script:
+        return find_duplicates(script, user_id=user_id)
+    return []
+
+def use_existing_result(detail):
+    """중복으로 찾은 기존 상담 결과를 모델 호출 없이 결과 화면에 불러옵니다. (이미 저장된 결과이므로 저장 작업 없음)"""
+    st.session_state.final_result = {
+        "score": detail.get("ai_score", 0),
+        "metrics": detail.get("metrics") or {},
+        "feedback": detail.get("ai_feedback") or "",
+        "transcript": detail.get("original_script"),
+        "type": detail.get("consultation_type"),
+        "reused_log": {"id": detail["id"], "created_at": detail.get("created_at")},
+    }
+    st.session_state.target_customer = {"id": detail.get("customer_id"), "name": "기존 상담 결과", "phone": None}
+    st.session_state.temp_analysis = None
+    st.session_state.temp_source = None
+    st.session_state.pop("save_job_id", None)
+    st.session_state.pop("dup_candidates", None)
+    st.session_state.process_step = "result"
+
+def resolve_customer(c_name, c_phone):
+    """확정된 이름/전화번호로 고객 조회/생성. 반환: (customer, history)"""
+    # Case A: 전화번호가 있는 경우 -> 정식 프로필 사용
+    if c_phone:
+        if not c_name: c_name = f"고객-{c_phone[-4:]}" # 이름 없으면 임시이름
+        # 1차 분석 중 미리 조회한 기존 고객이 있으면 그 결과 사용 (없으면 확정된 이름으로 조회/생성)
+        customer = take_prefetched_customer(c_phone) or get_or_create_customer(c_name, c_phone)
+        return customer, customer.get("consultation_history", [])
+
+    # Case B: 전화번호가 없는 경우 -> 익명(None) 처리
+    # 이름이라도 있으면 임시 객체에 담음 (저장 시 script에 병기)
+    display_name = c_name if c_name else "Unknown"
+    st.toast("연락처가 없어 '고객 이력'을 불러오지 못했습니다.", icon="⚠️")
+    return {"id": None, "name": display_name, "phone": None}, []
+
+def start_auto_save(final_res, customer, source):
+    """
+    [Auto-Save Implementation] 사용자가 버튼을 안 눌러도 강제 저장
+    오디오 업로드 + DB 저장은 백그라운드(Write-Behind)로 처리하고 결과를 바로 표시
+    """
+    st.session_state.final_result = final_res
+    st.session_state.target_customer = customer
+
+    script_to_save = final_res.get("transcript")
+    if not script_to_save:
+        script_to_save = source["script"] if source["script"] else "Audio Analysis"
+
+    # 비회원(Unknown) 처리
+    cid = customer.get("id")
+    if not cid and customer.get("name") and customer.get("name") != "Unknown":
+        script_to_save = f"[비회원 고객명: {customer['name']}]\n\n{script_to_save}"
+
+    audio_ext = AUDIO_EXT_BY_MIME.get(source.get("mime_type"), "mp3")
+    st.session_state.save_job_id = enqueue_coaching_save(
+        user_id,
+        cid,
+        final_res,
+        script_to_save,
+        audio_ext=audio_ext,
+        audio_path=source["audio"].path if source.get("audio") else None
+    )
 
 # Sidebar Profile & Logout
 with st.sidebar:
@@ -31,7 +114,7 @@ with st.sidebar:
     st.caption(f"Role: {'Admin' if st.session_state.profile.get('is_admin') else 'Consultant'}")
     
     if st.button("로그아웃 (Logout)", key="sidebar_logout"):
-        supabase.auth.sign_out()
+        get_supabase().auth.sign_out()
         st.session_state.clear()
         st.switch_page("app.py")
 
@@ -40,7 +123,7 @@ st.title("🎧 Smart Coaching Session")
 # ----------------------------------------------------
 # TAB LAYOUT
 # ----------------------------------------------------
-tab_session, tab_dashboard, tab_history = st.tabs(["🎧 코칭 세션 진행", "📊 나의 대시보드", "📜 전체 이력"])
+tab_session, tab_live, tab_dashboard, tab_history = st.tabs(["🎧 코칭 세션 진행", "🔴 실시간 코칭 (Live)", "📊 나의 대시보드", "📜 전체 이력"])
 
 # ====================================================
 # TAB 1: 코칭 세션 (Main Workflow)
@@ -59,7 +142,8 @@ with tab_session:
         tab_audio, tab_text = st.tabs(["🎤 오디오 업로드 (Default)", "📝 텍스트 입력"])
         
         script_input = None
-        audio_bytes = None
+        fast_mode = False
+        audio_payload = None  # 오디오는 세션 임시 파일 핸들로만 보관 (bytes를 세션에 두지 않음)
         
         with tab_audio:
             uploaded_file = st.file_uploader("녹음 파일 (mp3/wav/m4a)", type=["mp3", "wav", "m4a"])
@@ -72,47 +156,139 @@ with tab_session:
                 elif uploaded_file.name.lower().endswith(".wav"):
                      audio_mime = "audio/wav"
                      
-                audio_bytes = uploaded_file.read()
                 st.audio(uploaded_file, format=audio_mime)
+                
+                # 파일 선택 시 1회: 임시 파일로 옮기고 즉시 저장소 업로드 시작 (내용 해시 기반, 이미 저장된 파일은 생략)
+                file_key = getattr(uploaded_file, "file_id", uploaded_file.name)
+                audio_payload = st.session_state.get("audio_payload")
+                if st.session_state.get("audio_payload_key") != file_key or not (audio_payload and audio_payload.alive):
+                    if audio_payload:
+                        audio_payload.release()
+                    audio_ext = AUDIO_EXT_BY_MIME.get(audio_mime, "mp3")
+                    audio_payload = store_payload(uploaded_file, suffix=f".{audio_ext}",
+                                                  name=uploaded_file.name, mime_type=audio_mime)
+                    st.session_state.audio_payload = audio_payload
+                    st.session_state.audio_payload_key = file_key
+                    prefetch_audio_upload(audio_ext=audio_ext, audio_path=audio_payload.path)
 
         with tab_text:
             text_val = st.text_area("상담 스크립트", height=200, key="txt_in")
             if text_val: script_input = text_val
+            fast_mode = st.toggle("⚡ 빠른 모드 (주제 확인 단계 없이 한 번에 코칭)", key="fast_mode",
+                                  help="고객 정보/유형/참고자료 추천과 코칭을 모델 호출 1회로 처리합니다. 유형은 결과 화면에서 고칠 수 있습니다.")
+
+        # [NEW] 중복/유사 상담 안내: 같은 입력으로 이미 분석된 결과가 있으면 먼저 보여줌
+        input_key = audio_payload.id if audio_payload else (hash(script_input) if script_input else None)
+        dup = st.session_state.get("dup_candidates")
+        dup_shown = bool(dup and dup["key"] == input_key)
+        if dup_shown:
+            st.warning("⚠️ 이미 분석된 상담과 같거나 매우 유사합니다. 아래 기존 결과를 확인하면 AI 분석을 다시 하지 않아도 됩니다.")
+            for m in dup["logs"]:
+                detail = fetch_log_detail(m["log_id"], user_id)
+                if not detail:
+                    continue
+                d_date = (detail.get("created_at") or "")[:16].replace("T", " ")
+                with st.expander(f"[{d_date}] {detail.get('consultation_type')} ({detail.get('ai_score')}점) · 유사도 {m['similarity']:.0%}"):
+                    if st.button("✅ 이 결과 사용 (AI 분석 생략)", key=f"dup_use_{m['log_id']}", type="primary"):
+                        use_existing_result(detail)
+                        st.rerun()
+                    st.markdown(detail.get("ai_feedback") or "")
+                    st.text_area("전문", detail.get("original_script"), height=150, disabled=True, key=f"dup_txt_{m['log_id']}")
+            st.caption("기존 결과를 사용하지 않고 새로 분석하려면 '분석 시작'을 한 번 더 누르세요.")
 
         if st.button("분석 시작 (Information Extraction)", type="primary"):
-            if not (script_input or audio_bytes):
+            dups = [] if dup_shown else find_similar_logs(script_input, audio_payload)
+            if not (script_input or audio_payload):
                 st.error("입력된 내용이 없습니다.")
+            elif dups:
+                st.session_state.dup_candidates = {"key": input_key, "logs": dups}
+                st.rerun()
+            elif fast_mode and script_input and not audio_payload:
+                st.session_state.pop("dup_candidates", None)
+                with st.spinner("빠른 모드: 분석 및 코칭 생성 중..."):
+                    # 로컬 추출 번호로 기존 고객만 조회 (이력을 코칭 프롬프트에 포함)
+                    # 확인 단계가 없으므로 신규 고객 생성은 이름을 모델 추출값과 맞춘 뒤에 함
+                    local_info = extract_customer_info(script_input)
+                    prefetch_customer(local_info["phone"])
+                    bundle = load_current_bundle()
+                    known = take_prefetched_customer(local_info["phone"])
+                    history = known.get("consultation_history", []) if known else []
+                    final_res = run_fast_coaching(script_input, bundle, history=history)
+                if final_res is None:
+                    st.error("빠른 모드 분석에 실패했습니다. 빠른 모드를 끄고 다시 시도해주세요.")
+                else:
+                    record_agreement(local_info, final_res.get("customer_info"))
+                    final_res["customer_info"] = merge_customer_info(local_info, final_res.get("customer_info"))
+                    merged = final_res["customer_info"]
+                    if known and merged.get("phone") == local_info["phone"]:
+                        customer = known
+                    else:
+                        # 신규 고객이거나 모델 추출 번호로 바뀜 -> 합친 이름/번호로 조회/생성
+                        customer, _ = resolve_customer(merged.get("name"), merged.get("phone"))
+                    source = {"script": script_input, "audio": None, "mime_type": None}
+                    st.session_state.temp_analysis = final_res
+                    st.session_state.temp_source = source
+                    start_auto_save(final_res, customer, source)
+                    st.session_state.process_step = "result"
+                    st.rerun()
             else:
+                st.session_state.pop("dup_candidates", None)
                 with st.spinner("1차 분석 중: 고객 정보, 주제, 관련 자료 추출..."):
-                    # [NEW] 분석에 사용할 참고자료 메타데이터 로드 (전체)
-                    # 토큰 절약을 위해 필요한 필드만 추출
-                    all_refs_data = fetch_references(None) # None = Fetch all
-                    ref_meta_for_ai = []
-                    if all_refs_data:
-                        for r in all_refs_data:
-                            ref_meta_for_ai.append({
-                                "id": r["id"],
-                                "title": r["title"],
-                                "summary": r["summary"] # Usage Context
-                            })
-                    
-                    # [NEW] 카테고리 정보 로드 (설명 포함)
-                    detailed_categories = fetch_consultation_types(include_desc=True)
+                    # [NEW] 텍스트 입력은 고객 이름/번호를 로컬에서 먼저 추출하고, 고객 조회를 1차 분석과 동시에 시작
+                    local_info = extract_customer_info(script_input) if script_input and not audio_payload else None
+                    if local_info:
+                        prefetch_customer(local_info["phone"])
+
+                    # [NEW] 현재 프롬프트 번들 로드 (상담 유형/참고자료 목록이 미리 렌더링됨, 조회 1회)
+                    bundle = load_current_bundle()
+                    categories = bundle_categories(bundle)
+
+                    # [NEW] 로컬 유형 분류기 (텍스트 입력만): 확신하면 유형을 미리 정하고 1차 프롬프트를 축소
+                    active_names = [c["name"] if isinstance(c, dict) else c for c in categories]
+                    guess = classify_topic(script_input, active_names) if script_input and not audio_payload else None
+                    if guess and guess["confident"]:
+                        hint = guess["topic"]
+                        prompt_args = {
+                            "topic_hint": hint,
+                            "reference_list_text": render_reference_list(
+                                [r for r in bundle_references(bundle) if r.get("category") in (hint, "common")]
+                            )
+                        }
+                    elif bundle:
+                        prompt_args = {
+                            "category_text": bundle["category_text"],
+                            "reference_list_text": bundle["reference_list_text"]
+                        }
+                    else:
+                        # 번들이 아직 발행되지 않은 경우: 참고자료 메타데이터 + 카테고리(설명 포함) 직접 조회
+                        # 토큰 절약을 위해 필요한 필드만 추출
+                        prompt_args = {
+                            "ref_metadata": [
+                                {"id": r["id"], "title": r["title"], "summary": r["summary"]} # Usage Context
+                                for r in bundle_references(None)
+                            ],
+                            "categories": categories
+                        }
 
                     # 1차 분석 수행 (with references & categories)
                     res = analyze_topic_and_traits(
                         script=script_input, 
-                        audio_data=audio_bytes,
+                        audio_data=audio_payload.read_bytes() if audio_payload else None, # 모델 호출 시점에만 읽음
                         mime_type=audio_mime, # 전달
-                        ref_metadata=ref_meta_for_ai,
-                        categories=detailed_categories
+                        **prompt_args
                     )
+                    if res is not None and "topic_hint" in prompt_args:
+                        res["top_3_topics"] = guess["candidates"]
+                        res["topic_source"] = "local"
+                    if res is not None and local_info:
+                        record_agreement(local_info, res.get("customer_info"))
+                        res["customer_info"] = merge_customer_info(local_info, res.get("customer_info"))
                     
                     # 세션에 저장
                     st.session_state.temp_analysis = res
                     st.session_state.temp_source = {
                         "script": script_input,
-                        "audio": audio_bytes,
+                        "audio": audio_payload, # PayloadHandle (임시 파일)
                         "mime_type": audio_mime # Store MIME type
                     }
                     st.session_state.process_step = "extracted"
@@ -124,6 +300,7 @@ with tab_session:
         
         res = st.session_state.temp_analysis
         info = res.get("customer_info", {}) or {}
+        bundle = load_current_bundle()
         
         col1, col2 = st.columns(2)
         with col1:
@@ -141,8 +318,8 @@ with tab_session:
         with col2:
             st.markdown("### 📋 상담 주제 확인")
             
-            # [수정] DB에서 동적으로 불러온 카테고리 사용
-            active_types = fetch_consultation_types()
+            # [수정] 번들(없으면 DB)에서 불러온 카테고리 사용
+            active_types = [c["name"] if isinstance(c, dict) else c for c in bundle_categories(bundle)]
             
             # [수정] AI가 추천한 Top 3 Topics 활용
             ai_topics = res.get("top_3_topics", [])
@@ -156,6 +333,9 @@ with tab_session:
             c_topic = st.selectbox("상담 유형 (1순위 추천 자동선택)", active_types, 
                                    index=active_types.index(default_topic) if default_topic in active_types else 0)
             
+            if res.get("topic_source") == "local":
+                st.caption("🏷️ 로컬 분류기가 과거 상담 기록으로 유형을 미리 분류했습니다.")
+
             # 나머지 추천 표시
             if len(ai_topics) > 1:
                 others = [t for t in ai_topics if t != c_topic and t in active_types]
@@ -170,7 +350,7 @@ with tab_session:
             rec_ids = res.get("recommended_ref_ids", [])
             
             # 2. 전체 자료에서 추천된 것만 필터링
-            all_refs = fetch_references(None) # 전체 로드
+            all_refs = bundle_references(bundle) # 전체 로드
             recommended_refs = [r for r in all_refs if r['id'] in rec_ids]
             
             selected_ref_ids = []
@@ -201,31 +381,17 @@ with tab_session:
             
         if col_act2.button("FINAL 코칭 진행 ➡️", type="primary", use_container_width=True):
             # 1. 고객 조회/생성 로직 개선
-            customer = None
-            history = []
-            
-            # Case A: 전화번호가 있는 경우 -> 정식 프로필 사용
-            if c_phone:
-                if not c_name: c_name = f"고객-{c_phone[-4:]}" # 이름 없으면 임시이름
-                customer = get_or_create_customer(c_name, c_phone)
-                history = customer.get("consultation_history", [])
-            
-            # Case B: 전화번호가 없는 경우 -> 익명(None) 처리
-            else:
-                # 이름이라도 있으면 임시 객체에 담음 (저장 시 script에 병기)
-                display_name = c_name if c_name else "Unknown"
-                customer = {"id": None, "name": display_name, "phone": None}
-                st.toast("연락처가 없어 '고객 이력'을 불러오지 못했습니다.", icon="⚠️")
+            customer, history = resolve_customer(c_name, c_phone)
             
             # 2. 2차 분석 진행
             with st.spinner("Context-Aware 코칭 생성 중... (History + Guidelines + RAG)"):
                 source = st.session_state.temp_source
-                guidelines = fetch_active_guidelines(c_topic)
+                rule_text = bundle_rule_text(bundle, c_topic)
                 
                 # 체크된 References만 필터링 (rerun 시 checkbox 상태 유지됨)
                 final_refs = []
                 # 다시 fetch하여 체크 여부 확인 (all_refs는 위에서 정의되지 않았을 수 있으므로 다시 로드)
-                check_candidates = fetch_references(None) 
+                check_candidates = bundle_references(bundle)
                 if check_candidates:
                     for r in check_candidates:
                          if st.session_state.get(f"ref_chk_{r['id']}", False):
@@ -233,11 +399,12 @@ with tab_session:
                 
                 final_res = generate_coaching_feedback(
                     script=source["script"],
-                    audio_data=source["audio"],
+                    audio_data=source["audio"].read_bytes() if source["audio"] else None,
                     mime_type=source.get("mime_type", "audio/mp3"), # MIME Type 전달
                     history=history,
-                    guidelines=guidelines,
-                    references=final_refs
+                    rule_text=rule_text,
+                    references=final_refs,
+                    category=c_topic
                 )
                 
                 # 결과 합성
@@ -245,46 +412,7 @@ with tab_session:
                 final_res["summary"] = res.get("summary")
                 final_res["type"] = c_topic
                 
-                st.session_state.final_result = final_res
-                st.session_state.target_customer = customer
-                
-                # [Auto-Save Implementation]
-                # 사용자가 버튼을 안 눌러도 강제 저장
-                script_to_save = final_res.get("transcript")
-                top_source = st.session_state.temp_source
-                if not script_to_save:
-                    script_to_save = top_source["script"] if top_source["script"] else "Audio Analysis"
-
-                # 오디오 업로드 (있다면)
-                final_audio_url = None
-                if top_source.get("audio"):
-                    # Auto-save는 사용자 대기 시간을 최소화해야 하므로 스피너 없이 백그라운드 느낌으로 처리하거나,
-                    # 짧게 처리. 여기서는 중요하므로 스피너 사용.
-                    with st.spinner("💾 결과 자동 저장 중..."):
-                         final_audio_url = upload_audio_file(top_source["audio"])
-                
-                # 비회원(Unknown) 처리
-                cid = customer.get("id")
-                if not cid and customer.get("name") and customer.get("name") != "Unknown":
-                    script_to_save = f"[비회원 고객명: {customer['name']}]\n\n{script_to_save}"
-                
-                # DB 저장
-                success = save_coaching_result(
-                    user_id,
-                    cid,
-                    final_res,
-                    script_to_save,
-                    audio_url=final_audio_url
-                )
-                
-                if success:
-                    # 세션 프로필 통계 갱신
-                    updated_profile = get_user_profile(user_id)
-                    if updated_profile:
-                        st.session_state.profile = updated_profile
-                    st.toast("✅ 상담 결과가 자동으로 저장되었습니다!", icon="💾")
-                else:
-                    st.error("자동 저장 실패. 관리자에게 문의하세요.")
+                start_auto_save(final_res, customer, st.session_state.temp_source)
 
                 st.session_state.process_step = "result"
                 st.rerun()
@@ -294,8 +422,13 @@ with tab_session:
         final_res = st.session_state.final_result
         customer = st.session_state.target_customer
         
-        st.balloons()
+        reused = final_res.get("reused_log")
+        if not reused:
+            st.balloons()
         st.subheader(f"🎯 코칭 결과 레포트 (고객: {customer['name']})")
+        if reused:
+            r_date = (reused.get("created_at") or "")[:16].replace("T", " ")
+            st.info(f"♻️ 이미 분석된 상담의 결과입니다. ({r_date} 저장, AI 분석 생략)")
         
         # 1. Score
         score = final_res.get("score", 0)
@@ -324,10 +457,56 @@ with tab_session:
         st.markdown("### 💡 AI 피드백 상세")
         st.markdown(final_res.get("feedback"))
         
+        # [NEW] 빠른 모드: 주제 확인 단계가 없었으므로 결과 화면에서 유형 수정
+        if final_res.get("mode") == "fast":
+            st.divider()
+            active_types = [c["name"] if isinstance(c, dict) else c for c in bundle_categories(load_current_bundle())]
+            cur_type = final_res.get("type")
+            col_t1, col_t2 = st.columns([3, 1])
+            new_type = col_t1.selectbox(
+                "상담 유형 (빠른 모드 자동 분류)", active_types,
+                index=active_types.index(cur_type) if cur_type in active_types else 0, key="fast_type"
+            )
+            if col_t2.button("유형 수정", disabled=new_type == cur_type, use_container_width=True):
+                job_id = st.session_state.get("save_job_id")
+                log_id = get_save_status(job_id).get("log_id") if job_id else None
+                if not log_id:
+                    st.info("저장이 끝난 뒤에 수정할 수 있습니다. 잠시 후 다시 눌러주세요.")
+                elif update_coaching_log_type(log_id, new_type):
+                    final_res["type"] = new_type
+                    st.success(f"상담 유형을 '{new_type}'(으)로 수정했습니다.")
+                    st.rerun()
+            if new_type not in (final_res.get("rule_topics") or []):
+                st.caption("ℹ️ 이 유형의 가이드라인은 이번 코칭에 포함되지 않았습니다. 점수는 그대로 유지됩니다.")
+            st.caption(f"⚡ 빠른 모드 처리 시간: {final_res.get('latency_ms', 0) / 1000:.1f}초 (모델 호출 1회)")
+        
         st.divider()
         
-        # 저장 완료 메시지 및 새 상담 시작
-        st.success("✅ **[Auto-Saved]** 상담 내용과 코칭 결과가 안전하게 저장되었습니다.")
+        # 백그라운드 저장 상태 표시 (저장 완료 전까지 2초마다 갱신)
+        @st.fragment(run_every=2)
+        def show_save_status(job_id):
+            status = get_save_status(job_id)
+            state = status["state"]
+            if state == "saved":
+                st.success("✅ **[Auto-Saved]** 상담 내용과 코칭 결과가 안전하게 저장되었습니다.")
+                # 세션 프로필 통계 갱신 (작업당 1회)
+                if st.session_state.get("profile_synced_job") != job_id:
+                    updated_profile = get_user_profile(user_id)
+                    if updated_profile:
+                        st.session_state.profile = updated_profile
+                    st.session_state.profile_synced_job = job_id
+            elif state == "retrying":
+                st.warning(f"⏳ 저장 재시도 대기 중... ({status['attempts']}회 실패: {status.get('error')})")
+            elif state == "failed":
+                st.error(f"⚠️ 저장에 반복 실패했습니다. 결과는 서버에 보관되어 있으며 "
+                         f"{status.get('retry_in', 0)}초 뒤 자동으로 다시 저장을 시도합니다. ({status.get('error')})")
+                if st.button("지금 다시 저장", key=f"retry_save_{job_id}"):
+                    retry_save(job_id)
+            else:
+                st.info("💾 결과 자동 저장 중... (화면을 계속 사용하셔도 됩니다)")
+
+        if st.session_state.get("save_job_id"):
+            show_save_status(st.session_state.save_job_id)
         
         if st.button("🔄 새로운 상담 시작 (New Session)", type="primary"):
             # Cleanup
@@ -335,12 +514,88 @@ with tab_session:
             del st.session_state.temp_analysis
             del st.session_state.temp_source
             del st.session_state.final_result
+            st.session_state.pop("save_job_id", None)
+            st.session_state.pop("fast_type", None)
+            # 오디오 임시 파일 정리 (저장 작업은 스풀에 별도 링크를 가지고 있음)
+            payload = st.session_state.pop("audio_payload", None)
+            if payload:
+                payload.release()
+            st.session_state.pop("audio_payload_key", None)
             if "target_customer" in st.session_state:
                 del st.session_state.target_customer
                 
             time.sleep(0.5)
             st.rerun()
 
+# ====================================================
+# TAB 1-1: 실시간 코칭 (통화 중 알림)
+# ====================================================
+NUDGE_ICONS = {"compliance": "📋", "fact": "📚", "empathy": "💬"}
+
+with tab_live:
+    st.info("💡 통화 오디오를 조각 단위로 받아 전사하고, 몇 초마다 가이드라인/참고자료와 비교해 짧은 알림을 띄웁니다. "
+            "통화가 끝나면 전체 전사문으로 코칭 리포트를 만듭니다. 여기서는 녹음 파일이나 스크립트를 실시간처럼 재생해 볼 수 있습니다.")
+    live = st.session_state.get("live")
+
+    if not live:
+        live_file = st.file_uploader("녹음 파일 또는 전사 스크립트", type=["wav", "mp3", "m4a", "txt"], key="live_file")
+        col_l1, col_l2 = st.columns(2)
+        live_speed = col_l1.selectbox("재생 배속", [1.0, 2.0, 4.0], format_func=lambda x: f"{x:g}x")
+        live_types = [c["name"] if isinstance(c, dict) else c for c in bundle_categories(load_current_bundle())]
+        live_cat = col_l2.selectbox("상담 유형", ["(자동 분류)"] + live_types)
+        if st.button("▶️ 실시간 코칭 시작", type="primary", disabled=live_file is None):
+            session = LiveCoachingSession(bundle=load_current_bundle(),
+                                          category=None if live_cat == "(자동 분류)" else live_cat)
+            payload = None
+            if live_file.name.lower().endswith(".txt"):
+                thread = start_replay(session, script=live_file.getvalue().decode("utf-8"), speed=live_speed)
+            else:
+                ext = live_file.name.rsplit(".", 1)[-1].lower()
+                payload = store_payload(live_file, suffix=f".{ext}", name=live_file.name)
+                thread = start_replay(session, path=payload.path, speed=live_speed)
+            st.session_state.live = {"session": session, "thread": thread, "payload": payload}
+            st.rerun()
+    else:
+        session = live["session"]
+
+        @st.fragment(run_every=1)
+        def show_live(session, replay_thread):
+            summary = session.summary()
+            col_m1, col_m2, col_m3, col_m4 = st.columns(4)
+            col_m1.metric("경과", f"{summary['elapsed_s']:.0f}초")
+            col_m2.metric("알림", f"{summary['nudges']}건")
+            col_m3.metric("알림 지연 (p50)", f"{(summary['e2e_ms_p50'] or 0) / 1000:.1f}초")
+            col_m4.metric("상담 유형", summary["category"] or "분류 중")
+            for n in reversed(session.poll_nudges()[-5:]):
+                st.warning(f"{NUDGE_ICONS.get(n['kind'], '🔔')} **{n['text']}**  ·  {n['t']:.0f}초")
+            with st.expander("📝 실시간 전사문", expanded=False):
+                st.text(session.transcript[-2000:] or "(아직 전사된 내용이 없습니다)")
+            if not replay_thread.is_alive():
+                st.caption("재생이 끝났습니다. 통화 종료를 눌러 리포트를 만드세요.")
+
+        show_live(session, live["thread"])
+
+        if st.button("📞 통화 종료 & 리포트 생성", type="primary"):
+            with st.spinner("전사 마무리 및 코칭 리포트 생성 중..."):
+                # 남은 조각 전사를 먼저 마친 뒤, 전체 전사문에서 고객 정보를 찾아 이력 조회 후 리포트에 반영
+                session.finish(report=False)
+                # 확인 단계 없이 고객을 만들므로 상담원 호칭("OOO 고객님")으로 찾은 이름은 쓰지 않음
+                info = extract_customer_info(session.transcript, honorific=False)
+                customer, session.history = resolve_customer(info["name"], info["phone"])
+                final_res = session.make_report()
+            if live.get("payload"):
+                live["payload"].release()
+            st.session_state.pop("live", None)
+            if final_res is None:
+                st.error("전사된 내용이 없거나 리포트 생성에 실패했습니다.")
+            else:
+                source = {"script": final_res.get("transcript"), "audio": None, "mime_type": None}
+                st.session_state.temp_analysis = final_res
+                st.session_state.temp_source = source
+                start_auto_save(final_res, customer, source)
+                st.session_state.process_step = "result"
+                st.success("✅ 리포트가 생성되었습니다. '🎧 코칭 세션 진행' 탭에서 확인하세요.")
+
 # Helper for KST
 def format_to_kst(date_str):
     if not date_str: return ""
@@ -413,7 +668,12 @@ with tab_dashboard:
                 
                 # 버튼 클릭 시 Dialog 띄우기 (Experimental)
                 @st.dialog("상담 상세 정보")
-                def show_log_detail(log):
+                def show_log_detail(log_id):
+                    # 다이얼로그가 열릴 때만 상세 내용(피드백/전문) 조회
+                    log = fetch_log_detail(log_id, user_id)
+                    if not log:
+                        st.error("상세 내용을 불러오지 못했습니다.")
+                        return
                     d_date = format_to_kst(log['created_at'])
                     st.write(f"**Date:** {d_date}")
                     st.metric("Score", f"{log['ai_score']}점")
@@ -432,7 +692,7 @@ with tab_dashboard:
                         st.audio(log['audio_url'])
 
                 if st.button("🔍 해당 상담 상세보기"):
-                    show_log_detail(worst_log)
+                    show_log_detail(worst_log['id'])
         else:
             st.info("데이터가 부족합니다.")
 
@@ -458,33 +718,55 @@ with tab_dashboard:
 # TAB 3: HISTORY (New Tab)
 # ====================================================
 with tab_history:
-    st.markdown("### 📋 전체 상담 이력 (최근 20건)")
+    st.markdown("### 📋 전체 상담 이력")
     
-    # DB Stats 다시 로드 or 위 stats 재사용
-    # stats는 상단에서 이미 로드됨
+    # 첫 페이지는 상단 stats 재사용, 이후 페이지는 '더 보기' 시에만 조회
     h_logs = stats.get("recent_logs", [])
     
+    # 새 상담이 저장되어 첫 페이지가 바뀌면 추가 로드분 초기화
+    anchor = h_logs[0]["id"] if h_logs else None
+    if st.session_state.get("hist_anchor") != anchor:
+        st.session_state.hist_anchor = anchor
+        st.session_state.hist_more = []
+        st.session_state.hist_has_more = len(h_logs) >= 20
+    h_logs = h_logs + st.session_state.hist_more
+    
     if h_logs:
         for log in h_logs:
             display_date = format_to_kst(log['created_at'])
             label = f"[{display_date}] {log['consultation_type']} (Scores: {log['ai_score']}점)"
             
             with st.expander(label):
+                # 펼친 뒤 토글을 켤 때만 상세 내용 조회 (LRU 캐시)
+                if not st.toggle("상세 내용 보기", key=f"hist_open_{log['id']}"):
+                    continue
+                detail = fetch_log_detail(log['id'], user_id)
+                if not detail:
+                    st.error("상세 내용을 불러오지 못했습니다.")
+                    continue
+                
                 c_d1, c_d2 = st.columns([1, 1])
                 with c_d1:
                     st.markdown("**💡 AI Feedback**")
                     try:
-                        fb = log.get('ai_feedback', '')
+                        fb = detail.get('ai_feedback', '')
                         if isinstance(fb, dict): st.json(fb)
                         else: st.markdown(fb) # Markdown rendering for str
                     except:
-                        st.write(log.get('ai_feedback'))
+                        st.write(detail.get('ai_feedback'))
                         
                 with c_d2:
                     st.markdown("**📝 Transcript**")
-                    st.text_area("대화 전문", log.get('original_script', ''), height=150, disabled=True, key=f"hist_{log['id']}")
+                    st.text_area("대화 전문", detail.get('original_script', ''), height=150, disabled=True, key=f"hist_{log['id']}")
                     
-                    if log.get('audio_url'):
-                        st.audio(log['audio_url'])
+                    if detail.get('audio_url'):
+                        st.audio(detail['audio_url'])
+        
+        if st.session_state.hist_has_more:
+            if st.button("⬇️ 이전 이력 더 보기", key="hist_more_btn"):
+                page = fetch_consultant_log_page(user_id, page_size=20, before=h_logs[-1])
+                st.session_state.hist_more.extend(page)
+                st.session_state.hist_has_more = len(page) >= 20
+                st.rerun()
     else:
-        st.info("이력이 없습니다.")
\ No newline at end of file
+        st.info("이력이 없습니다.")
@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# 로컬 스냅샷/스풀 파일은 테스트마다 임시 디렉토리로 (utils.local_store import 전에 설정)
+os.environ.setdefault("PASS_DATA_DIR", tempfile.mkdtemp(prefix="pass-test-"))
+
+@pytest.fixture
+def fake_db():
+    """메모리 Supabase를 db_manager에 연결합니다. (benchmarks/fakes.py)"""
+    pytest.importorskip("streamlit")
+    from benchmarks.fakes import FakeSupabase, install_fakes
+
+    db = FakeSupabase()
+    install_fakes(db)
+    return db
@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+from utils import analytics_snapshot
+from utils.analytics_snapshot import sync_snapshot, read_watermark
+
+def _insert_log(db, log_id_hint=0):
+    db._insert("coaching_logs", {
+        "user_id": "u1", "customer_id": None, "consultation_type": "refund",
+        "original_script": "-", "audio_url": None, "ai_score": 80,
+        "metrics": {"empathy": 70, "clarity": 70, "compliance": 70},
+        "created_at": f"2026-01-01T00:00:{log_id_hint:02d}+00:00",
+    })
+
+def test_sync_empty_table_twice(fake_db, tmp_path):
+    first = sync_snapshot(str(tmp_path))
+    assert first["new_rows"] == 0 and first["total_rows"] == 0
+    assert "created_at" not in read_watermark(str(tmp_path))
+
+    second = sync_snapshot(str(tmp_path))
+    assert second["new_rows"] == 0 and "rebuilt" not in second
+
+def test_sync_after_empty_picks_up_first_rows(fake_db, tmp_path):
+    sync_snapshot(str(tmp_path))
+    _insert_log(fake_db, 1)
+    _insert_log(fake_db, 2)
+
+    result = sync_snapshot(str(tmp_path))
+    assert result["new_rows"] == 2
+    assert len(analytics_snapshot.load_snapshot(str(tmp_path))) == 2
+    assert sync_snapshot(str(tmp_path))["new_rows"] == 0
@@ -0,0 +1,18 @@
+def test_failed_trend_write_fails_the_save_step(fake_db, monkeypatch):
+    from utils import db_manager
+
+    monkeypatch.setattr(db_manager, "upsert_consultant_trends", lambda rows: False)
+    result = {"type": "refund", "summary": "-", "score": 80, "metrics": {"empathy": 80}}
+    assert db_manager.save_coaching_result("u1", None, result, "script", client_job_id="job-1") is False
+
+    # 저장이 복구되면 같은 작업의 재시도가 추세를 반영하고 기존 로그 id를 반환
+    monkeypatch.undo()
+    log_id = db_manager.save_coaching_result("u1", None, result, "script", client_job_id="job-1")
+    assert log_id and len(fake_db.tables["coaching_logs"]) == 1
+    assert db_manager.fetch_consultant_trend_state("u1")["last_log_id"] == log_id
+
+def test_record_session_skips_reflected_log(fake_db):
+    from utils.consultant_trends import record_session
+
+    assert record_session("u1", 5, 80) is True
+    assert record_session("u1", 5, 80) is False
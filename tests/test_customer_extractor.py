@@ -0,0 +1,31 @@
+import pytest
+
+from utils.customer_extractor import extract_customer_info, extract_name, merge_customer_info
+
+@pytest.mark.parametrize("script", [
+    "상담원: 주문하신 고객님, 확인 도와드리겠습니다.",
+    "상담원: 기다려주신 고객님 감사합니다.",
+    "고객: 선생님이 그렇게 안내해 주셨어요.",
+    "고객: 어머님 명의로 된 회선인데요.",
+    "상담원: 사장님, 요금제 변경 도와드릴게요.",
+])
+def test_honorific_nouns_are_not_names(script):
+    assert extract_name(script) is None
+
+def test_agent_honorific_name():
+    assert extract_name("상담원: 홍길동 고객님 맞으실까요?") == "홍길동"
+    assert extract_name("상담원: 홍길동 고객님 맞으실까요?", honorific=False) is None
+
+def test_self_introduction_needs_copula_or_phrase_end():
+    info = extract_customer_info("고객: 전 이사를 가게 돼서요. 연락처는 010-2222-3333입니다")
+    assert info == {"name": None, "phone": "010-2222-3333"}
+    assert extract_name("고객: 저는 홍길동입니다.") == "홍길동"
+
+def test_korean_digit_phone_stops_at_group():
+    assert extract_customer_info("번호는 공일공 일이삼사 오육칠팔 이요")["phone"] == "010-1234-5678"
+
+def test_merge_prefers_model_name_and_local_phone():
+    local = {"name": "문하신", "phone": "010-1234-5678"}
+    model = {"name": "홍길동", "phone": "010-9999-9999"}
+    assert merge_customer_info(local, model) == {"name": "홍길동", "phone": "010-1234-5678"}
+    assert merge_customer_info(local, {"name": None, "phone": None}) == local
@@ -0,0 +1,15 @@
+def test_profile_stats_and_global_average_use_aggregates(fake_db, monkeypatch):
+    from benchmarks.fakes import seed_database
+    from utils import db_manager
+
+    (u1, u2), _ = seed_database(fake_db, users=2)
+    for uid, score in ((u1, 80), (u1, 60), (u2, 90)):
+        db_manager.save_coaching_result(uid, None, {"type": "refund", "summary": "-", "score": score}, "script")
+
+    profiles = {p["id"]: p for p in fake_db.tables["profiles"]}
+    assert (profiles[u1]["total_coaching_count"], profiles[u1]["avg_score"]) == (2, 70.0)
+    assert (profiles[u2]["total_coaching_count"], profiles[u2]["avg_score"]) == (1, 90.0)
+
+    # 전체 평균은 coaching_logs를 다시 읽지 않음
+    monkeypatch.setattr(db_manager, "iter_coaching_logs", None)
+    assert round(db_manager.fetch_global_avg_score(), 2) == round((80 + 60 + 90) / 3, 2)
@@ -0,0 +1,27 @@
+def test_publish_retries_on_version_conflict(fake_db, monkeypatch):
+    from benchmarks.fakes import seed_database
+    from utils import db_manager, prompt_bundles
+
+    seed_database(fake_db)
+    assert prompt_bundles.publish_prompt_bundle(reason="init") == 1
+
+    real_insert = db_manager.insert_prompt_bundle
+    calls = []
+
+    def racing_insert(row):
+        calls.append(row["version"])
+        if len(calls) == 1:
+            # 다른 관리자가 같은 버전을 먼저 발행
+            fake_db.tables["guidelines"][0]["refined_content"] = "다른 관리자의 수정"
+            real_insert(dict(row, content_hash="other"))
+            raise Exception('duplicate key value violates unique constraint "prompt_bundles_pkey" (23505)')
+        return real_insert(row)
+
+    monkeypatch.setattr(db_manager, "insert_prompt_bundle", racing_insert)
+    fake_db.tables["guidelines"][1]["refined_content"] = "이번 관리자의 수정"
+
+    assert prompt_bundles.publish_prompt_bundle(reason="edit") == 3
+    assert calls == [2, 3]
+    latest = db_manager.fetch_current_prompt_bundle(include_bundle=True)["bundle"]
+    rules = "\n".join(latest["rules"].values())
+    assert "다른 관리자의 수정" in rules and "이번 관리자의 수정" in rules
@@ -0,0 +1,36 @@
+import time
+
+def _wait_for(job_id, states, timeout=5.0):
+    from utils.save_queue import get_save_status
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = get_save_status(job_id)
+        if status["state"] in states:
+            return status
+        time.sleep(0.02)
+    raise AssertionError(f"{job_id}: {get_save_status(job_id)}")
+
+def test_failed_job_keeps_retrying(fake_db, monkeypatch):
+    from utils import db_manager, save_queue
+
+    monkeypatch.setattr(save_queue, "RETRY_BASE_SECONDS", 0.01)
+    monkeypatch.setattr(save_queue, "RETRY_MAX_SECONDS", 0.05)
+    monkeypatch.setattr(save_queue, "MAX_ATTEMPTS", 2)
+    outage = {"on": True}
+    real_save = db_manager.save_coaching_result
+
+    def flaky_save(*args, **kwargs):
+        return False if outage["on"] else real_save(*args, **kwargs)
+
+    monkeypatch.setattr(db_manager, "save_coaching_result", flaky_save)
+    result = {"type": "refund", "summary": "-", "score": 80, "metrics": {"empathy": 80}}
+    job_id = save_queue.enqueue_coaching_save("u1", None, result, "script")
+
+    status = _wait_for(job_id, {"failed"})
+    assert status["retry_in"] <= 0.05
+
+    # MAX_ATTEMPTS 이후에도 재시도가 이어져 장애가 끝나면 저장됨
+    outage["on"] = False
+    status = _wait_for(job_id, {"saved"})
+    assert status["log_id"] and len(fake_db.tables["coaching_logs"]) == 1
@@ -1,27 +1,95 @@
-from google import genai
-from google.genai import types
 import streamlit as st
+import os
 import json
 import base64
-import requests
+import time
+from utils.tracing import span, instrument_module
+from utils.model_telemetry import record_model_call
+from utils.prompt_bundles import render_category_text, render_reference_list, render_rule_text
+from utils.feedback_templates import FINDINGS_SCHEMA, render_feedback
 
 # 1. Gemini Client 설정
+# google-genai SDK는 import 비용이 커서, SDK 로드와 클라이언트 생성을 첫 모델 호출 시점으로 미룹니다.
 def init_gemini():
     try:
+        from google import genai
         api_key = st.secrets["google"]["api_key"]
         return genai.Client(api_key=api_key)
     except Exception as e:
         st.error(f"Gemini API 연결 실패: {e}")
         return None
 
-client = init_gemini()
 MODEL_ID = "gemini-3-flash-preview"
 
-# 공통 설정: Thinking Level = High (Explicit)
-# Gemini 3.0은 기본값이 High이지만, 명시적으로 설정함.
-config_high_thinking = types.GenerateContentConfig(
-    thinking_config=types.ThinkingConfig(thinking_level="high")
-)
+# 2차 분석 출력 형식: compact(구조화 findings -> 로컬 Markdown 렌더링) / markdown(기존 자유 형식)
+FEEDBACK_FORMAT = os.environ.get("PASS_FEEDBACK_FORMAT", "compact")
+
+_client = None
+_configs = {}
+
+def get_client():
+    """Gemini 클라이언트를 반환합니다. (최초 호출 시 생성 후 재사용, 실패 시 None)"""
+    global _client
+    if _client is None:
+        _client = init_gemini()
+    return _client
+
+def _thinking_config(level="high"):
+    # 공통 설정: Thinking Level = High (Explicit)
+    # Gemini 3.0은 기본값이 High이지만, 명시적으로 설정함.
+    # low: 유형이 로컬 분류기로 정해진 1차 분석처럼 추출 위주의 호출
+    if level not in _configs:
+        from google.genai import types
+        _configs[level] = types.GenerateContentConfig(
+            thinking_config=types.ThinkingConfig(thinking_level=level)
+        )
+    return _configs[level]
+
+def _file_part(data, mime_type):
+    """바이너리(오디오/PDF)를 모델 입력 Part로 변환합니다."""
+    from google.genai import types
+    return types.Part.from_bytes(data=data, mime_type=mime_type)
+
+def __getattr__(name):
+    # 하위 호환: `from utils.ai_agent import client, config_high_thinking`
+    if name == "client":
+        return get_client()
+    if name == "config_high_thinking":
+        return _thinking_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _generate(contents, fn_name, category=None, thinking_level="high"):
+    """
+    모델 호출 공통 경로
+    호출 구간을 'ai.model_call' span으로 기록하고, usage_metadata 토큰 수를 텔레메트리에 남깁니다.
+    """
+    with span("ai.model_call", fn=fn_name, category=category, thinking=thinking_level):
+        started = time.perf_counter()
+        response, error = None, None
+        try:
+            response = get_client().models.generate_content(
+                model=MODEL_ID,
+                contents=contents,
+                config=_thinking_config(thinking_level)
+            )
+            return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            record_model_call(
+                fn_name, response,
+                latency_ms=(time.perf_counter() - started) * 1000,
+                model=MODEL_ID, category=category, error=error
+            )
+
+def parse_json_response(text):
+    """모델 응답에서 JSON 블록을 추출해 dict로 반환합니다. (코드 펜스/앞뒤 설명 허용)"""
+    import re
+    match = re.search(r'\{.*\}', text, re.DOTALL)
+    if match:
+        return json.loads(match.group(0))
+    return json.loads(text.replace("```json", "").replace("```", "").strip())
 
 # ==========================================
 # 🧠 기능 1: 가이드라인 정제 (Admin용)
@@ -30,7 +98,7 @@ def refine_guideline_with_ai(category, raw_input):
     """
     관리자의 거친 표현을 세련된 스크립트로 변환
     """
-    if not client: return "AI 클라이언트 오류"
+    if not get_client(): return "AI 클라이언트 오류"
 
     prompt = f"""
     관리자의 지시사항을 상담원이 즉시 사용할 수 있는 **'간결하고 명확한 가이드'**로 변환하세요.
@@ -47,11 +115,7 @@ def refine_guideline_with_ai(category, raw_input):
     """
     
     try:
-        response = client.models.generate_content(
-            model=MODEL_ID,
-            contents=prompt,
-            config=config_high_thinking
-        )
+        response = _generate(prompt, "refine_guideline_with_ai", category=category)
         return response.text
     except Exception as e:
         return f"AI 변환 실패: {e}"
@@ -61,7 +125,7 @@ def generate_reference_usage_context(content, file_data=None, mime_type="applica
     참고자료의 '사용 상황(Context)'을 AI로 추출
     (텍스트 또는 파일 기반)
     """
-    if not client: return "AI Client Error"
+    if not get_client(): return "AI Client Error"
 
     prompt = f"""
     이 참고자료가 상담 중 **언제 쓰여야 하는지**를 **가장 짧고 명확한 한 문장**으로 정의하세요. (토큰 절약 목적)
@@ -79,18 +143,14 @@ def generate_reference_usage_context(content, file_data=None, mime_type="applica
     
     contents = [prompt]
     if file_data:
-        contents.append(types.Part.from_bytes(data=file_data, mime_type=mime_type))
+        contents.append(_file_part(file_data, mime_type))
     elif content:
         contents.append(f"[자료 본문]\n{content}")
     else:
         return "내용 없음"
     
     try:
-        response = client.models.generate_content(
-            model=MODEL_ID,
-            contents=contents,
-            config=config_high_thinking
-        )
+        response = _generate(contents, "generate_reference_usage_context")
         return response.text.replace("사용 시점:", "").strip()
     except Exception as e:
         return f"분석 실패: {str(e)[:50]}..."
@@ -99,35 +159,24 @@ def generate_reference_usage_context(content, file_data=None, mime_type="applica
 # 🧠 기능 2: 상담 분석 & 코칭 (Consultant용)
 # ==========================================
 
-def analyze_topic_and_traits(script=None, audio_data=None, mime_type="audio/mp3", ref_metadata=[], categories=[]):
+def analyze_topic_and_traits(script=None, audio_data=None, mime_type="audio/mp3", ref_metadata=[], categories=[],
+                             category_text=None, reference_list_text=None, topic_hint=None):
     """
     [1차 분석] 주제 분류, 고객 성향, 고객 정보(이름/전화번호) 추출 + RAG 추천
     Now capable of using dynamic categories with descriptions.
+    category_text / reference_list_text: 프롬프트 번들에 미리 렌더링된 블록 (있으면 categories / ref_metadata 대신 사용)
+    topic_hint: 로컬 분류기(utils/topic_classifier)가 확신한 유형. 있으면 유형 목록을 프롬프트에서 빼고 사고 수준 low로 호출
     """
-    if not client: return {"topic": "general", "customer_traits": "unknown", "customer_info": {}, "summary": "AI Error"}
-
-    # 카테고리 정보 포맷팅
-    cat_text = ""
-    if categories:
-        cat_text = "[가능한 상담 유형 (Categories)]\n"
-        for c in categories:
-            # c가 dict면 description 사용, str이면 이름만 사용
-            if isinstance(c, dict):
-                desc = f": {c.get('description')}" if c.get('description') else ""
-                cat_text += f"- {c['name']}{desc}\n"
-            else:
-                cat_text += f"- {c}\n"
+    if not get_client(): return {"topic": "general", "customer_traits": "unknown", "customer_info": {}, "summary": "AI Error"}
+
+    # 카테고리 정보 포맷팅 (번들과 같은 렌더링 함수 사용)
+    if topic_hint:
+        cat_text = f"(상담 유형은 \"{topic_hint}\"(으)로 이미 분류됨 -> [\"{topic_hint}\"]를 그대로 반환)"
     else:
-        # Fallback
-        cat_text = "환불(refund), 기술(tech), 문의(inquiry), 일반(general) 중 택1"
+        cat_text = category_text if category_text is not None else render_category_text(categories)
 
-    # 참고자료 리스트 텍스트 화
-    ref_list_txt = ""
-    if ref_metadata:
-        ref_list_txt = "[가용 참고자료 목록]\n"
-        for r in ref_metadata:
-            # ID, Title, Context만 전달 (토큰 효율화)
-            ref_list_txt += f"- ID:{r['id']} | {r['title']} (상황: {r.get('summary')})\n"
+    # 참고자료 리스트 텍스트 화 (ID, Title, Context만 전달 - 토큰 효율화)
+    ref_list_txt = reference_list_text if reference_list_text is not None else render_reference_list(ref_metadata)
 
     sys_instruction = f"""
     상담 내용을 분석해서 다음 5가지 정보를 JSON으로 추출하세요.
@@ -161,27 +210,16 @@ def analyze_topic_and_traits(script=None, audio_data=None, mime_type="audio/mp3"
     
     # 멀티모달 입력 처리
     if audio_data:
-        contents.append(types.Part.from_bytes(data=audio_data, mime_type=mime_type))
+        contents.append(_file_part(audio_data, mime_type))
     elif script:
         contents.append(f"[상담 내용]\n{script}")
     else:
         return None
 
     try:
-        response = client.models.generate_content(
-            model=MODEL_ID,
-            contents=contents,
-            config=config_high_thinking
-        )
-        
-        # Regex로 JSON 블록 추출
-        import re
-        match = re.search(r'\{.*\}', response.text, re.DOTALL)
-        if match:
-            json_str = match.group(0)
-            return json.loads(json_str)
-        else:
-            return json.loads(response.text) # 시도
+        response = _generate(contents, "analyze_topic_and_traits", category=topic_hint,
+                             thinking_level="low" if topic_hint else "high")
+        return parse_json_response(response.text)
 
     except Exception as e:
         print(f"1차 분석 실패: {e}")
@@ -193,35 +231,129 @@ def analyze_topic_and_traits(script=None, audio_data=None, mime_type="audio/mp3"
             "recommended_ref_ids": []
         }
 
-def generate_coaching_feedback(script=None, audio_data=None, history=[], guidelines=[], references=[], mime_type="audio/mp3"):
+# 수집된 참고자료 1건당 프롬프트에 넣을 최대 글자 수 (초과 시 관련 청크만 검색해서 사용)
+REF_CONTEXT_CHARS = 6000
+REF_TOP_CHUNKS = 6
+
+def _is_ingested(ref):
+    """수집 파이프라인으로 텍스트 추출/청크 색인이 끝난 참고자료인지 확인"""
+    return ref.get("ingest_status") == "ready" and bool(ref.get("chunk_count"))
+
+def _reference_context(ref, query=None):
+    """
+    참고자료 본문을 프롬프트용으로 반환합니다.
+    본문이 길면 로컬 인덱스에서 상담 내용과 관련 높은 청크만 문서 순서대로 골라 사용합니다.
+    프롬프트 번들의 참고자료(본문 없음)는 로컬 인덱스의 청크를 본문으로 사용합니다.
+    """
+    from utils.reference_index import reference_chunks, search
+
+    content = ref.get("content")
+    if content is None:
+        content = "\n".join(reference_chunks(ref["id"]) or [])
+    if len(content) <= REF_CONTEXT_CHARS:
+        return content
+
+    hits = search(query, ref_ids=[ref["id"]], top_k=REF_TOP_CHUNKS) if query else []
+    if not hits:
+        return content[:REF_CONTEXT_CHARS]
+    hits.sort(key=lambda h: h["chunk"])
+    return "\n...\n".join(h["text"] for h in hits)
+
+def _attach_contents(references):
+    """
+    본문이 없는 참고자료(프롬프트 번들) 중 로컬 인덱스로 대신할 수 없는 자료만 DB에서 본문을 한 번에 조회해 붙입니다.
+    (수집 전 자료, 이 서버에 인덱스가 없는 자료. 첨부 PDF는 파일로 전달하므로 제외)
+    """
+    from utils.reference_index import has_reference
+    from utils.db_manager import fetch_reference_contents
+
+    def needs_content(r):
+        if r.get("content") is not None:
+            return False
+        if _is_ingested(r):
+            return not has_reference(r["id"])
+        return not (r.get("file_url") or "").lower().endswith(".pdf")
+
+    missing = [r["id"] for r in references if needs_content(r)]
+    if not missing:
+        return references
+    contents = fetch_reference_contents(missing)
+    return [dict(r, content=contents.get(r["id"], "")) if r["id"] in contents else r for r in references]
+
+def _render_history(history):
+    """고객 상담 이력 (최근 3건) -> [고객 프로필 (History)] 블록"""
+    history_text = ""
+    for h in (history or [])[-3:]:
+        history_text += f"- {h.get('date')}: {h.get('summary')} (성향: {h.get('extracted_traits')})\n"
+    return history_text
+
+def _feedback_contract(feedback_format, with_transcript=True):
+    """
+    2차 분석 출력 지시문과 JSON 필드 블록. 반환: (instruction, fields)
+    compact: 짧은 findings만 출력하고 전사문은 오디오 입력일 때만 (텍스트는 입력 스크립트를 그대로 사용)
+    """
+    if feedback_format == "markdown":
+        instruction = """
+    'feedback' 필드에는:
+    1. 잘한 점
+    2. 아쉬운 점 & 수정 제안 (Before & After) - **참고 문헌 인용 필수**
+    3. 총평
+    을 포함하여 Markdown 형식으로 작성하세요."""
+        fields = '"feedback": "..."'
+        transcript = ',\n        "transcript": "..."' if with_transcript else ""
+    else:
+        instruction = """
+    'findings' 필드에 평가 결과를 **짧은 구조화 형식**으로 작성하세요. (Markdown 문단으로 풀어 쓰지 마세요. 화면에서 자동으로 펼칩니다)
+    - good: 잘한 점 1~3개 / improve: 아쉬운 점 1~3개 (before는 상담원 실제 발화를 짧게 인용, after는 수정 발화)
+    - 참고 문헌을 근거로 든 항목은 ref_id(참고 문헌 제목 옆 ID)와 조항(clause)을 반드시 채우세요.
+    - overall: 총평 1~2문장"""
+        fields = FINDINGS_SCHEMA.strip()
+        transcript = ',\n        "transcript": "오디오 전사문 (화자 표시)"' if with_transcript else ""
+    return instruction, fields + transcript
+
+def _finish_feedback(result, feedback_format, references):
+    """compact 결과의 findings를 기존 형식의 feedback Markdown으로 펼칩니다."""
+    if feedback_format != "markdown" and isinstance(result, dict) and "findings" in result:
+        result["feedback"] = render_feedback(result.get("findings"), references)
+    return result
+
+def generate_coaching_feedback(script=None, audio_data=None, history=[], guidelines=[], references=[], mime_type="audio/mp3", category=None,
+                               rule_text=None, feedback_format=None):
     """
     [2차 분석] Context-Aware 코칭 + (오디오인 경우) STT 추출
+    category: 1차 분석에서 확정된 상담 유형 (토큰 텔레메트리 태그용)
+    rule_text: 프롬프트 번들에 미리 렌더링된 가이드라인 본문 (있으면 guidelines 대신 사용)
+    feedback_format: "compact" / "markdown" (기본 FEEDBACK_FORMAT). 어느 쪽이든 반환 dict의 feedback은 Markdown
     """
-    if not client: return None
+    feedback_format = feedback_format or FEEDBACK_FORMAT
+    if not get_client(): return None
     
-    history_text = ""
-    if history:
-        for h in history[-3:]:
-            history_text += f"- {h.get('date')}: {h.get('summary')} (성향: {h.get('extracted_traits')})\n"
+    history_text = _render_history(history)
     
-    rule_text = ""
-    for g in guidelines:
-        rule_text += f"- {g['refined_content']}\n"
+    if rule_text is None:
+        rule_text = render_rule_text(guidelines)
         
     ref_text = ""
     if references:
+        references = _attach_contents(references)
         ref_text = "[참고 문헌 (법률, 규정, 매뉴얼)]\n"
         for r in references:
+             # 수집(Ingestion) 완료된 자료는 미리 추출한 텍스트만 사용 (파일 다운로드 없음)
+             if _is_ingested(r):
+                ref_text += f"==== {r['title']} (ID:{r['id']}) ====\n{_reference_context(r, script)}\n================\n"
+                continue
+             
              # 파일이 있으면(PDF) 프롬프트 텍스트에서는 제외 (토큰 절약 및 중복 방지)
              # 단, DOCX나 TXT는 파일 Part 지원이 안되므로 텍스트로 포함
              f_url = r.get('file_url')
              is_pdf = f_url and f_url.lower().endswith('.pdf')
              
              if not is_pdf:
-                ref_text += f"==== {r['title']} ====\n{r['content']}\n================\n"
+                ref_text += f"==== {r['title']} (ID:{r['id']}) ====\n{r.get('content') or ''}\n================\n"
              else:
-                ref_text += f"==== {r['title']} ====\n(첨부된 PDF 파일 참조)\n================\n"
+                ref_text += f"==== {r['title']} (ID:{r['id']}) ====\n(첨부된 PDF 파일 참조)\n================\n"
 
+    instruction, output_fields = _feedback_contract(feedback_format, with_transcript=feedback_format == "markdown" or bool(audio_data))
     prompt_text = f"""
     당신은 AI 세일즈 슈퍼바이저입니다. 
     과거 이력, 필수 가이드라인, 그리고 **참고 문헌(Reference)**을 바탕으로 상담 내용을 평가하고 정밀 코칭하세요.
@@ -239,12 +371,7 @@ def generate_coaching_feedback(script=None, audio_data=None, history=[], guideli
     위 상담 내용을 바탕으로 상담원의 화법을 구체적으로 교정해주는 JSON을 작성하세요.
     특히, 제공된 **'참고 문헌'이 있다면 이를 적극 활용하여 팩트 체크(Fact Check)**를 수행해야 합니다.
     상담원이 잘못된 정보를 안내했다면, 참고 문헌의 조항을 인용하여 정확한 정보를 알려주세요.
-    
-    'feedback' 필드에는:
-    1. 잘한 점
-    2. 아쉬운 점 & 수정 제안 (Before & After) - **참고 문헌 인용 필수**
-    3. 총평
-    을 포함하여 Markdown 형식으로 작성하세요.
+    {instruction}
     
     [출력 포맷 - JSON Only]
     {{
@@ -254,9 +381,8 @@ def generate_coaching_feedback(script=None, audio_data=None, history=[], guideli
             "clarity": 0~100,
             "compliance": 0~100
         }},
-        "feedback": "...",
         "type": "상담 유형",
-        "transcript": "..."
+        {output_fields}
     }}
     """
     
@@ -266,14 +392,16 @@ def generate_coaching_feedback(script=None, audio_data=None, history=[], guideli
     if references:
         for r in references:
             f_url = r.get('file_url')
-            # 1. 파일이 있고 PDF인 경우 -> File Part 전송
-            if f_url and f_url.lower().endswith('.pdf'):
+            # 1. 파일이 있고 PDF인 경우 -> File Part 전송 (수집 전 자료만)
+            if f_url and f_url.lower().endswith('.pdf') and not _is_ingested(r):
                 try:
                     # 파일 다운로드 (Public URL or Signed URL needed. Assuming Public based on settings)
-                    rf = requests.get(f_url)
+                    import requests
+                    with span("ai.reference_download", title=r['title']):
+                        rf = requests.get(f_url)
                     if rf.status_code == 200:
                         print(f"📎 PDF Reference Attached: {r['title']}")
-                        contents.append(types.Part.from_bytes(data=rf.content, mime_type="application/pdf"))
+                        contents.append(_file_part(rf.content, "application/pdf"))
                     else:
                         print(f"⚠️ PDF Download Failed ({rf.status_code}): {f_url}")
                         # 실패 시 텍스트로 폴백할지 여부 결정. 여기선 텍스트 content가 있다면 텍스트는 프롬프트에 이미 포함됨?
@@ -284,25 +412,234 @@ def generate_coaching_feedback(script=None, audio_data=None, history=[], guideli
                     print(f"Error downloading ref file: {e}")
     
     if audio_data:
-        contents.append(types.Part.from_bytes(data=audio_data, mime_type=mime_type))
+        contents.append(_file_part(audio_data, mime_type))
     elif script:
         contents.append(f"[금번 상담 내용]\n{script}")
 
     try:
-        response = client.models.generate_content(
-            model=MODEL_ID,
-            contents=contents,
-            config=config_high_thinking
-        )
-        
-        import re
-        match = re.search(r'\{.*\}', response.text, re.DOTALL)
-        if match:
-            json_str = match.group(0)
-            return json.loads(json_str)
-        else:
-             # Fallback
-            return json.loads(response.text.replace("```json", "").replace("```", "").strip())
+        # 텔레메트리에서 형식별 출력 토큰을 비교할 수 있도록 compact는 함수명을 구분해 기록
+        fn_name = "generate_coaching_feedback" if feedback_format == "markdown" else "generate_coaching_feedback.compact"
+        response = _generate(contents, fn_name, category=category)
+        return _finish_feedback(parse_json_response(response.text), feedback_format, references)
             
     except Exception as e:
-        return {"score": 0, "metrics": {}, "feedback": f"분석 오류: {e}", "type": "unknown", "transcript": ""}
\ No newline at end of file
+        return {"score": 0, "metrics": {}, "feedback": f"분석 오류: {e}", "type": "unknown", "transcript": ""}
+
+def analyze_and_coach(script, history=[], category_text=None, reference_list_text="", rule_text="",
+                      reference_text="", topic_hint=None, references=None, feedback_format=None):
+    """
+    [빠른 모드] 텍스트 스크립트 1건을 1차 분석 + 2차 코칭 한 번의 호출로 처리합니다. (utils/fast_coaching)
+    category_text / reference_list_text: 프롬프트 번들의 상담 유형 / 참고자료 목록
+    rule_text: 후보 유형들의 가이드라인 (공통 + 유형별), reference_text: 로컬 검색으로 고른 참고자료 발췌
+    topic_hint: 로컬 분류기가 확신한 유형 (있으면 유형 목록 대신 사용)
+    references: 발췌를 넣은 참고자료 (compact 형식의 ref_id -> 제목 표시용)
+    전사문(transcript)은 입력 스크립트와 같으므로 출력하지 않습니다.
+    """
+    if not get_client(): return None
+    feedback_format = feedback_format or FEEDBACK_FORMAT
+    instruction, output_fields = _feedback_contract(feedback_format, with_transcript=False)
+
+    if topic_hint:
+        cat_text = f"(상담 유형은 \"{topic_hint}\"(으)로 이미 분류됨 -> [\"{topic_hint}\"]를 그대로 반환)"
+    else:
+        cat_text = category_text or render_category_text([])
+
+    prompt_text = f"""
+    당신은 AI 세일즈 슈퍼바이저입니다.
+    상담 내용을 분류하고, 과거 이력, 필수 가이드라인, 참고 문헌을 바탕으로 상담원을 평가하고 정밀 코칭하세요.
+    
+    [1단계: 분류]
+    1. top_3_topics: 아래 '가능한 상담 유형' 중 가장 적절한 순서대로 상위 1~3개를 리스트로 반환 (영문 코드명)
+    {cat_text}
+    2. customer_traits: 급함, 화남, 논리적 등 핵심 키워드
+    3. customer_info: 대화 중 언급된 고객의 이름과 전화번호. 없으면 null.
+    4. summary: 상담 내용 한줄 요약
+    5. recommended_ref_ids: 아래 '가용 참고자료 목록' 중 현재 상담에 도움이 될 자료의 ID 리스트 (없으면 [])
+    
+    {reference_list_text}
+    
+    [2단계: 코칭] top_3_topics 1순위 유형의 가이드라인(공통 포함) 기준으로 평가하세요.
+    
+    [고객 프로필 (History)]
+    {_render_history(history)}
+    
+    [필수 준수 가이드라인]
+    {rule_text}
+    
+    {reference_text}
+    
+    상담원이 잘못된 정보를 안내했다면, 참고 문헌의 조항을 인용하여 정확한 정보를 알려주세요.
+    {instruction}
+    
+    [출력 포맷 - JSON Only]
+    {{
+        "top_3_topics": ["topic_A", "topic_B"],
+        "customer_traits": "...",
+        "customer_info": {{
+            "name": "홍길동" or null,
+            "phone": "010-XXXX-XXXX" or null
+        }},
+        "summary": "...",
+        "recommended_ref_ids": [123, 456],
+        "score": 0~100 사이 정수,
+        "metrics": {{
+            "empathy": 0~100,
+            "clarity": 0~100,
+            "compliance": 0~100
+        }},
+        {output_fields}
+    }}
+    """
+
+    try:
+        fn_name = "analyze_and_coach" if feedback_format == "markdown" else "analyze_and_coach.compact"
+        response = _generate([prompt_text, f"[금번 상담 내용]\n{script}"], fn_name, category=topic_hint)
+        return _finish_feedback(parse_json_response(response.text), feedback_format, references)
+    except Exception as e:
+        print(f"빠른 모드 분석 실패: {e}")
+        return None
+
+# ==========================================
+# 🔴 기능 2-1: 통화 중 실시간 코칭 (utils/live_coaching)
+# ==========================================
+
+def transcribe_chunk(audio_data, mime_type="audio/wav", context_tail=""):
+    """
+    통화 오디오 조각 1개를 전사합니다. (사고 수준 low, 실패 시 None)
+    context_tail: 직전 전사문 끝부분 (화자 구분/문장 이어짐 판단용, 다시 출력하지 않음)
+    """
+    if not get_client(): return None
+    prompt_text = f"""
+    통화 녹음의 일부 조각입니다. 들리는 내용만 화자(상담원/고객)를 표시해 전사하세요.
+    한 발화당 한 줄, "상담원: ..." / "고객: ..." 형식으로 출력하고 설명은 붙이지 마세요.
+    말소리가 없으면 빈 문자열을 출력하세요.
+    
+    [직전 전사문 (참고용, 다시 출력하지 말 것)]
+    {context_tail}
+    """
+    try:
+        response = _generate([prompt_text, _file_part(audio_data, mime_type)], "transcribe_chunk", thinking_level="low")
+        return (response.text or "").strip()
+    except Exception as e:
+        print(f"실시간 전사 실패: {e}")
+        return None
+
+def live_nudges(window_text, rule_text="", reference_text="", recent_nudges=(), category=None):
+    """
+    통화 중 최근 대화(슬라이딩 윈도)를 보고 상담원에게 바로 띄울 짧은 알림을 만듭니다. (사고 수준 low)
+    recent_nudges: 이미 띄운 알림 (같은 내용 반복 방지)
+    반환: [{"kind", "text", "ref_id"}] (지금 알릴 것이 없거나 실패 시 [])
+    """
+    if not get_client(): return []
+    recent_text = "".join(f"- {n}\n" for n in recent_nudges) or "(없음)"
+    prompt_text = f"""
+    당신은 통화를 옆에서 듣고 있는 AI 세일즈 슈퍼바이저입니다.
+    아래 '최근 대화'만 보고, 상담원이 **지금 바로** 고쳐야 하거나 놓치고 있는 것이 있으면 짧은 알림을 만드세요.
+    - 알림은 최대 2개, 각 40자 이내의 지시문 (예: "환불 기간(7일) 먼저 안내하세요")
+    - 가이드라인 위반, 잘못된 정보 안내(참고 문헌과 다름), 고객 감정 악화 신호만 알리고 사소한 것은 생략
+    - 이미 띄운 알림과 같은 내용은 다시 만들지 마세요. 알릴 것이 없으면 빈 리스트
+    
+    [필수 준수 가이드라인]
+    {rule_text}
+    
+    {reference_text}
+    
+    [이미 띄운 알림]
+    {recent_text}
+    
+    [출력 포맷 - JSON Only]
+    {{
+        "nudges": [
+            {{"kind": "compliance" | "fact" | "empathy", "text": "...", "ref_id": 참고자료 ID 또는 null}}
+        ]
+    }}
+    """
+    try:
+        response = _generate([prompt_text, f"[최근 대화]\n{window_text}"], "live_nudges",
+                             category=category, thinking_level="low")
+        nudges = parse_json_response(response.text).get("nudges") or []
+        return [n for n in nudges if isinstance(n, dict) and n.get("text")]
+    except Exception as e:
+        print(f"실시간 알림 생성 실패: {e}")
+        return []
+
+# ==========================================
+# 🔁 기능 3: 가이드라인 변경 후 재채점 (utils/rescoring)
+# ==========================================
+
+def rescore_contents(script, rule_text):
+    """
+    저장된 상담 스크립트를 새 가이드라인 기준으로 다시 채점하는 모델 입력
+    (2차 분석과 같은 점수/지표 기준, 전사문/상세 코칭 없이 점수와 짧은 사유만 출력)
+    """
+    prompt_text = f"""
+    당신은 AI 세일즈 슈퍼바이저입니다.
+    상담 가이드라인이 변경되어, 이미 평가된 상담을 **변경된 가이드라인 기준으로만** 다시 채점합니다.
+    
+    [필수 준수 가이드라인]
+    {rule_text}
+    
+    [출력 포맷 - JSON Only]
+    {{
+        "score": 0~100 사이 정수,
+        "metrics": {{
+            "empathy": 0~100,
+            "clarity": 0~100,
+            "compliance": 0~100
+        }},
+        "feedback": "점수에 영향을 준 가이드라인 항목 1~3줄"
+    }}
+    """
+    return [prompt_text, f"[상담 내용]\n{script}"]
+
+def rescore_coaching(script, rule_text, category=None):
+    """재채점 1건을 즉시 호출로 처리합니다. (배치 모드를 쓸 수 없을 때) 실패 시 None"""
+    if not get_client(): return None
+    try:
+        response = _generate(rescore_contents(script, rule_text), "rescore_coaching", category=category)
+        return parse_json_response(response.text)
+    except Exception as e:
+        print(f"재채점 실패: {e}")
+        return None
+
+# 배치 작업 종료 상태 (SDK JobState 이름)
+BATCH_DONE_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+
+def batch_available():
+    """클라이언트가 배치 제출(client.batches)을 지원하는지 확인합니다."""
+    client = get_client()
+    return client is not None and getattr(client, "batches", None) is not None
+
+def submit_batch(contents_list, display_name):
+    """
+    모델 입력 목록을 인라인 배치 작업 1건으로 제출하고 작업 이름을 반환합니다.
+    (즉시 호출 대비 낮은 단가, 결과는 비동기로 fetch_batch에서 조회)
+    """
+    requests = [
+        {"contents": [{"role": "user", "parts": [{"text": c} for c in contents]}], "config": _thinking_config()}
+        for contents in contents_list
+    ]
+    job = get_client().batches.create(model=MODEL_ID, src=requests, config={"display_name": display_name})
+    return job.name
+
+def fetch_batch(name):
+    """
+    배치 작업 상태를 조회합니다.
+    반환: (state, results) - 끝나지 않았으면 results는 None,
+    성공 시 제출 순서대로 [(response, error)]
+    """
+    job = get_client().batches.get(name=name)
+    state = getattr(job.state, "name", str(job.state))
+    if state not in BATCH_DONE_STATES:
+        return state, None
+    responses = getattr(getattr(job, "dest", None), "inlined_responses", None) or []
+    return state, [(r.response, r.error) for r in responses]
+
+# ==========================================
+# ⏱️ 지연 시간 추적: 모든 함수 호출을 span으로 기록
+# ==========================================
+instrument_module(__name__, "ai", exclude=(
+    "init_gemini", "get_client", "_thinking_config", "_file_part", "__getattr__", "_generate",
+    "parse_json_response", "_render_history", "_feedback_contract", "_finish_feedback", "rescore_contents",
+    "batch_available"
+))
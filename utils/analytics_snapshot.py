@@ -0,0 +1,239 @@
+import os
+import json
+import glob
+import time
+import threading
+import pandas as pd
+from utils.local_store import data_path
+
+# ==========================================
+# 📦 coaching_logs 로컬 분석 스냅샷 (Parquet)
+# ==========================================
+# (created_at, id) 워터마크 이후의 신규 행만 증분으로 받아 Parquet 파트 파일로 누적합니다.
+# insert 이후의 수정(상담 유형 수정)과 삭제(중복 정리)는 database/migration_snapshot_changes.sql의
+# updated_at / coaching_log_tombstones로 따로 받아 해당 행을 교체/제거합니다.
+# 변경 추적이 빠지는 경우(마이그레이션 미적용, tombstone 정리 등)에 대비해 FULL_REBUILD_HOURS마다 전체를 다시 만듭니다.
+
+SNAPSHOT_DIR = os.path.dirname(data_path("analytics", "coaching_logs", "_"))
+WATERMARK_FILE = "_watermark.json"
+SNAPSHOT_COLUMNS = "id, created_at, user_id, consultation_type, ai_score, metrics"
+METRIC_KEYS = ("empathy", "clarity", "compliance")
+
+DEFAULT_PAGE_SIZE = 1000  # db_manager.MAX_PAGE_SIZE 이하로 유지
+PART_ROWS = 100_000     # 파트 파일 1개당 최대 행 수
+MAX_PARTS = 16          # 파트 수가 넘으면 하나로 압축(Compaction)
+FULL_REBUILD_HOURS = 24 # 이 시간이 지나면 다음 동기화에서 전체 재구성
+
+_sync_lock = threading.Lock()
+
+def read_watermark(path=SNAPSHOT_DIR):
+    """
+    마지막으로 동기화된 행의 (created_at, id), 누적 행 수, 수정/삭제 워터마크(updated, deleted),
+    마지막 전체 재구성 시각(rebuilt_at, epoch 초)을 반환합니다.
+    """
+    try:
+        with open(os.path.join(path, WATERMARK_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _write_watermark(path, watermark):
+    tmp = os.path.join(path, WATERMARK_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(watermark, f)
+    os.replace(tmp, os.path.join(path, WATERMARK_FILE))
+
+def _small_int(series):
+    """0~100 점수를 nullable UInt8로 변환합니다."""
+    return pd.to_numeric(series, errors="coerce").clip(0, 255).round().astype("UInt8")
+
+def to_compact_frame(rows):
+    """
+    coaching_logs 레코드(list of dict 또는 DataFrame)를 압축 dtype DataFrame으로 변환합니다.
+    - user_id, consultation_type: category
+    - ai_score, metric_*: UInt8
+    - metrics(JSON): metric_empathy / metric_clarity / metric_compliance 로 평탄화
+    """
+    df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(rows)
+    out = pd.DataFrame(index=df.index)
+    out["id"] = df["id"]
+    out["created_at"] = pd.to_datetime(df["created_at"], utc=True, format="ISO8601")
+    out["user_id"] = df["user_id"].astype("category")
+    out["consultation_type"] = df["consultation_type"].fillna("general").astype("category")
+    out["ai_score"] = _small_int(df["ai_score"])
+
+    metrics = df["metrics"] if "metrics" in df.columns else pd.Series([None] * len(df), index=df.index)
+    for key in METRIC_KEYS:
+        values = [m.get(key) if isinstance(m, dict) else None for m in metrics]
+        out[f"metric_{key}"] = _small_int(pd.Series(values, index=df.index, dtype="object"))
+    return out.reset_index(drop=True)
+
+def _fetch_pages_since(watermark, page_size):
+    """
+    워터마크 이후의 coaching_logs를 (created_at, id) 키셋 페이지 단위로 조회합니다.
+    아직 한 행도 받지 않은 워터마크(빈 테이블에서 첫 동기화)는 처음부터 조회합니다.
+    """
+    from utils.db_manager import iter_coaching_logs
+    after = watermark if watermark and "created_at" in watermark and "id" in watermark else None
+    return iter_coaching_logs(SNAPSHOT_COLUMNS, page_size=page_size, after=after)
+
+def _part_files(path):
+    return sorted(glob.glob(os.path.join(path, "part-*.parquet")))
+
+def _write_part(path, rows):
+    frame = to_compact_frame(rows)
+    seq = len(_part_files(path)) + 1
+    target = os.path.join(path, f"part-{int(time.time() * 1000)}-{seq:06d}.parquet")
+    frame.to_parquet(target + ".tmp", engine="pyarrow", index=False)
+    os.replace(target + ".tmp", target)
+
+def _write_frame(path, frame):
+    """frame 하나를 단일 파트로 기록하고 기존 파트를 지웁니다."""
+    parts = _part_files(path)
+    target = os.path.join(path, f"part-{int(time.time() * 1000)}-000000.parquet")
+    frame.to_parquet(target + ".tmp", engine="pyarrow", index=False)
+    os.replace(target + ".tmp", target)
+    for p in parts:
+        os.remove(p)
+
+def compact_snapshot(path=SNAPSHOT_DIR):
+    """파트 파일들을 하나의 Parquet 파일로 합칩니다."""
+    if len(_part_files(path)) <= 1:
+        return
+    _write_frame(path, load_snapshot(path))
+
+def _rebuild_due(watermark):
+    if not watermark:
+        return False  # 빈 스냅샷은 동기화가 곧 전체 적재
+    rebuilt_at = watermark.get("rebuilt_at")
+    return rebuilt_at is None or time.time() - rebuilt_at > FULL_REBUILD_HOURS * 3600
+
+def _fetch_changes(state, page_size):
+    """수정/삭제 워터마크 이후의 변경을 조회합니다. 반환: (수정된 행, 삭제된 ID, 새 워터마크)"""
+    from utils.db_manager import iter_coaching_logs, fetch_log_tombstones
+
+    changed = []
+    for page in iter_coaching_logs(SNAPSHOT_COLUMNS, page_size=page_size, after=state["updated"], key="updated_at"):
+        changed.extend(page)
+    tombstones = fetch_log_tombstones(after=state["deleted"], page_size=page_size)
+
+    updated = {"updated_at": changed[-1]["updated_at"], "id": changed[-1]["id"]} if changed else state["updated"]
+    deleted = tombstones[-1] if tombstones else state["deleted"]
+    return changed, [t["log_id"] for t in tombstones], {"updated": updated, "deleted": deleted}
+
+def _apply_changes(path, changed, deleted_ids):
+    """
+    스냅샷의 행을 수정본으로 교체하고 삭제된 행을 제거합니다. 반환: 전체 행 수
+    아직 스냅샷에 없는 행(워터마크 이후 insert 후 수정)은 다음 신규 행 동기화에서 최신 값으로 들어옵니다.
+    """
+    frame = load_snapshot(path)
+    if frame is None:
+        return 0
+    present = set(frame["id"])
+    changed = [r for r in changed if r["id"] in present]
+    drop = set(deleted_ids) | {r["id"] for r in changed}
+    if not drop & present:
+        return len(frame)
+
+    frame = frame[~frame["id"].isin(drop)]
+    if changed:
+        frame = pd.concat([frame.astype({"user_id": "object", "consultation_type": "object"}),
+                           to_compact_frame(changed).astype({"user_id": "object", "consultation_type": "object"})])
+        frame = frame.sort_values(["created_at", "id"]).astype({"user_id": "category", "consultation_type": "category"})
+    _write_frame(path, frame.reset_index(drop=True))
+    return len(frame)
+
+def sync_snapshot(path=SNAPSHOT_DIR, page_size=DEFAULT_PAGE_SIZE, pages=None):
+    """
+    워터마크 이후 신규 행을 스냅샷에 추가하고, 수정/삭제된 행을 반영합니다.
+    마지막 전체 재구성 후 FULL_REBUILD_HOURS가 지났으면 전체를 다시 만듭니다.
+    pages를 넘기면 Supabase 대신 해당 페이지 이터러블을 신규 행으로 사용합니다. (리빌드/벤치마크용, 변경 추적 생략)
+    """
+    live = pages is None
+    if live and _rebuild_due(read_watermark(path)):
+        return dict(rebuild_snapshot(path, page_size=page_size), rebuilt=True)
+
+    started = time.perf_counter()
+    with _sync_lock:
+        os.makedirs(path, exist_ok=True)
+        watermark = read_watermark(path)
+        state = dict(watermark) if watermark else {"rows": 0, "rebuilt_at": time.time()}
+        if live and "updated" not in state:
+            try:
+                # 처음 적재: 지금까지의 수정/삭제는 전체 조회에 이미 반영되므로 현재 위치부터 추적
+                from utils.db_manager import fetch_log_change_marks
+                state.update(fetch_log_change_marks())
+            except Exception as e:
+                print(f"스냅샷 변경 추적 불가 (migration_snapshot_changes.sql 확인, 주기적 재구성만 사용): {e}")
+        if live:
+            pages = _fetch_pages_since(watermark, page_size)
+
+        total = state["rows"]
+        new_rows = 0
+        buffer = []
+
+        def flush():
+            nonlocal total, buffer
+            if not buffer:
+                return
+            _write_part(path, buffer)
+            total += len(buffer)
+            # 파트 파일이 기록된 뒤에만 워터마크 전진 (중단 시 재개 가능)
+            state.update(created_at=buffer[-1]["created_at"], id=buffer[-1]["id"], rows=total)
+            _write_watermark(path, state)
+            buffer = []
+
+        for page in pages:
+            buffer.extend(page)
+            new_rows += len(page)
+            if len(buffer) >= PART_ROWS:
+                flush()
+        flush()
+        if not watermark:
+            _write_watermark(path, state)
+
+        changed_rows = deleted_rows = 0
+        if live and "updated" in state:
+            try:
+                changed, deleted_ids, marks = _fetch_changes(state, page_size)
+                changed_rows, deleted_rows = len(changed), len(deleted_ids)
+                if changed or deleted_ids:
+                    total = _apply_changes(path, changed, deleted_ids)
+                state.update(marks, rows=total)
+                _write_watermark(path, state)
+            except Exception as e:
+                print(f"스냅샷 수정/삭제 반영 실패 (다음 동기화에서 재시도): {e}")
+
+        if len(_part_files(path)) > MAX_PARTS:
+            compact_snapshot(path)
+
+    return {
+        "new_rows": new_rows,
+        "changed_rows": changed_rows,
+        "deleted_rows": deleted_rows,
+        "total_rows": total,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
+
+def rebuild_snapshot(path=SNAPSHOT_DIR, page_size=DEFAULT_PAGE_SIZE, pages=None):
+    """스냅샷을 삭제하고 처음부터 다시 만듭니다."""
+    with _sync_lock:
+        for p in _part_files(path):
+            os.remove(p)
+        wm = os.path.join(path, WATERMARK_FILE)
+        if os.path.exists(wm):
+            os.remove(wm)
+    return sync_snapshot(path, page_size=page_size, pages=pages)
+
+def load_snapshot(path=SNAPSHOT_DIR, columns=None):
+    """스냅샷 전체(또는 지정 컬럼)를 DataFrame으로 읽습니다. 스냅샷이 없으면 None."""
+    parts = _part_files(path)
+    if not parts:
+        return None
+    import pyarrow.parquet as pq
+    frame = pq.read_table(parts, columns=columns).to_pandas()
+    # 파트마다 카테고리 사전이 달라도 하나의 category dtype으로 통일
+    for col in ("user_id", "consultation_type"):
+        if col in frame.columns and frame[col].dtype != "category":
+            frame[col] = frame[col].astype("category")
+    return frame
@@ -0,0 +1,172 @@
+from datetime import datetime, timezone
+
+# ==========================================
+# 📉 상담원별 추세 & 경고 (Incremental)
+# ==========================================
+# 상담 1건이 저장될 때마다 상담원별 상태(최근 N건, EWMA, 지표별 드리프트)를 O(1)로 갱신해
+# consultant_trends 테이블에 저장합니다. 대시보드는 전체 로그를 다시 정렬/집계하지 않고 이 상태만 읽습니다.
+#
+# 상태(state) 구조
+#   count / score_sum          전체 건수와 점수 합 (전체 평균)
+#   window                     최근 WINDOW_SIZE건 점수 (오래된 것부터)
+#   ewma                       점수 EWMA
+#   metric_count / metric_sum  지표별 전체 건수와 합 (기준선)
+#   metric_ewma                지표별 EWMA -> drift = EWMA - 기준선
+#   last_log_id                마지막 반영 로그 (재시도 시 중복 반영 방지)
+
+WINDOW_SIZE = 5          # 성장세(Growth) = 최근 5건 평균 - 전체 평균 (기존 성과표 정의 유지)
+EWMA_ALPHA = 0.2         # 최근 약 10건에 가중
+METRIC_KEYS = ("empathy", "clarity", "compliance")
+
+# 경고 기준 (min_sessions건 이상 쌓인 상담원만 판단)
+WARNING_THRESHOLDS = {
+    "min_sessions": 5,
+    "recent_mean_below": 60,     # 최근 N건 평균 점수
+    "growth_below": -10,         # 최근 N건 평균 - 전체 평균
+    "ewma_below": 65,            # 점수 EWMA
+    "metric_drift_below": -10,   # 지표 EWMA - 지표 전체 평균
+}
+
+WARNING_LABELS = {
+    "recent_mean": "최근 평균 점수 저조",
+    "growth": "최근 성과 하락",
+    "ewma": "점수 추세 저조",
+    "metric_drift": "지표 하락",
+}
+
+def new_state():
+    return {
+        "count": 0, "score_sum": 0.0, "window": [], "ewma": None,
+        "metric_count": {}, "metric_sum": {}, "metric_ewma": {},
+        "last_log_id": None, "last_at": None,
+    }
+
+def _ewma(prev, value):
+    return value if prev is None else prev + EWMA_ALPHA * (value - prev)
+
+def update_state(state, score, metrics=None, log_id=None, created_at=None):
+    """상담 1건을 상태에 반영합니다. (입력 state는 변경하지 않고 새 dict 반환)"""
+    state = {**new_state(), **(state or {})}
+    if log_id is not None and state["last_log_id"] is not None and log_id <= state["last_log_id"]:
+        return state  # 이미 반영된 로그
+
+    score = float(score or 0)
+    window = (state["window"] + [score])[-WINDOW_SIZE:]
+    metric_count, metric_sum, metric_ewma = dict(state["metric_count"]), dict(state["metric_sum"]), dict(state["metric_ewma"])
+    for key in METRIC_KEYS:
+        value = (metrics or {}).get(key)
+        if isinstance(value, (int, float)):
+            metric_count[key] = metric_count.get(key, 0) + 1
+            metric_sum[key] = metric_sum.get(key, 0.0) + value
+            metric_ewma[key] = _ewma(metric_ewma.get(key), float(value))
+
+    return {
+        "count": state["count"] + 1,
+        "score_sum": state["score_sum"] + score,
+        "window": window,
+        "ewma": _ewma(state["ewma"], score),
+        "metric_count": metric_count,
+        "metric_sum": metric_sum,
+        "metric_ewma": metric_ewma,
+        "last_log_id": log_id if log_id is not None else state["last_log_id"],
+        "last_at": created_at or datetime.now(timezone.utc).isoformat(),
+    }
+
+def summarize_state(state):
+    """대시보드 표시용 값: 전체 평균, 최근 평균, 성장세, EWMA, 지표별 드리프트"""
+    count = state.get("count") or 0
+    total_mean = state["score_sum"] / count if count else 0.0
+    window = state.get("window") or []
+    recent_mean = sum(window) / len(window) if window else 0.0
+    drift = {
+        key: round(state["metric_ewma"][key] - state["metric_sum"][key] / state["metric_count"][key], 2)
+        for key in state.get("metric_ewma", {})
+        if state["metric_count"].get(key)
+    }
+    return {
+        "count": count,
+        "total_mean": round(total_mean, 2),
+        "recent_mean": round(recent_mean, 2),
+        # 최근 N건이 다 쌓이기 전에는 성장세 0 (기존 성과표와 동일)
+        "growth": round(recent_mean - total_mean, 2) if len(window) >= WINDOW_SIZE else 0.0,
+        "ewma": round(state["ewma"], 2) if state.get("ewma") is not None else None,
+        "drift": drift,
+    }
+
+def evaluate_warnings(summary, thresholds=WARNING_THRESHOLDS):
+    """요약값이 경고 기준을 넘으면 [{"code", "label", "value", "threshold"}]를 반환합니다."""
+    if summary["count"] < thresholds["min_sessions"]:
+        return []
+    warnings = []
+
+    def check(code, value, limit, label=None):
+        if value is not None and value < limit:
+            warnings.append({"code": code, "label": label or WARNING_LABELS[code], "value": value, "threshold": limit})
+
+    check("recent_mean", summary["recent_mean"], thresholds["recent_mean_below"])
+    check("growth", summary["growth"], thresholds["growth_below"])
+    check("ewma", summary["ewma"], thresholds["ewma_below"])
+    for key, value in summary["drift"].items():
+        check("metric_drift", value, thresholds["metric_drift_below"], f"{WARNING_LABELS['metric_drift']} ({key})")
+    return warnings
+
+def to_row(user_id, state):
+    """consultant_trends 테이블 행으로 변환합니다."""
+    summary = summarize_state(state)
+    return {
+        "user_id": user_id,
+        "state": state,
+        "session_count": summary["count"],
+        "total_mean": summary["total_mean"],
+        "recent_mean": summary["recent_mean"],
+        "growth": summary["growth"],
+        "ewma": summary["ewma"],
+        "drift": summary["drift"],
+        "warnings": evaluate_warnings(summary),
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+# ------------------------------------------
+# 저장 / 재계산
+# ------------------------------------------
+
+def record_session(user_id, log_id, score, metrics=None, created_at=None):
+    """
+    저장된 상담 1건을 상담원 추세에 반영합니다. (save_coaching_result에서 호출, 조회 1회 + upsert 1회)
+    조회와 upsert 사이에 잠금이 없으므로 같은 상담원의 저장은 호출 측에서 직렬화합니다. (save_queue의 상담원별 잠금)
+    반환: 반영했으면 True, 이미 반영된 로그면 False. 저장에 실패하면 예외 (호출 측에서 재시도)
+    """
+    from utils.db_manager import fetch_consultant_trend_state, upsert_consultant_trends
+
+    state = fetch_consultant_trend_state(user_id)
+    if state and state.get("last_log_id") is not None and log_id <= state["last_log_id"]:
+        return False  # 재시도 등으로 이미 반영된 로그
+    updated = update_state(state, score, metrics, log_id=log_id, created_at=created_at)
+    if not upsert_consultant_trends([to_row(user_id, updated)]):
+        raise RuntimeError(f"상담원 추세 저장 실패 (log: {log_id})")
+    return True
+
+def rebuild_trends(pages=None, batch_size=500):
+    """
+    coaching_logs 전체를 (created_at, id) 순서로 읽어 모든 상담원의 상태를 다시 만듭니다.
+    (기능 도입 시 초기화 / 기준 변경 후 관리자 화면에서 실행)
+    pages를 넘기면 Supabase 대신 해당 페이지 이터러블을 사용합니다.
+    """
+    from utils.db_manager import iter_coaching_logs, upsert_consultant_trends
+
+    if pages is None:
+        pages = iter_coaching_logs("id, created_at, user_id, ai_score, metrics")
+    states = {}
+    rows = 0
+    for page in pages:
+        for log in page:
+            uid = log.get("user_id")
+            if not uid:
+                continue
+            states[uid] = update_state(states.get(uid), log.get("ai_score"), log.get("metrics"),
+                                       log_id=log["id"], created_at=log["created_at"])
+            rows += 1
+    trend_rows = [to_row(uid, state) for uid, state in states.items()]
+    for i in range(0, len(trend_rows), batch_size):
+        upsert_consultant_trends(trend_rows[i:i + batch_size])
+    return {"logs": rows, "consultants": len(states)}
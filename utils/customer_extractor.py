@@ -0,0 +1,243 @@
+import os
+import re
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.local_store import data_path
+from utils.phone_number import normalize_phone, format_phone
+from utils.tracing import bind
+
+# ==========================================
+# 🪪 고객 정보 로컬 추출 (이름 / 전화번호)
+# ==========================================
+# 텍스트 스크립트가 있으면 1차 분석 전에 정규식으로 고객 이름과 전화번호를 찾아 customer_info를 미리 채우고,
+# 기존 고객 조회(find_customer)를 백그라운드에서 바로 시작합니다. (1차 분석 대기 시간과 겹침)
+# 모델이 추출한 값과의 일치율을 기록해, 프롬프트에서 customer_info 필드를 뺄 수 있는지 판단합니다.
+
+AGREEMENT_FILE = data_path("customer_extractor", "agreement.json")
+
+# 휴대전화 / 지역번호 / 070, 국가번호(+82) 표기 포함. 1588 같은 대표번호와 마스킹(****)된 번호는 제외
+_PHONE = re.compile(
+    r"(?<![\d*])"
+    r"((?:\+?82[\s.-]?0?|0)(?:1[016789]|2|[3-6][1-5]|70))"
+    r"[\s.)-]{0,2}(\d{3,4})[\s.-]{0,2}(\d{4})"
+    r"(?![\d*])"
+)
+# 숫자를 한글로 읽은 전사문 ("공일공 일이삼사 오육칠팔")
+_KOREAN_DIGITS = {"공": "0", "영": "0", "일": "1", "이": "2", "삼": "3", "사": "4",
+                  "오": "5", "육": "6", "칠": "7", "팔": "8", "구": "9"}
+# 번호 묶음(2~3 / 3~4 / 4자리)까지만 변환 -> 뒤에 붙은 "이요", "일 때문에" 같은 말을 번호로 삼키지 않음
+_KD = "[공영일이삼사오육칠팔구]"
+_KOREAN_DIGIT_RUN = re.compile(rf"{_KD}{{2,3}}[\s-]?{_KD}{{3,4}}[\s-]?{_KD}{{4}}")
+_PHONE_CUE = re.compile(r"(번호|연락처|핸드폰|휴대폰|전화)")
+
+# 흔한 성씨 (복성 포함) + 이름 1~2자
+_SURNAMES = (
+    "남궁|황보|제갈|선우|독고|사공|"
+    "김|이|박|최|정|강|조|윤|장|임|한|오|서|신|권|황|안|송|류|유|전|홍|고|문|양|손|배|백|허|남|심|노|하|"
+    "곽|성|차|주|우|구|민|진|나|지|엄|채|원|천|방|공|현|함|변|염|여|추|도|소|석|선|설|마|길|연|위|표|명|"
+    "기|반|왕|금|옥|육|인|맹|제|모|탁|국|어|은|편|용|예|경|봉|사|부"
+)
+_NAME = rf"((?:{_SURNAMES})[가-힣]{{1,2}})"
+# 앞 문맥 없이 쓰는 패턴용: 단어 중간에서 시작하지 않음 ("주문하신 고객님"의 "문하신" 제외)
+_BARE_NAME = rf"(?<![가-힣]){_NAME}"
+_NAME_PATTERNS = [
+    # 고객 발화: "저는 홍길동입니다", "홍길동이라고 합니다", "제 이름은 홍길동이에요"
+    # 이름 뒤에 서술격 조사나 구 끝(문장부호/줄 끝)이 와야 함 ("전 이사를 가게 돼서요" 제외)
+    re.compile(rf"(?:저는|전|제\s?이름은|이름은|성함은)\s*{_NAME}(?:이?라고|입니다|이에요|예요|인데요|이고|이요|요|(?=\s*(?:[.,!?]|$)))"),
+    re.compile(rf"{_BARE_NAME}(?:이?라고\s?(?:합니다|해요|하는데요))"),
+    # 고객 발화 첫머리: "홍길동인데요, ..."
+    re.compile(rf"^\s*(?:네,?\s*)?{_NAME}(?:인데요|입니다|이에요|예요)"),
+    # 상담원 발화: "홍길동 고객님", "홍길동 님 맞으실까요"
+    re.compile(rf"{_BARE_NAME}\s?(?:고객님|님)"),
+    # 양식: "고객명: 홍길동", "이름 : 홍길동"
+    re.compile(rf"(?:고객명|성함|이름)\s*[:：]\s*{_NAME}"),
+]
+_HONORIFIC_RANK = 3  # _NAME_PATTERNS에서 상담원 호칭 패턴의 위치
+# 성씨로 시작하지만 이름이 아닌 흔한 단어
+_NOT_NAMES = {
+    "고객", "고객님", "이번", "이거", "이건", "이게", "이름", "정말", "정도", "정보", "지금", "지난", "오늘", "오후", "오전",
+    "조금", "한번", "한테", "안녕", "안내", "문의", "문제", "전화", "전에", "확인", "주문", "주소", "배송", "변경", "해지",
+    "상담", "상담원", "서비스", "신청", "성함", "유지", "우선", "다음", "도움", "진행", "결제", "기사", "방문", "사용",
+    "요금", "요청", "하나", "나중", "제가", "제품", "저희", "최근", "최대", "연락", "연락처", "여기", "금액", "그냥",
+    "공유", "장애", "구매", "원래", "현재", "부분", "부탁", "명의", "명세서", "인터넷", "선택", "설치", "위약금",
+    # '~님' 호칭 명사 ("선생님", "어머님", "사장님")
+    "선생", "어머", "아버", "사장", "사모", "부장", "차장", "과장", "팀장", "실장", "원장", "대표", "교수", "박사",
+    "장모", "장인", "고모", "이모", "삼촌", "주인", "손님",
+}
+_SPEAKER = re.compile(r"^\s*([^\s:]{1,10})\s*:\s*", re.MULTILINE)
+_AGENT_SPEAKERS = {"상담원", "상담사", "agent", "상담"}
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="customer-prefetch")
+_lock = threading.Lock()
+_prefetched = {}  # phone_normalized -> Future(customer 또는 None)
+
+# ------------------------------------------
+# 추출
+# ------------------------------------------
+
+def _lines(script):
+    """(화자가 상담원인지, 발화) 목록. 화자 표시가 없으면 모두 고객 발화로 봄"""
+    out = []
+    for line in (script or "").splitlines():
+        m = _SPEAKER.match(line)
+        speaker = m.group(1).lower() if m else ""
+        out.append((speaker in _AGENT_SPEAKERS, line[m.end():] if m else line))
+    return out
+
+def _korean_digits_to_arabic(text):
+    return _KOREAN_DIGIT_RUN.sub(
+        lambda m: "".join(_KOREAN_DIGITS.get(ch, "") for ch in m.group(0) if ch in _KOREAN_DIGITS), text
+    )
+
+def extract_phone(script):
+    """
+    스크립트에서 고객 전화번호를 찾습니다. 반환: '010-1234-5678' 형식 (없으면 None)
+    우선순위: 고객 발화 > '번호/연락처' 언급 직후 > 상담원 발화 (상담원이 불러준 회사 번호 오인 방지)
+    """
+    best = None
+    for is_agent, line in _lines(script):
+        line = _korean_digits_to_arabic(line)
+        for m in _PHONE.finditer(line):
+            rank = 2 if is_agent else 0
+            if _PHONE_CUE.search(line[:m.start()]):
+                rank -= 1
+            if best is None or rank < best[0]:
+                best = (rank, "".join(m.groups()))
+        if best and best[0] <= -1:
+            break
+    return format_phone(best[1]) if best else None
+
+def extract_name(script, honorific=True):
+    """
+    스크립트에서 고객 이름(한글 2~4자)을 찾습니다. 고객 자기소개 > 상담원 호칭 > 양식 순. 없으면 None
+    honorific=False: 상담원 호칭 패턴("OOO 고객님")은 쓰지 않음 (상담원 확인 단계 없이 고객을 만드는 경로)
+    """
+    best = None
+    for is_agent, line in _lines(script):
+        for rank, pattern in enumerate(_NAME_PATTERNS):
+            # 자기소개 패턴은 상담원 발화에서는 무시 ("저는 상담원 김철수입니다")
+            if is_agent and rank < _HONORIFIC_RANK or not honorific and rank == _HONORIFIC_RANK:
+                continue
+            for m in pattern.finditer(line):
+                name = m.group(1)
+                if name in _NOT_NAMES or name[:2] in _NOT_NAMES:
+                    continue
+                if best is None or rank < best[0]:
+                    best = (rank, name)
+        if best and best[0] == 0:
+            break
+    return best[1] if best else None
+
+def extract_customer_info(script, honorific=True):
+    """1차 분석 전 로컬 추출. 반환: {"name", "phone"} (찾지 못한 값은 None)"""
+    return {"name": extract_name(script, honorific=honorific), "phone": extract_phone(script)}
+
+def merge_customer_info(local, model):
+    """
+    없는 필드는 서로 채웁니다. 전화번호는 로컬 추출값을 우선하고,
+    이름은 둘이 다르면 모델 추출값을 씁니다. (정규식 이름은 오탐이 더 잦음)
+    """
+    model = model or {}
+    local = local or {}
+    name = model.get("name") if _norm_name(model.get("name")) else local.get("name")
+    return {"name": name or None, "phone": local.get("phone") or model.get("phone")}
+
+# ------------------------------------------
+# 고객 조회/생성 선행 실행
+# ------------------------------------------
+
+def prefetch_customer(phone):
+    """
+    전화번호를 찾았으면 기존 고객 조회(find_customer)를 백그라운드로 바로 시작합니다. (번호당 1회)
+    조회만 하고 만들지는 않음 -> 신규 고객은 상담원이 이름/번호를 확정한 뒤 get_or_create_customer로 생성
+    결과는 take_prefetched_customer로 받아 씁니다.
+    """
+    from utils.db_manager import find_customer
+
+    key = normalize_phone(phone)
+    if not key:
+        return None
+    with _lock:
+        future = _prefetched.get(key)
+        if future is None or (future.done() and future.exception() is not None):
+            _prefetched[key] = _executor.submit(bind(find_customer), phone)
+    return key
+
+def take_prefetched_customer(phone, timeout=5.0):
+    """
+    확정된 전화번호로 미리 조회한 기존 고객을 반환합니다.
+    선행 조회가 없거나, 기존 고객이 아니거나, 실패하면 None (호출 측에서 get_or_create_customer)
+    """
+    key = normalize_phone(phone)
+    with _lock:
+        future = _prefetched.pop(key, None) if key else None
+    if future is None:
+        return None
+    try:
+        return future.result(timeout=timeout)
+    except Exception as e:
+        print(f"고객 선행 조회 실패: {e}")
+        return None
+
+# ------------------------------------------
+# 모델 추출값과의 일치율
+# ------------------------------------------
+
+def _compare(local, model, normalize):
+    a, b = normalize(local), normalize(model)
+    if a is None and b is None:
+        return "both_missing"
+    if a is None:
+        return "model_only"
+    if b is None:
+        return "local_only"
+    return "agree" if a == b else "disagree"
+
+def _norm_name(name):
+    name = re.sub(r"\s+", "", name or "")
+    return re.sub(r"(고객)?님$", "", name) or None
+
+def record_agreement(local, model):
+    """로컬 추출값과 모델 추출값의 일치 여부를 필드별로 누적합니다. (값 자체는 저장하지 않음)"""
+    local, model = local or {}, model or {}
+    outcome = {
+        "phone": _compare(local.get("phone"), model.get("phone"), normalize_phone),
+        "name": _compare(local.get("name"), model.get("name"), _norm_name),
+    }
+    with _lock:
+        stats = _load_agreement()
+        stats["total"] = stats.get("total", 0) + 1
+        for field, result in outcome.items():
+            counts = stats.setdefault(field, {})
+            counts[result] = counts.get(result, 0) + 1
+        tmp = AGREEMENT_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(stats, f)
+        os.replace(tmp, AGREEMENT_FILE)
+    return outcome
+
+def _load_agreement():
+    try:
+        with open(AGREEMENT_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def agreement_summary():
+    """
+    필드별 일치율 요약 (관리자 KPI 탭)
+    agree_rate: 둘 다 찾은 경우 중 일치 비율, local_recall: 모델이 찾은 경우 중 로컬도 찾은 비율
+    """
+    stats = _load_agreement()
+    summary = {"total": stats.get("total", 0)}
+    for field in ("phone", "name"):
+        c = stats.get(field, {})
+        both = c.get("agree", 0) + c.get("disagree", 0)
+        model_found = both + c.get("model_only", 0)
+        summary[field] = dict(
+            c,
+            agree_rate=round(c.get("agree", 0) / both, 4) if both else None,
+            local_recall=round(both / model_found, 4) if model_found else None,
+        )
+    return summary
@@ -0,0 +1,129 @@
+import time
+import pandas as pd
+from utils.db_manager import (
+    fetch_all_kpi_data,
+    fetch_all_profiles,
+    fetch_consultation_types,
+    fetch_consultant_trends,
+    fetch_model_call_telemetry
+)
+from utils.model_telemetry import estimate_cost_usd
+
+# 대시보드에서 실제로 사용하는 컬럼만 조회 (Column Projection)
+PROFILE_COLUMNS = "id, email, department, total_coaching_count, avg_score, created_at"
+
+# KPI 탭 토큰 사용량 조회 기간 (일)
+TELEMETRY_DAYS = 30
+
+# True면 coaching_logs를 로컬 Parquet 스냅샷(증분 동기화)에서 읽음. 실패 시 Supabase 직접 조회로 폴백
+USE_ANALYTICS_SNAPSHOT = True
+
+def _timed(stats, name, fn, *args, **kwargs):
+    """fn 실행 시간을 측정해 stats에 기록합니다. (쿼리 1회 = 1 count)"""
+    started = time.perf_counter()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        stats["queries"] += 1
+        stats["timings"][name] = round((time.perf_counter() - started) * 1000, 1)
+
+def _to_kst(series):
+    """UTC 문자열/타임스탬프 Series를 Asia/Seoul 기준으로 한 번만 변환합니다."""
+    series = pd.to_datetime(series)
+    if series.dt.tz is None:
+        series = series.dt.tz_localize("UTC")
+    return series.dt.tz_convert("Asia/Seoul")
+
+def build_logs_frame(raw_logs):
+    """coaching_logs 레코드(list of dict 또는 스냅샷 DataFrame)를 타입이 지정된 DataFrame으로 변환합니다."""
+    if raw_logs is None or len(raw_logs) == 0:
+        return pd.DataFrame(columns=["ai_score", "created_at", "user_id", "consultation_type", "metrics"])
+
+    df = raw_logs if isinstance(raw_logs, pd.DataFrame) else pd.DataFrame(raw_logs)
+    df["created_at"] = _to_kst(df["created_at"])
+    df["ai_score"] = pd.to_numeric(df["ai_score"], errors="coerce").fillna(0)
+    if df["consultation_type"].dtype != "category":
+        df["consultation_type"] = df["consultation_type"].fillna("general").astype("category")
+    return df
+
+def _load_logs(stats):
+    """스냅샷 사용 시 증분 동기화 후 로컬에서 읽고, 실패하면 Supabase에서 직접 조회합니다."""
+    if USE_ANALYTICS_SNAPSHOT:
+        try:
+            from utils.analytics_snapshot import sync_snapshot, load_snapshot
+            sync = _timed(stats, "coaching_logs_sync", sync_snapshot)
+            stats["snapshot"] = sync
+            started = time.perf_counter()
+            frame = load_snapshot()
+            stats["timings"]["coaching_logs_snapshot_read"] = round((time.perf_counter() - started) * 1000, 1)
+            return frame
+        except Exception as e:
+            print(f"분석 스냅샷 로드 실패, Supabase 직접 조회로 대체: {e}")
+    return _timed(stats, "coaching_logs", fetch_all_kpi_data)
+
+def build_profiles_frame(profiles):
+    """profiles 레코드를 DataFrame으로 변환합니다. (집계 컬럼 결측치는 0으로 보정)"""
+    df = pd.DataFrame(profiles or [])
+    for col in ("total_coaching_count", "avg_score"):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+    return df
+
+def build_telemetry_frame(rows):
+    """모델 호출 텔레메트리 레코드를 DataFrame으로 변환하고 추정 비용 컬럼을 추가합니다."""
+    token_cols = ["prompt_tokens", "cached_tokens", "thoughts_tokens", "output_tokens", "total_tokens"]
+    df = pd.DataFrame(rows or [], columns=["created_at", "function", "category", "user_id",
+                                           "session_id", "latency_ms", "status"] + token_cols)
+    if df.empty:
+        df["cost_usd"] = pd.Series(dtype="float64")
+        return df
+    df[token_cols] = df[token_cols].apply(pd.to_numeric, errors="coerce").fillna(0).astype("int64")
+    df["category"] = df["category"].fillna("(분류 전)")
+    df["created_at"] = _to_kst(df["created_at"])
+    df["cost_usd"] = estimate_cost_usd(df["prompt_tokens"], df["cached_tokens"],
+                                       df["thoughts_tokens"], df["output_tokens"])
+    return df
+
+def build_trends_frame(rows):
+    """consultant_trends 레코드(상담원별 사전 계산된 추세/경고)를 DataFrame으로 변환합니다."""
+    df = pd.DataFrame(rows or [], columns=["user_id", "session_count", "total_mean", "recent_mean",
+                                           "growth", "ewma", "drift", "warnings", "updated_at"])
+    for col in ("total_mean", "recent_mean", "growth", "ewma"):
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df["warnings"] = df["warnings"].apply(lambda w: w if isinstance(w, list) else [])
+    return df
+
+def load_dashboard_data():
+    """
+    관리자 대시보드 1회 렌더링에 필요한 데이터를 한 번씩만 조회해 공유합니다.
+    (모든 탭이 같은 DataFrame을 사용하며, 쿼리 수/소요 시간이 stats에 기록됩니다)
+    """
+    stats = {"queries": 0, "timings": {}}
+    started = time.perf_counter()
+
+    raw_logs = _load_logs(stats)
+    profiles = _timed(stats, "profiles", fetch_all_profiles, columns=PROFILE_COLUMNS)
+    # include_desc=True 한 번으로 이름 목록까지 만들어 사용
+    types_detailed = _timed(stats, "consultation_types", fetch_consultation_types, include_desc=True) or []
+    telemetry = _timed(stats, "model_call_telemetry", fetch_model_call_telemetry, days=TELEMETRY_DAYS)
+    trends = _timed(stats, "consultant_trends", fetch_consultant_trends)
+
+    frame_started = time.perf_counter()
+    logs_df = build_logs_frame(raw_logs)
+    profiles_df = build_profiles_frame(profiles)
+    telemetry_df = build_telemetry_frame(telemetry)
+    trends_df = build_trends_frame(trends)
+    stats["timings"]["dataframes"] = round((time.perf_counter() - frame_started) * 1000, 1)
+
+    stats["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    stats["rows"] = {"coaching_logs": len(logs_df), "profiles": len(profiles_df), "model_calls": len(telemetry_df)}
+
+    return {
+        "logs": logs_df,
+        "profiles": profiles_df,
+        "types": [t if isinstance(t, str) else t["name"] for t in types_detailed],
+        "types_detailed": types_detailed,
+        "telemetry": telemetry_df,
+        "trends": trends_df,
+        "stats": stats
+    }
@@ -1,85 +1,376 @@
 import streamlit as st
-from supabase import create_client, Client
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from collections import Counter
+from functools import lru_cache
 import json
-import pandas as pd
+from utils.tracing import instrument_module
 
 # 1. Supabase 클라이언트 연결 (싱글톤 패턴 + 캐싱)
+# SDK import와 클라이언트 생성은 첫 DB 호출 시점으로 미룹니다. (로그인 화면 초기 로딩 단축)
 @st.cache_resource
-def init_supabase() -> Client:
+def init_supabase():
+    from supabase import create_client
     url = st.secrets["supabase"]["url"]
     key = st.secrets["supabase"]["key"]
     return create_client(url, key)
 
-supabase = init_supabase()
+_supabase = None
+
+def get_supabase():
+    """Supabase 클라이언트를 반환합니다. (최초 호출 시 생성 후 재사용)"""
+    global _supabase
+    if _supabase is None:
+        _supabase = init_supabase()
+    return _supabase
+
+def __getattr__(name):
+    # 하위 호환: `from utils.db_manager import supabase`
+    if name == "supabase":
+        return get_supabase()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# ==========================================
+# 📄 대용량 조회 (Keyset Pagination)
+# ==========================================
+# PostgREST는 한 번의 select에 최대 행 수(Supabase 기본 1000)를 적용하므로,
+# 단일 select로 전체를 읽으면 그 이상은 조용히 잘립니다.
+# (created_at, id) 키셋 기준으로 페이지를 나눠 순차 조회합니다.
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 1000  # 서버 max-rows보다 크면 짧은 페이지를 마지막으로 오인하므로 상한 적용
+CHANGE_EPOCH = "1970-01-01T00:00:00+00:00"  # 수정/삭제 워터마크 초기값
+
+def iter_coaching_logs(columns, filters=None, page_size=DEFAULT_PAGE_SIZE, after=None, key="created_at"):
+    """
+    coaching_logs를 (key, id) 오름차순 페이지(list of dict) 단위로 반환하는 제너레이터.
+    - filters: {"user_id": ...} 형태의 eq 조건
+    - after: {key: ..., "id": ...} 워터마크. 이 행 이후부터 조회
+    - key: 정렬/워터마크 컬럼 (기본 created_at, 수정분 동기화는 updated_at)
+    첫 페이지는 다음 페이지를 조회하기 전에 소비자에게 전달되므로, 메모리는 페이지 크기로 제한됩니다.
+    """
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    select_cols = columns
+    for col in (key, "id"):
+        if col not in [c.strip() for c in select_cols.split(",")]:
+            select_cols += f", {col}"
+
+    last_ts = after[key] if after else None
+    last_id = after["id"] if after else None
+    while True:
+        query = get_supabase().table("coaching_logs").select(select_cols)
+        for col, val in (filters or {}).items():
+            query = query.eq(col, val)
+        if last_ts is not None:
+            query = query.or_(
+                f'{key}.gt."{last_ts}",and({key}.eq."{last_ts}",id.gt.{last_id})'
+            )
+        page = query.order(key).order("id").limit(page_size).execute().data or []
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        last_ts, last_id = page[-1][key], page[-1]["id"]
+
+def fetch_log_tombstones(after=None, page_size=DEFAULT_PAGE_SIZE):
+    """
+    삭제된 coaching_logs ID (database/migration_snapshot_changes.sql 트리거가 기록)를
+    (deleted_at, log_id) 오름차순으로 조회합니다. after: {"deleted_at": ..., "log_id": ...}
+    """
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    rows = []
+    while True:
+        query = get_supabase().table("coaching_log_tombstones").select("log_id, deleted_at")
+        if after:
+            query = query.or_(
+                f'deleted_at.gt."{after["deleted_at"]}",and(deleted_at.eq."{after["deleted_at"]}",log_id.gt.{after["log_id"]})'
+            )
+        page = query.order("deleted_at").order("log_id").limit(page_size).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        after = page[-1]
+
+def fetch_log_change_marks():
+    """
+    현재 가장 최근의 수정(updated_at, id)과 삭제(deleted_at, log_id) 위치를 반환합니다.
+    스냅샷을 처음부터 만들기 직전에 호출해, 이후의 수정/삭제만 증분으로 받도록 합니다.
+    """
+    client = get_supabase()
+    updated = (
+        client.table("coaching_logs").select("id, updated_at").gt("updated_at", CHANGE_EPOCH)
+        .order("updated_at", desc=True).order("id", desc=True).limit(1).execute().data
+    )
+    deleted = (
+        client.table("coaching_log_tombstones").select("log_id, deleted_at")
+        .order("deleted_at", desc=True).order("log_id", desc=True).limit(1).execute().data
+    )
+    return {
+        "updated": updated[0] if updated else {"updated_at": CHANGE_EPOCH, "id": 0},
+        "deleted": deleted[0] if deleted else {"deleted_at": CHANGE_EPOCH, "log_id": 0},
+    }
+
+def _score_sum_and_count(filters=None, page_size=DEFAULT_PAGE_SIZE):
+    """ai_score 합계와 건수를 페이지 단위로 누적 계산합니다. (전체 행을 메모리에 올리지 않음)"""
+    total, count = 0, 0
+    for page in iter_coaching_logs("ai_score", filters=filters, page_size=page_size):
+        for r in page:
+            total += r["ai_score"] or 0
+            count += 1
+    return total, count
 
 def fetch_global_avg_score():
-    """전체 상담 기록의 평균 점수를 반환합니다."""
+    """
+    전체 상담 기록의 평균 점수를 반환합니다.
+    coaching_logs를 다시 집계하지 않고 상담원별 프로필 집계(건수, 평균)를 건수로 가중 평균합니다.
+    """
     try:
-        # ai_score 컬럼만 가져와서 평균 계산 (MVP 최적화)
-        res = supabase.table("coaching_logs").select("ai_score").execute()
-        if not res.data:
+        profiles = get_supabase().table("profiles").select("total_coaching_count, avg_score").gt(
+            "total_coaching_count", 0
+        ).execute().data
+        count = sum(p["total_coaching_count"] for p in profiles)
+        if not count:
             return 0
-        
-        scores = [r['ai_score'] for r in res.data]
-        return sum(scores) / len(scores)
+        return sum(p["total_coaching_count"] * (p["avg_score"] or 0) for p in profiles) / count
     except Exception as e:
         print(f"전체 평균 조회 실패: {e}")
         return 0
 
+def refresh_profile_stats(user_id):
+    """
+    상담원 프로필의 상담 건수 / 평균 점수를 다시 계산합니다. (저장 후 호출)
+    refresh_profile_stats RPC(database/migration_profile_stats.sql)로 DB에서 집계합니다.
+    """
+    try:
+        get_supabase().rpc("refresh_profile_stats", {"p_user_id": user_id}).execute()
+        return
+    except Exception as e:
+        # 마이그레이션 적용 전: 상담원 로그를 페이지 단위로 누적
+        print(f"프로필 통계 RPC 실패, 기존 방식으로 처리: {e}")
+
+    total, new_count = _score_sum_and_count(filters={"user_id": user_id})
+    if new_count:
+        get_supabase().table("profiles").update({
+            "total_coaching_count": new_count,
+            "avg_score": round(total / new_count, 1)
+        }).eq("id", user_id).execute()
+
 # ==========================================
 # 💾 파일 업로드 (Supabase Storage)
 # ==========================================
-import uuid
+import hashlib
+import base64
+import threading
+
+# 이 크기 이상은 TUS 재개 가능(resumable) 업로드로 청크 전송 (Supabase는 6MB 청크 고정)
+RESUMABLE_THRESHOLD = 6 * 1024 * 1024
+RESUMABLE_CHUNK_SIZE = 6 * 1024 * 1024
+
+UPLOAD_LOCK_STRIPES = 64
+_upload_locks = [threading.Lock() for _ in range(UPLOAD_LOCK_STRIPES)]  # 같은 객체 동시 업로드 방지
+_resumable_urls = {}                          # object_path -> 진행 중인 TUS 업로드 URL
+
+def _upload_lock(object_path):
+    """객체 경로의 업로드 잠금 (잠금 수가 고정이라 객체 수와 무관하게 메모리가 늘지 않음, 중첩 사용 금지)"""
+    return _upload_locks[hash(object_path) % UPLOAD_LOCK_STRIPES]
+
+def content_hash(file_bytes):
+    """파일 내용의 SHA-256 해시 (Storage 객체 이름으로 사용, bytes/memoryview/mmap 모두 가능)"""
+    return hashlib.sha256(file_bytes).hexdigest()
+
+def _auth_headers():
+    key = st.secrets["supabase"]["key"]
+    token = key
+    try:
+        session = get_supabase().auth.get_session()
+        if session:
+            token = session.access_token
+    except Exception:
+        pass
+    return {"apikey": key, "authorization": f"Bearer {token}"}
+
+def _media_object_exists(bucket, filename):
+    """media_objects 테이블(없으면 Storage 목록)로 객체 존재 여부를 확인합니다."""
+    try:
+        res = get_supabase().table("media_objects").select("object_path").eq("object_path", f"{bucket}/{filename}").execute()
+        return bool(res.data)
+    except Exception:
+        listed = get_supabase().storage.from_(bucket).list("", {"search": filename, "limit": 1})
+        return any(o.get("name") == filename for o in listed or [])
+
+def _register_media_object(bucket, filename, digest, size, public_url):
+    """업로드 완료된 객체를 참조 카운트 테이블에 등록합니다. (ref_count는 coaching_logs 트리거가 관리)"""
+    try:
+        get_supabase().table("media_objects").upsert({
+            "object_path": f"{bucket}/{filename}",
+            "bucket": bucket,
+            "content_hash": digest,
+            "size_bytes": size,
+            "public_url": public_url
+        }, on_conflict="object_path", ignore_duplicates=True).execute()
+    except Exception as e:
+        print(f"media_objects 등록 실패: {e}")
 
-def upload_audio_file(file_bytes, file_ext="mp3"):
+def _resumable_upload(bucket, filename, file_bytes, content_type):
+    """
+    TUS 프로토콜로 청크 업로드합니다. 중단된 업로드는 같은 객체를 다시 올릴 때 이어서 전송합니다.
+    """
+    import requests
+
+    object_path = f"{bucket}/{filename}"
+    base_url = st.secrets["supabase"]["url"].rstrip("/")
+    headers = {**_auth_headers(), "tus-resumable": "1.0.0"}
+    data = memoryview(file_bytes)
+
+    upload_url = _resumable_urls.get(object_path)
+    offset = 0
+    if upload_url:
+        head = requests.head(upload_url, headers=headers, timeout=30)
+        if head.status_code == 200:
+            offset = int(head.headers.get("upload-offset", 0))
+        else:
+            upload_url = None
+
+    if not upload_url:
+        metadata = {"bucketName": bucket, "objectName": filename, "contentType": content_type, "cacheControl": "3600"}
+        res = requests.post(
+            f"{base_url}/storage/v1/upload/resumable",
+            headers={
+                **headers,
+                "upload-length": str(len(data)),
+                "upload-metadata": ",".join(f"{k} {base64.b64encode(v.encode()).decode()}" for k, v in metadata.items())
+            },
+            timeout=30
+        )
+        res.raise_for_status()
+        upload_url = res.headers["location"]
+        _resumable_urls[object_path] = upload_url
+
+    while offset < len(data):
+        chunk = data[offset:offset + RESUMABLE_CHUNK_SIZE]
+        res = requests.patch(
+            upload_url,
+            headers={**headers, "upload-offset": str(offset), "content-type": "application/offset+octet-stream"},
+            data=chunk.tobytes(),
+            timeout=120
+        )
+        res.raise_for_status()
+        offset = int(res.headers.get("upload-offset", offset + len(chunk)))
+
+    _resumable_urls.pop(object_path, None)
+
+def upload_audio_file(file_bytes=None, file_ext="mp3", file_path=None):
     """
     Supabase Storage 'recordings' 버킷에 오디오를 업로드하고 Public URL을 반환합니다.
+    객체 이름은 내용 해시이므로 같은 파일은 한 번만 저장되며, 이미 있으면 업로드를 생략합니다.
+    file_path를 주면 파일을 메모리에 읽지 않고 mmap으로 해시 계산/청크 전송을 하며,
+    일반 업로드에는 경로를 그대로 전달합니다.
     """
+    from utils.session_payloads import open_mapped
+
     try:
-        filename = f"{uuid.uuid4()}.{file_ext}"
-        bucket = "recordings"
-        
-        # Upload
-        supabase.storage.from_(bucket).upload(
-            path=filename,
-            file=file_bytes,
-            file_options={"content-type": f"audio/{file_ext}"}
-        )
-        
-        # Get Public URL
-        # get_public_url returns a string directly in newer generic clients, 
-        # but let's check return type. Usually it's a string url.
-        public_url = supabase.storage.from_(bucket).get_public_url(filename)
-        return public_url
+        if file_path is not None:
+            with open_mapped(file_path) as view:
+                return _upload_audio(view, file_ext, file_path)
+        return _upload_audio(file_bytes, file_ext, None)
     except Exception as e:
         # st.error might be annoying if called from non-ui context but fine here
         print(f"오디오 업로드 에러: {e}") 
         return None
 
+def _upload_audio(data, file_ext, file_path):
+    digest = content_hash(data)
+    filename = f"{digest}.{file_ext}"
+    bucket = "recordings"
+    public_url = get_supabase().storage.from_(bucket).get_public_url(filename)
+
+    with _upload_lock(f"{bucket}/{filename}"):
+        if _media_object_exists(bucket, filename):
+            return public_url
+
+        content_type = f"audio/{file_ext}"
+        if len(data) >= RESUMABLE_THRESHOLD:
+            _resumable_upload(bucket, filename, data, content_type)
+        else:
+            try:
+                get_supabase().storage.from_(bucket).upload(
+                    path=filename,
+                    file=file_path if file_path is not None else data,
+                    file_options={"content-type": content_type}
+                )
+            except Exception as e:
+                # 같은 해시 객체가 이미 저장됨 (다른 프로세스가 먼저 업로드)
+                if "Duplicate" not in str(e) and "already exists" not in str(e):
+                    raise
+
+        _register_media_object(bucket, filename, digest, len(data), public_url)
+    return public_url
+
+REFERENCE_MIME_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "txt": "text/plain"
+}
+
+def fetch_reference_file(digest):
+    """
+    내용 해시로 이미 등록된 참고자료 파일(추출 텍스트, 페이지 수, 토큰 추정치, 사용 상황 요약)을 조회합니다.
+    """
+    try:
+        res = get_supabase().table("reference_files").select("*").eq("content_hash", digest).execute()
+        return res.data[0] if res.data else None
+    except Exception as e:
+        print(f"참고자료 파일 캐시 조회 실패: {e}")
         return None
 
+def save_reference_file(digest, file_url, file_ext, extracted_text=None, page_count=None,
+                        token_estimate=None, usage_summary=None):
+    """최초 업로드 시 계산한 추출 결과와 요약을 내용 해시 기준으로 저장합니다."""
+    try:
+        get_supabase().table("reference_files").upsert({
+            "content_hash": digest,
+            "file_url": file_url,
+            "file_ext": file_ext,
+            "extracted_text": extracted_text,
+            "page_count": page_count,
+            "token_estimate": token_estimate,
+            "usage_summary": usage_summary
+        }, on_conflict="content_hash").execute()
+        return True
+    except Exception as e:
+        print(f"참고자료 파일 캐시 저장 실패: {e}")
+        return False
+
 def upload_reference_file(file_bytes, file_ext="pdf"):
     """
     Supabase Storage 'references' 버킷에 파일을 업로드하고 Public URL을 반환합니다.
+    객체 이름은 내용 해시이며, 이미 등록된 파일은 업로드 없이 기존 URL을 반환합니다.
     """
     try:
-        filename = f"{uuid.uuid4()}.{file_ext}"
+        digest = content_hash(file_bytes)
+        filename = f"{digest}.{file_ext}"
         bucket = "references"
+
+        known = fetch_reference_file(digest)
+        if known:
+            return known["file_url"]
         
         # Upload
         # content-type 설정: pdf, docx 등
-        mime_type = "application/pdf"
-        if file_ext == "docx": mime_type = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-        elif file_ext == "txt": mime_type = "text/plain"
+        mime_type = REFERENCE_MIME_TYPES.get(file_ext, "application/pdf")
         
-        supabase.storage.from_(bucket).upload(
-            path=filename,
-            file=file_bytes,
-            file_options={"content-type": mime_type}
-        )
+        with _upload_lock(f"{bucket}/{filename}"):
+            try:
+                get_supabase().storage.from_(bucket).upload(
+                    path=filename,
+                    file=file_bytes,
+                    file_options={"content-type": mime_type}
+                )
+            except Exception as e:
+                # 같은 내용의 파일이 Storage에는 이미 있음 (메타데이터 저장 전 중단된 경우)
+                if "Duplicate" not in str(e) and "already exists" not in str(e):
+                    raise
         
-        public_url = supabase.storage.from_(bucket).get_public_url(filename)
+        public_url = get_supabase().storage.from_(bucket).get_public_url(filename)
         return public_url
     except Exception as e:
         print(f"파일 업로드 에러: {e}") 
@@ -94,7 +385,7 @@ def get_user_profile(user_id):
     로그인한 유저의 권한(is_admin, is_consultant) 및 정보를 가져옵니다.
     """
     try:
-        response = supabase.table("profiles").select("*").eq("id", user_id).execute()
+        response = get_supabase().table("profiles").select("*").eq("id", user_id).execute()
         if response.data:
             return response.data[0]
         return None
@@ -120,7 +411,7 @@ def create_profile_if_not_exists(user, is_admin=False):
             "total_coaching_count": 0,
             "avg_score": 0.0
         }
-        supabase.table("profiles").insert(new_profile).execute()
+        get_supabase().table("profiles").insert(new_profile).execute()
         return new_profile
     return existing
 
@@ -128,19 +419,21 @@ def create_profile_if_not_exists(user, is_admin=False):
 # 📊 관리자 대시보드용 (Admin Dashboard)
 # ==========================================
 
-def fetch_all_kpi_data():
+def fetch_all_kpi_data(page_size=DEFAULT_PAGE_SIZE):
     """
     상담원 랭킹, 전체 평균 점수 등을 계산하기 위해 로그 데이터를 가져옵니다.
     (MVP에서는 DB에서 연산보다 데이터를 가져와서 Pandas로 처리하는게 빠릅니다)
     """
     # 점수와 날짜, 상담원 ID만 가져옴 (데이터 절약)
-    return supabase.table("coaching_logs").select(
-        "ai_score, created_at, user_id, consultation_type, metrics"
-    ).execute().data
+    return [
+        row
+        for page in iter_coaching_logs("ai_score, created_at, user_id, consultation_type, metrics", page_size=page_size)
+        for row in page
+    ]
 
 def fetch_all_guidelines():
     """현재 활성화된 모든 가이드라인 조회"""
-    return supabase.table("guidelines").select("*").order("category").execute().data
+    return get_supabase().table("guidelines").select("*").order("category").execute().data
 
 def add_new_guideline(category, raw_input, refined_content):
     """관리자가 입력한 새 가이드라인 추가"""
@@ -150,23 +443,38 @@ def add_new_guideline(category, raw_input, refined_content):
         "refined_content": refined_content,
         "is_active": True
     }
-    return supabase.table("guidelines").insert(data).execute()
+    return get_supabase().table("guidelines").insert(data).execute()
 
 def update_guideline_content(guideline_id, new_content):
     """가이드라인 내용을 수정합니다"""
-    return supabase.table("guidelines").update({"refined_content": new_content}).eq("id", guideline_id).execute()
+    return get_supabase().table("guidelines").update({"refined_content": new_content}).eq("id", guideline_id).execute()
 
 # ==========================================
 # 🎧 상담 코칭 및 고객 관리 (Coaching & CRM)
 # ==========================================
 
+# 2차 분석 프롬프트에 넣는 최근 고객 이력 건수 (ai_agent.generate_coaching_feedback과 동일)
+CUSTOMER_HISTORY_LIMIT = 3
+
 def get_or_create_customer(name, phone, initial_trait=None):
     """
     이름/전화번호로 고객을 찾고, 없으면 새로 만듭니다.
     (AI가 1차 추론한 정보를 바탕으로 실행)
+    정규화한 전화번호(phone_normalized, RPC 안에서 계산) 기준 upsert_customer RPC 한 번으로 처리하며,
+    consultation_history에는 최근 CUSTOMER_HISTORY_LIMIT건만 담겨 옵니다.
     """
+    try:
+        return get_supabase().rpc("upsert_customer", {
+            "p_name": name,
+            "p_phone": phone,
+            "p_history_limit": CUSTOMER_HISTORY_LIMIT
+        }).execute().data
+    except Exception as e:
+        # 마이그레이션(migration_customer_upsert.sql) 적용 전: 기존 조회 -> 생성 방식
+        print(f"고객 upsert RPC 실패, 기존 방식으로 처리: {e}")
+
     # 1. 조회
-    res = supabase.table("customers").select("*").eq("phone", phone).execute()
+    res = get_supabase().table("customers").select("*").eq("phone", phone).execute()
     
     if res.data:
         return res.data[0] # 기존 고객 반환
@@ -179,23 +487,44 @@ def get_or_create_customer(name, phone, initial_trait=None):
             "last_consultation_date": datetime.now().isoformat()
         }
         # 초기 특이사항이 있다면 히스토리에 넣기 애매하므로 일단 생성만
-        created = supabase.table("customers").insert(new_customer).execute()
+        created = get_supabase().table("customers").insert(new_customer).execute()
         return created.data[0]
 
+def find_customer(phone):
+    """
+    전화번호로 기존 고객만 조회합니다. (생성하지 않음, 없으면 None)
+    정규화는 find_customer RPC 안에서 계산하며, 반환 형태는 get_or_create_customer와 같습니다.
+    """
+    try:
+        return get_supabase().rpc("find_customer", {
+            "p_phone": phone,
+            "p_history_limit": CUSTOMER_HISTORY_LIMIT
+        }).execute().data
+    except Exception as e:
+        print(f"고객 조회 RPC 실패, 기존 방식으로 처리: {e}")
+
+    res = get_supabase().table("customers").select("*").eq("phone", phone).limit(1).execute()
+    return res.data[0] if res.data else None
+
 def fetch_active_guidelines(category):
     """
     특정 상담 카테고리(예: 'refund')에 맞는 가이드라인만 RAG용으로 조회
     """
     # 공통(common) 가이드 + 해당 카테고리 가이드 합치기
-    return supabase.table("guidelines").select("refined_content").or_(
+    return get_supabase().table("guidelines").select("refined_content").or_(
         f"category.eq.common,category.eq.{category}"
     ).eq("is_active", True).execute().data
 
-def save_coaching_result(user_id, customer_id, analysis_result, original_script, audio_url=None):
+def save_coaching_result(user_id, customer_id, analysis_result, original_script, audio_url=None, client_job_id=None):
     """
     [핵심] 코칭 결과를 저장하고, 고객 정보(History)를 업데이트합니다.
     (수정사항: audio_url 인자 추가 및 DB 저장 반영)
+    client_job_id: 백그라운드 저장 재시도 시 중복 insert를 막기 위한 멱등 키
+      이미 저장된 작업의 재시도면 기존 로그 id를 찾아, 후속 단계(고객 이력, 유사 상담 인덱스, 상담원 추세) 중
+      빠진 것만 다시 수행합니다. (각 단계는 log_id 기준 멱등)
+    반환: 저장된 로그 id (실패 시 False, client_job_id가 있으면 후속 단계 실패도 False -> 저장 큐가 재시도)
     """
+    failed_steps = []
     try:
         # 1. 코칭 로그 저장
         log_data = {
@@ -208,84 +537,194 @@ def save_coaching_result(user_id, customer_id, analysis_result, original_script,
             "metrics": analysis_result.get("metrics", {}),
             "ai_feedback": analysis_result.get("feedback", ""),
         }
-        supabase.table("coaching_logs").insert(log_data).execute()
-
-
+        if client_job_id:
+            log_data["client_job_id"] = client_job_id
+            res = get_supabase().table("coaching_logs").upsert(
+                log_data, on_conflict="client_job_id", ignore_duplicates=True
+            ).execute()
+            if not res.data:
+                # 이전 시도에서 이미 저장됨 -> 기존 로그 id로 후속 단계 확인
+                res = get_supabase().table("coaching_logs").select("id").eq("client_job_id", client_job_id).execute()
+        else:
+            res = get_supabase().table("coaching_logs").insert(log_data).execute()
+        log_id = res.data[0]["id"]
 
         # 2. 고객 정보 업데이트 (History Append) - customer_id가 있을 때만
         if customer_id:
             try:
                 # 기존 고객 정보 가져오기
-                cust = supabase.table("customers").select("consultation_history").eq("id", customer_id).execute().data[0]
+                cust = get_supabase().table("customers").select("consultation_history").eq("id", customer_id).execute().data[0]
                 history = cust["consultation_history"] if cust["consultation_history"] else []
                 
-                # 새 기록 추가
-                new_record = {
-                    "date": datetime.now().strftime("%Y-%m-%d"),
-                    "type": analysis_result.get("type"),
-                    "summary": analysis_result.get("summary", "상담 내용 없음"),
-                    "extracted_traits": analysis_result.get("customer_traits", "")
-                }
-                history.append(new_record)
-                
-                # DB 업데이트
-                supabase.table("customers").update({
-                    "consultation_history": history,
-                    "last_consultation_date": datetime.now().isoformat()
-                }).eq("id", customer_id).execute()
+                # 새 기록 추가 (재시도 시 이미 추가된 로그면 생략)
+                if not any(isinstance(h, dict) and h.get("log_id") == log_id for h in history):
+                    new_record = {
+                        "log_id": log_id,
+                        "date": datetime.now().strftime("%Y-%m-%d"),
+                        "type": analysis_result.get("type"),
+                        "summary": analysis_result.get("summary", "상담 내용 없음"),
+                        "extracted_traits": analysis_result.get("customer_traits", "")
+                    }
+                    history.append(new_record)
+                    
+                    # DB 업데이트
+                    get_supabase().table("customers").update({
+                        "consultation_history": history,
+                        "last_consultation_date": datetime.now().isoformat()
+                    }).eq("id", customer_id).execute()
             except Exception as e:
                 print(f"고객 이력 업데이트 실패 (ID: {customer_id}): {e}")
+                failed_steps.append("customer_history")
+
+        # 3. 중복/유사 상담 감지 인덱스에 추가
+        try:
+            from utils.near_duplicate import add_log
+            add_log(log_id, original_script)
+        except Exception as e:
+            print(f"유사 상담 인덱스 갱신 실패 (ID: {log_id}): {e}")
+            failed_steps.append("near_duplicate")
+
+        # 4. 상담원 추세/경고 상태 갱신 (최근 N건, EWMA, 지표 드리프트)
+        try:
+            from utils.consultant_trends import record_session
+            record_session(user_id, log_id, log_data["ai_score"], log_data["metrics"])
+        except Exception as e:
+            print(f"상담원 추세 갱신 실패 (user: {user_id}): {e}")
+            failed_steps.append("consultant_trends")
         
-        return True
+        if client_job_id and failed_steps:
+            print(f"후속 단계 실패, 재시도 필요 (ID: {log_id}): {failed_steps}")
+            return False
+        return log_id
     except Exception as e:
-        st.error(f"저장 중 오류 발생: {e}")
+        # 백그라운드 저장 스레드에서 호출되므로 화면 출력 대신 로그 (save_queue가 재시도)
+        print(f"저장 중 오류 발생: {e}")
         return False
         
     finally:
         # [추가] 3. 프로필 통계 업데이트 (Total Count & Avg Score)
         try:
-            # 전체 로그 다시 조회해서 정확하게 계산 (MVP 방식)
-            res = supabase.table("coaching_logs").select("ai_score").eq("user_id", user_id).execute()
-            all_logs = res.data if res.data else []
-            
-            if all_logs:
-                new_count = len(all_logs)
-                new_avg = sum([l['ai_score'] for l in all_logs]) / new_count
-                
-                supabase.table("profiles").update({
-                    "total_coaching_count": new_count,
-                    "avg_score": round(new_avg, 1)
-                }).eq("id", user_id).execute()
+            # DB에서 상담원 로그를 집계해 갱신 (RPC 1회)
+            refresh_profile_stats(user_id)
         except Exception as e:
             print(f"프로필 통계 업데이트 실패: {e}")
     
     
+def find_logs_by_audio(file_path, user_id, file_ext="mp3", limit=3):
+    """
+    같은 오디오 파일로 이미 저장된 상담원 본인의 상담 로그를 찾습니다.
+    오디오는 내용 해시 이름으로 저장되므로 업로드 없이 URL을 계산해 audio_url로 조회합니다.
+    """
+    from utils.session_payloads import open_mapped
+
+    try:
+        with open_mapped(file_path) as view:
+            digest = content_hash(view)
+        url = get_supabase().storage.from_("recordings").get_public_url(f"{digest}.{file_ext}")
+        return get_supabase().table("coaching_logs").select(
+            "id, created_at, user_id, consultation_type, ai_score"
+        ).eq("audio_url", url).eq("user_id", user_id).order("created_at", desc=True).limit(limit).execute().data
+    except Exception as e:
+        print(f"오디오 중복 조회 실패: {e}")
+        return []
+
+def fetch_owned_log_ids(log_ids, user_id):
+    """log_ids 중 user_id 상담원의 로그 id만 반환합니다. (입력 순서 유지)"""
+    if not log_ids:
+        return []
+    rows = get_supabase().table("coaching_logs").select("id").in_("id", list(log_ids)).eq("user_id", user_id).execute().data
+    owned = {r["id"] for r in rows}
+    return [i for i in log_ids if i in owned]
+
 # [추가] 개발자 모드용: 권한 토글 함수
 def update_user_role(user_id, is_admin):
     """
     유저의 관리자 권한을 켜거나 끕니다.
     """
-    supabase.table("profiles").update({"is_admin": is_admin}).eq("id", user_id).execute()
+    get_supabase().table("profiles").update({"is_admin": is_admin}).eq("id", user_id).execute()
 
 def update_user_department(user_id, dept):
     """
     유저의 부서 정보를 업데이트합니다.
     """
-    supabase.table("profiles").update({"department": dept}).eq("id", user_id).execute()
+    get_supabase().table("profiles").update({"department": dept}).eq("id", user_id).execute()
 
-def fetch_all_profiles():
+def fetch_all_profiles(columns="*"):
     """관리자 페이지에서 상담원 목록을 보기 위해 모든 프로필을 가져옵니다."""
-    return supabase.table("profiles").select("*").order("created_at").execute().data
+    return get_supabase().table("profiles").select(columns).order("created_at").execute().data
+
+# 목록/차트용 요약 컬럼 (original_script, ai_feedback 같은 대용량 텍스트 제외)
+LOG_SUMMARY_COLUMNS = "id, created_at, consultation_type, ai_score"
+LOG_DETAIL_COLUMNS = "id, created_at, customer_id, consultation_type, ai_score, metrics, ai_feedback, original_script, audio_url"
+
+def fetch_consultant_log_page(user_id, page_size=20, before=None):
+    """
+    상담원의 상담 이력 요약을 최신순으로 한 페이지 조회합니다.
+    before: 이전 페이지의 마지막 행 ({"created_at", "id"}). 이 행보다 오래된 기록부터 조회
+    """
+    query = get_supabase().table("coaching_logs").select(LOG_SUMMARY_COLUMNS).eq("user_id", user_id)
+    if before:
+        query = query.or_(
+            f'created_at.lt."{before["created_at"]}",and(created_at.eq."{before["created_at"]}",id.lt.{before["id"]})'
+        )
+    return query.order("created_at", desc=True).order("id", desc=True).limit(page_size).execute().data or []
+
+@lru_cache(maxsize=64)
+def _fetch_log_detail_cached(user_id, log_id):
+    # 소유자 조건을 쿼리에 포함하고 캐시 키에도 넣어, 다른 상담원의 세션에 캐시된 행이 반환되지 않도록 함
+    res = get_supabase().table("coaching_logs").select(LOG_DETAIL_COLUMNS).eq("id", log_id).eq("user_id", user_id).execute()
+    if not res.data:
+        raise LookupError(log_id)  # 없는(또는 본인 것이 아닌) 결과는 캐시하지 않음
+    return res.data[0]
+
+def fetch_log_detail(log_id, user_id):
+    """
+    상담 1건의 상세 내용(피드백, 전문, 오디오)을 조회합니다. (상세 화면을 열 때만 호출, LRU 캐시)
+    user_id: 조회하는 상담원. 본인의 상담이 아니면 None
+    """
+    try:
+        return dict(_fetch_log_detail_cached(user_id, log_id))
+    except Exception as e:
+        print(f"상담 상세 조회 실패 (ID: {log_id}): {e}")
+        return None
+
+def update_coaching_log_type(log_id, consultation_type):
+    """
+    저장된 상담의 유형을 수정합니다. (빠른 모드 결과 화면에서 상담원이 유형을 고칠 때)
+    고객 consultation_history의 같은 로그(log_id) 항목도 함께 고칩니다.
+    분석 스냅샷은 updated_at 트리거(migration_snapshot_changes.sql)로 다음 갱신 때 반영됩니다.
+    """
+    try:
+        res = get_supabase().table("coaching_logs").update({"consultation_type": consultation_type}).eq("id", log_id).execute()
+        _fetch_log_detail_cached.cache_clear()
+    except Exception as e:
+        print(f"상담 유형 수정 실패 (ID: {log_id}): {e}")
+        return False
+
+    customer_id = res.data[0].get("customer_id") if res.data else None
+    if customer_id:
+        try:
+            cust = get_supabase().table("customers").select("consultation_history").eq("id", customer_id).execute().data[0]
+            history = cust["consultation_history"] or []
+            changed = False
+            for h in history:
+                if isinstance(h, dict) and h.get("log_id") == log_id and h.get("type") != consultation_type:
+                    h["type"] = consultation_type
+                    changed = True
+            if changed:
+                get_supabase().table("customers").update({"consultation_history": history}).eq("id", customer_id).execute()
+        except Exception as e:
+            # 로그 유형은 이미 수정됨 -> 이력 표시만 이전 유형으로 남음
+            print(f"고객 이력 유형 수정 실패 (ID: {customer_id}): {e}")
+    return True
 
 def fetch_consultant_stats(user_id):
     """
     상담원 대시보드용: 최근 기록과 주요 취약점을 분석합니다.
     """
-    # 1. 최근 10건 로그 조회
-    # Recent Logs (Recent 20)
+    # 1. 최근 20건 요약 조회 (상세 내용은 fetch_log_detail로 필요할 때만)
     try:
-        res = supabase.table("coaching_logs").select("*").eq("user_id", user_id).order("created_at", desc=True).limit(20).execute()
-        logs = res.data if res.data else []
+        logs = fetch_consultant_log_page(user_id, page_size=20)
     except:
         logs = []
     
@@ -296,16 +735,11 @@ def fetch_consultant_stats(user_id):
     # [NEW] Category Counts (All Time)
     category_counts = {}
     try:
-        # Fetch only type column for lightweight counting
-        res_all = supabase.table("coaching_logs").select("consultation_type").eq("user_id", user_id).execute()
-        print("DEBUG: res_all data count:", len(res_all.data) if res_all.data else 0)
-        
-        if res_all.data:
-            df = pd.DataFrame(res_all.data)
-            print("DEBUG: DF columns:", df.columns)
-            if "consultation_type" in df.columns:
-                category_counts = df["consultation_type"].value_counts().to_dict()
-                print("DEBUG: Calculated counts:", category_counts)
+        # Fetch only type column for lightweight counting (페이지 단위 누적)
+        counter = Counter()
+        for page in iter_coaching_logs("consultation_type", filters={"user_id": user_id}):
+            counter.update(r["consultation_type"] for r in page)
+        category_counts = dict(counter.most_common())
     except Exception as e:
         print(f"Error fetching category counts: {e}") 
         
@@ -322,7 +756,7 @@ def fetch_consultant_stats(user_id):
 def fetch_consultation_types(include_desc=False):
     """DB에 등록된 활성 상담 유형 목록을 가져옵니다."""
     try:
-        res = supabase.table("consultation_types").select("name, description").eq("is_active", True).execute()
+        res = get_supabase().table("consultation_types").select("name, description").eq("is_active", True).execute()
         if not res.data:
             return ["refund", "tech", "inquiry", "general"] # Fallback
             
@@ -339,7 +773,7 @@ def add_consultation_type(name, description=None):
         data = {"name": name}
         if description:
             data["description"] = description
-        supabase.table("consultation_types").insert(data).execute()
+        get_supabase().table("consultation_types").insert(data).execute()
         return True, "성공"
     except Exception as e:
         return False, str(e)
@@ -348,7 +782,7 @@ def deactivate_consultation_type(name):
     """상담 유형 비활성화 (Soft Delete: 이름 변경 및 is_active=False)"""
     new_name = f"{name}(Unused_{datetime.now().strftime('%m%d%H%M')})"
     try:
-        supabase.table("consultation_types").update({
+        get_supabase().table("consultation_types").update({
             "name": new_name,
             "is_active": False
         }).eq("name", name).execute()
@@ -363,10 +797,11 @@ def fetch_kpi_trend():
     (날짜, 점수, 상담유형)
     """
     try:
-        return supabase.table("coaching_logs")\
-            .select("created_at, ai_score, consultation_type")\
-            .order("created_at")\
-            .execute().data
+        return [
+            row
+            for page in iter_coaching_logs("created_at, ai_score, consultation_type")
+            for row in page
+        ]
     except:
         return []
 
@@ -374,25 +809,40 @@ def fetch_kpi_trend():
 # 📚 참고자료(Reference Materials) 관리
 # ==========================================
 
-def fetch_references(category=None):
+def fetch_references(category=None, ready_only=False):
     """
     활성화된 참고자료 목록을 조회합니다.
     category가 있으면 해당 카테고리 + 'common'(공통) 자료를 가져옵니다.
+    ready_only=True면 수집(Ingestion)이 끝난 자료만 반환합니다. (코칭용)
     """
     try:
-        query = supabase.table("reference_materials").select("*").eq("is_active", True)
+        query = get_supabase().table("reference_materials").select("*").eq("is_active", True)
         if category:
             # category가 특정값 OR 'common' 인 것 조회
             # Supabase-py의 or_ 필터 사용
             query = query.or_(f"category.eq.{category},category.eq.common")
         
-        return query.order("created_at", desc=True).execute().data
+        rows = query.order("created_at", desc=True).execute().data
+        if ready_only:
+            rows = [r for r in rows if r.get("ingest_status") in (None, "ready")]
+        return rows
     except Exception as e:
         print(f"참고자료 조회 실패: {e}")
         return []
 
-def add_reference(category, title, content, summary=None, file_url=None):
-    """새 참고자료를 추가합니다."""
+def fetch_reference_contents(ref_ids):
+    """참고자료 본문만 조회합니다. 반환: {id: content} (프롬프트 번들에는 메타데이터만 있으므로 필요한 자료만 조회)"""
+    if not ref_ids:
+        return {}
+    try:
+        rows = get_supabase().table("reference_materials").select("id, content").in_("id", list(ref_ids)).execute().data
+        return {r["id"]: r.get("content") or "" for r in rows}
+    except Exception as e:
+        print(f"참고자료 본문 조회 실패: {e}")
+        return {}
+
+def add_reference(category, title, content, summary=None, file_url=None, content_hash=None):
+    """새 참고자료를 추가합니다. (content_hash: 첨부 파일의 reference_files 키)"""
     try:
         data = {
             "category": category,
@@ -401,16 +851,148 @@ def add_reference(category, title, content, summary=None, file_url=None):
             "summary": summary if summary else content[:200],
             "file_url": file_url
         }
-        supabase.table("reference_materials").insert(data).execute()
+        if content_hash:
+            data["content_hash"] = content_hash
+        get_supabase().table("reference_materials").insert(data).execute()
         return True, "저장 성공"
     except Exception as e:
         return False, str(e)
 
+def create_pending_reference(category, title, note=None):
+    """
+    수집 대기(pending) 상태의 참고자료 행을 만들고 반환합니다.
+    본문/요약/파일 정보는 수집 작업이 끝난 뒤 update_reference로 채워집니다.
+    """
+    data = {
+        "category": category,
+        "title": title,
+        "content": note or "",
+        "summary": "(분석 중)",
+        "ingest_status": "pending"
+    }
+    return get_supabase().table("reference_materials").insert(data).execute().data[0]
+
+def update_reference(ref_id, fields):
+    """참고자료 행의 일부 컬럼을 갱신합니다."""
+    return get_supabase().table("reference_materials").update(fields).eq("id", ref_id).execute()
+
 def delete_reference(ref_id):
     """참고자료 삭제 (Soft Delete)"""
     try:
-        supabase.table("reference_materials").update({"is_active": False}).eq("id", ref_id).execute()
+        get_supabase().table("reference_materials").update({"is_active": False}).eq("id", ref_id).execute()
         return True
     except Exception as e:
         print(f"참고자료 삭제 실패: {e}")
-        return False
\ No newline at end of file
+        return False
+
+# ==========================================
+# 🪙 모델 호출 텔레메트리
+# ==========================================
+
+def insert_model_call_telemetry(rows):
+    """모델 호출 토큰 사용량 행들을 한 번에 저장합니다. (utils/model_telemetry 백그라운드 스레드에서 호출)"""
+    try:
+        get_supabase().table("model_call_telemetry").insert(rows).execute()
+        return True
+    except Exception as e:
+        print(f"텔레메트리 저장 실패 ({len(rows)}건): {e}")
+        return False
+
+def fetch_model_call_telemetry(days=30, page_size=DEFAULT_PAGE_SIZE):
+    """최근 days일치 모델 호출 텔레메트리를 id 키셋 페이지 단위로 모두 조회합니다."""
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    rows, last_id = [], 0
+    try:
+        while True:
+            page = get_supabase().table("model_call_telemetry").select(
+                "id, created_at, function, category, user_id, session_id, latency_ms, status, "
+                "prompt_tokens, cached_tokens, thoughts_tokens, output_tokens, total_tokens"
+            ).gte("created_at", since).gt("id", last_id).order("id").limit(page_size).execute().data
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+            last_id = page[-1]["id"]
+    except Exception as e:
+        print(f"텔레메트리 조회 실패: {e}")
+        return rows
+
+# ==========================================
+# 📉 상담원 추세 & 경고 (utils/consultant_trends)
+# ==========================================
+
+def fetch_consultant_trend_state(user_id):
+    """상담원 1명의 추세 상태(state)를 조회합니다. (없으면 None)"""
+    rows = get_supabase().table("consultant_trends").select("state").eq("user_id", user_id).execute().data
+    return rows[0]["state"] if rows else None
+
+def upsert_consultant_trends(rows):
+    """상담원 추세 행들을 user_id 기준으로 저장합니다."""
+    try:
+        get_supabase().table("consultant_trends").upsert(rows, on_conflict="user_id").execute()
+        return True
+    except Exception as e:
+        print(f"상담원 추세 저장 실패 ({len(rows)}건): {e}")
+        return False
+
+def fetch_consultant_trends():
+    """대시보드용: 모든 상담원의 추세 요약과 경고 (상태 원본 제외)"""
+    try:
+        return get_supabase().table("consultant_trends").select(
+            "user_id, session_count, total_mean, recent_mean, growth, ewma, drift, warnings, updated_at"
+        ).execute().data
+    except Exception as e:
+        print(f"상담원 추세 조회 실패: {e}")
+        return []
+
+# ==========================================
+# 🔁 가이드라인 변경 후 재채점 (utils/rescoring)
+# ==========================================
+
+def fetch_rescored_log_ids(rules_versions, page_size=DEFAULT_PAGE_SIZE):
+    """주어진 규칙 버전으로 이미 재채점된 log_id 집합 (log_id 키셋 페이지 조회)"""
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    ids, last_id = set(), None
+    while True:
+        query = get_supabase().table("coaching_log_rescores").select("log_id").in_("rules_version", list(rules_versions))
+        if last_id is not None:
+            query = query.gt("log_id", last_id)
+        page = query.order("log_id").limit(page_size).execute().data or []
+        ids.update(r["log_id"] for r in page)
+        if len(page) < page_size:
+            return ids
+        last_id = page[-1]["log_id"]
+
+def insert_log_rescores(rows):
+    """재채점 결과를 저장합니다. (같은 로그/규칙 버전은 기존 행 유지)"""
+    try:
+        get_supabase().table("coaching_log_rescores").upsert(
+            rows, on_conflict="log_id,rules_version", ignore_duplicates=True
+        ).execute()
+        return True
+    except Exception as e:
+        print(f"재채점 결과 저장 실패 ({len(rows)}건): {e}")
+        return False
+
+# ==========================================
+# 📦 프롬프트 번들 (utils/prompt_bundles)
+# ==========================================
+
+def fetch_current_prompt_bundle(include_bundle=False):
+    """가장 최근 버전의 프롬프트 번들을 조회합니다. (없거나 실패하면 None)"""
+    columns = "version, content_hash, published_at" + (", bundle" if include_bundle else "")
+    try:
+        rows = get_supabase().table("prompt_bundles").select(columns).order("version", desc=True).limit(1).execute().data
+        return rows[0] if rows else None
+    except Exception as e:
+        print(f"프롬프트 번들 조회 실패: {e}")
+        return None
+
+def insert_prompt_bundle(row):
+    """새 버전의 프롬프트 번들을 저장합니다. (version 중복 시 예외 -> 동시 발행 중 하나만 성공)"""
+    return get_supabase().table("prompt_bundles").insert(row).execute()
+
+# ==========================================
+# ⏱️ 지연 시간 추적: 모든 함수 호출을 span으로 기록
+# ==========================================
+instrument_module(__name__, "db", exclude=("get_supabase", "__getattr__", "content_hash", "_auth_headers"))
@@ -0,0 +1,109 @@
+import time
+from utils.prompt_bundles import (
+    bundle_categories, bundle_references, bundle_rule_text, render_category_text, render_reference_list
+)
+from utils.topic_classifier import classify_topic
+
+# ==========================================
+# ⚡ 빠른 모드: 1차 + 2차 분석을 한 번의 모델 호출로 (텍스트 입력)
+# ==========================================
+# 기본 흐름은 1차 분석 -> 상담원 확인 -> 2차 코칭으로 모델을 두 번 왕복합니다.
+# 빠른 모드는 모델이 유형을 고르기 전에 필요한 입력을 모두 로컬에서 준비해 한 번에 보냅니다.
+#   - 유형 목록 / 참고자료 목록 / 유형별 가이드라인: 프롬프트 번들(캐시)
+#   - 가이드라인: 로컬 분류기 후보 유형(확신하면 1개)만, 분류기가 없으면 모든 유형 (공통 가이드는 1번만)
+#   - 참고자료 본문: 선택 전이므로 후보 유형 자료의 로컬 인덱스(BM25)에서 상담 내용과 관련된 청크만
+#   - 고객 이력: 로컬 추출한 전화번호로 미리 조회한 고객 (utils/customer_extractor)
+# 결과 화면에서 유형을 고치면 저장된 로그와 고객 이력 항목의 유형을 수정합니다. (update_coaching_log_type)
+
+FAST_TOP_CHUNKS = 8      # 프롬프트에 넣을 참고자료 청크 수 (전체 자료 합계)
+
+def _rule_text(bundle, topics):
+    """후보 유형들의 가이드라인. 번들 규칙은 '공통 + 유형'이므로 공통 부분은 한 번만 넣습니다."""
+    common = bundle_rule_text(bundle, "common")
+    blocks = [f"[공통]\n{common}"] if common else []
+    for topic in topics:
+        rules = bundle_rule_text(bundle, topic)
+        extra = rules[len(common):] if common and rules.startswith(common) else rules
+        if extra.strip():
+            blocks.append(f"[{topic}]\n{extra}")
+    return "\n".join(blocks)
+
+def reference_excerpts(script, references, top_k=FAST_TOP_CHUNKS):
+    """참고자료에서 상담 내용과 관련된 청크만 골라 [참고 문헌] 블록으로 만듭니다. (실시간 코칭도 사용)"""
+    from utils.reference_index import search
+
+    if not references:
+        return ""
+    by_id = {str(r["id"]): r for r in references}
+    hits = search(script, ref_ids=list(by_id), top_k=top_k)
+    if not hits:
+        return ""
+    grouped = {}
+    for h in sorted(hits, key=lambda h: (h["ref_id"], h["chunk"])):
+        grouped.setdefault(h["ref_id"], []).append(h["text"])
+    ref_text = "[참고 문헌 (법률, 규정, 매뉴얼) - 관련 발췌]\n"
+    for ref_id, texts in grouped.items():
+        ref_text += f"==== {by_id[ref_id]['title']} (ID:{ref_id}) ====\n" + "\n...\n".join(texts) + "\n================\n"
+    return ref_text
+
+def build_fast_prompt_args(script, bundle, guess=None):
+    """
+    analyze_and_coach 입력을 준비합니다. 반환: (prompt_args, rule_topics)
+    rule_topics: 가이드라인이 프롬프트에 들어간 유형 (결과 화면에서 유형 수정 시 안내용)
+    """
+    categories = bundle_categories(bundle)
+    active = [c["name"] if isinstance(c, dict) else c for c in categories]
+    references = bundle_references(bundle)
+
+    if guess and guess["confident"]:
+        topics = [guess["topic"]]
+    elif guess:
+        topics = [t for t in guess["candidates"] if t in active]
+    else:
+        topics = active
+    refs = [r for r in references if r.get("category") in set(topics) | {"common"}]
+
+    prompt_args = {
+        "category_text": bundle["category_text"] if bundle else render_category_text(categories),
+        "reference_list_text": render_reference_list(refs),
+        "rule_text": _rule_text(bundle, topics),
+        "reference_text": reference_excerpts(script, refs),
+        "topic_hint": guess["topic"] if guess and guess["confident"] else None,
+        "references": refs,
+    }
+    return prompt_args, topics
+
+def run_fast_coaching(script, bundle, history=None):
+    """
+    텍스트 스크립트를 한 번의 호출로 분석/코칭합니다.
+    반환: 2차 분석 결과와 같은 형태의 dict (+ top_3_topics, customer_info, recommended_ref_ids,
+    rule_topics, mode="fast", latency_ms). 모델 호출 실패 시 None
+    """
+    from utils.ai_agent import analyze_and_coach
+
+    started = time.perf_counter()
+    active = [c["name"] if isinstance(c, dict) else c for c in bundle_categories(bundle)]
+    guess = classify_topic(script, active)
+    prompt_args, rule_topics = build_fast_prompt_args(script, bundle, guess)
+
+    res = analyze_and_coach(script, history=history or [], **prompt_args)
+    if res is None:
+        return None
+
+    topics = res.get("top_3_topics") or []
+    if isinstance(topics, str): topics = [topics]
+    if guess and guess["confident"]:
+        topics = guess["candidates"]
+    # 가이드라인이 프롬프트에 들어간 유형 중에서 확정 (모델이 목록 밖 유형을 고르면 분류기/후보 1순위)
+    topic = next((t for t in topics if t in rule_topics), None) or (rule_topics[0] if rule_topics else "general")
+
+    res.update({
+        "type": topic,
+        "top_3_topics": topics,
+        "topic_source": "local" if guess and guess["confident"] else "model",
+        "rule_topics": rule_topics,
+        "transcript": None,
+        "mode": "fast",
+        "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+    })
+    return res
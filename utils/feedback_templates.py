@@ -0,0 +1,70 @@
+import re
+
+# ==========================================
+# 📝 구조화 코칭 결과 -> Markdown 피드백 (로컬 렌더링)
+# ==========================================
+# 2차 분석 지연의 대부분은 출력 토큰(긴 Markdown 피드백 + 전사문)입니다. 간결 모드(compact)에서는 모델이
+# 짧은 구조화 결과(findings: 잘한 점 / Before-After / 인용 참고자료 ID / 총평)만 출력하고,
+# 화면·DB에 저장하는 Markdown은 여기서 기존 피드백과 같은 구성으로 펼칩니다.
+
+# 모델 출력 계약 (ai_agent 프롬프트에 그대로 들어감)
+FINDINGS_SCHEMA = """
+        "findings": {
+            "good": ["잘한 점 (한 문장)", "..."],
+            "improve": [
+                {
+                    "issue": "아쉬운 점 (한 문장)",
+                    "before": "상담원의 실제 발화 (짧게 인용)",
+                    "after": "수정 제안 발화",
+                    "ref_id": 참고자료 ID 또는 null,
+                    "clause": "인용 조항/근거 (예: 제15조 환불)" 또는 null
+                }
+            ],
+            "overall": "총평 1~2문장"
+        }"""
+
+SECTION_GOOD = "### 1. 잘한 점 👍\n{items}\n"
+SECTION_IMPROVE = "### 2. 아쉬운 점 & 수정 제안 (Before & After) 🔧\n{items}\n"
+SECTION_OVERALL = "### 3. 총평 📝\n{text}\n"
+GOOD_ITEM = "- {text}"
+IMPROVE_ITEM = "**{n}. {issue}**\n- ❌ Before: \"{before}\"\n- ✅ After: \"{after}\""
+CITATION = "- 📚 근거: {source}"
+EMPTY = "- (없음)"
+
+def _clean(text):
+    """한 줄 항목용: 줄바꿈/중복 공백 제거, 양끝 따옴표 제거"""
+    return re.sub(r"\s+", " ", str(text or "")).strip().strip('"“”')
+
+def _citation(item, ref_titles):
+    ref_id, clause = item.get("ref_id"), _clean(item.get("clause"))
+    title = ref_titles.get(str(ref_id)) if ref_id is not None else None
+    if title and clause:
+        return CITATION.format(source=f"[{title}] {clause}")
+    if title or clause:
+        return CITATION.format(source=f"[{title}]" if title else clause)
+    return None
+
+def render_feedback(findings, references=None):
+    """
+    findings(dict) -> 기존 피드백과 같은 구성의 Markdown
+    references: 프롬프트에 넣은 참고자료 목록 (ref_id를 제목으로 표시, 목록에 없는 ID는 조항만 표시)
+    """
+    findings = findings or {}
+    ref_titles = {str(r["id"]): r.get("title") for r in references or [] if r.get("id") is not None}
+
+    good = [GOOD_ITEM.format(text=_clean(g)) for g in findings.get("good") or [] if _clean(g)]
+
+    improve = []
+    for item in findings.get("improve") or []:
+        if not isinstance(item, dict) or not _clean(item.get("issue")):
+            continue
+        block = IMPROVE_ITEM.format(n=len(improve) + 1, issue=_clean(item.get("issue")),
+                                    before=_clean(item.get("before")) or "-", after=_clean(item.get("after")) or "-")
+        citation = _citation(item, ref_titles)
+        improve.append(f"{block}\n{citation}" if citation else block)
+
+    return "\n".join([
+        SECTION_GOOD.format(items="\n".join(good) or EMPTY),
+        SECTION_IMPROVE.format(items="\n\n".join(improve) or EMPTY),
+        SECTION_OVERALL.format(text=_clean(findings.get("overall")) or "-"),
+    ])
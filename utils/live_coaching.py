@@ -0,0 +1,398 @@
+import io
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import wave
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.tracing import bind, span
+from utils.prompt_bundles import bundle_categories, bundle_references, bundle_rule_text
+from utils.topic_classifier import classify_topic
+from utils.fast_coaching import reference_excerpts
+
+# ==========================================
+# 🔴 통화 중 실시간 코칭 (Live Mode)
+# ==========================================
+# 통화 오디오를 조각(chunk) 단위로 받아 바로 전사하고, 누적 전사문의 최근 WINDOW_SECONDS 구간을
+# ANALYZE_EVERY_SECONDS마다 가이드라인/참고자료(번들 캐시 + 로컬 인덱스)와 비교해 짧은 알림(nudge)을 띄웁니다.
+#   - 전사: 조각별 병렬 호출, 도착 순서대로 이어 붙임 (사고 수준 low)
+#   - 분석: 동시에 1건만 (진행 중이면 다음 주기로 미룸). 조각 도착 -> 알림까지 NUDGE_DEADLINE_SECONDS를
+#     넘긴 결과는 이미 지난 대화이므로 버림 (종단 지연 상한)
+#   - 통화 종료: 전체 전사문으로 기존 2차 분석(generate_coaching_feedback) 리포트 1회
+# 녹음 파일을 실시간처럼 흘려보내는 재생(replay)으로 같은 경로를 시험할 수 있습니다.
+#
+#     python -m utils.live_coaching recording.wav --speed 2
+
+CHUNK_SECONDS = 5            # 재생 시 오디오 조각 길이
+WINDOW_SECONDS = 60          # 분석 창: 최근 60초 전사문
+ANALYZE_EVERY_SECONDS = 5    # 분석 주기 (새 전사문이 있을 때만)
+NUDGE_DEADLINE_SECONDS = 8   # 조각 도착 -> 알림 표시 허용 지연
+TRANSCRIBE_WORKERS = 2
+CONTEXT_TAIL_CHARS = 300     # 전사 호출에 넣을 직전 전사문 길이
+LIVE_TOP_CHUNKS = 3          # 분석 1회에 넣을 참고자료 청크 수
+RECENT_NUDGES = 5            # 반복 방지를 위해 프롬프트에 넣을 최근 알림 수
+TEXT_CHARS_PER_SECOND = 7    # 텍스트 재생 속도 (한국어 발화 약 7자/초)
+MP3_BYTES_PER_SECOND = 16000 # WAV 외 형식은 128kbps 기준으로 바이트 단위 분할
+
+MIME_BY_EXT = {".wav": "audio/wav", ".mp3": "audio/mp3", ".m4a": "audio/mp4"}
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))], 1)
+
+def _norm_nudge(text):
+    return re.sub(r"[\s.!~]+", "", text or "")
+
+class LiveCoachingSession:
+    """
+    통화 1건의 실시간 코칭 상태. add_chunk / add_text로 입력하고, poll_nudges로 새 알림을 가져갑니다.
+    bundle: 프롬프트 번들 (없으면 DB 조회, 유형별로 세션 안에서 캐시)
+    history: 고객 상담 이력 (종료 리포트용), category: 유형이 미리 정해진 경우
+    """
+
+    def __init__(self, bundle=None, history=None, category=None,
+                 analyze_every=ANALYZE_EVERY_SECONDS, window_seconds=WINDOW_SECONDS,
+                 deadline_seconds=NUDGE_DEADLINE_SECONDS):
+        self.id = uuid.uuid4().hex[:12]
+        self.bundle = bundle
+        self.history = history or []
+        self.category = category
+        self.analyze_every = analyze_every
+        self.window_seconds = window_seconds
+        self.deadline_seconds = deadline_seconds
+
+        self.started_at = time.monotonic()
+        self.segments = []      # [{"seq", "t", "arrived", "text"}] 도착 순서
+        self.nudges = []        # [{"t", "kind", "text", "ref_id", "latency_ms"}]
+        self.stats = {"chunks": 0, "transcribe_ms": [], "analyze_ms": [], "e2e_ms": [],
+                      "analyses": 0, "stale_dropped": 0, "transcribe_failed": 0}
+        self.closed = False
+
+        self._lock = threading.Lock()
+        self._new_text = threading.Event()
+        self._next_seq = 0
+        self._emit_seq = 0
+        self._pending = {}
+        self._analyzed_seq = -1
+        self._rules = {}
+        self._refs = None
+        self._active = None
+        self._pool = ThreadPoolExecutor(max_workers=TRANSCRIBE_WORKERS, thread_name_prefix=f"live-{self.id}")
+        self._loop = threading.Thread(target=bind(self._analysis_loop), name=f"live-analyze-{self.id}", daemon=True)
+        self._loop.start()
+
+    # ------------------------------------------
+    # 입력
+    # ------------------------------------------
+
+    def _take_seq(self):
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self.stats["chunks"] += 1
+        return seq
+
+    def add_chunk(self, audio_data, mime_type="audio/wav"):
+        """오디오 조각 1개를 전사 대기열에 넣습니다. (즉시 반환)"""
+        if self.closed:
+            return
+        seq, arrived = self._take_seq(), time.monotonic()
+        self._pool.submit(bind(self._transcribe), seq, audio_data, mime_type, arrived)
+
+    def add_text(self, text):
+        """이미 전사된 발화(외부 STT, 텍스트 재생)를 추가합니다."""
+        if self.closed:
+            return
+        self._append(self._take_seq(), text, time.monotonic())
+
+    def _transcribe(self, seq, audio_data, mime_type, arrived):
+        from utils.ai_agent import transcribe_chunk
+
+        started = time.perf_counter()
+        text = transcribe_chunk(audio_data, mime_type, context_tail=self.transcript[-CONTEXT_TAIL_CHARS:])
+        with self._lock:
+            self.stats["transcribe_ms"].append((time.perf_counter() - started) * 1000)
+            if text is None:
+                self.stats["transcribe_failed"] += 1
+        self._append(seq, text or "", arrived)
+
+    def _append(self, seq, text, arrived):
+        """조각이 끝난 순서와 관계없이 seq 순서대로 전사문에 붙입니다."""
+        with self._lock:
+            self._pending[seq] = (text.strip(), arrived)
+            while self._emit_seq in self._pending:
+                text, arrived = self._pending.pop(self._emit_seq)
+                if text:
+                    self.segments.append({"seq": self._emit_seq, "t": round(arrived - self.started_at, 2),
+                                          "arrived": arrived, "text": text})
+                self._emit_seq += 1
+        self._new_text.set()
+
+    # ------------------------------------------
+    # 슬라이딩 윈도 분석
+    # ------------------------------------------
+
+    @property
+    def transcript(self):
+        return "\n".join(s["text"] for s in self.segments)
+
+    def _window(self):
+        """최근 window_seconds 구간의 발화와 가장 최근 조각의 도착 시각"""
+        with self._lock:
+            if not self.segments or self.segments[-1]["seq"] <= self._analyzed_seq:
+                return None, None
+            newest = self.segments[-1]
+            window = [s for s in self.segments if s["arrived"] >= newest["arrived"] - self.window_seconds]
+            self._analyzed_seq = newest["seq"]
+        return "\n".join(s["text"] for s in window), newest["arrived"]
+
+    def _rule_text(self, category):
+        key = category or "common"
+        if key not in self._rules:
+            self._rules[key] = bundle_rule_text(self.bundle, key)
+        return self._rules[key]
+
+    def _references(self):
+        if self._refs is None:
+            self._refs = bundle_references(self.bundle)
+        return [r for r in self._refs if r.get("category") in (self.category, "common")]
+
+    def _detect_category(self):
+        """유형이 정해지지 않았으면 누적 전사문으로 로컬 분류 (확신할 때만 고정)"""
+        if self.category:
+            return
+        if self._active is None:
+            self._active = [c["name"] if isinstance(c, dict) else c for c in bundle_categories(self.bundle)]
+        guess = classify_topic(self.transcript, self._active)
+        if guess and guess["confident"]:
+            self.category = guess["topic"]
+
+    def _analysis_loop(self):
+        """새 전사문이 들어오면 분석. 직전 분석 시작부터 analyze_every가 지나지 않았으면 그만큼 기다림"""
+        last = 0.0
+        while not self.closed:
+            if not self._new_text.wait(timeout=1.0):
+                continue
+            wait = self.analyze_every - (time.monotonic() - last)
+            if wait > 0:
+                time.sleep(wait)
+            self._new_text.clear()
+            if self.closed:
+                break
+            last = time.monotonic()
+            try:
+                self.analyze_once()
+            except Exception as e:
+                print(f"실시간 분석 실패 (session: {self.id}): {e}")
+
+    def analyze_once(self):
+        """새 발화가 있으면 최근 구간을 1회 분석해 알림을 추가합니다. 반환: 추가된 알림 수"""
+        from utils.ai_agent import live_nudges
+
+        window_text, newest_arrived = self._window()
+        if not window_text:
+            return 0
+        with span("live.analyze", session=self.id):
+            started = time.perf_counter()
+            self._detect_category()
+            refs = self._references()
+            raw = live_nudges(
+                window_text,
+                rule_text=self._rule_text(self.category),
+                reference_text=reference_excerpts(window_text, refs, top_k=LIVE_TOP_CHUNKS),
+                recent_nudges=[n["text"] for n in self.nudges[-RECENT_NUDGES:]],
+                category=self.category
+            )
+        now = time.monotonic()
+        latency_ms = (now - newest_arrived) * 1000
+        with self._lock:
+            self.stats["analyses"] += 1
+            self.stats["analyze_ms"].append((time.perf_counter() - started) * 1000)
+            if latency_ms > self.deadline_seconds * 1000:
+                self.stats["stale_dropped"] += len(raw)
+                return 0
+            seen = {_norm_nudge(n["text"]) for n in self.nudges}
+            added = 0
+            for n in raw:
+                if _norm_nudge(n["text"]) in seen:
+                    continue
+                seen.add(_norm_nudge(n["text"]))
+                self.nudges.append({
+                    "t": round(now - self.started_at, 2), "kind": n.get("kind") or "compliance",
+                    "text": n["text"], "ref_id": n.get("ref_id"), "latency_ms": round(latency_ms, 1)
+                })
+                self.stats["e2e_ms"].append(latency_ms)
+                added += 1
+        return added
+
+    def poll_nudges(self, since=0):
+        """since번째 이후의 새 알림 목록 (화면 갱신용)"""
+        with self._lock:
+            return list(self.nudges[since:])
+
+    # ------------------------------------------
+    # 종료
+    # ------------------------------------------
+
+    def summary(self):
+        with self._lock:
+            s = self.stats
+            return {
+                "session": self.id,
+                "elapsed_s": round(time.monotonic() - self.started_at, 1),
+                "chunks": s["chunks"],
+                "segments": len(self.segments),
+                "analyses": s["analyses"],
+                "nudges": len(self.nudges),
+                "stale_dropped": s["stale_dropped"],
+                "transcribe_failed": s["transcribe_failed"],
+                "transcribe_ms_p50": _percentile(s["transcribe_ms"], 50),
+                "transcribe_ms_p95": _percentile(s["transcribe_ms"], 95),
+                "analyze_ms_p50": _percentile(s["analyze_ms"], 50),
+                "analyze_ms_p95": _percentile(s["analyze_ms"], 95),
+                "e2e_ms_p50": _percentile(s["e2e_ms"], 50),
+                "e2e_ms_p95": _percentile(s["e2e_ms"], 95),
+                "category": self.category,
+            }
+
+    def finish(self, report=True):
+        """
+        통화 종료: 남은 전사를 마치고 분석을 멈춘 뒤, 전체 전사문으로 2차 분석 리포트를 만듭니다.
+        report=False: 전사만 마무리 (전체 전사문으로 고객 이력을 찾은 뒤 make_report 호출)
+        반환: generate_coaching_feedback 결과 (+ transcript, type, live) / report=False면 None
+        """
+        self.closed = True
+        self._pool.shutdown(wait=True)
+        self._new_text.set()
+        self._loop.join(timeout=self.analyze_every + 1)
+        return self.make_report() if report else None
+
+    def make_report(self):
+        """finish 이후: 전체 전사문과 self.history로 2차 분석 리포트를 만듭니다. (전사문이 없으면 None)"""
+        from utils.ai_agent import generate_coaching_feedback
+
+        if not self.transcript:
+            return None
+
+        self._detect_category()
+        if not self.category:
+            guess = classify_topic(self.transcript)
+            self.category = guess["topic"] if guess else "general"
+        result = generate_coaching_feedback(
+            script=self.transcript, history=self.history, rule_text=self._rule_text(self.category),
+            references=self._references(), category=self.category
+        )
+        if result is None:
+            return None
+        result.update({"transcript": self.transcript, "type": self.category, "live": self.summary(),
+                       "live_nudges": list(self.nudges)})
+        return result
+
+# ==========================================
+# ▶️ 녹음 파일 재생 (실시간 스트림 흉내)
+# ==========================================
+
+def iter_audio_chunks(path, chunk_seconds=CHUNK_SECONDS):
+    """
+    녹음 파일을 chunk_seconds 길이 조각으로 나눕니다. 반환: (bytes, mime_type, 조각 길이 초) 이터레이터
+    WAV는 프레임 단위로 잘라 조각마다 헤더를 붙이고, 그 밖의 형식은 비트레이트 기준 바이트 단위로 자릅니다.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    mime_type = MIME_BY_EXT.get(ext, "audio/mp3")
+    if ext == ".wav":
+        with wave.open(path, "rb") as src:
+            params = src.getparams()
+            frames_per_chunk = max(1, int(params.framerate * chunk_seconds))
+            while True:
+                frames = src.readframes(frames_per_chunk)
+                if not frames:
+                    break
+                buf = io.BytesIO()
+                with wave.open(buf, "wb") as dst:
+                    dst.setparams(params)
+                    dst.writeframes(frames)
+                yield buf.getvalue(), mime_type, len(frames) / (params.sampwidth * params.nchannels) / params.framerate
+        return
+    size = int(MP3_BYTES_PER_SECOND * chunk_seconds)
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(size)
+            if not data:
+                break
+            yield data, mime_type, len(data) / MP3_BYTES_PER_SECOND
+
+def iter_text_chunks(script, chunk_seconds=CHUNK_SECONDS):
+    """전사 스크립트를 발화 단위로 나눠 말하는 속도(TEXT_CHARS_PER_SECOND)에 맞춘 조각으로 반환합니다."""
+    for line in (script or "").splitlines():
+        if line.strip():
+            yield line.strip(), max(0.5, min(chunk_seconds * 2, len(line) / TEXT_CHARS_PER_SECOND))
+
+def replay(session, path=None, script=None, speed=1.0, chunk_seconds=CHUNK_SECONDS):
+    """
+    녹음 파일(path) 또는 스크립트(script)를 실제 통화처럼 조각 길이만큼 기다리며 세션에 넣습니다.
+    speed: 재생 배속 (2.0이면 2배 빠르게). 블로킹 호출 -> 화면에서는 start_replay 사용
+    """
+    if path:
+        for data, mime_type, seconds in iter_audio_chunks(path, chunk_seconds):
+            if session.closed:
+                return
+            time.sleep(seconds / speed)   # 조각이 다 녹음된 시점에 도착
+            session.add_chunk(data, mime_type)
+    else:
+        for text, seconds in iter_text_chunks(script, chunk_seconds):
+            if session.closed:
+                return
+            time.sleep(seconds / speed)
+            session.add_text(text)
+
+def start_replay(session, path=None, script=None, speed=1.0):
+    """replay를 백그라운드 스레드로 시작합니다. 반환: Thread"""
+    thread = threading.Thread(target=bind(replay), args=(session, path, script, speed),
+                              name=f"live-replay-{session.id}", daemon=True)
+    thread.start()
+    return thread
+
+# ==========================================
+# 🖥️ CLI: 녹음 파일을 실시간으로 재생하며 알림 출력
+# ==========================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="녹음 파일/스크립트를 실시간 스트림처럼 재생하며 코칭 알림을 출력합니다.")
+    parser.add_argument("path", help="녹음 파일(.wav/.mp3/.m4a) 또는 전사 스크립트(.txt)")
+    parser.add_argument("--speed", type=float, default=1.0, help="재생 배속")
+    parser.add_argument("--category", default=None, help="상담 유형 (생략 시 로컬 분류기)")
+    parser.add_argument("--no-report", action="store_true", help="종료 후 2차 분석 리포트 생략")
+    args = parser.parse_args(argv)
+
+    from utils.prompt_bundles import load_current_bundle
+
+    session = LiveCoachingSession(bundle=load_current_bundle(), category=args.category)
+    if args.path.lower().endswith(".txt"):
+        with open(args.path, encoding="utf-8") as f:
+            thread = start_replay(session, script=f.read(), speed=args.speed)
+    else:
+        thread = start_replay(session, path=args.path, speed=args.speed)
+
+    shown = 0
+    while thread.is_alive():
+        thread.join(timeout=0.5)
+        for n in session.poll_nudges(shown):
+            print(f"[{n['t']:7.1f}s] 🔔 ({n['kind']}) {n['text']}  ({n['latency_ms']:.0f}ms)")
+        shown = len(session.nudges)
+
+    result = session.finish(report=not args.no_report)
+    for n in session.poll_nudges(shown):
+        print(f"[{n['t']:7.1f}s] 🔔 ({n['kind']}) {n['text']}  ({n['latency_ms']:.0f}ms)")
+    print(json.dumps(session.summary(), indent=2, ensure_ascii=False))
+    if result:
+        print(f"\n종합 점수: {result.get('score')}점 ({result.get('type')})\n")
+        print(result.get("feedback"))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,13 @@
+import os
+
+# 로컬 스냅샷/캐시/스풀 파일 저장 위치 (PASS_DATA_DIR 환경변수로 변경 가능)
+DATA_DIR = os.environ.get(
+    "PASS_DATA_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".pass_data")
+)
+
+def data_path(*parts):
+    """DATA_DIR 하위 경로를 반환합니다. (상위 디렉토리는 자동 생성)"""
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
@@ -0,0 +1,100 @@
+import atexit
+import threading
+from datetime import datetime, timezone
+from utils.tracing import get_session, get_user
+
+# ==========================================
+# 🪙 모델 호출 토큰/비용 텔레메트리
+# ==========================================
+# 모델 응답의 usage_metadata(프롬프트/캐시/사고/출력 토큰)와 지연 시간을 함수·카테고리·사용자별로
+# model_call_telemetry 테이블에 기록합니다. 행은 메모리에 모았다가 백그라운드 스레드가
+# 묶어서 insert하므로, 모델 호출 경로에는 네트워크 호출이 추가되지 않습니다.
+
+FLUSH_EVERY = 20             # 이만큼 모이면 바로 기록
+FLUSH_INTERVAL_SECONDS = 5   # 또는 이 주기마다 기록
+MAX_BUFFERED = 5000          # DB 장애 시 메모리에 보관할 최대 행 수 (초과분은 오래된 것부터 버림)
+
+# 추정 비용 계산용 단가 (USD / 100만 토큰). 요금표가 바뀌면 여기만 수정
+PRICE_PER_MTOK = {
+    "input": 0.50,
+    "cached": 0.05,
+    "output": 3.00,   # 사고(thinking) 토큰도 출력 단가로 과금
+}
+
+_buffer = []
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_worker = None
+
+def _usage_value(usage, name):
+    return int(getattr(usage, name, None) or 0) if usage is not None else 0
+
+def record_model_call(function, response=None, latency_ms=None, model=None, category=None, error=None):
+    """모델 호출 1건의 토큰 사용량을 기록 대기열에 넣습니다. (즉시 반환)"""
+    usage = getattr(response, "usage_metadata", None)
+    row = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "function": function,
+        "category": category,
+        "user_id": get_user(),
+        "session_id": get_session(),
+        "model": model,
+        "prompt_tokens": _usage_value(usage, "prompt_token_count"),
+        "cached_tokens": _usage_value(usage, "cached_content_token_count"),
+        "thoughts_tokens": _usage_value(usage, "thoughts_token_count"),
+        "output_tokens": _usage_value(usage, "candidates_token_count"),
+        "total_tokens": _usage_value(usage, "total_token_count"),
+        "latency_ms": round(latency_ms, 1) if latency_ms is not None else None,
+        "status": "error" if error else "ok",
+    }
+    with _lock:
+        _buffer.append(row)
+        if len(_buffer) > MAX_BUFFERED:
+            del _buffer[:len(_buffer) - MAX_BUFFERED]
+        size = len(_buffer)
+    _ensure_worker()
+    if size >= FLUSH_EVERY:
+        _wakeup.set()
+
+def flush():
+    """대기 중인 행을 한 번의 insert로 기록합니다. 실패하면 다음 주기에 다시 시도합니다."""
+    from utils.db_manager import insert_model_call_telemetry
+
+    with _lock:
+        rows = _buffer[:]
+        _buffer.clear()
+    if not rows:
+        return
+    if not insert_model_call_telemetry(rows):
+        with _lock:
+            _buffer[:0] = rows[-MAX_BUFFERED:]
+
+def _run():
+    while True:
+        _wakeup.wait(FLUSH_INTERVAL_SECONDS)
+        _wakeup.clear()
+        try:
+            flush()
+        except Exception as e:
+            print(f"텔레메트리 기록 실패: {e}")
+
+def _ensure_worker():
+    global _worker
+    if _worker is None:
+        with _lock:
+            if _worker is None:
+                _worker = threading.Thread(target=_run, name="model-telemetry", daemon=True)
+                _worker.start()
+                atexit.register(flush)
+
+# ==========================================
+# 📊 비용 추정 (관리자 KPI 탭)
+# ==========================================
+
+def estimate_cost_usd(prompt_tokens, cached_tokens, thoughts_tokens, output_tokens):
+    """토큰 수로 추정 비용(USD)을 계산합니다. (캐시 토큰은 프롬프트 토큰에 포함된 값)"""
+    return (
+        (prompt_tokens - cached_tokens) * PRICE_PER_MTOK["input"]
+        + cached_tokens * PRICE_PER_MTOK["cached"]
+        + (thoughts_tokens + output_tokens) * PRICE_PER_MTOK["output"]
+    ) / 1_000_000
@@ -0,0 +1,290 @@
+import os
+import re
+import json
+import threading
+import numpy as np
+from utils.local_store import data_path
+
+# ==========================================
+# 🪞 중복/유사 상담 감지 (MinHash + LSH)
+# ==========================================
+# 같은 통화를 다시 올리거나 텍스트를 조금 고쳐 다시 넣으면 모델 호출 2회가 낭비되고 상담원 평균 점수도 왜곡됩니다.
+# (사후 정리용 database/deduplicate_logs.sql 참고)
+# coaching_logs.original_script를 정규화한 뒤 글자 5-gram 집합의 MinHash 서명을 만들고,
+# 밴드(LSH) 키로 후보를 찾아 1차 분석 전에 유사한 기존 상담을 알려줍니다.
+#
+# 메모리 (로그 1건당): 밴드 키 정렬본 BANDS x (uint32 키 + uint32 위치) + 서명 하위 8비트 NUM_PERM바이트 + id 8바이트
+#   = 8 x 8 + 64 + 8 = 136바이트 -> 100만 건 약 130MB
+# 유사도는 서명 하위 8비트 일치율로 추정합니다. (b-bit MinHash, 우연 일치 1/256 보정)
+
+INDEX_DIR = os.path.dirname(data_path("near_duplicate", "_"))
+INDEX_FILE = os.path.join(INDEX_DIR, "index.npz")
+PENDING_FILE = os.path.join(INDEX_DIR, "pending.jsonl")
+WATERMARK_FILE = os.path.join(INDEX_DIR, "_watermark.json")
+
+SHINGLE = 5              # 글자 n-gram 크기
+NUM_PERM = 64            # MinHash 해시 함수 수
+BANDS = 8                # LSH 밴드 수 (BANDS x ROWS = NUM_PERM)
+ROWS = NUM_PERM // BANDS # 밴드당 행 수 -> 후보가 되는 유사도 임계 약 (1/BANDS)^(1/ROWS) = 0.77
+MIN_CHARS = 40           # 정규화 후 이보다 짧은 스크립트는 색인/검사하지 않음 (오탐 방지)
+DUPLICATE_THRESHOLD = 0.8
+COMPACT_EVERY = 2000     # 대기(pending) 항목이 이만큼 쌓이면 본 인덱스로 병합
+SHINGLE_BLOCK = 4096     # 긴 스크립트의 MinHash 계산 블록 크기 (임시 메모리 제한)
+OWNER_OVERFETCH = 10     # 상담원 본인 로그만 찾을 때 인덱스에서 limit의 몇 배까지 후보를 볼지
+SYNC_CHECKPOINT_ROWS = 100_000  # sync_index 중 이만큼마다 인덱스 저장 + 워터마크 전진
+
+_PRIME = np.uint64(4294967311)  # 2^32보다 큰 소수 (a*x + b가 uint64를 넘지 않음)
+_MASK32 = np.uint64(0xFFFFFFFF)
+_rng = np.random.RandomState(20240521)  # 고정 시드: 서명이 프로세스/서버 간에 같아야 함
+_A = _rng.randint(1, 2**32 - 1, size=NUM_PERM, dtype=np.uint64)[:, None]
+_B = _rng.randint(0, 2**32 - 1, size=NUM_PERM, dtype=np.uint64)[:, None]
+_BAND_MULT = np.uint64(0x9E3779B97F4A7C15) ** np.arange(ROWS, dtype=np.uint64)
+
+_lock = threading.Lock()
+_index = None
+
+# ------------------------------------------
+# 서명 계산
+# ------------------------------------------
+
+_SPEAKER = re.compile(r"^\s*[^\s:]{1,10}\s*:", re.MULTILINE)
+_GUEST_PREFIX = re.compile(r"^\[비회원 고객명:[^\]]*\]\s*")
+_KEEP = re.compile(r"[^0-9a-z가-힣]+")
+
+def normalize_script(text):
+    """화자 표시, 비회원 고객명 머리말, 공백/문장부호를 제거하고 소문자로 바꿉니다."""
+    text = _GUEST_PREFIX.sub("", (text or "").strip())
+    text = _SPEAKER.sub("", text.lower())
+    return _KEEP.sub("", text)
+
+def _shingle_hashes(text):
+    """글자 SHINGLE-gram의 32비트 다항식 해시 (중복 제거)"""
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    n = len(codes) - SHINGLE + 1
+    h = np.zeros(n, dtype=np.uint64)
+    for k in range(SHINGLE):
+        h = (h * np.uint64(1000003) + codes[k:k + n]) & _MASK32
+    return np.unique(h)
+
+def signature(script):
+    """
+    스크립트의 MinHash 서명(uint32, NUM_PERM개)을 반환합니다.
+    정규화 후 MIN_CHARS보다 짧으면 None
+    """
+    text = normalize_script(script)
+    if len(text) < MIN_CHARS:
+        return None
+    shingles = _shingle_hashes(text)
+    sig = np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    for start in range(0, len(shingles), SHINGLE_BLOCK):
+        block = shingles[start:start + SHINGLE_BLOCK][None, :]
+        np.minimum(sig, ((_A * block + _B) % _PRIME).min(axis=1), out=sig)
+    return (sig & _MASK32).astype(np.uint32)
+
+def band_keys(sigs):
+    """서명(N, NUM_PERM) -> 밴드 키(N, BANDS) uint32"""
+    sigs = np.atleast_2d(sigs).astype(np.uint64).reshape(-1, BANDS, ROWS)
+    with np.errstate(over="ignore"):
+        keys = (sigs * _BAND_MULT).sum(axis=2, dtype=np.uint64)
+    return ((keys ^ (keys >> np.uint64(32))) & _MASK32).astype(np.uint32)
+
+def estimate_similarity(sig8_a, sig8_b):
+    """하위 8비트 서명 일치율 -> Jaccard 유사도 추정치 (우연 일치 보정)"""
+    match = (np.atleast_2d(sig8_a) == sig8_b).mean(axis=-1)
+    return np.clip((match - 1 / 256) / (1 - 1 / 256), 0.0, 1.0)
+
+# ------------------------------------------
+# 인덱스
+# ------------------------------------------
+
+class MinHashIndex:
+    """
+    로그 id -> MinHash 서명 인덱스
+    본 인덱스는 밴드별로 정렬된 키 배열(searchsorted 조회), 최근 추가분은 작은 대기 목록으로 유지합니다.
+    """
+
+    def __init__(self, ids=None, sigs=None):
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.sig8 = np.zeros((0, NUM_PERM), dtype=np.uint8)
+        self.sorted_keys = np.zeros((BANDS, 0), dtype=np.uint32)
+        self.sorted_pos = np.zeros((BANDS, 0), dtype=np.uint32)
+        self.pending_ids, self.pending_sigs = [], []
+        if ids is not None and len(ids):
+            sigs = np.asarray(sigs, dtype=np.uint32)
+            self._build(np.asarray(ids, dtype=np.int64), band_keys(sigs), (sigs & 0xFF).astype(np.uint8))
+
+    def __len__(self):
+        return len(self.ids) + len(self.pending_ids)
+
+    @property
+    def nbytes(self):
+        return self.ids.nbytes + self.sig8.nbytes + self.sorted_keys.nbytes + self.sorted_pos.nbytes
+
+    def _build(self, ids, keys, sig8):
+        # 같은 로그가 여러 번 들어오면 마지막 것만 유지
+        _, last = np.unique(ids[::-1], return_index=True)
+        keep = np.sort(len(ids) - 1 - last)
+        ids, keys, sig8 = ids[keep], keys[keep], sig8[keep]
+        order = np.argsort(keys, axis=0, kind="stable").T.astype(np.uint32)   # (BANDS, N)
+        self.ids, self.sig8 = ids, sig8
+        self.sorted_keys = np.take_along_axis(keys.T, order, axis=1)
+        self.sorted_pos = order
+
+    def add(self, log_id, sig):
+        self.pending_ids.append(int(log_id))
+        self.pending_sigs.append(np.asarray(sig, dtype=np.uint32))
+
+    def query(self, sig, threshold=DUPLICATE_THRESHOLD, limit=3):
+        """서명과 유사도가 threshold 이상인 로그 [(log_id, similarity)] (유사도 내림차순)"""
+        keys = band_keys(sig)[0]
+        sig8 = (np.asarray(sig) & 0xFF).astype(np.uint8)
+        found = {}
+
+        if len(self.ids):
+            positions = []
+            for b in range(BANDS):
+                lo = np.searchsorted(self.sorted_keys[b], keys[b], side="left")
+                hi = np.searchsorted(self.sorted_keys[b], keys[b], side="right")
+                if hi > lo:
+                    positions.append(self.sorted_pos[b, lo:hi])
+            if positions:
+                rows = np.unique(np.concatenate(positions))
+                sims = estimate_similarity(sig8, self.sig8[rows])
+                for row, sim in zip(rows, sims):
+                    if sim >= threshold:
+                        found[int(self.ids[row])] = float(sim)
+
+        if self.pending_ids:
+            p_sigs = np.stack(self.pending_sigs)
+            hit = (band_keys(p_sigs) == keys).any(axis=1)
+            sims = estimate_similarity(sig8, (p_sigs & 0xFF).astype(np.uint8))
+            for i in np.nonzero(hit & (sims >= threshold))[0]:
+                found[self.pending_ids[i]] = float(sims[i])
+
+        return sorted(found.items(), key=lambda x: -x[1])[:limit]
+
+    def compact(self):
+        """대기 항목을 본 인덱스에 병합합니다. (정렬 재구성)"""
+        if not self.pending_ids:
+            return
+        # 본 인덱스는 하위 8비트만 보관하므로 밴드 키는 정렬 배열에서 복원
+        keys = np.empty((len(self.ids), BANDS), dtype=np.uint32)
+        for b in range(BANDS):
+            keys[self.sorted_pos[b], b] = self.sorted_keys[b]
+        p_sigs = np.stack(self.pending_sigs)
+        ids = np.concatenate([self.ids, np.asarray(self.pending_ids, dtype=np.int64)])
+        keys = np.concatenate([keys, band_keys(p_sigs)])
+        sig8 = np.concatenate([self.sig8, (p_sigs & 0xFF).astype(np.uint8)])
+        self.pending_ids, self.pending_sigs = [], []
+        self._build(ids, keys, sig8)
+
+    def save(self, path=INDEX_FILE):
+        self.compact()
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, ids=self.ids, sig8=self.sig8, sorted_keys=self.sorted_keys, sorted_pos=self.sorted_pos)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=INDEX_FILE):
+        index = cls()
+        if os.path.exists(path):
+            with np.load(path) as data:
+                index.ids, index.sig8 = data["ids"], data["sig8"]
+                index.sorted_keys, index.sorted_pos = data["sorted_keys"], data["sorted_pos"]
+        return index
+
+# ------------------------------------------
+# 앱에서 사용하는 함수 (프로세스당 인덱스 1개, 디스크에 유지)
+# ------------------------------------------
+
+def _get_index():
+    global _index
+    if _index is None:
+        index = MinHashIndex.load()
+        # 마지막 병합 이후 추가된 항목 재생
+        if os.path.exists(PENDING_FILE):
+            with open(PENDING_FILE, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # 기록 중 중단된 마지막 줄
+                    index.add(entry["id"], np.asarray(entry["sig"], dtype=np.uint32))
+        _index = index
+    return _index
+
+def _persist_compacted(index):
+    index.save()
+    if os.path.exists(PENDING_FILE):
+        os.remove(PENDING_FILE)
+
+def add_log(log_id, script):
+    """저장된 상담 로그를 인덱스에 추가합니다. (저장 직후 호출, 너무 짧은 스크립트는 생략, 이미 있는 로그는 생략)"""
+    sig = signature(script)
+    if sig is None:
+        return False
+    with _lock:
+        index = _get_index()
+        if int(log_id) in index.pending_ids or (index.ids == int(log_id)).any():
+            return True  # 저장 재시도
+        index.add(log_id, sig)
+        with open(PENDING_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"id": int(log_id), "sig": sig.tolist()}) + "\n")
+        if len(index.pending_ids) >= COMPACT_EVERY:
+            _persist_compacted(index)
+    return True
+
+def find_duplicates(script, user_id=None, threshold=DUPLICATE_THRESHOLD, limit=3):
+    """
+    스크립트와 유사한 기존 상담 로그를 찾습니다.
+    user_id: 지정하면 해당 상담원의 로그만 반환 (인덱스에는 소유자가 없으므로 후보를 넉넉히 찾은 뒤 DB로 확인)
+    반환: [{"log_id", "similarity"}] (유사도 내림차순, 없으면 [])
+    """
+    sig = signature(script)
+    if sig is None:
+        return []
+    with _lock:
+        matches = _get_index().query(sig, threshold=threshold, limit=limit * OWNER_OVERFETCH if user_id else limit)
+    if user_id and matches:
+        from utils.db_manager import fetch_owned_log_ids
+        owned = set(fetch_owned_log_ids([log_id for log_id, _ in matches], user_id))
+        matches = [m for m in matches if m[0] in owned][:limit]
+    return [{"log_id": log_id, "similarity": round(sim, 3)} for log_id, sim in matches]
+
+def sync_index(page_size=1000):
+    """
+    워터마크 이후의 coaching_logs를 읽어 인덱스에 추가합니다.
+    (기능 도입 전 로그, 다른 서버 프로세스에서 저장된 로그 반영 / 관리자 화면 또는 배치에서 호출)
+    """
+    from utils.db_manager import iter_coaching_logs
+
+    try:
+        with open(WATERMARK_FILE, encoding="utf-8") as f:
+            watermark = json.load(f)
+    except (FileNotFoundError, ValueError):
+        watermark = None
+
+    def checkpoint(index, last_row):
+        # 인덱스 파일이 기록된 뒤에만 워터마크 전진 (중단 시 재개 가능)
+        _persist_compacted(index)
+        tmp = WATERMARK_FILE + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"created_at": last_row["created_at"], "id": last_row["id"]}, f)
+        os.replace(tmp, WATERMARK_FILE)
+
+    added, last_row = 0, None
+    for page in iter_coaching_logs("id, original_script", page_size=page_size, after=watermark):
+        with _lock:
+            index = _get_index()
+            for row in page:
+                sig = signature(row.get("original_script"))
+                if sig is not None:
+                    index.add(row["id"], sig)
+                    added += 1
+            last_row = page[-1]
+            if len(index.pending_ids) >= SYNC_CHECKPOINT_ROWS:
+                checkpoint(index, last_row)
+    if last_row is not None:
+        with _lock:
+            checkpoint(_get_index(), last_row)
+    return {"added": added, "indexed": len(_get_index())}
@@ -0,0 +1,45 @@
+import re
+
+# ==========================================
+# ☎️ 전화번호 정규화 (고객 식별 키)
+# ==========================================
+# "010-1234-5678", "010 1234 5678", "+82 10-1234-5678"처럼 표기만 다른 번호를 같은 고객으로 보기 위해
+# 숫자만 남긴 국내 형식(01012345678)을 customers.phone_normalized 키로 사용합니다.
+# DB 키는 upsert_customer RPC 안의 SQL normalize_phone()(database/migration_customer_upsert.sql)만 계산하고,
+# 이 함수는 같은 규칙으로 화면 표시와 로컬 비교(고객 조회 선행 키, 추출 일치율)에만 사용합니다.
+
+_NON_DIGITS = re.compile(r"\D")
+MIN_DIGITS = 7   # 이보다 짧으면 전화번호가 아닌 식별자로 보고 원문(공백 제거, 소문자)을 키로 사용
+
+def normalize_phone(phone):
+    """
+    전화번호를 비교용 키로 정규화합니다.
+    반환: '01012345678' 형식 문자열 (입력이 비어 있으면 None)
+    """
+    if phone is None:
+        return None
+    raw = str(phone).strip()
+    if not raw:
+        return None
+    digits = _NON_DIGITS.sub("", raw)
+    if len(digits) < MIN_DIGITS:
+        return re.sub(r"\s+", "", raw).lower()
+    # 국가번호(+82 / 0082) -> 국내 형식 ("+82 010-..."처럼 0을 남겨 쓴 경우 포함)
+    for prefix in ("0082", "82"):
+        if digits.startswith(prefix):
+            digits = digits[len(prefix):]
+            break
+    if not digits.startswith("0"):
+        digits = "0" + digits
+    return digits
+
+def format_phone(phone):
+    """정규화된 번호를 화면 표시용(010-1234-5678)으로 변환합니다. 형식을 모르면 그대로 반환"""
+    key = normalize_phone(phone)
+    if not key or not key.isdigit():
+        return phone
+    if key.startswith("02") and len(key) in (9, 10):
+        return f"02-{key[2:-4]}-{key[-4:]}"
+    if len(key) in (10, 11):
+        return f"{key[:3]}-{key[3:-4]}-{key[-4:]}"
+    return key
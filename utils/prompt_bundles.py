@@ -0,0 +1,187 @@
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime, timezone
+
+# ==========================================
+# 📦 카테고리별 프롬프트 번들 (Publish at Admin Save)
+# ==========================================
+# 상담 유형 목록(cat_text), 참고자료 목록(ref_list_text), 카테고리별 가이드라인(rule_text)은
+# 관리자가 수정하기 전까지 모든 세션에서 똑같습니다. 관리자 저장 시점에 한 번 렌더링해
+# 버전을 붙여 prompt_bundles 테이블에 저장하고, 코칭 화면은 현재 번들 1건만 읽어 사용합니다.
+# 정렬 순서를 고정해 같은 내용이면 항상 같은 프롬프트 문자열이 나오도록 합니다. (모델 측 프리픽스 캐시 적중)
+
+BUNDLE_SCHEMA = 2        # 2: 참고자료는 메타데이터만 (본문은 로컬 인덱스 청크 / reference_materials에서 필요할 때 조회)
+CACHE_TTL_SECONDS = 30   # 프로세스 내 번들 캐시 유지 시간 (세션 간 공유)
+PUBLISH_ATTEMPTS = 3     # 동시 발행으로 버전이 겹칠 때 재시도 횟수
+
+_cache = {"loaded_at": 0.0, "bundle": None}
+_cache_lock = threading.Lock()
+
+# ------------------------------------------
+# 렌더링 (ai_agent와 번들이 같은 함수를 사용)
+# ------------------------------------------
+
+def render_category_text(categories):
+    """상담 유형 목록 -> 1차 분석 프롬프트의 [가능한 상담 유형] 블록"""
+    if not categories:
+        return "환불(refund), 기술(tech), 문의(inquiry), 일반(general) 중 택1"
+    cat_text = "[가능한 상담 유형 (Categories)]\n"
+    for c in categories:
+        # c가 dict면 description 사용, str이면 이름만 사용
+        if isinstance(c, dict):
+            desc = f": {c.get('description')}" if c.get('description') else ""
+            cat_text += f"- {c['name']}{desc}\n"
+        else:
+            cat_text += f"- {c}\n"
+    return cat_text
+
+def render_reference_list(references):
+    """참고자료 메타데이터 -> 1차 분석 프롬프트의 [가용 참고자료 목록] 블록 (ID, 제목, 사용 상황만)"""
+    if not references:
+        return ""
+    ref_list_txt = "[가용 참고자료 목록]\n"
+    for r in references:
+        ref_list_txt += f"- ID:{r['id']} | {r['title']} (상황: {r.get('summary')})\n"
+    return ref_list_txt
+
+def render_rule_text(guidelines):
+    """가이드라인 목록 -> 2차 분석 프롬프트의 [필수 준수 가이드라인] 본문"""
+    return "".join(f"- {g['refined_content']}\n" for g in guidelines)
+
+def _sorted_guidelines(guidelines, category):
+    # 공통(common) 먼저, 그 다음 카테고리 가이드. 같은 그룹 안에서는 id 순
+    rows = [g for g in guidelines if g.get("is_active", True) and g.get("category") in ("common", category)]
+    return sorted(rows, key=lambda g: (g.get("category") != "common", g.get("id") or 0))
+
+def build_bundle(categories, guidelines, references):
+    """
+    DB 행으로 번들 내용을 만듭니다. 입력 순서와 무관하게 항상 같은 결과가 나오도록 정렬합니다.
+    반환: {"schema", "category_text", "reference_list_text", "categories", "references", "rules"}
+    """
+    categories = sorted(
+        ({"name": c["name"], "description": c.get("description")} if isinstance(c, dict) else {"name": c, "description": None}
+         for c in categories),
+        key=lambda c: c["name"]
+    )
+    references = sorted(references, key=lambda r: r["id"])
+    # 본문(content)은 넣지 않음: 번들 행은 모든 프로세스가 캐시 만료마다 다시 받으므로 크기를 목록 수준으로 유지
+    ref_fields = ("id", "category", "title", "summary", "file_url", "ingest_status", "chunk_count")
+    return {
+        "schema": BUNDLE_SCHEMA,
+        "category_text": render_category_text(categories),
+        "reference_list_text": render_reference_list(references),
+        "categories": categories,
+        "references": [{k: r.get(k) for k in ref_fields} for r in references],
+        "rules": {
+            c["name"]: render_rule_text(_sorted_guidelines(guidelines, c["name"]))
+            for c in categories
+        } | {"common": render_rule_text(_sorted_guidelines(guidelines, "common"))},
+    }
+
+def bundle_hash(bundle):
+    return hashlib.sha256(json.dumps(bundle, ensure_ascii=False, sort_keys=True).encode()).hexdigest()
+
+# ------------------------------------------
+# 발행 / 조회
+# ------------------------------------------
+
+def _is_version_conflict(error):
+    """다른 관리자가 같은 버전을 먼저 발행함 (prompt_bundles.version 기본키 충돌)"""
+    text = str(error)
+    return "23505" in text or "duplicate key" in text
+
+def publish_prompt_bundle(published_by=None, reason=None):
+    """
+    현재 DB 상태로 번들을 렌더링해 새 버전으로 저장합니다. (관리자 저장 직후 호출)
+    내용이 현재 버전과 같으면 새 버전을 만들지 않습니다.
+    동시에 저장한 관리자와 버전이 겹치면 다시 조회/렌더링해 다음 버전으로 재시도합니다. (PUBLISH_ATTEMPTS회)
+    반환: 현재 버전 번호 (실패 시 None)
+    """
+    from utils.db_manager import (
+        fetch_consultation_types, fetch_all_guidelines, fetch_references,
+        fetch_current_prompt_bundle, insert_prompt_bundle
+    )
+    for attempt in range(1, PUBLISH_ATTEMPTS + 1):
+        try:
+            bundle = build_bundle(
+                fetch_consultation_types(include_desc=True),
+                fetch_all_guidelines(),
+                fetch_references(None, ready_only=True)
+            )
+            digest = bundle_hash(bundle)
+            current = fetch_current_prompt_bundle()
+            if current and current.get("content_hash") == digest:
+                return current["version"]
+
+            version = (current["version"] + 1) if current else 1
+            insert_prompt_bundle({
+                "version": version,
+                "bundle": bundle,
+                "content_hash": digest,
+                "published_by": published_by,
+                "reason": reason,
+                "published_at": datetime.now(timezone.utc).isoformat()
+            })
+            invalidate_cache()
+            print(f"[prompt_bundles] v{version} 발행 ({reason or '-'})")
+            return version
+        except Exception as e:
+            if _is_version_conflict(e) and attempt < PUBLISH_ATTEMPTS:
+                print(f"프롬프트 번들 버전 충돌, 다시 발행 ({attempt}회): {e}")
+                continue
+            print(f"프롬프트 번들 발행 실패: {e}")
+            return None
+
+def invalidate_cache():
+    with _cache_lock:
+        _cache.update(loaded_at=0.0, bundle=None)
+
+def load_current_bundle():
+    """
+    현재 번들을 반환합니다. (DB 조회 1회, CACHE_TTL_SECONDS 동안 프로세스 내 재사용)
+    번들이 아직 없거나 조회에 실패하면 None -> 호출 측은 기존 방식(행 단위 조회)으로 대체
+    """
+    from utils.db_manager import fetch_current_prompt_bundle
+
+    with _cache_lock:
+        if _cache["bundle"] is not None and time.monotonic() - _cache["loaded_at"] < CACHE_TTL_SECONDS:
+            return _cache["bundle"]
+    row = fetch_current_prompt_bundle(include_bundle=True)
+    schema = (row.get("bundle") or {}).get("schema") if row else None
+    if schema is not None and schema < BUNDLE_SCHEMA and publish_prompt_bundle(reason=f"schema:{schema}->{BUNDLE_SCHEMA}"):
+        # 이전 형식의 번들 -> 현재 형식으로 1회 다시 발행
+        row = fetch_current_prompt_bundle(include_bundle=True)
+    bundle = None
+    if row and (row.get("bundle") or {}).get("schema") == BUNDLE_SCHEMA:
+        bundle = dict(row["bundle"], version=row["version"])
+    with _cache_lock:
+        _cache.update(loaded_at=time.monotonic(), bundle=bundle)
+    return bundle
+
+# ------------------------------------------
+# 코칭 화면용 접근 함수 (번들이 없으면 DB 직접 조회)
+# ------------------------------------------
+
+def bundle_categories(bundle):
+    """상담 유형 목록 [{"name", "description"}]"""
+    if bundle:
+        return bundle["categories"]
+    from utils.db_manager import fetch_consultation_types
+    return fetch_consultation_types(include_desc=True)
+
+def bundle_references(bundle):
+    """코칭에 사용할 수 있는(수집 완료) 참고자료 목록 (번들이 있으면 본문 제외 메타데이터)"""
+    if bundle:
+        return bundle["references"]
+    from utils.db_manager import fetch_references
+    return fetch_references(None, ready_only=True)
+
+def bundle_rule_text(bundle, category):
+    """카테고리의 [필수 준수 가이드라인] 본문 (common + 카테고리)"""
+    if bundle:
+        rules = bundle["rules"]
+        return rules.get(category, rules.get("common", ""))
+    from utils.db_manager import fetch_active_guidelines
+    return render_rule_text(fetch_active_guidelines(category))
@@ -0,0 +1,124 @@
+import os
+import re
+import json
+import math
+import threading
+from collections import Counter
+from utils.local_store import data_path
+
+# ==========================================
+# 🔎 참고자료 로컬 검색 인덱스 (Chunk + BM25)
+# ==========================================
+# 참고자료 본문을 청크로 나눠 로컬 파일에 저장하고, 코칭 시 상담 내용과
+# 관련 있는 청크만 골라 프롬프트에 넣을 수 있도록 BM25 점수로 검색합니다.
+# 한글은 띄어쓰기/조사 변형에 강하도록 글자 2-gram, 영문/숫자는 단어 단위로 색인합니다.
+
+INDEX_PATH = data_path("references", "index.json")
+CHUNK_CHARS = 800
+CHUNK_OVERLAP = 100
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_lock = threading.Lock()
+_cache = {"mtime": None, "index": {}}
+
+def _terms(text):
+    terms = []
+    for token in re.findall(r"[0-9a-z]+|[가-힣]+", (text or "").lower()):
+        if token[0] >= "가" and len(token) > 1:
+            terms.extend(token[i:i + 2] for i in range(len(token) - 1))
+        else:
+            terms.append(token)
+    return terms
+
+def chunk_text(text, size=CHUNK_CHARS, overlap=CHUNK_OVERLAP):
+    """문단 경계를 우선해 size 글자 내외의 청크로 나눕니다. (긴 문단은 overlap을 두고 분할)"""
+    chunks, current = [], ""
+    for para in re.split(r"\n\s*\n|\n", text or ""):
+        para = para.strip()
+        if not para:
+            continue
+        if len(current) + len(para) + 1 <= size:
+            current = f"{current}\n{para}" if current else para
+            continue
+        if current:
+            chunks.append(current)
+        while len(para) > size:
+            chunks.append(para[:size])
+            para = para[size - overlap:]
+        current = para
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _load():
+    try:
+        mtime = os.path.getmtime(INDEX_PATH)
+    except FileNotFoundError:
+        return {}
+    if _cache["mtime"] != mtime:
+        with open(INDEX_PATH, encoding="utf-8") as f:
+            _cache["index"] = json.load(f)
+        _cache["mtime"] = mtime
+    return _cache["index"]
+
+def _save(index):
+    tmp = INDEX_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp, INDEX_PATH)
+
+def index_reference(ref_id, chunks):
+    """참고자료의 청크를 인덱스에 추가(또는 교체)합니다."""
+    with _lock:
+        index = dict(_load())
+        index[str(ref_id)] = [{"text": c, "tf": dict(Counter(_terms(c)))} for c in chunks]
+        _save(index)
+
+def remove_reference(ref_id):
+    """참고자료를 인덱스에서 제거합니다."""
+    with _lock:
+        index = dict(_load())
+        if index.pop(str(ref_id), None) is not None:
+            _save(index)
+
+def has_reference(ref_id):
+    return str(ref_id) in _load()
+
+def reference_chunks(ref_id):
+    """참고자료의 청크 본문 목록 (색인되지 않은 자료면 None)"""
+    chunks = _load().get(str(ref_id))
+    return [c["text"] for c in chunks] if chunks is not None else None
+
+def search(query, ref_ids=None, top_k=5):
+    """
+    query와 관련도가 높은 청크를 BM25 점수순으로 반환합니다.
+    반환: [{"ref_id", "chunk", "score", "text"}, ...]
+    """
+    index = _load()
+    docs = [
+        (ref_id, i, chunk)
+        for ref_id, chunks in index.items()
+        if ref_ids is None or ref_id in {str(r) for r in ref_ids}
+        for i, chunk in enumerate(chunks)
+    ]
+    q_terms = set(_terms(query))
+    if not docs or not q_terms:
+        return []
+
+    avg_len = sum(sum(c["tf"].values()) for _, _, c in docs) / len(docs) or 1
+    df = Counter(t for _, _, c in docs for t in q_terms if t in c["tf"])
+    scored = []
+    for ref_id, i, chunk in docs:
+        length = sum(chunk["tf"].values())
+        score = 0.0
+        for t in q_terms:
+            tf = chunk["tf"].get(t)
+            if not tf:
+                continue
+            idf = math.log(1 + (len(docs) - df[t] + 0.5) / (df[t] + 0.5))
+            score += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_len))
+        if score > 0:
+            scored.append({"ref_id": ref_id, "chunk": i, "score": score, "text": chunk["text"]})
+    scored.sort(key=lambda x: x["score"], reverse=True)
+    return scored[:top_k]
@@ -0,0 +1,150 @@
+import os
+import json
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from utils.local_store import data_path
+from utils.tracing import bind, traced
+
+# ==========================================
+# 📥 참고자료 수집(Ingestion) 파이프라인
+# ==========================================
+# 관리자 폼은 'pending' 행만 만들고 바로 돌아가며, 아래 작업이 백그라운드에서
+# 업로드 -> 텍스트 추출 -> 청크 분할 -> 로컬 검색 인덱스 갱신 -> 사용 상황 요약 -> 행 갱신(ready)
+# 순서로 처리합니다. 원본 파일은 스풀에 보관되어 서버 재시작 시에도 이어서 처리됩니다.
+
+SPOOL_DIR = os.path.dirname(data_path("ingest", "_"))
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="reference-ingest")
+_lock = threading.Lock()
+_recovered = False
+
+def _spool_path(ref_id, suffix):
+    return os.path.join(SPOOL_DIR, f"{ref_id}.{suffix}")
+
+def submit_reference_ingestion(category, title, note=None, file_bytes=None, file_ext=None):
+    """
+    참고자료 등록 요청을 'pending' 상태로 저장하고 수집 작업을 예약합니다.
+    반환: 생성된 reference_materials 행 (네트워크 호출은 insert 1회)
+    """
+    from utils.db_manager import create_pending_reference
+
+    resume_pending_ingestions()
+    row = create_pending_reference(category, title, note)
+    ref_id = row["id"]
+    if file_bytes:
+        with open(_spool_path(ref_id, "bin.tmp"), "wb") as f:
+            f.write(file_bytes)
+        os.replace(_spool_path(ref_id, "bin.tmp"), _spool_path(ref_id, "bin"))
+    with open(_spool_path(ref_id, "json.tmp"), "w", encoding="utf-8") as f:
+        json.dump({"ref_id": ref_id, "note": note, "file_ext": file_ext}, f, ensure_ascii=False)
+    os.replace(_spool_path(ref_id, "json.tmp"), _spool_path(ref_id, "json"))
+
+    _executor.submit(bind(run_ingestion), ref_id)
+    return row
+
+@traced("ingest.run_ingestion")
+def run_ingestion(ref_id):
+    """수집 작업 1건을 실행합니다. (스풀에 남은 작업 재실행에도 사용)"""
+    from utils.db_manager import (
+        content_hash, fetch_reference_file, save_reference_file,
+        upload_reference_file, update_reference
+    )
+    from utils.text_extractor import extract_document, estimate_tokens
+    from utils.reference_index import chunk_text, index_reference
+    from utils.ai_agent import generate_reference_usage_context
+
+    try:
+        with open(_spool_path(ref_id, "json"), encoding="utf-8") as f:
+            job = json.load(f)
+    except FileNotFoundError:
+        return
+
+    try:
+        update_reference(ref_id, {"ingest_status": "processing", "ingest_error": None})
+        note = job.get("note") or ""
+        fields = {}
+
+        if os.path.exists(_spool_path(ref_id, "bin")):
+            with open(_spool_path(ref_id, "bin"), "rb") as f:
+                file_bytes = f.read()
+            ext = job["file_ext"]
+            digest = content_hash(file_bytes)
+
+            # 같은 파일이 이미 수집된 적 있으면 추출/요약 결과 재사용 (업로드/AI 호출 없음)
+            cached = fetch_reference_file(digest)
+            if cached:
+                text = cached.get("extracted_text") or ""
+                page_count = cached.get("page_count")
+                summary = cached.get("usage_summary")
+                file_url = cached["file_url"]
+            else:
+                file_url = upload_reference_file(file_bytes, ext)
+                if not file_url:
+                    raise RuntimeError("파일 업로드 실패")
+                doc, err = extract_document(file_bytes, ext)
+                if err:
+                    raise RuntimeError(err)
+                text, page_count = doc["text"], doc["page_count"]
+                # 스캔 PDF처럼 텍스트가 없으면 파일 자체로 요약
+                if ext == "pdf" and not text:
+                    summary = generate_reference_usage_context(content=note, file_data=file_bytes)
+                else:
+                    summary = generate_reference_usage_context(content=text or note)
+                save_reference_file(
+                    digest, file_url, ext,
+                    extracted_text=text, page_count=page_count,
+                    token_estimate=estimate_tokens(text), usage_summary=summary
+                )
+            fields.update({"file_url": file_url, "content_hash": digest, "page_count": page_count})
+            if note:
+                text = f"{note}\n\n{text}" if text else note
+        else:
+            text = note
+            summary = generate_reference_usage_context(content=text)
+
+        chunks = chunk_text(text)
+        index_reference(ref_id, chunks)
+
+        fields.update({
+            "content": text or "(첨부 파일 참조)",
+            "summary": summary,
+            "chunk_count": len(chunks),
+            "token_estimate": estimate_tokens(text),
+            "ingest_status": "ready",
+            "ingested_at": datetime.now(timezone.utc).isoformat()
+        })
+        update_reference(ref_id, fields)
+
+        # 코칭 화면의 참고자료 목록에 반영되도록 프롬프트 번들 재발행
+        from utils.prompt_bundles import publish_prompt_bundle
+        publish_prompt_bundle(reason=f"reference:{ref_id} ready")
+
+        for suffix in ("bin", "json"):
+            if os.path.exists(_spool_path(ref_id, suffix)):
+                os.remove(_spool_path(ref_id, suffix))
+
+    except Exception as e:
+        print(f"참고자료 수집 실패 (ID: {ref_id}): {e}")
+        try:
+            update_reference(ref_id, {"ingest_status": "failed", "ingest_error": str(e)[:500]})
+        except Exception as e2:
+            print(f"수집 상태 갱신 실패 (ID: {ref_id}): {e2}")
+
+def retry_ingestion(ref_id):
+    """실패한 수집 작업을 다시 예약합니다. (스풀 파일이 남아 있는 경우)"""
+    if not os.path.exists(_spool_path(ref_id, "json")):
+        return False
+    _executor.submit(bind(run_ingestion), ref_id)
+    return True
+
+def resume_pending_ingestions():
+    """프로세스 시작 후 최초 1회, 스풀에 남아 있는 수집 작업을 다시 예약합니다."""
+    global _recovered
+    with _lock:
+        if _recovered:
+            return
+        _recovered = True
+    for name in sorted(os.listdir(SPOOL_DIR)):
+        if name.endswith(".json"):
+            _executor.submit(run_ingestion, name[:-len(".json")])
@@ -0,0 +1,390 @@
+import os
+import sys
+import json
+import time
+import uuid
+import hashlib
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from utils.local_store import data_path
+from utils.tracing import bind, traced
+
+# ==========================================
+# 🔁 가이드라인 변경 후 과거 상담 재채점 (Offline)
+# ==========================================
+# 가이드라인이 바뀌면 해당 카테고리(common이면 전체)의 과거 coaching_logs를 새 기준으로 다시 채점해
+# coaching_log_rescores에 규칙 버전별로 저장합니다. (원본 ai_score는 변경하지 않음)
+#
+# - 모델 호출은 배치 제출(client.batches)로 묶어 보내고, 지원되지 않으면 동시 호출 수를 제한한 즉시 호출로 처리합니다.
+# - 작업 상태(제출한 배치 이름, 진행 건수)는 로컬 작업 파일에 기록되어, 서버 재시작 후에도 제출된 배치를
+#   다시 보내지 않고 결과만 이어서 수집합니다. 이미 저장된 (log_id, rules_version)은 다시 채점하지 않습니다.
+#
+#   python -m utils.rescoring --category refund
+#   python -m utils.rescoring --resume <job_id>
+
+JOB_DIR = os.path.dirname(data_path("rescoring", "_"))
+BATCH_SIZE = 200        # 배치 작업 1건에 넣는 요청 수 (인라인 요청 크기 제한 이내)
+POLL_SECONDS = 30       # 배치 상태 조회 주기
+POOL_WORKERS = 4        # 배치 모드를 쓸 수 없을 때 동시 모델 호출 수
+WRITE_EVERY = 50        # 즉시 호출 모드에서 결과를 묶어 저장하는 단위
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rescoring")
+_lock = threading.Lock()
+_running = set()
+_recovered = False
+
+def rules_version(rule_text):
+    """가이드라인 본문의 버전 키 (본문이 같으면 같은 버전)"""
+    return hashlib.sha256((rule_text or "").encode("utf-8")).hexdigest()[:12]
+
+# ------------------------------------------
+# 작업 파일
+# ------------------------------------------
+
+def _job_path(job_id):
+    return os.path.join(JOB_DIR, f"{job_id}.json")
+
+def _save_job(job):
+    job["updated_at"] = datetime.now(timezone.utc).isoformat()
+    tmp = _job_path(job["job_id"]) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(job, f, ensure_ascii=False)
+    os.replace(tmp, _job_path(job["job_id"]))
+
+def load_job(job_id):
+    try:
+        with open(_job_path(job_id), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def list_jobs(limit=10):
+    """최근 재채점 작업 목록 (생성 시각 내림차순)"""
+    jobs = [load_job(name[:-len(".json")]) for name in os.listdir(JOB_DIR) if name.endswith(".json")]
+    jobs = [j for j in jobs if j]
+    jobs.sort(key=lambda j: j["created_at"], reverse=True)
+    return jobs[:limit]
+
+def job_progress(job):
+    """진행률 요약: 처리(성공+실패+건너뜀) / 전체"""
+    handled = job["done"] + job["failed"] + job["skipped"]
+    total = job["total"] or 0
+    return {
+        "state": job["status"],
+        "mode": job["mode"],
+        "done": job["done"],
+        "failed": job["failed"],
+        "skipped": job["skipped"],
+        "total": total,
+        "percent": round(handled / total * 100, 1) if total else 0.0,
+        "avg_delta": round(job["delta_sum"] / job["delta_count"], 2) if job["delta_count"] else None,
+    }
+
+# ------------------------------------------
+# 작업 생성 / 실행
+# ------------------------------------------
+
+def plan_rescore(category, reason=None, requested_by=None):
+    """
+    재채점 작업을 만들고 작업 파일에 기록합니다. (모델 호출 없음)
+    채점 기준(카테고리별 가이드라인 본문)은 이 시점의 프롬프트 번들로 고정되어, 재개 시에도 같은 기준을 사용합니다.
+    """
+    from utils.prompt_bundles import load_current_bundle, bundle_categories, bundle_rule_text
+
+    bundle = load_current_bundle()
+    if category == "common":
+        names = [c if isinstance(c, str) else c["name"] for c in bundle_categories(bundle)]
+    else:
+        names = [category]
+    rules = {}
+    for name in names + (["common"] if category == "common" else []):
+        text = bundle_rule_text(bundle, name)
+        rules[name] = {"text": text, "version": rules_version(text)}
+
+    job = {
+        "job_id": uuid.uuid4().hex[:12],
+        "category": category,
+        "reason": reason,
+        "requested_by": requested_by,
+        "bundle_version": bundle["version"] if bundle else None,
+        "rules": rules,
+        "status": "planned",
+        "mode": None,
+        "batches": [],
+        "total": None,
+        "done": 0,
+        "failed": 0,
+        "skipped": 0,
+        "delta_sum": 0.0,
+        "delta_count": 0,
+        "error": None,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    _save_job(job)
+    return job
+
+def start_rescore(category, reason=None, requested_by=None):
+    """재채점 작업을 만들고 백그라운드 실행을 예약합니다. 반환: 작업 dict"""
+    resume_rescore_jobs()
+    job = plan_rescore(category, reason, requested_by)
+    _executor.submit(bind(run_rescore), job["job_id"])
+    return job
+
+def resume_rescore(job_id):
+    """실패한 작업을 다시 예약합니다. (이미 저장된 로그는 건너뛰고 나머지만 채점)"""
+    _executor.submit(bind(run_rescore), job_id)
+
+def resume_rescore_jobs():
+    """프로세스 시작 후 최초 1회, 끝나지 않은 재채점 작업을 다시 예약합니다."""
+    global _recovered
+    with _lock:
+        if _recovered:
+            return
+        _recovered = True
+    for job in list_jobs(limit=None):
+        if job["status"] in ("planned", "running"):
+            _executor.submit(run_rescore, job["job_id"])
+
+def _rule_for(job, category):
+    """로그 유형의 채점 기준 {"text", "version"} (비활성화된 유형은 common 기준)"""
+    rules = job["rules"]
+    return rules.get(category) or rules.get("common") or rules[job["category"]]
+
+def _log_filters(job):
+    return None if job["category"] == "common" else {"consultation_type": job["category"]}
+
+def _pending_logs(job, skip_ids):
+    """재채점할 로그를 페이지 단위로 읽어 1건씩 반환합니다. (스크립트가 없는 로그는 건너뜀)"""
+    from utils.db_manager import iter_coaching_logs
+
+    for page in iter_coaching_logs("consultation_type, original_script, ai_score", filters=_log_filters(job)):
+        for log in page:
+            if log["id"] in skip_ids:
+                continue
+            if not (log.get("original_script") or "").strip():
+                job["skipped"] += 1
+                continue
+            yield log
+
+def _result_row(job, log_id, category, original_score, result):
+    from utils.ai_agent import MODEL_ID
+
+    rule = _rule_for(job, category)
+    score = int(result.get("score") or 0)
+    if original_score is not None:
+        job["delta_sum"] += score - original_score
+        job["delta_count"] += 1
+    return {
+        "log_id": log_id,
+        "rules_version": rule["version"],
+        "category": category,
+        "job_id": job["job_id"],
+        "score": score,
+        "metrics": result.get("metrics") or {},
+        "feedback": result.get("feedback") or "",
+        "original_score": original_score,
+        "model": MODEL_ID,
+    }
+
+@traced("rescoring.run_rescore")
+def run_rescore(job_id, use_batch=True, poll_seconds=POLL_SECONDS):
+    """
+    재채점 작업 1건을 끝까지 실행합니다. (작업 파일 기준으로 재개 가능, 같은 작업의 중복 실행은 무시)
+    반환: 작업 dict
+    """
+    from utils.db_manager import iter_coaching_logs, fetch_rescored_log_ids
+    from utils.ai_agent import batch_available
+
+    with _lock:
+        if job_id in _running:
+            return load_job(job_id)
+        _running.add(job_id)
+    try:
+        job = load_job(job_id)
+        if job is None or job["status"] == "done":
+            return job
+        job.update(status="running", error=None, failed=0, skipped=0)
+        if job["total"] is None:
+            job["total"] = sum(len(page) for page in iter_coaching_logs("id", filters=_log_filters(job)))
+        done_ids = fetch_rescored_log_ids({r["version"] for r in job["rules"].values()})
+        job["done"] = len(done_ids)
+        if job["mode"] is None:
+            job["mode"] = "batch" if use_batch and batch_available() else "pool"
+        _save_job(job)
+
+        if job["mode"] == "batch":
+            _run_batches(job, done_ids, poll_seconds)
+        else:
+            _run_pool(job, done_ids)
+
+        if job["failed"]:
+            # 채점/저장에 실패한 로그가 남음 -> 재개하면 저장되지 않은 로그만 다시 채점
+            job.update(status="failed", error=f"{job['failed']}건 재채점 실패 (재개 시 다시 시도)")
+        else:
+            job["status"] = "done"
+        _save_job(job)
+        print(f"[rescoring] {job_id} {job['status']}: {job_progress(job)}")
+        return job
+    except Exception as e:
+        print(f"재채점 작업 실패 ({job_id}): {e}")
+        job = load_job(job_id) or {}
+        if job:
+            job.update(status="failed", error=str(e)[:500])
+            _save_job(job)
+        return job
+    finally:
+        with _lock:
+            _running.discard(job_id)
+
+# ------------------------------------------
+# 배치 모드
+# ------------------------------------------
+
+def _run_batches(job, done_ids, poll_seconds):
+    """미제출 로그를 BATCH_SIZE 단위로 모두 제출한 뒤, 끝난 배치부터 결과를 수집합니다."""
+    in_flight = {log_id for b in job["batches"] if b["state"] != "collected" for log_id in b["log_ids"]}
+    chunk = []
+    for log in _pending_logs(job, done_ids | in_flight):
+        chunk.append(log)
+        if len(chunk) == BATCH_SIZE:
+            _submit(job, chunk)
+            chunk = []
+    if chunk:
+        _submit(job, chunk)
+
+    while True:
+        pending = [b for b in job["batches"] if b["state"] != "collected"]
+        if not pending:
+            return
+        for batch in pending:
+            _collect(job, batch)
+        if any(b["state"] != "collected" for b in job["batches"]):
+            time.sleep(poll_seconds)
+
+def _submit(job, logs):
+    from utils.ai_agent import submit_batch, rescore_contents
+
+    contents = [
+        rescore_contents(log["original_script"], _rule_for(job, log.get("consultation_type"))["text"])
+        for log in logs
+    ]
+    name = submit_batch(contents, display_name=f"rescore-{job['job_id']}-{len(job['batches']) + 1}")
+    job["batches"].append({
+        "name": name,
+        "state": "submitted",
+        "log_ids": [log["id"] for log in logs],
+        "categories": [log.get("consultation_type") for log in logs],
+        "original_scores": [log.get("ai_score") for log in logs],
+    })
+    # 제출 직후 기록해야 재시작 시 같은 로그를 다시 제출하지 않음
+    _save_job(job)
+
+def _collect(job, batch):
+    """배치 1건의 상태를 확인하고, 끝났으면 결과를 저장합니다. (저장 실패 시 다음 조회에서 재시도)"""
+    from utils.ai_agent import fetch_batch, parse_json_response, MODEL_ID
+    from utils.db_manager import insert_log_rescores
+    from utils.model_telemetry import record_model_call
+
+    state, results = fetch_batch(batch["name"])
+    if results is None:
+        if batch["state"] != state:
+            batch["state"] = state
+            _save_job(job)
+        return
+
+    rows, failed = [], 0
+    for i, log_id in enumerate(batch["log_ids"]):
+        response, error = results[i] if i < len(results) else (None, "missing response")
+        category = batch["categories"][i]
+        record_model_call("rescore_coaching_batch", response, model=MODEL_ID, category=category, error=error)
+        try:
+            if error or response is None:
+                raise RuntimeError(error or "empty response")
+            result = parse_json_response(response.text)
+        except Exception as e:
+            print(f"재채점 결과 해석 실패 (log: {log_id}): {e}")
+            failed += 1
+            continue
+        rows.append(_result_row(job, log_id, category, batch["original_scores"][i], result))
+
+    if rows and not insert_log_rescores(rows):
+        return
+    job["done"] += len(rows)
+    job["failed"] += failed
+    batch["state"] = "collected"
+    batch["result_state"] = state
+    _save_job(job)
+
+# ------------------------------------------
+# 즉시 호출 모드 (배치 미지원 시)
+# ------------------------------------------
+
+def _run_pool(job, done_ids):
+    """POOL_WORKERS개 스레드로 동시에 호출하고, WRITE_EVERY건마다 결과를 저장합니다."""
+    from utils.ai_agent import rescore_coaching
+
+    def score(log):
+        category = log.get("consultation_type")
+        return log, rescore_coaching(log["original_script"], _rule_for(job, category)["text"], category)
+
+    with ThreadPoolExecutor(max_workers=POOL_WORKERS, thread_name_prefix="rescoring-call") as pool:
+        futures = []
+        for log in _pending_logs(job, done_ids):
+            # bind()는 컨텍스트 1개를 감싸므로 요청마다 따로 만듦 (동시 실행)
+            futures.append(pool.submit(bind(score), log))
+            if len(futures) == WRITE_EVERY:
+                _write_pool_results(job, [f.result() for f in futures])
+                futures = []
+        if futures:
+            _write_pool_results(job, [f.result() for f in futures])
+
+def _write_pool_results(job, scored):
+    from utils.db_manager import insert_log_rescores
+
+    rows, failed = [], 0
+    for log, result in scored:
+        if result is None:
+            failed += 1
+            continue
+        rows.append(_result_row(job, log["id"], log.get("consultation_type"), log.get("ai_score"), result))
+    if rows and not insert_log_rescores(rows):
+        failed += len(rows)
+        rows = []
+    job["done"] += len(rows)
+    job["failed"] += failed
+    _save_job(job)
+
+# ==========================================
+# 🖥️ CLI
+# ==========================================
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="가이드라인 변경 후 과거 상담 재채점")
+    parser.add_argument("--category", help="재채점할 상담 유형 (common이면 전체)")
+    parser.add_argument("--resume", metavar="JOB_ID", help="중단된 작업 재개")
+    parser.add_argument("--reason", default=None)
+    parser.add_argument("--no-batch", action="store_true", help="배치 제출 대신 즉시 호출 사용")
+    parser.add_argument("--poll", type=float, default=POLL_SECONDS, help="배치 상태 조회 주기 (초)")
+    parser.add_argument("--list", action="store_true", help="최근 작업 진행 상황 출력")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for job in list_jobs():
+            print(job["job_id"], job["category"], json.dumps(job_progress(job), ensure_ascii=False))
+        return 0
+    if args.resume:
+        job_id = args.resume
+    elif args.category:
+        job_id = plan_rescore(args.category, reason=args.reason or "cli")["job_id"]
+        print(f"작업 생성: {job_id}")
+    else:
+        parser.error("--category 또는 --resume이 필요합니다.")
+    job = run_rescore(job_id, use_batch=not args.no_batch, poll_seconds=args.poll)
+    print(json.dumps(job_progress(job), ensure_ascii=False, indent=2) if job else "작업을 찾을 수 없습니다.")
+    return 0 if job and job["status"] == "done" else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
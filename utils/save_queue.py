@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils.local_store import data_path
+from utils.tracing import bind, traced, get_session, set_session
+
+# ==========================================
+# 💾 코칭 결과 백그라운드 저장 (Write-Behind)
+# ==========================================
+# 코칭 결과는 화면에 먼저 보여주고, 저장(오디오 업로드 + DB 저장 + 통계 갱신)은
+# 백그라운드 스레드에서 처리합니다. 작업은 실행 전에 로컬 스풀 디렉토리에 기록되므로
+# 세션이 끊기거나 서버가 재시작되어도 다음 실행 시 이어서 저장됩니다.
+
+SPOOL_DIR = os.path.dirname(data_path("spool", "_"))
+MAX_ATTEMPTS = 5         # 이 횟수만큼 실패하면 failed로 표시 (재시도는 계속)
+RETRY_BASE_SECONDS = 2   # 2, 4, 8, 16초 지수 백오프
+RETRY_MAX_SECONDS = 300  # 백오프 상한: DB 장애가 길어지면 5분마다 재시도
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="coaching-save")
+USER_LOCK_STRIPES = 16
+# 같은 상담원의 저장은 한 번에 하나씩 (consultant_trends 상태 조회 -> upsert 사이에 다른 저장이 끼어 갱신이 유실되지 않도록,
+# 로그 id 순서대로 추세에 반영되도록). 잠금 수는 고정이며 user_id 해시로 선택
+_user_locks = [threading.Lock() for _ in range(USER_LOCK_STRIPES)]
+_upload_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="audio-upload")
+_status = {}
+_prefetched = {}  # content hash -> Future (파일 선택 시점 업로드)
+_timers = {}      # job_id -> 예약된 재시도 Timer
+_lock = threading.Lock()
+_recovered = False
+
+def _job_path(job_id, suffix="json"):
+    return os.path.join(SPOOL_DIR, f"{job_id}.{suffix}")
+
+def _write_json_atomic(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def _set_status(job_id, state, **extra):
+    with _lock:
+        entry = _status.setdefault(job_id, {"attempts": 0})
+        entry.update(extra, state=state, updated_at=time.time())
+
+def get_save_status(job_id):
+    """
+    저장 작업 상태를 반환합니다. state: queued / saving / retrying / saved / failed
+    failed: MAX_ATTEMPTS회 이상 실패 (retry_in초 뒤 계속 재시도, retry_save로 즉시 재시도)
+    """
+    resume_pending_saves()
+    with _lock:
+        entry = _status.get(job_id)
+        if entry:
+            return dict(entry)
+    # 다른 프로세스/이전 실행에서 넘어온 작업: 스풀 파일이 남아 있으면 대기 중
+    return {"state": "queued" if os.path.exists(_job_path(job_id)) else "unknown", "attempts": 0}
+
+def prefetch_audio_upload(audio_bytes=None, audio_ext="mp3", audio_path=None):
+    """
+    파일이 선택되는 즉시 오디오를 백그라운드로 업로드합니다. (내용 해시 기준 1회만)
+    이후 저장 작업의 업로드는 이미 저장된 객체를 확인하고 생략됩니다.
+    audio_path: 세션 임시 파일 경로 (bytes 대신 전달하면 메모리에 올리지 않고 mmap으로 해시 계산)
+    """
+    from utils.db_manager import content_hash, upload_audio_file
+    from utils.session_payloads import open_mapped
+
+    if audio_path is not None:
+        with open_mapped(audio_path) as view:
+            digest = content_hash(view)
+    else:
+        digest = content_hash(audio_bytes)
+    with _lock:
+        future = _prefetched.get(digest)
+        # 실패한 업로드는 다시 시도
+        if future is None or (future.done() and not future.result()):
+            _prefetched[digest] = _upload_executor.submit(
+                bind(upload_audio_file), audio_bytes, audio_ext, file_path=audio_path
+            )
+    return digest
+
+def enqueue_coaching_save(user_id, customer_id, analysis_result, original_script,
+                          audio_bytes=None, audio_ext="mp3", audio_path=None):
+    """
+    코칭 결과 저장 작업을 스풀에 기록한 뒤 백그라운드 저장을 예약하고 job_id를 반환합니다.
+    (스풀 기록까지만 동기 처리 - 네트워크 호출 없음)
+    audio_path: 세션 임시 파일 경로. 스풀에는 하드링크(불가 시 복사)로 연결해 바이트를 읽지 않습니다.
+    """
+    from utils.session_payloads import link_or_copy
+
+    resume_pending_saves()
+    job_id = str(uuid.uuid4())
+    if audio_path is not None:
+        link_or_copy(audio_path, _job_path(job_id, "audio.tmp"))
+        os.replace(_job_path(job_id, "audio.tmp"), _job_path(job_id, "audio"))
+    elif audio_bytes:
+        with open(_job_path(job_id, "audio.tmp"), "wb") as f:
+            f.write(audio_bytes)
+        os.replace(_job_path(job_id, "audio.tmp"), _job_path(job_id, "audio"))
+
+    _write_json_atomic(_job_path(job_id), {
+        "job_id": job_id,
+        "user_id": user_id,
+        "customer_id": customer_id,
+        "analysis_result": analysis_result,
+        "original_script": original_script,
+        "audio_ext": audio_ext,
+        "audio_url": None,
+        "created_at": time.time(),
+        "trace_session_id": get_session()
+    })
+    _set_status(job_id, "queued")
+    # 요청한 세션 ID를 이어받아 백그라운드 저장 span도 같은 세션으로 기록
+    _executor.submit(bind(_run_job), job_id)
+    return job_id
+
+@traced("queue.save_job")
+def _run_job(job_id):
+    from utils.db_manager import upload_audio_file, save_coaching_result
+
+    try:
+        with open(_job_path(job_id), encoding="utf-8") as f:
+            job = json.load(f)
+    except FileNotFoundError:
+        _set_status(job_id, "saved")  # 다른 스레드에서 이미 완료
+        return
+    if job.get("trace_session_id") and not get_session():
+        set_session(job["trace_session_id"], job["user_id"])  # 재시작 후 복구된 작업
+
+    with _lock:
+        attempts = _status.setdefault(job_id, {"attempts": 0})["attempts"] + 1
+    _set_status(job_id, "saving", attempts=attempts)
+
+    try:
+        # 1. 오디오 업로드 (성공한 URL은 스풀에 기록해 재시도 시 재업로드 방지)
+        audio_file = _job_path(job_id, "audio")
+        if not job.get("audio_url") and os.path.exists(audio_file):
+            url = upload_audio_file(file_ext=job.get("audio_ext", "mp3"), file_path=audio_file)
+            if not url:
+                raise RuntimeError("오디오 업로드 실패")
+            job["audio_url"] = url
+            _write_json_atomic(_job_path(job_id), job)
+
+        # 2. DB 저장 (client_job_id로 멱등 처리, 상담원 단위 직렬화)
+        with _user_locks[hash(job["user_id"]) % USER_LOCK_STRIPES]:
+            ok = save_coaching_result(
+                job["user_id"],
+                job["customer_id"],
+                job["analysis_result"],
+                job["original_script"],
+                audio_url=job.get("audio_url"),
+                client_job_id=job_id
+            )
+        if not ok:
+            raise RuntimeError("코칭 결과 저장 실패")
+
+        for suffix in ("audio", "json"):
+            if os.path.exists(_job_path(job_id, suffix)):
+                os.remove(_job_path(job_id, suffix))
+        _set_status(job_id, "saved", error=None, log_id=ok)
+
+    except Exception as e:
+        print(f"백그라운드 저장 실패 (job: {job_id}, 시도 {attempts}회): {e}")
+        # 스풀 파일은 남겨두고 상한 있는 백오프로 계속 재시도 (서버 재시작 시에는 resume_pending_saves가 이어받음)
+        delay = min(RETRY_BASE_SECONDS * (2 ** (attempts - 1)), RETRY_MAX_SECONDS)
+        _set_status(job_id, "failed" if attempts >= MAX_ATTEMPTS else "retrying", error=str(e), retry_in=delay)
+        _schedule_retry(job_id, delay)
+
+def _schedule_retry(job_id, delay):
+    timer = threading.Timer(delay, bind(lambda: _executor.submit(bind(_run_job), job_id)))
+    timer.daemon = True
+    with _lock:
+        previous = _timers.pop(job_id, None)
+        _timers[job_id] = timer
+    if previous:
+        previous.cancel()
+    timer.start()
+
+def retry_save(job_id):
+    """예약된 재시도를 기다리지 않고 바로 다시 저장합니다. (결과 화면의 '지금 다시 저장' 버튼)"""
+    with _lock:
+        timer = _timers.pop(job_id, None)
+    if timer:
+        timer.cancel()
+    _set_status(job_id, "queued")
+    _executor.submit(bind(_run_job), job_id)
+
+def resume_pending_saves():
+    """프로세스 시작 후 최초 1회, 스풀에 남아 있는 미저장 작업을 다시 예약합니다."""
+    global _recovered
+    with _lock:
+        if _recovered:
+            return
+        _recovered = True
+    for name in sorted(os.listdir(SPOOL_DIR)):
+        if not name.endswith(".json"):
+            continue
+        job_id = name[:-len(".json")]
+        print(f"미저장 코칭 결과 복구: {job_id}")
+        _set_status(job_id, "queued")
+        _executor.submit(_run_job, job_id)
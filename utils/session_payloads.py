@@ -0,0 +1,134 @@
+import os
+import mmap
+import time
+import uuid
+import shutil
+import weakref
+import threading
+from contextlib import contextmanager
+from utils.local_store import data_path
+
+# ==========================================
+# 📦 세션 대용량 데이터 디스크 보관 (Spill-to-Disk)
+# ==========================================
+# 업로드된 오디오처럼 큰 데이터는 st.session_state에 bytes로 두지 않고 임시 파일에 기록한 뒤
+# 핸들(PayloadHandle)만 세션에 보관합니다. 동시 세션이 많아도 서버 메모리가 파일 크기만큼 늘지 않으며,
+# 실제 바이트는 모델 호출 직전에만 읽고, 업로드/해시 계산은 mmap으로 복사 없이 처리합니다.
+#
+# 정리: 세션이 끝나 세션 상태가 해제되면 weakref.finalize가 파일을 지우고,
+# 비정상 종료로 남은 파일은 TTL 기준 주기 정리(sweep)로 삭제됩니다.
+
+PAYLOAD_DIR = os.path.dirname(data_path("payloads", "_"))
+PAYLOAD_TTL_SECONDS = 6 * 60 * 60     # 이보다 오래된 파일은 정리 대상
+SWEEP_INTERVAL_SECONDS = 10 * 60
+COPY_BUFFER_SIZE = 1024 * 1024
+
+_sweep_lock = threading.Lock()
+_last_sweep = 0.0
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"임시 파일 삭제 실패 ({path}): {e}")
+
+class PayloadHandle:
+    """디스크에 보관된 세션 데이터의 핸들 (세션 상태에는 이 객체만 저장)"""
+
+    def __init__(self, path, size, name=None, mime_type=None):
+        self.id = os.path.basename(path)
+        self.path = path
+        self.size = size
+        self.name = name
+        self.mime_type = mime_type
+        # 핸들이 더 이상 참조되지 않으면(세션 종료) 파일 삭제
+        self._finalizer = weakref.finalize(self, _remove_file, path)
+
+    @property
+    def alive(self):
+        return self._finalizer.alive and os.path.exists(self.path)
+
+    def read_bytes(self):
+        """전체 바이트를 읽습니다. (모델 입력처럼 bytes가 꼭 필요한 시점에만 호출)"""
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def open_view(self):
+        """복사 없이 읽는 memoryview 컨텍스트 (mmap)"""
+        return open_mapped(self.path)
+
+    def release(self):
+        """파일을 즉시 삭제합니다. (새 상담 시작 등 명시적 정리)"""
+        self._finalizer()
+
+    def __repr__(self):
+        return f"PayloadHandle({self.id}, {self.size} bytes)"
+
+@contextmanager
+def open_mapped(path):
+    """
+    파일을 읽기 전용 mmap으로 열어 memoryview를 반환합니다.
+    hashlib, 청크 슬라이싱 등 버퍼 프로토콜을 받는 곳에 bytes 대신 그대로 넘길 수 있습니다.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield memoryview(b"")
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mm)
+        try:
+            yield view
+        finally:
+            view.release()
+            try:
+                mm.close()
+            except BufferError:
+                pass  # 하위 슬라이스가 아직 참조 중이면 GC 시 해제
+
+def store_payload(source, suffix="", name=None, mime_type=None):
+    """
+    bytes 또는 파일 객체(Streamlit UploadedFile 등)를 임시 파일에 기록하고 핸들을 반환합니다.
+    파일 객체는 버퍼 단위로 복사하므로 전체 내용을 한 번 더 메모리에 올리지 않습니다.
+    """
+    sweep_expired()
+    path = os.path.join(PAYLOAD_DIR, f"{uuid.uuid4().hex}{suffix}")
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            f.write(source)
+        else:
+            if hasattr(source, "seek"):
+                source.seek(0)
+            shutil.copyfileobj(source, f, COPY_BUFFER_SIZE)
+    os.replace(tmp, path)
+    return PayloadHandle(path, os.path.getsize(path), name=name, mime_type=mime_type)
+
+def link_or_copy(src_path, dst_path):
+    """
+    파일을 하드링크로 연결하고, 불가능하면(다른 파일시스템 등) 복사합니다.
+    세션 파일이 먼저 삭제되어도 대상 파일은 그대로 남습니다.
+    """
+    try:
+        os.link(src_path, dst_path)
+    except OSError:
+        shutil.copyfile(src_path, dst_path)
+
+def sweep_expired(max_age=PAYLOAD_TTL_SECONDS, force=False):
+    """TTL이 지난 임시 파일을 삭제합니다. (SWEEP_INTERVAL_SECONDS마다 최대 1회)"""
+    global _last_sweep
+    now = time.time()
+    with _sweep_lock:
+        if not force and now - _last_sweep < SWEEP_INTERVAL_SECONDS:
+            return 0
+        _last_sweep = now
+    removed = 0
+    for entry in os.scandir(PAYLOAD_DIR):
+        try:
+            if entry.is_file() and now - entry.stat().st_mtime > max_age:
+                os.remove(entry.path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
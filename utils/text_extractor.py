@@ -1,35 +1,153 @@
-import pypdf
-import docx
 import io
+import os
+import time
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
 
-def extract_text_from_file(uploaded_file):
+# 추출 제한 (대용량 문서가 관리자 화면을 멈추지 않도록)
+MAX_PAGES = 1000             # 이 페이지 수까지만 추출 (초과분은 무시)
+TIME_LIMIT_SECONDS = 120     # 전체 추출 제한 시간
+PARALLEL_MIN_PAGES = 60      # 이 이상인 PDF는 프로세스 풀로 병렬 추출
+PAGES_PER_TASK = 20          # 워커 1회 작업 단위 (페이지 수)
+SUPPORTED_TYPES = ("pdf", "docx", "txt")
+
+_pool = None
+
+def _get_pool(workers=None):
+    """PDF 병렬 추출용 프로세스 풀 (최초 사용 시 생성, 이후 재사용)"""
+    global _pool
+    if _pool is None:
+        # Streamlit 서버는 멀티스레드이므로 fork 대신 spawn 사용
+        _pool = ProcessPoolExecutor(
+            max_workers=workers or max(1, min(4, (os.cpu_count() or 2) - 1)),
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+def _extract_pdf_range(path, start, end):
+    """[워커 프로세스] PDF 파일의 start~end-1 페이지 텍스트를 추출합니다."""
+    import pypdf
+    reader = pypdf.PdfReader(path)
+    return [(i + 1, reader.pages[i].extract_text() or "") for i in range(start, end)]
+
+def estimate_tokens(text):
     """
-    Streamlit uploaded_file 객체(PDF or DOCX or TXT)에서 텍스트를 추출합니다.
+    모델 입력 토큰 수를 대략 추정합니다. (영문/숫자 약 4자당 1토큰, 한글 등 비ASCII 약 1.5자당 1토큰)
     """
-    file_type = uploaded_file.name.split('.')[-1].lower()
-    text = ""
-    
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return int(ascii_chars / 4 + (len(text) - ascii_chars) / 1.5) + 1
+
+def _iter_pdf(file_bytes, max_pages, deadline, parallel, progress):
+    import pypdf  # PDF/DOCX 파서는 실제 추출 시점에만 로드
+    reader = pypdf.PdfReader(io.BytesIO(file_bytes))
+    total = min(len(reader.pages), max_pages)
+
+    if not parallel or total < PARALLEL_MIN_PAGES:
+        for i in range(total):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"추출 제한 시간 초과 ({i}/{total} 페이지)")
+            yield {"page": i + 1, "text": reader.pages[i].extract_text() or ""}
+            if progress: progress(i + 1, total)
+        return
+
+    # 워커에는 바이트 대신 임시 파일 경로 전달 (작업마다 전체 파일을 직렬화하지 않음)
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(file_bytes)
+    pool = _get_pool()
+    futures = [
+        pool.submit(_extract_pdf_range, tmp.name, start, min(start + PAGES_PER_TASK, total))
+        for start in range(0, total, PAGES_PER_TASK)
+    ]
     try:
-        if file_type == 'pdf':
-            # PDF Reader
-            pdf_reader = pypdf.PdfReader(uploaded_file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-                
-        elif file_type == 'docx':
-            # Docx Reader
-            doc = docx.Document(uploaded_file)
-            for para in doc.paragraphs:
-                text += para.text + "\n"
-                
-        elif file_type == 'txt':
-            # Text File
-            text = uploaded_file.getvalue().decode("utf-8")
-            
-        else:
-            return None, "지원하지 않는 파일 형식입니다."
-            
-        return text.strip(), None
-        
+        done = 0
+        # 제출 순서대로 결과를 받아 페이지 순서를 유지
+        for future in futures:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"추출 제한 시간 초과 ({done}/{total} 페이지)")
+            try:
+                pages = future.result(timeout=remaining)
+            except FutureTimeoutError:
+                raise TimeoutError(f"추출 제한 시간 초과 ({done}/{total} 페이지)")
+            for page_no, text in pages:
+                yield {"page": page_no, "text": text}
+            done += len(pages)
+            if progress: progress(done, total)
+    finally:
+        for future in futures:
+            future.cancel()
+        os.remove(tmp.name)
+
+def iter_document(file_bytes, file_type, max_pages=MAX_PAGES, time_limit=TIME_LIMIT_SECONDS,
+                  parallel=True, progress=None):
+    """
+    문서를 페이지(PDF) 또는 문단(DOCX/TXT) 단위로 순서대로 반환하는 제너레이터.
+    - 각 항목: {"page": n, "text": ...} 또는 {"paragraph": n, "offset": 문자 위치, "text": ...}
+    - max_pages: PDF 최대 페이지 수 / time_limit: 제한 시간(초) 초과 시 TimeoutError
+    - progress(done, total): 진행 상황 콜백 (소비하는 쪽 스레드에서 호출)
+    """
+    file_type = file_type.lower()
+    deadline = time.monotonic() + time_limit
+
+    if file_type == 'pdf':
+        yield from _iter_pdf(file_bytes, max_pages, deadline, parallel, progress)
+
+    elif file_type == 'docx':
+        import docx
+        doc = docx.Document(io.BytesIO(file_bytes))
+        total = len(doc.paragraphs)
+        offset = 0
+        for i, para in enumerate(doc.paragraphs):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"추출 제한 시간 초과 ({i}/{total} 문단)")
+            yield {"paragraph": i + 1, "offset": offset, "text": para.text}
+            offset += len(para.text) + 1
+            if progress: progress(i + 1, total)
+
+    elif file_type == 'txt':
+        text = file_bytes.decode("utf-8")
+        offset = 0
+        paragraphs = text.split("\n\n")
+        for i, para in enumerate(paragraphs):
+            yield {"paragraph": i + 1, "offset": offset, "text": para}
+            offset += len(para) + 2
+            if progress: progress(i + 1, len(paragraphs))
+
+    else:
+        raise ValueError("지원하지 않는 파일 형식입니다.")
+
+def extract_document(file_bytes, file_type, progress=None, **limits):
+    """
+    파일 바이트(PDF or DOCX or TXT)에서 텍스트와 메타데이터를 추출합니다.
+    반환: ({"text", "page_count", "token_estimate"}, error)
+    """
+    file_type = file_type.lower()
+    if file_type not in SUPPORTED_TYPES:
+        return None, "지원하지 않는 파일 형식입니다."
+    try:
+        parts = []
+        page_count = None
+        for item in iter_document(file_bytes, file_type, progress=progress, **limits):
+            parts.append(item["text"])
+            if "page" in item:
+                page_count = item["page"]
+
+        sep = "\n\n" if file_type == 'txt' else "\n"
+        text = sep.join(parts).strip()
+        return {"text": text, "page_count": page_count, "token_estimate": estimate_tokens(text)}, None
+
     except Exception as e:
         return None, f"파일 처리 중 오류 발생: {str(e)}"
+
+def extract_text_from_file(uploaded_file):
+    """
+    Streamlit uploaded_file 객체(PDF or DOCX or TXT)에서 텍스트를 추출합니다.
+    """
+    file_type = uploaded_file.name.split('.')[-1].lower()
+    doc, err = extract_document(uploaded_file.getvalue(), file_type)
+    if err:
+        return None, err
+    return doc["text"], None
@@ -0,0 +1,249 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime, timezone
+import numpy as np
+from utils.local_store import data_path
+from utils.near_duplicate import normalize_script
+
+# ==========================================
+# 🏷️ 로컬 상담 유형 분류기 (1차 분석 Fast Path)
+# ==========================================
+# 1차 분석(analyze_topic_and_traits)의 고사고(high thinking) 호출은 대부분 몇 개 안 되는 상담 유형 중
+# top_3_topics를 고르는 데 쓰입니다. coaching_logs에 쌓인 (original_script, consultation_type)으로
+# 글자 n-gram 해시 특징 + 다항 나이브 베이즈(로그 공간의 선형 모델)를 학습해, 확신할 때는 유형을 미리 채우고
+# 1차 분석 프롬프트에서 유형 목록을 빼고 참고자료 목록도 해당 유형으로 줄입니다. (사고 수준도 low)
+#
+# 확신 기준: (1위 점수 - 2위 점수) / 특징 수. 학습 시 검증 세트(20%)에서 정밀도가 TARGET_PRECISION 이상인
+# 가장 낮은 값을 임계값으로 골라 모델과 함께 저장합니다. 텍스트 입력에만 적용됩니다. (오디오는 1차 분석 전 전사문 없음)
+
+MODEL_DIR = os.path.dirname(data_path("topic_classifier", "_"))
+MODEL_FILE = os.path.join(MODEL_DIR, "model.npz")
+
+NGRAM_MAX = 3            # 글자 1~3-gram
+HASH_BITS = 18           # 특징 해시 공간 2^18 (유형 8개 기준 가중치 8MB)
+MAX_CHARS = 4000         # 정규화 후 앞부분만 사용 (상담 주제는 초반에 드러남, 지연 상한)
+MIN_CHARS = 20
+ALPHA = 0.1              # 라플라스 평활
+MIN_EXAMPLES = 20        # 이보다 예시가 적은 유형은 학습에서 제외
+MIN_TRAIN_LOGS = 200     # 전체 학습 예시가 이보다 적으면 학습하지 않음
+HOLDOUT_EVERY = 5        # log id % 5 == 0 -> 검증 세트 (20%)
+TARGET_PRECISION = 0.95
+MIN_CONFIDENT = 20       # 임계값 선택 시 확신 구간 최소 표본 수
+
+_DIM = 1 << HASH_BITS
+_MULT = np.uint64(1000003)
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+_SHIFT = np.uint64(64 - HASH_BITS)
+
+_lock = threading.Lock()
+_cached = {"mtime": None, "model": None}
+
+def features(script):
+    """정규화한 스크립트의 글자 1~NGRAM_MAX-gram 해시 버킷 (중복 제거, int32). 너무 짧으면 None"""
+    text = normalize_script(script)[:MAX_CHARS]
+    if len(text) < MIN_CHARS:
+        return None
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    buckets = []
+    h = np.zeros(len(codes), dtype=np.uint64)
+    for n in range(1, NGRAM_MAX + 1):
+        m = len(codes) - n + 1
+        h = h[:m] * _MULT + codes[n - 1:n - 1 + m]
+        # n별로 다른 상수를 더해 길이가 다른 n-gram끼리 버킷이 겹치지 않도록
+        buckets.append(((h + np.uint64(n)) * _MIX) >> _SHIFT)
+    return np.unique(np.concatenate(buckets)).astype(np.int32)
+
+class TopicClassifier:
+    """해시 특징 다항 나이브 베이즈 (classes x 2^HASH_BITS 로그 확률 가중치)"""
+
+    def __init__(self, classes, log_prior, weights, threshold=float("inf"), report=None):
+        self.classes = list(classes)
+        self.log_prior = np.asarray(log_prior, dtype=np.float32)
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.threshold = float(threshold)
+        self.report = report or {}
+
+    @classmethod
+    def fit(cls, counts, doc_counts, classes):
+        """유형별 특징 문서 빈도(counts: classes x dim)로 가중치를 계산합니다."""
+        counts = np.asarray(counts, dtype=np.float64)
+        weights = np.log(counts + ALPHA) - np.log(counts.sum(axis=1, keepdims=True) + ALPHA * _DIM)
+        doc_counts = np.asarray(doc_counts, dtype=np.float64)
+        return cls(classes, np.log(doc_counts / doc_counts.sum()), weights)
+
+    def scores(self, feats):
+        return self.log_prior + self.weights[:, feats].sum(axis=1)
+
+    def predict_features(self, feats, k=3):
+        """반환: (상위 k개 유형, 확신도 margin)"""
+        scores = self.scores(feats)
+        order = np.argsort(scores)[::-1]
+        margin = (scores[order[0]] - scores[order[1]]) / len(feats) if len(order) > 1 else float("inf")
+        return [self.classes[i] for i in order[:k]], float(margin)
+
+    def predict(self, script, k=3):
+        """
+        반환: {"topic", "candidates", "margin", "confident"} (스크립트가 너무 짧으면 None)
+        """
+        feats = features(script)
+        if feats is None:
+            return None
+        candidates, margin = self.predict_features(feats, k)
+        return {"topic": candidates[0], "candidates": candidates, "margin": round(margin, 4),
+                "confident": margin >= self.threshold}
+
+    @property
+    def nbytes(self):
+        return self.weights.nbytes + self.log_prior.nbytes
+
+    def save(self, path=MODEL_FILE):
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, classes=np.array(self.classes), log_prior=self.log_prior, weights=self.weights,
+                 threshold=np.array(self.threshold),
+                 report=np.array(json.dumps(self.report, ensure_ascii=False)))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=MODEL_FILE):
+        with np.load(path) as data:
+            return cls(data["classes"].tolist(), data["log_prior"], data["weights"],
+                       float(data["threshold"]), json.loads(str(data["report"])))
+
+def _choose_threshold(margins, correct):
+    """margin 내림차순 누적 정밀도가 TARGET_PRECISION 이상인 가장 넓은 구간의 경계값 (없으면 inf)"""
+    if len(margins) == 0:
+        return float("inf")
+    order = np.argsort(margins)[::-1]
+    precision = np.cumsum(correct[order]) / np.arange(1, len(order) + 1)
+    ok = np.nonzero((precision >= TARGET_PRECISION) & (np.arange(1, len(order) + 1) >= MIN_CONFIDENT))[0]
+    return float(margins[order[ok[-1]]]) if len(ok) else float("inf")
+
+def _percentile(values, q):
+    return round(float(np.percentile(values, q)), 3) if len(values) else None
+
+def train(examples):
+    """
+    (log_id, script, label) 이터러블로 분류기를 학습합니다. (학습 세트는 바로 빈도에 누적해 메모리는 검증 세트만큼)
+    검증 세트로 정확도/확신 임계값/지연 시간을 측정한 뒤, 전체 데이터로 다시 맞춘 모델을 반환합니다.
+    예시가 부족하면 None
+    """
+    started = time.perf_counter()
+    counts, doc_counts = {}, {}
+    holdout = []
+    for log_id, script, label in examples:
+        if not label:
+            continue
+        feats = features(script)
+        if feats is None:
+            continue
+        if log_id is not None and log_id % HOLDOUT_EVERY == 0:
+            holdout.append((feats, label, script))
+            continue
+        if label not in counts:
+            counts[label] = np.zeros(_DIM, dtype=np.float64)
+            doc_counts[label] = 0
+        counts[label][feats] += 1
+        doc_counts[label] += 1
+
+    classes = sorted(c for c, n in doc_counts.items() if n >= MIN_EXAMPLES)
+    if len(classes) < 2 or sum(doc_counts[c] for c in classes) < MIN_TRAIN_LOGS:
+        print(f"유형 분류기 학습 생략: 학습 예시 부족 ({doc_counts})")
+        return None
+
+    # 1) 학습 세트 모델로 검증
+    model = TopicClassifier.fit([counts[c] for c in classes], [doc_counts[c] for c in classes], classes)
+    margins, correct, top3, latencies = [], [], [], []
+    for feats, label, script in holdout:
+        t0 = time.perf_counter()
+        result = model.predict(script)   # 지연 시간은 특징 추출 포함
+        latencies.append((time.perf_counter() - t0) * 1000)
+        margins.append(result["margin"])
+        correct.append(result["topic"] == label)
+        top3.append(label in result["candidates"])
+    margins, correct = np.array(margins), np.array(correct, dtype=bool)
+    threshold = _choose_threshold(margins, correct)
+    confident = margins >= threshold
+
+    # 2) 검증 세트까지 합쳐 최종 모델
+    for feats, label, _ in holdout:
+        if label in counts:
+            counts[label][feats] += 1
+            doc_counts[label] += 1
+    final = TopicClassifier.fit([counts[c] for c in classes], [doc_counts[c] for c in classes], classes)
+    final.threshold = threshold
+    final.report = {
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+        "examples": int(sum(doc_counts.values())),
+        "classes": {c: int(doc_counts[c]) for c in classes},
+        "holdout": len(holdout),
+        "accuracy": round(float(correct.mean()), 4) if len(correct) else None,
+        "top3_accuracy": round(float(np.mean(top3)), 4) if top3 else None,
+        "threshold": round(threshold, 4) if np.isfinite(threshold) else None,
+        "coverage": round(float(confident.mean()), 4) if len(confident) else 0.0,
+        "confident_precision": round(float(correct[confident].mean()), 4) if confident.any() else None,
+        "predict_ms_p50": _percentile(latencies, 50),
+        "predict_ms_p95": _percentile(latencies, 95),
+        "train_s": round(time.perf_counter() - started, 2),
+        "model_mb": round(final.nbytes / 1e6, 1),
+    }
+    return final
+
+def train_from_logs(page_size=500):
+    """coaching_logs 전체로 학습해 저장합니다. 반환: 학습 리포트 (예시 부족/실패 시 None)"""
+    from utils.db_manager import iter_coaching_logs
+
+    def examples():
+        for page in iter_coaching_logs("consultation_type, original_script", page_size=page_size):
+            for log in page:
+                yield log["id"], log.get("original_script"), log.get("consultation_type")
+
+    try:
+        model = train(examples())
+        if model is None:
+            return None
+        model.save()
+        with _lock:
+            _cached.update(mtime=None, model=None)
+        print(f"[topic_classifier] 학습 완료: {model.report}")
+        return model.report
+    except Exception as e:
+        print(f"유형 분류기 학습 실패: {e}")
+        return None
+
+def get_classifier():
+    """저장된 분류기를 반환합니다. (파일이 바뀌면 다시 로드, 없으면 None)"""
+    try:
+        mtime = os.path.getmtime(MODEL_FILE)
+    except OSError:
+        return None
+    with _lock:
+        if _cached["model"] is None or _cached["mtime"] != mtime:
+            try:
+                _cached.update(model=TopicClassifier.load(), mtime=mtime)
+            except Exception as e:
+                print(f"유형 분류기 로드 실패: {e}")
+                return None
+        return _cached["model"]
+
+def classify_topic(script, active_types=None):
+    """
+    1차 분석 전 로컬 유형 분류. 반환: predict() 결과 + latency_ms (모델이 없거나 스크립트가 짧으면 None)
+    active_types가 주어지면 비활성 유형은 확신하지 않은 것으로 처리합니다.
+    """
+    model = get_classifier()
+    if model is None or not script:
+        return None
+    started = time.perf_counter()
+    result = model.predict(script)
+    if result is None:
+        return None
+    result["latency_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    if active_types is not None and result["topic"] not in active_types:
+        result["confident"] = False
+    return result
+
+def model_report():
+    model = get_classifier()
+    return model.report if model else None
@@ -0,0 +1,293 @@
+import os
+import sys
+import json
+import time
+import uuid
+import types
+import atexit
+import inspect
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from utils.local_store import data_path
+
+# ==========================================
+# ⏱️ 단계별 지연 시간 추적 (Span)
+# ==========================================
+# ai_agent / db_manager 함수 호출마다 span(이름, 시작 시각, 소요 ms, 상위 span, 세션 ID)을 남겨
+# "코칭이 느리다"는 문의가 왔을 때 PDF 다운로드 / 모델 호출 / 오디오 업로드 / 프로필 재집계 중
+# 어디서 시간이 걸렸는지 세션 단위로 확인할 수 있게 합니다.
+# span은 메모리 버퍼에 모았다가 일자별 JSONL 파일(.pass_data/traces)에 묶어서 기록합니다.
+
+TRACE_DIR = os.path.dirname(data_path("traces", "_"))
+FLUSH_EVERY = 50            # 버퍼에 이만큼 쌓이면 파일에 기록
+FLUSH_INTERVAL_SECONDS = 2  # 또는 마지막 기록 후 이 시간이 지나면 기록
+RETENTION_DAYS = 7
+TRACING_ENABLED = os.environ.get("PASS_TRACING", "1") != "0"
+
+_session_id = contextvars.ContextVar("trace_session_id", default=None)
+_user_id = contextvars.ContextVar("trace_user_id", default=None)
+_current_span = contextvars.ContextVar("trace_current_span", default=None)
+
+_buffer = []
+_buffer_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+# ------------------------------------------
+# 세션 컨텍스트
+# ------------------------------------------
+
+def set_session(session_id, user_id=None):
+    """현재 실행 흐름(스크립트 실행/스레드)의 세션 ID와 사용자 ID를 지정합니다."""
+    _session_id.set(session_id)
+    _user_id.set(user_id)
+
+def bind_streamlit_session(session_state, user_id=None):
+    """Streamlit 세션마다 고정된 추적용 세션 ID를 만들고 현재 실행에 지정합니다. (페이지 상단에서 호출)"""
+    if "trace_session_id" not in session_state:
+        session_state["trace_session_id"] = uuid.uuid4().hex[:12]
+    set_session(session_state["trace_session_id"], user_id)
+    return session_state["trace_session_id"]
+
+def get_session():
+    return _session_id.get()
+
+def get_user():
+    return _user_id.get()
+
+def bind(fn):
+    """
+    현재 컨텍스트(세션 ID, 상위 span)를 복사해 fn을 감쌉니다.
+    스레드 풀/타이머에 작업을 넘길 때 사용하면 백그라운드 span도 같은 세션으로 묶입니다.
+    """
+    ctx = contextvars.copy_context()
+    return functools.partial(ctx.run, fn)
+
+# ------------------------------------------
+# Span 기록
+# ------------------------------------------
+
+def _record(item):
+    with _buffer_lock:
+        _buffer.append(item)
+        due = len(_buffer) >= FLUSH_EVERY or time.monotonic() - _last_flush >= FLUSH_INTERVAL_SECONDS
+    if due:
+        flush()
+
+def flush():
+    """버퍼에 모인 span을 오늘 날짜 파일에 기록합니다."""
+    global _last_flush
+    with _buffer_lock:
+        items = _buffer[:]
+        _buffer.clear()
+        _last_flush = time.monotonic()
+    if not items:
+        return
+    path = os.path.join(TRACE_DIR, f"spans-{datetime.now(timezone.utc):%Y%m%d}.jsonl")
+    try:
+        new_file = not os.path.exists(path)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(i, ensure_ascii=False, default=str) + "\n" for i in items))
+        if new_file:
+            _purge_old_files()
+    except Exception as e:
+        print(f"span 기록 실패: {e}")
+
+atexit.register(flush)
+
+def _purge_old_files():
+    cutoff = f"spans-{datetime.now(timezone.utc) - timedelta(days=RETENTION_DAYS):%Y%m%d}.jsonl"
+    for name in os.listdir(TRACE_DIR):
+        if name.startswith("spans-") and name < cutoff:
+            os.remove(os.path.join(TRACE_DIR, name))
+
+@contextmanager
+def span(name, **attrs):
+    """
+    코드 블록의 소요 시간을 span으로 기록합니다.
+        with span("ai.model_call", fn="generate_coaching_feedback"):
+            ...
+    블록 안에서 예외가 나면 status="error"로 기록하고 예외는 그대로 전달합니다.
+    """
+    if not TRACING_ENABLED:
+        yield {}
+        return
+    item = {
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_id": _current_span.get(),
+        "session_id": _session_id.get(),
+        "user_id": _user_id.get(),
+        "name": name,
+        "start": datetime.now(timezone.utc).isoformat(),
+        "thread": threading.current_thread().name,
+        "status": "ok",
+        "attrs": attrs,
+    }
+    token = _current_span.set(item["span_id"])
+    started = time.perf_counter()
+    try:
+        yield item["attrs"]
+    except BaseException as e:
+        item["status"] = "error"
+        item["error"] = f"{type(e).__name__}: {e}"[:300]
+        raise
+    finally:
+        item["duration_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        _current_span.reset(token)
+        _record(item)
+
+def _traced_generator(fn, name):
+    """제너레이터 함수는 소비자 처리 시간을 빼고, 제너레이터 내부에서 보낸 시간만 합산합니다."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        gen = fn(*args, **kwargs)
+        busy, items = 0.0, 0
+        status, error = "ok", None
+        started_at = datetime.now(timezone.utc).isoformat()
+        try:
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    value = next(gen)
+                except StopIteration:
+                    busy += time.perf_counter() - t0
+                    return
+                busy += time.perf_counter() - t0
+                items += 1
+                yield value
+        except GeneratorExit:
+            gen.close()
+            raise
+        except Exception as e:
+            status, error = "error", f"{type(e).__name__}: {e}"[:300]
+            raise
+        finally:
+            if TRACING_ENABLED:
+                item = {
+                    "span_id": uuid.uuid4().hex[:16], "parent_id": _current_span.get(),
+                    "session_id": _session_id.get(), "user_id": _user_id.get(),
+                    "name": name, "start": started_at, "thread": threading.current_thread().name,
+                    "status": status, "attrs": {"items": items},
+                    "duration_ms": round(busy * 1000, 3),
+                }
+                if error:
+                    item["error"] = error
+                _record(item)
+    return wrapper
+
+def traced(name=None):
+    """
+    함수 호출 전체를 span으로 기록하는 데코레이터.
+        @traced("db.save_coaching_result")
+    """
+    def decorator(fn):
+        span_name = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+        if getattr(fn, "__traced__", False):
+            return fn
+        if inspect.isgeneratorfunction(fn):
+            wrapper = _traced_generator(fn, span_name)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with span(span_name):
+                    return fn(*args, **kwargs)
+        wrapper.__traced__ = True
+        return wrapper
+    return decorator
+
+def instrument_module(module_name, prefix, exclude=()):
+    """
+    모듈에 정의된 모든 함수(def)를 traced로 교체합니다. (모듈 맨 끝에서 호출)
+    모듈 전역 이름을 교체하므로 모듈 내부 호출도 하위 span으로 기록됩니다.
+    st.cache_resource / lru_cache 등으로 감싼 객체는 함수가 아니므로 건너뜁니다.
+    """
+    module = sys.modules[module_name]
+    for attr, obj in list(vars(module).items()):
+        if (isinstance(obj, types.FunctionType) and obj.__module__ == module_name
+                and attr not in exclude):
+            setattr(module, attr, traced(f"{prefix}.{attr}")(obj))
+
+# ------------------------------------------
+# 조회 / 내보내기
+# ------------------------------------------
+
+def load_spans(days=1, session_id=None):
+    """최근 days일치 span 목록을 반환합니다. (아직 파일에 기록되지 않은 버퍼 포함)"""
+    flush()
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    spans = []
+    for name in sorted(os.listdir(TRACE_DIR)):
+        if not name.startswith("spans-") or name < f"spans-{cutoff:%Y%m%d}":
+            continue
+        with open(os.path.join(TRACE_DIR, name), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    item = json.loads(line)
+                except ValueError:
+                    continue  # 동시 기록으로 잘린 줄
+                if item["start"] < cutoff.isoformat():
+                    continue
+                if session_id and item.get("session_id") != session_id:
+                    continue
+                spans.append(item)
+    return spans
+
+def _quantile(ordered, q):
+    if not ordered:
+        return 0.0
+    idx = min(len(ordered) - 1, max(0, int(round(q * len(ordered) + 0.5)) - 1))
+    return ordered[idx]
+
+def summarize_spans(spans):
+    """
+    span 이름별 호출 수, 오류 수, p50/p95/p99/평균/합계(ms)를 반환합니다. (p95 내림차순)
+    self_mean_ms: 하위 span 시간을 뺀 자체 소요 시간 평균 (예: 프롬프트 조립, 결과 파싱)
+    """
+    by_name = {}
+    child_ms = {}
+    for s in spans:
+        by_name.setdefault(s["name"], []).append(s)
+        if s.get("parent_id"):
+            child_ms[s["parent_id"]] = child_ms.get(s["parent_id"], 0.0) + s["duration_ms"]
+    rows = []
+    for name, items in by_name.items():
+        durations = sorted(i["duration_ms"] for i in items)
+        rows.append({
+            "name": name,
+            "count": len(items),
+            "errors": sum(1 for i in items if i["status"] == "error"),
+            "p50_ms": round(_quantile(durations, 0.50), 1),
+            "p95_ms": round(_quantile(durations, 0.95), 1),
+            "p99_ms": round(_quantile(durations, 0.99), 1),
+            "mean_ms": round(sum(durations) / len(durations), 1),
+            "self_mean_ms": round(
+                sum(max(0.0, i["duration_ms"] - child_ms.get(i["span_id"], 0.0)) for i in items) / len(items), 1
+            ),
+            "total_ms": round(sum(durations), 1),
+        })
+    rows.sort(key=lambda r: r["p95_ms"], reverse=True)
+    return rows
+
+def prometheus_text(spans=None, days=1):
+    """span 통계를 Prometheus 텍스트 노출 형식(summary)으로 반환합니다."""
+    spans = load_spans(days) if spans is None else spans
+    lines = [
+        "# HELP pass_span_duration_seconds Duration of traced ai_agent/db_manager calls.",
+        "# TYPE pass_span_duration_seconds summary",
+    ]
+    errors = []
+    for row in summarize_spans(spans):
+        label = row["name"].replace("\\", "\\\\").replace('"', '\\"')
+        for q, key in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+            lines.append(f'pass_span_duration_seconds{{span="{label}",quantile="{q}"}} {row[key] / 1000:.6f}')
+        lines.append(f'pass_span_duration_seconds_sum{{span="{label}"}} {row["total_ms"] / 1000:.6f}')
+        lines.append(f'pass_span_duration_seconds_count{{span="{label}"}} {row["count"]}')
+        errors.append(f'pass_span_errors_total{{span="{label}"}} {row["errors"]}')
+    lines += [
+        "# HELP pass_span_errors_total Traced calls that raised an exception.",
+        "# TYPE pass_span_errors_total counter",
+        *errors,
+    ]
+    return "\n".join(lines) + "\n"